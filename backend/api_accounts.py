@@ -0,0 +1,1144 @@
+"""
+User profile, dashboard and the per-platform account endpoints.
+"""
+from flask import Blueprint, request, jsonify, session
+import mysql.connector
+from datetime import datetime, timedelta, date
+from api_common import get_db_connection, validate_email, time_to_timedelta, get_user_id_from_email, TIMEZONE
+
+bp = Blueprint('accounts', __name__)
+
+@bp.route('/dashboard', methods=['GET'])
+def get_dashboard():
+    if 'user_id' not in session:
+        return jsonify({"error": "Unauthorized access"}), 403
+    
+    user_id = session['user_id']
+    email_id = session['user_email']
+    
+    conn = get_db_connection()
+    if not conn:
+        return jsonify({"error": "Database connection failed"}), 500
+
+    try:
+        cursor = conn.cursor(dictionary=True)
+        
+        # Single query to get all counts for Instagram
+        cursor.execute("""
+            SELECT 
+                COUNT(*) as total,
+                SUM(CASE WHEN selected = 'Yes' THEN 1 ELSE 0 END) as active
+            FROM instagram 
+            WHERE user_id = %s
+        """, (email_id,))
+        instagram_result = cursor.fetchone()
+        
+        # Single query to get all counts for Telegram
+        cursor.execute("""
+            SELECT 
+                COUNT(*) as total,
+                SUM(CASE WHEN selected = 'Yes' THEN 1 ELSE 0 END) as active
+            FROM telegram 
+            WHERE user_id = %s
+        """, (email_id,))
+        telegram_result = cursor.fetchone()
+        
+        # Single query to get all counts for Facebook
+        cursor.execute("""
+            SELECT 
+                COUNT(*) as total,
+                SUM(CASE WHEN selected = 'Yes' THEN 1 ELSE 0 END) as active
+            FROM facebook 
+            WHERE user_id = %s
+        """, (email_id,))
+        facebook_result = cursor.fetchone()
+        
+        # Single query to get all counts for YouTube
+        cursor.execute("""
+            SELECT 
+                COUNT(*) as total,
+                SUM(CASE WHEN selected = 'Yes' THEN 1 ELSE 0 END) as active
+            FROM youtube 
+            WHERE user_id = %s
+        """, (email_id,))
+        youtube_result = cursor.fetchone()
+        
+        # Calculate posts for today using post_daily_range_left
+        today = datetime.now(TIMEZONE).date()
+        tomorrow = today + timedelta(days=1)
+        
+        posts_today = 0
+        for platform in ['instagram', 'telegram', 'facebook', 'youtube']:
+            cursor.execute(f"""
+                SELECT SUM(post_daily_range_left) as total_posts 
+                FROM {platform} 
+                WHERE user_id = %s 
+                AND selected = 'Yes'
+            """, (email_id,))
+            result = cursor.fetchone()
+            posts_today += result['total_posts'] if result and result['total_posts'] else 0
+        
+        cursor.close()
+        conn.close()
+        
+        instagram_total = instagram_result['total'] if instagram_result else 0
+        instagram_active = instagram_result['active'] if instagram_result else 0
+        telegram_total = telegram_result['total'] if telegram_result else 0
+        telegram_active = telegram_result['active'] if telegram_result else 0
+        facebook_total = facebook_result['total'] if facebook_result else 0
+        facebook_active = facebook_result['active'] if facebook_result else 0
+        youtube_total = youtube_result['total'] if youtube_result else 0
+        youtube_active = youtube_result['active'] if youtube_result else 0
+        
+        total_accounts = instagram_total + telegram_total + facebook_total + youtube_total
+        active_schedules = instagram_active + telegram_active + facebook_active + youtube_active
+        
+        return jsonify({
+            "totalAccounts": total_accounts,
+            "activeSchedules": active_schedules,
+            "postsToday": posts_today,
+            "instagramAccounts": instagram_total,
+            "telegramAccounts": telegram_total,
+            "facebookAccounts": facebook_total,
+            "youtubeAccounts": youtube_total
+        }), 200
+        
+    except mysql.connector.Error as e:
+        if conn:
+            conn.close()
+        return jsonify({"error": f"Database error: {str(e)}"}), 500
+
+@bp.route('/user/<int:user_id>', methods=['PATCH'])
+def update_user(user_id):
+    """Update user details in the user table."""
+    if 'user_id' not in session or session['user_id'] != user_id:
+        return jsonify({"error": "Unauthorized access"}), 403
+        
+    data = request.get_json()
+    name = data.get('name')
+    email = data.get('email')
+    phone_number = data.get('phone_number')
+
+    # Validation
+    if name and len(name) < 3:
+        return jsonify({"error": "Name must be at least 3 characters long"}), 400
+    if email and not validate_email(email):
+        return jsonify({"error": "Invalid email format"}), 400
+
+    conn = get_db_connection()
+    if not conn:
+        return jsonify({"error": "Database connection failed"}), 500
+
+    try:
+        cursor = conn.cursor()
+        # Verify user exists
+        cursor.execute("SELECT Id FROM user WHERE Id = %s", (user_id,))
+        if not cursor.fetchone():
+            cursor.close()
+            conn.close()
+            return jsonify({"error": "User ID does not exist"}), 400
+
+        # Check for duplicate email if email is being changed
+        if email:
+            cursor.execute("SELECT Id FROM user WHERE email = %s AND Id != %s", (email, user_id))
+            if cursor.fetchone():
+                cursor.close()
+                conn.close()
+                return jsonify({"error": "Email already exists"}), 400
+
+        # Build dynamic update query
+        updates = []
+        params = []
+        if name:
+            updates.append("Name = %s")
+            params.append(name)
+        if email:
+            updates.append("email = %s")
+            params.append(email)
+        if phone_number is not None:  # Allow empty string for phone number
+            updates.append("phone_number = %s")
+            params.append(phone_number)
+
+        if not updates:
+            cursor.close()
+            conn.close()
+            return jsonify({"error": "No fields provided to update"}), 400
+
+        query = f"UPDATE user SET {', '.join(updates)} WHERE Id = %s"
+        params.append(user_id)
+        cursor.execute(query, params)
+        conn.commit()
+        cursor.close()
+        conn.close()
+        return jsonify({"message": "User updated successfully"}), 200
+    except mysql.connector.Error as e:
+        conn.close()
+        return jsonify({"error": f"Database error: {str(e)}"}), 500
+
+@bp.route('/user/<int:user_id>', methods=['DELETE'])
+def delete_user(user_id):
+    """Delete a user and their associated platform records."""
+    conn = get_db_connection()
+    if not conn:
+        return jsonify({"error": "Database connection failed"}), 500
+
+    try:
+        cursor = conn.cursor()
+        # Verify user exists
+        cursor.execute("SELECT Id FROM user WHERE Id = %s", (user_id,))
+        if not cursor.fetchone():
+            cursor.close()
+            conn.close()
+            return jsonify({"error": "User ID does not exist"}), 400
+
+        # Delete user (cascading deletes will remove platform records)
+        cursor.execute("DELETE FROM user WHERE Id = %s", (user_id,))
+        conn.commit()
+        cursor.close()
+        conn.close()
+        return jsonify({"message": "User and associated records deleted successfully"}), 200
+    except mysql.connector.Error as e:
+        conn.close()
+        return jsonify({"error": f"Database error: {str(e)}"}), 500
+
+@bp.route('/instagram/<int:record_id>', methods=['PATCH'])
+def update_instagram(record_id):
+    """Update an existing Instagram account."""
+    data = request.get_json()
+    email = data.get('email')
+    username = data.get('username')
+    password = data.get('password')
+    sch_start_range = data.get('sch_start_range')
+    sch_end_range = data.get('sch_end_range')
+    number_of_posts = data.get('number_of_posts')
+    
+    # NEW: Get post_daily_range from request
+    post_daily_range = data.get('post_daily_range')
+
+    # Validation
+    if email and not validate_email(email):
+        return jsonify({"error": "Invalid email format"}), 400
+    if username and len(username) < 3:
+        return jsonify({"error": "Username must be at least 3 characters long"}), 400
+    if password and len(password) < 8:
+        return jsonify({"error": "Password must be at least 8 characters long"}), 400
+    if sch_start_range and not time_to_timedelta(sch_start_range):
+        return jsonify({"error": "Invalid sch_start_range format (use HH:MM:SS)"}), 400
+    if sch_end_range and not time_to_timedelta(sch_end_range):
+        return jsonify({"error": "Invalid sch_end_range format (use HH:MM:SS)"}), 400
+    if number_of_posts is not None and number_of_posts < 0:
+        return jsonify({"error": "Number of posts must be non-negative"}), 400
+    
+    # NEW: Validate post_daily_range
+    if post_daily_range is not None and post_daily_range < 0:
+        return jsonify({"error": "Daily post range must be non-negative"}), 400
+
+    # Fetch user_id if email provided
+    user_id = None
+    if email:
+        user_id = get_user_id_from_email(email)
+        if not user_id:
+            return jsonify({"error": "User not available for the provided email"}), 400
+
+    conn = get_db_connection()
+    if not conn:
+        return jsonify({"error": "Database connection failed"}), 500
+
+    try:
+        cursor = conn.cursor()
+        # Verify record exists
+        cursor.execute("SELECT user_id FROM instagram WHERE id = %s", (record_id,))
+        result = cursor.fetchone()
+        if not result:
+            cursor.close()
+            conn.close()
+            return jsonify({"error": "Instagram record not found"}), 400
+        current_user_id = result[0]
+
+        # If email provided, ensure it matches the record's user_id
+        if user_id and user_id != current_user_id:
+            cursor.close()
+            conn.close()
+            return jsonify({"error": "Email does not match the user associated with this Instagram record"}), 400
+
+        # Build dynamic update query
+        updates = []
+        params = []
+        if username:
+            updates.append("username = %s")
+            params.append(username)
+        if password:
+            updates.append("passwand = %s")
+            params.append(password)
+        if email:
+            updates.append("email = %s")
+            params.append(email)
+        if sch_start_range:
+            updates.append("sch_start_range = %s")
+            params.append(sch_start_range)
+        if sch_end_range:
+            updates.append("sch_end_range = %s")
+            params.append(sch_end_range)
+        if number_of_posts is not None:
+            updates.append("number_of_posts = %s")
+            updates.append("posts_left = %s")
+            params.extend([number_of_posts, number_of_posts])
+        
+        # NEW: Handle post_daily_range
+        if post_daily_range is not None:
+            updates.append("post_daily_range = %s")
+            updates.append("post_daily_range_left = %s")
+            params.extend([post_daily_range, post_daily_range])
+            # Also reset last_reset to trigger daily counter refresh
+            updates.append("last_reset = %s")
+            params.append(datetime.now(TIMEZONE).strftime('%Y-%m-%d %H:%M:%S'))
+
+        if not updates:
+            cursor.close()
+            conn.close()
+            return jsonify({"error": "No fields provided to update"}), 400
+
+        # Always reset scheduling fields
+        updates.extend(["selected = 'No'", "done = 'No'", "next_post_time = NULL"])
+        query = f"UPDATE instagram SET {', '.join(updates)} WHERE id = %s"
+        params.append(record_id)
+
+        cursor.execute(query, params)
+        conn.commit()
+        cursor.close()
+        conn.close()
+        return jsonify({"message": "Instagram account updated successfully"}), 200
+    except mysql.connector.Error as e:
+        conn.close()
+        return jsonify({"error": f"Database error: {str(e)}"}), 500
+
+@bp.route('/telegram/<int:record_id>', methods=['PATCH'])
+def update_telegram(record_id):
+    """Update an existing Telegram channel."""
+    data = request.get_json()
+    email = data.get('email')
+    channel_name = data.get('channel_name')
+    token_sesson = data.get('token_sesson')
+    google_drive_link = data.get('google_drive_link')  # ✅ ADDED: Get google_drive_link from request
+    sch_start_range = data.get('sch_start_range')
+    sch_end_range = data.get('sch_end_range')
+    number_of_posts = data.get('number_of_posts')
+    
+    # NEW: Get post_daily_range from request
+    post_daily_range = data.get('post_daily_range')
+
+    # Validation
+    if email and not validate_email(email):
+        return jsonify({"error": "Invalid email format"}), 400
+    if channel_name and len(channel_name) < 3:
+        return jsonify({"error": "Channel name must be at least 3 characters long"}), 400
+    if token_sesson and (not token_sesson.startswith('@') and not token_sesson.startswith('-')):
+        return jsonify({"error": "Invalid token_sesson (must start with '@' or '-')"}), 400
+    if sch_start_range and not time_to_timedelta(sch_start_range):
+        return jsonify({"error": "Invalid sch_start_range format (use HH:MM:SS)"}), 400
+    if sch_end_range and not time_to_timedelta(sch_end_range):
+        return jsonify({"error": "Invalid sch_end_range format (use HH:MM:SS)"}), 400
+    if number_of_posts is not None and number_of_posts < 0:
+        return jsonify({"error": "Number of posts must be non-negative"}), 400
+    
+    # NEW: Validate post_daily_range
+    if post_daily_range is not None and post_daily_range < 0:
+        return jsonify({"error": "Daily post range must be non-negative"}), 400
+
+    # Fetch user_id if email provided
+    user_id = None
+    if email:
+        user_id = get_user_id_from_email(email)
+        if not user_id:
+            return jsonify({"error": "User not available for the provided email"}), 400
+
+    conn = get_db_connection()
+    if not conn:
+        return jsonify({"error": "Database connection failed"}), 500
+
+    try:
+        cursor = conn.cursor()
+        # Verify record exists
+        cursor.execute("SELECT user_id FROM telegram WHERE id = %s", (record_id,))
+        result = cursor.fetchone()
+        if not result:
+            cursor.close()
+            conn.close()
+            return jsonify({"error": "Telegram record not found"}), 400
+        current_user_id = result[0]
+
+        # If email provided, ensure it matches the record's user_id
+        if user_id and user_id != current_user_id:
+            cursor.close()
+            conn.close()
+            return jsonify({"error": "Email does not match the user associated with this Telegram record"}), 400
+
+        # Build dynamic update query
+        updates = []
+        params = []
+        if channel_name:
+            updates.append("channel_name = %s")
+            params.append(channel_name)
+        if token_sesson:
+            updates.append("token_sesson = %s")
+            params.append(token_sesson)
+        if email:
+            updates.append("email = %s")
+            params.append(email)
+        if google_drive_link:  # ✅ ADDED: Include google_drive_link in updates
+            updates.append("google_drive_link = %s")
+            params.append(google_drive_link)
+        if sch_start_range:
+            updates.append("sch_start_range = %s")
+            params.append(sch_start_range)
+        if sch_end_range:
+            updates.append("sch_end_range = %s")
+            params.append(sch_end_range)
+        if number_of_posts is not None:
+            updates.append("number_of_posts = %s")
+            updates.append("posts_left = %s")
+            params.extend([number_of_posts, number_of_posts])
+        
+        # NEW: Handle post_daily_range
+        if post_daily_range is not None:
+            updates.append("post_daily_range = %s")
+            updates.append("post_daily_range_left = %s")
+            params.extend([post_daily_range, post_daily_range])
+            # Also reset last_reset to trigger daily counter refresh
+            updates.append("last_reset = %s")
+            params.append(datetime.now(TIMEZONE).strftime('%Y-%m-%d %H:%M:%S'))
+
+        if not updates:
+            cursor.close()
+            conn.close()
+            return jsonify({"error": "No fields provided to update"}), 400
+
+        # Always reset scheduling fields
+        updates.extend(["selected = 'No'", "done = 'No'", "next_post_time = NULL"])
+        query = f"UPDATE telegram SET {', '.join(updates)} WHERE id = %s"
+        params.append(record_id)
+
+        cursor.execute(query, params)
+        conn.commit()
+        cursor.close()
+        conn.close()
+        return jsonify({"message": "Telegram channel updated successfully"}), 200
+    except mysql.connector.Error as e:
+        conn.close()
+        return jsonify({"error": f"Database error: {str(e)}"}), 500
+
+@bp.route('/instagram/<int:record_id>', methods=['DELETE'])
+def delete_instagram(record_id):
+    """Delete an Instagram account."""
+    conn = get_db_connection()
+    if not conn:
+        return jsonify({"error": "Database connection failed"}), 500
+
+    try:
+        cursor = conn.cursor()
+        # Verify record exists
+        cursor.execute("SELECT id FROM instagram WHERE id = %s", (record_id,))
+        if not cursor.fetchone():
+            cursor.close()
+            conn.close()
+            return jsonify({"error": "Instagram record not found"}), 400
+
+        cursor.execute("DELETE FROM instagram WHERE id = %s", (record_id,))
+        conn.commit()
+        cursor.close()
+        conn.close()
+        return jsonify({"message": "Instagram account deleted successfully"}), 200
+    except mysql.connector.Error as e:
+        conn.close()
+        return jsonify({"error": f"Database error: {str(e)}"}), 500
+
+@bp.route('/telegram/<int:record_id>', methods=['DELETE'])
+def delete_telegram(record_id):
+    """Delete a Telegram channel."""
+    conn = get_db_connection()
+    if not conn:
+        return jsonify({"error": "Database connection failed"}), 500
+
+    try:
+        cursor = conn.cursor()
+        # Verify record exists
+        cursor.execute("SELECT id FROM telegram WHERE id = %s", (record_id,))
+        if not cursor.fetchone():
+            cursor.close()
+            conn.close()
+            return jsonify({"error": "Telegram record not found"}), 400
+
+        cursor.execute("DELETE FROM telegram WHERE id = %s", (record_id,))
+        conn.commit()
+        cursor.close()
+        conn.close()
+        return jsonify({"message": "Telegram channel deleted successfully"}), 200
+    except mysql.connector.Error as e:
+        conn.close()
+        return jsonify({"error": f"Database error: {str(e)}"}), 500
+
+@bp.route('/youtube/<int:record_id>', methods=['PATCH'])
+def update_youtube(record_id):
+    """Update an existing YouTube channel."""
+    data = request.get_json()
+    email = data.get('email')
+    username = data.get('username')
+    google_drive_link = data.get('google_drive_link')  # ✅ ADDED
+    sch_start_range = data.get('sch_start_range')
+    sch_end_range = data.get('sch_end_range')
+    number_of_posts = data.get('number_of_posts')
+    
+    # NEW: Get post_daily_range from request
+    post_daily_range = data.get('post_daily_range')
+
+    # Validation
+    if email and not validate_email(email):
+        return jsonify({"error": "Invalid email format"}), 400
+    if username and len(username) < 3:
+        return jsonify({"error": "Username must be at least 3 characters long"}), 400
+    if sch_start_range and not time_to_timedelta(sch_start_range):
+        return jsonify({"error": "Invalid sch_start_range format (use HH:MM:SS)"}), 400
+    if sch_end_range and not time_to_timedelta(sch_end_range):
+        return jsonify({"error": "Invalid sch_end_range format (use HH:MM:SS)"}), 400
+    if number_of_posts is not None and number_of_posts < 0:
+        return jsonify({"error": "Number of posts must be non-negative"}), 400
+    
+    # NEW: Validate post_daily_range
+    if post_daily_range is not None and post_daily_range < 0:
+        return jsonify({"error": "Daily post range must be non-negative"}), 400
+
+    # Fetch user_id if email provided
+    user_id = None
+    if email:
+        user_id = get_user_id_from_email(email)
+        if not user_id:
+            return jsonify({"error": "User not available for the provided email"}), 400
+
+    conn = get_db_connection()
+    if not conn:
+        return jsonify({"error": "Database connection failed"}), 500
+
+    try:
+        cursor = conn.cursor()
+        # Verify record exists
+        cursor.execute("SELECT user_id FROM youtube WHERE id = %s", (record_id,))
+        result = cursor.fetchone()
+        if not result:
+            cursor.close()
+            conn.close()
+            return jsonify({"error": "YouTube record not found"}), 400
+        current_user_id = result[0]
+
+        # If email provided, ensure it matches the record's user_id
+        if user_id and user_id != current_user_id:
+            cursor.close()
+            conn.close()
+            return jsonify({"error": "Email does not match the user associated with this YouTube record"}), 400
+
+        # Build dynamic update query
+        updates = []
+        params = []
+        if username:
+            updates.append("username = %s")
+            params.append(username)
+        if email:
+            updates.append("email = %s")
+            params.append(email)
+        if google_drive_link:  # ✅ ADDED: Include google_drive_link
+            updates.append("google_drive_link = %s")
+            params.append(google_drive_link)
+        if sch_start_range:
+            updates.append("sch_start_range = %s")
+            params.append(sch_start_range)
+        if sch_end_range:
+            updates.append("sch_end_range = %s")
+            params.append(sch_end_range)
+        if number_of_posts is not None:
+            updates.append("number_of_posts = %s")
+            updates.append("posts_left = %s")
+            params.extend([number_of_posts, number_of_posts])
+        
+        # NEW: Handle post_daily_range
+        if post_daily_range is not None:
+            updates.append("post_daily_range = %s")
+            updates.append("post_daily_range_left = %s")
+            params.extend([post_daily_range, post_daily_range])
+            # Also reset last_reset to trigger daily counter refresh
+            updates.append("last_reset = %s")
+            params.append(datetime.now(TIMEZONE).strftime('%Y-%m-%d %H:%M:%S'))
+
+        if not updates:
+            cursor.close()
+            conn.close()
+            return jsonify({"error": "No fields provided to update"}), 400
+
+        # Always reset scheduling fields
+        updates.extend(["selected = 'No'", "done = 'No'", "next_post_time = NULL"])
+        query = f"UPDATE youtube SET {', '.join(updates)} WHERE id = %s"
+        params.append(record_id)
+
+        cursor.execute(query, params)
+        conn.commit()
+        cursor.close()
+        conn.close()
+        return jsonify({"message": "YouTube channel updated successfully"}), 200
+    except mysql.connector.Error as e:
+        conn.close()
+        return jsonify({"error": f"Database error: {str(e)}"}), 500
+
+@bp.route('/instagram', methods=['POST'])
+def add_instagram():
+    """Add or update an Instagram account for a user, including Google Drive link."""
+    data = request.get_json()
+    email = data.get('email')
+    username = data.get('username')
+    password = data.get('password') or data.get('passwand')  # Accept both
+    token_sesson = data.get('token_sesson')  # Get the token from request
+    google_drive_link = data.get('google_drive_link')
+    sch_start_range = data.get('sch_start_range', '20:00:00')
+    sch_end_range = data.get('sch_end_range', '17:00:00')
+    
+    # NEW: Get post_daily_range sent from frontend
+    post_daily_range = data.get('post_daily_range', 0) 
+    # OLD: number_of_posts should default to 0 to be superseded
+    number_of_posts = data.get('number_of_posts', 0) 
+
+    # Validation
+    if not email or not validate_email(email):
+        return jsonify({"error": "Valid email is required"}), 400
+    if not username or len(username) < 3:
+        return jsonify({"error": "Username must be at least 3 characters long"}), 400
+    if not password:
+        return jsonify({"error": "Password is required"}), 400
+    start_td = time_to_timedelta(sch_start_range)
+    end_td = time_to_timedelta(sch_end_range)
+    if not start_td or not end_td:
+        return jsonify({"error": "Invalid time format for sch_start_range or sch_end_range (use HH:MM:SS)"}), 400
+    # Use post_daily_range for validation
+    if post_daily_range < 0:
+        return jsonify({"error": "Number of posts daily must be non-negative"}), 400
+
+    # Fetch user_id from email
+    user_id = get_user_id_from_email(email)
+    if not user_id:
+        return jsonify({"error": "User not available for the provided email"}), 400
+
+    conn = get_db_connection()
+    if not conn:
+        return jsonify({"error": "Database connection failed"}), 500
+
+    try:
+        cursor = conn.cursor()
+        # Check if Instagram account exists for user
+        cursor.execute("SELECT id FROM instagram WHERE user_id = %s AND username = %s", (user_id, username))
+        existing = cursor.fetchone()
+
+        # Set default for post_daily_range_left
+        post_daily_range_left = post_daily_range
+
+        if existing:
+            # Update existing record
+            query = """
+                UPDATE instagram SET 
+                    passwand = %s, 
+                    email = %s,
+                    token_sesson = %s,
+                    token_drive = %s,
+                    google_drive_link = %s, 
+                    sch_start_range = %s, 
+                    sch_end_range = %s, 
+                    
+                    number_of_posts = %s,  -- Deprecated, set to 0
+                    posts_left = %s,        -- Deprecated, set to 0
+                    
+                    post_daily_range = %s,       -- NEW FIELD
+                    post_daily_range_left = %s,  -- NEW FIELD
+                    last_reset = %s,             -- Reset daily counter timestamp
+                    
+                    selected = 'No', 
+                    done = 'No', 
+                    schedule_type = 'range', 
+                    next_post_time = NULL 
+                WHERE id = %s
+            """
+            cursor.execute(query, (
+                password, email, token_sesson, token_sesson, google_drive_link, 
+                sch_start_range, sch_end_range, 
+                0, 0, # old posts fields
+                post_daily_range, post_daily_range_left, datetime.now(TIMEZONE).strftime('%Y-%m-%d %H:%M:%S'), # new daily posts fields
+                existing[0]
+            ))
+            record_id = existing[0]
+            action = "updated"
+        else:
+            # Insert new record - store token in both token_sesson and token_drive
+            query = """
+                INSERT INTO instagram (
+                    user_id, username, passwand, email, token_sesson, token_drive, google_drive_link, 
+                    sch_start_range, sch_end_range, sch_date, sch_time, 
+                    number_of_posts, posts_left, selected, done, schedule_type,
+                    post_daily_range, post_daily_range_left, last_reset
+                ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, 'No', 'No', 'range', %s, %s, %s)
+            """
+            sch_date = datetime.now(TIMEZONE).strftime('%Y-%m-%d')
+            sch_time = '12:00:00'
+            cursor.execute(query, (
+                user_id, username, password, email, token_sesson, token_sesson, google_drive_link,
+                sch_start_range, sch_end_range, sch_date, sch_time,
+                0, 0, # old posts fields
+                post_daily_range, post_daily_range_left, datetime.now(TIMEZONE).strftime('%Y-%m-%d %H:%M:%S') # new daily posts fields
+            ))
+            record_id = cursor.lastrowid
+            action = "created"
+
+        conn.commit()
+        cursor.close()
+        conn.close()
+        return jsonify({"message": f"Instagram account {action} successfully", "record_id": record_id}), 200
+    except mysql.connector.Error as e:
+        conn.close()
+        return jsonify({"error": f"Database error: {str(e)}"}), 500
+
+@bp.route('/telegram', methods=['POST'])
+def add_telegram():
+    """Add or update a Telegram channel for a user."""
+    data = request.get_json()
+    email = data.get('email')
+    channel_name = data.get('channel_name')
+    token_sesson = data.get('token_sesson')
+    sch_start_range = data.get('sch_start_range', '09:00:00')  # Default 9 AM
+    sch_end_range = data.get('sch_end_range', '17:00:00')      # Default 5 PM
+    
+    # NEW: Get post_daily_range sent from frontend
+    post_daily_range = data.get('post_daily_range', 0)
+    
+    # OLD: number_of_posts should default to 0 to be superseded
+    number_of_posts = data.get('number_of_posts', 0) 
+
+    # Validation
+    if not email or not validate_email(email):
+        return jsonify({"error": "Valid email is required"}), 400
+    if not channel_name or len(channel_name) < 3:
+        return jsonify({"error": "Channel name must be at least 3 characters long"}), 400
+    if not token_sesson or (not token_sesson.startswith('@') and not token_sesson.startswith('-')):
+        return jsonify({"error": "Invalid token_sesson (must start with '@' or '-')"}), 400
+    start_td = time_to_timedelta(sch_start_range)
+    end_td = time_to_timedelta(sch_end_range)
+    if not start_td or not end_td:
+        return jsonify({"error": "Invalid time format for sch_start_range or sch_end_range (use HH:MM:SS)"}), 400
+    # Use post_daily_range for validation
+    if post_daily_range < 0:
+        return jsonify({"error": "Number of posts daily must be non-negative"}), 400
+
+    # Fetch user_id from email
+    user_id = get_user_id_from_email(email)
+    if not user_id:
+        return jsonify({"error": "User not available for the provided email"}), 400
+
+    conn = get_db_connection()
+    if not conn:
+        return jsonify({"error": "Database connection failed"}), 500
+
+    try:
+        cursor = conn.cursor()
+        # Check if Telegram channel exists for user
+        cursor.execute("SELECT id FROM telegram WHERE user_id = %s AND channel_name = %s", (user_id, channel_name))
+        existing = cursor.fetchone()
+        
+        # Set default for post_daily_range_left
+        post_daily_range_left = post_daily_range
+
+        if existing:
+            # Update existing record
+            query = """
+                UPDATE telegram SET 
+                    token_sesson = %s, 
+                    email = %s,
+                    google_drive_link = NULL, 
+                    sch_start_range = %s, 
+                    sch_end_range = %s, 
+                    
+                    number_of_posts = %s,  -- Deprecated, set to 0
+                    posts_left = %s,        -- Deprecated, set to 0
+                    
+                    post_daily_range = %s,
+                    post_daily_range_left = %s,
+                    last_reset = %s,
+                    
+                    selected = 'No', 
+                    done = 'No', 
+                    schedule_type = 'range', 
+                    next_post_time = NULL 
+                WHERE id = %s
+            """
+            cursor.execute(query, (
+                token_sesson, email, sch_start_range, sch_end_range, 
+                0, 0, # old posts fields
+                post_daily_range, post_daily_range_left, datetime.now(TIMEZONE).strftime('%Y-%m-%d %H:%M:%S'), # new daily posts fields
+                existing[0]
+            ))
+            record_id = existing[0]
+            action = "updated"
+        else:
+            # Insert new record
+            query = """
+                INSERT INTO telegram (
+                    user_id, channel_name, token_sesson, email, google_drive_link, 
+                    sch_start_range, sch_end_range, sch_date, sch_time, 
+                    number_of_posts, posts_left, selected, done, schedule_type,
+                    post_daily_range, post_daily_range_left, last_reset
+                ) VALUES (%s, %s, %s, %s, NULL, %s, %s, %s, %s, %s, %s, 'No', 'No', 'range', %s, %s, %s)
+            """
+            sch_date = datetime.now(TIMEZONE).strftime('%Y-%m-%d')
+            sch_time = '12:00:00'
+            cursor.execute(query, (
+                user_id, channel_name, token_sesson, email,
+                sch_start_range, sch_end_range, sch_date, sch_time,
+                0, 0, # old posts fields
+                post_daily_range, post_daily_range_left, datetime.now(TIMEZONE).strftime('%Y-%m-%d %H:%M:%S') # new daily posts fields
+            ))
+            record_id = cursor.lastrowid
+            action = "created"
+
+        conn.commit()
+        cursor.close()
+        conn.close()
+        return jsonify({"message": f"Telegram channel {action} successfully", "record_id": record_id}), 200
+    except mysql.connector.Error as e:
+        conn.close()
+        return jsonify({"error": f"Database error: {str(e)}"}), 500
+
+@bp.route('/facebook', methods=['POST'])
+def add_facebook():
+    """Add or update a Facebook page for a user."""
+    data = request.get_json()
+    email = data.get('email')
+    username = data.get('username')
+    passwand = data.get('passwand')
+    channel_name = data.get('channel_name')
+    token_sesson = data.get('token_sesson')
+    sch_start_range = data.get('sch_start_range', '09:00:00')  # Default 9 AM
+    sch_end_range = data.get('sch_end_range', '17:00:00')      # Default 5 PM
+    number_of_posts = data.get('number_of_posts', 0)
+
+    # Validation
+    if not email or not validate_email(email):
+        return jsonify({"error": "Valid email is required"}), 400
+    if not username or len(username) < 3:
+        return jsonify({"error": "Username must be at least 3 characters long"}), 400
+    if not passwand:
+        return jsonify({"error": "Password is required"}), 400
+    if not channel_name or len(channel_name) < 3:
+        return jsonify({"error": "Channel name must be at least 3 characters long"}), 400
+    if not token_sesson:
+        return jsonify({"error": "Token session is required"}), 400
+    start_td = time_to_timedelta(sch_start_range)
+    end_td = time_to_timedelta(sch_end_range)
+    if not start_td or not end_td:
+        return jsonify({"error": "Invalid time format for sch_start_range or sch_end_range (use HH:MM:SS)"}), 400
+    if number_of_posts < 0:
+        return jsonify({"error": "Number of posts must be non-negative"}), 400
+
+    # Fetch user_id from email
+    user_id = get_user_id_from_email(email)
+    if not user_id:
+        return jsonify({"error": "User not available for the provided email"}), 400
+
+    conn = get_db_connection()
+    if not conn:
+        return jsonify({"error": "Database connection failed"}), 500
+
+    try:
+        cursor = conn.cursor()
+        # Check if Facebook page exists for user
+        cursor.execute("SELECT id FROM facebook WHERE user_id = %s AND channel_name = %s", (user_id, channel_name))
+        existing = cursor.fetchone()
+
+        if existing:
+            # Update existing record
+            query = """
+                UPDATE facebook SET 
+                    username = %s,
+                    passwand = %s,
+                    token_sesson = %s,
+                    email = %s,
+                    google_drive_link = NULL,
+                    sch_start_range = %s,
+                    sch_end_range = %s,
+                    number_of_posts = %s,
+                    posts_left = %s,
+                    selected = 'No',
+                    done = 'No',
+                    schedule_type = 'range',
+                    next_post_time = NULL
+                WHERE id = %s
+            """
+            cursor.execute(query, (username, passwand, token_sesson, email, sch_start_range, sch_end_range, number_of_posts, number_of_posts, existing[0]))
+            record_id = existing[0]
+            action = "updated"
+        else:
+            # Insert new record
+            query = """
+                INSERT INTO facebook (
+                    user_id, username, passwand, email, channel_name, token_sesson, google_drive_link,
+                    sch_start_range, sch_end_range, sch_date, sch_time,
+                    number_of_posts, posts_left, selected, done, schedule_type
+                ) VALUES (%s, %s, %s, %s, %s, %s, NULL, %s, %s, %s, %s, %s, %s, 'No', 'No', 'range')
+            """
+            sch_date = datetime.now(TIMEZONE).strftime('%Y-%m-%d')
+            sch_time = '12:00:00'
+            cursor.execute(query, (
+                user_id, username, passwand, email, channel_name, token_sesson,
+                sch_start_range, sch_end_range, sch_date, sch_time,
+                number_of_posts, number_of_posts
+            ))
+            record_id = cursor.lastrowid
+            action = "created"
+
+        conn.commit()
+        cursor.close()
+        conn.close()
+        return jsonify({"message": f"Facebook page {action} successfully", "record_id": record_id}), 200
+    except mysql.connector.Error as e:
+        conn.close()
+        return jsonify({"error": f"Database error: {str(e)}"}), 500
+
+@bp.route('/youtube', methods=['POST'])
+def add_youtube():
+    """Add or update a YouTube channel for a user using google_drive_link for Drive integration."""
+    data = request.get_json()
+    email = data.get('email')
+    username = data.get('username')
+    token_sesson = data.get('token_sesson', "{}")
+    channel_id = data.get('channel_id')
+    google_drive_link = data.get('google_drive_link')
+    sch_start_range = data.get('sch_start_range', '09:00:00')
+    sch_end_range = data.get('sch_end_range', '17:00:00')
+    
+    # NEW: Get post_daily_range sent from frontend
+    post_daily_range = data.get('post_daily_range', 0)
+    
+    # OLD: number_of_posts should default to 0 to be superseded
+    number_of_posts = data.get('number_of_posts', 0) 
+
+    # Validation
+    if not email or not validate_email(email):
+        return jsonify({"error": "Valid email is required"}), 400
+    if not username or len(username) < 3:
+        return jsonify({"error": "Username must be at least 3 characters long"}), 400
+    if not channel_id:
+        return jsonify({"error": "Channel ID is required"}), 400
+    start_td = time_to_timedelta(sch_start_range)
+    end_td = time_to_timedelta(sch_end_range)
+    if not start_td or not end_td:
+        return jsonify({"error": "Invalid time format for sch_start_range or sch_end_range (use HH:MM:SS)"}), 400
+    # Use post_daily_range for validation
+    if post_daily_range < 0:
+        return jsonify({"error": "Number of posts daily must be non-negative"}), 400
+
+    # Fetch user_id from email
+    user_id = get_user_id_from_email(email)
+    if not user_id:
+        return jsonify({"error": "User not available for the provided email"}), 400
+
+    conn = get_db_connection()
+    if not conn:
+        return jsonify({"error": "Database connection failed"}), 500
+
+    try:
+        cursor = conn.cursor()
+        # Check if YouTube channel exists for user
+        cursor.execute("SELECT id FROM youtube WHERE user_id = %s AND username = %s", (user_id, username))
+        existing = cursor.fetchone()
+        
+        # Set default for post_daily_range_left
+        post_daily_range_left = post_daily_range
+
+        if existing:
+            # Update existing record
+            query = """
+                UPDATE youtube SET 
+                    token_sesson = %s,
+                    email = %s,
+                    channel_id = %s,
+                    google_drive_link = %s,
+                    sch_start_range = %s,
+                    sch_end_range = %s,
+                    
+                    number_of_posts = %s,  -- Deprecated, set to 0
+                    posts_left = %s,        -- Deprecated, set to 0
+                    
+                    post_daily_range = %s,
+                    post_daily_range_left = %s,
+                    last_reset = %s,
+                    
+                    selected = 'No',
+                    done = 'No',
+                    schedule_type = 'range',
+                    next_post_time = NULL
+                WHERE id = %s
+            """
+            cursor.execute(query, (
+                token_sesson, email, channel_id, google_drive_link,
+                sch_start_range, sch_end_range, 
+                0, 0, # old posts fields
+                post_daily_range, post_daily_range_left, datetime.now(TIMEZONE).strftime('%Y-%m-%d %H:%M:%S'), # new daily posts fields
+                existing[0]
+            ))
+            record_id = existing[0]
+            action = "updated"
+        else:
+            # Insert new record
+            query = """
+                INSERT INTO youtube (
+                    user_id, username, token_sesson, email, channel_id, google_drive_link,
+                    sch_start_range, sch_end_range, sch_date, sch_time,
+                    number_of_posts, posts_left, selected, done, schedule_type,
+                    post_daily_range, post_daily_range_left, last_reset
+                ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, 'No', 'No', 'range', %s, %s, %s)
+            """
+            sch_date = datetime.now(TIMEZONE).strftime('%Y-%m-%d')
+            sch_time = '12:00:00'
+            cursor.execute(query, (
+                user_id, username, token_sesson, email, channel_id, google_drive_link,
+                sch_start_range, sch_end_range, sch_date, sch_time,
+                0, 0, # old posts fields
+                post_daily_range, post_daily_range_left, datetime.now(TIMEZONE).strftime('%Y-%m-%d %H:%M:%S') # new daily posts fields
+            ))
+            record_id = cursor.lastrowid
+            action = "created"
+
+        conn.commit()
+        cursor.close()
+        conn.close()
+        return jsonify({"message": f"YouTube channel {action} successfully", "record_id": record_id}), 200
+    except mysql.connector.Error as e:
+        conn.close()
+        return jsonify({"error": f"Database error: {str(e)}"}), 500    
+
+@bp.route('/youtube/<int:record_id>', methods=['DELETE'])
+def delete_youtube(record_id):
+    """Delete a YouTube channel."""
+    conn = get_db_connection()
+    if not conn:
+        return jsonify({"error": "Database connection failed"}), 500
+
+    try:
+        cursor = conn.cursor()
+        # Verify record exists
+        cursor.execute("SELECT id FROM youtube WHERE id = %s", (record_id,))
+        if not cursor.fetchone():
+            cursor.close()
+            conn.close()
+            return jsonify({"error": "YouTube record not found"}), 400
+
+        cursor.execute("DELETE FROM youtube WHERE id = %s", (record_id,))
+        conn.commit()
+        cursor.close()
+        conn.close()
+        return jsonify({"message": "YouTube channel deleted successfully"}), 200
+    except mysql.connector.Error as e:
+        conn.close()
+        return jsonify({"error": f"Database error: {str(e)}"}), 500
+
+@bp.route('/user/<int:user_id>', methods=['GET'])
+def get_user(user_id):
+    """Retrieve user details and associated Instagram/Telegram/Facebook/YouTube accounts."""
+    if 'user_id' not in session or session['user_id'] != user_id:
+        return jsonify({"error": "Unauthorized access"}), 403
+
+    conn = get_db_connection()
+    if not conn:
+        return jsonify({"error": "Database connection failed"}), 500
+
+    try:
+        cursor = conn.cursor(dictionary=True)
+        # Fetch user details
+        cursor.execute("SELECT Id, Name, email, expiry, phone_number FROM user WHERE Id = %s", (user_id,))
+        user = cursor.fetchone()
+        if not user:
+            cursor.close()
+            conn.close()
+            return jsonify({"error": "User ID does not exist"}), 400
+
+        # Helper function to serialize ALL data types properly
+        def serialize_records(records):
+            serialized = []
+            for record in records:
+                serialized_record = {}
+                for key, value in record.items():
+                    # Handle time objects
+                    if isinstance(value, timedelta):
+                        total_seconds = int(value.total_seconds())
+                        hours, remainder = divmod(total_seconds, 3600)
+                        minutes, seconds = divmod(remainder, 60)
+                        serialized_record[key] = f"{hours:02}:{minutes:02}:{seconds:02}"
+                    # Handle datetime objects
+                    elif isinstance(value, datetime):
+                        serialized_record[key] = value.strftime('%Y-%m-%d %H:%M:%S')
+                    # Handle time objects from database
+                    elif hasattr(value, 'strftime') and not isinstance(value, (datetime, date)):
+                        try:
+                            serialized_record[key] = value.strftime('%H:%M:%S')
+                        except:
+                            serialized_record[key] = str(value)
+                    # Handle None values
+                    elif value is None:
+                        serialized_record[key] = None
+                    # Handle everything else
+                    else:
+                        serialized_record[key] = value
+                serialized.append(serialized_record)
+            return serialized
+
+        # Fetch Instagram accounts - ADDED NEW FIELDS
+        cursor.execute("""
+            SELECT id, username, passwand, email, token_sesson, google_drive_link, 
+                   selected, sch_start_range, sch_end_range, sch_date, sch_time,
+                   number_of_posts, posts_left, done, schedule_type, next_post_time,
+                   post_daily_range, post_daily_range_left, last_reset  -- ADDED THESE
+            FROM instagram WHERE user_id = %s
+        """, (user_id,))
+        instagram_accounts = serialize_records(cursor.fetchall())
+
+        # Fetch Telegram channels - ADDED NEW FIELDS
+        cursor.execute("""
+            SELECT id, channel_name, token_sesson, email, google_drive_link,
+                   selected, sch_start_range, sch_end_range, sch_date, sch_time,
+                   number_of_posts, posts_left, done, schedule_type, next_post_time,
+                   post_daily_range, post_daily_range_left, last_reset  -- ADDED THESE
+            FROM telegram WHERE user_id = %s
+        """, (user_id,))
+        telegram_channels = serialize_records(cursor.fetchall())
+
+        # Fetch Facebook pages - ADDED NEW FIELDS
+        cursor.execute("""
+            SELECT id, username, email, channel_name, sch_start_range, sch_end_range, 
+                   number_of_posts, posts_left, selected,
+                   post_daily_range, post_daily_range_left, last_reset  -- ADDED THESE
+            FROM facebook WHERE user_id = %s
+        """, (user_id,))
+        facebook_pages = serialize_records(cursor.fetchall())
+
+        # Fetch YouTube channels - ADDED NEW FIELDS
+        cursor.execute("""
+            SELECT id, username, email, channel_id, google_drive_link, sch_start_range, 
+                   sch_end_range, number_of_posts, posts_left, selected,
+                   post_daily_range, post_daily_range_left, last_reset  -- ADDED THESE
+            FROM youtube WHERE user_id = %s
+        """, (user_id,))
+        youtube_channels = serialize_records(cursor.fetchall())
+
+        cursor.close()
+        conn.close()
+        
+        return jsonify({
+            "user": user,
+            "instagram_accounts": instagram_accounts,
+            "telegram_channels": telegram_channels,
+            "facebook_pages": facebook_pages,
+            "youtube_channels": youtube_channels
+        }), 200
+    except mysql.connector.Error as e:
+        conn.close()
+        return jsonify({"error": f"Database error: {str(e)}"}), 500
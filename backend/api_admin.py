@@ -0,0 +1,108 @@
+"""
+Admin-only endpoints.
+"""
+from flask import Blueprint, request, jsonify
+import mysql.connector
+from datetime import datetime, timedelta
+from api_common import get_db_connection, get_user_id_from_email, serialize_timedelta
+
+bp = Blueprint('admin', __name__)
+
+@bp.route('/admin/export', methods=['GET'])
+def export_data():
+    """Export user and platform data to JSON."""
+    email = request.args.get('email')
+
+    conn = get_db_connection()
+    if not conn:
+        return jsonify({"error": "Database connection failed"}), 500
+
+    try:
+        cursor = conn.cursor(dictionary=True)
+        result = {}
+
+        # Fetch user_id if email provided
+        user_id = None
+        if email:
+            user_id = get_user_id_from_email(email)
+            if not user_id:
+                cursor.close()
+                conn.close()
+                return jsonify({"error": "User not available for the provided email"}), 400
+
+        # Helper function to serialize records
+        def serialize_records(records):
+            serialized = []
+            for record in records:
+                serialized_record = {}
+                for key, value in record.items():
+                    if isinstance(value, (timedelta, datetime)):
+                        serialized_record[key] = serialize_timedelta(value)
+                    else:
+                        serialized_record[key] = value
+                serialized.append(serialized_record)
+            return serialized
+
+        # Fetch users
+        query = "SELECT Id, Name, email, expiry FROM user"
+        if user_id:
+            query += " WHERE Id = %s"
+            cursor.execute(query, (user_id,))
+        else:
+            cursor.execute(query)
+        result['users'] = serialize_records(cursor.fetchall())
+
+        # Fetch Instagram accounts - ADDED NEW FIELDS
+        query = """SELECT id, user_id, username, email, sch_start_range, sch_end_range, 
+                          number_of_posts, posts_left, next_post_time,
+                          post_daily_range, post_daily_range_left, last_reset  -- ADDED
+                   FROM instagram"""
+        if user_id:
+            query += " WHERE user_id = %s"
+            cursor.execute(query, (user_id,))
+        else:
+            cursor.execute(query)
+        result['instagram'] = serialize_records(cursor.fetchall())
+
+        # Fetch Telegram channels - ADDED NEW FIELDS
+        query = """SELECT id, user_id, channel_name, email, sch_start_range, 
+                          sch_end_range, number_of_posts, posts_left, next_post_time,
+                          post_daily_range, post_daily_range_left, last_reset  -- ADDED
+                   FROM telegram"""
+        if user_id:
+            query += " WHERE user_id = %s"
+            cursor.execute(query, (user_id,))
+        else:
+            cursor.execute(query)
+        result['telegram'] = serialize_records(cursor.fetchall())
+
+        # Fetch Facebook pages - ADDED NEW FIELDS
+        query = """SELECT id, user_id, username, email, channel_name, sch_start_range, 
+                          sch_end_range, number_of_posts, posts_left, next_post_time,
+                          post_daily_range, post_daily_range_left, last_reset  -- ADDED
+                   FROM facebook"""
+        if user_id:
+            query += " WHERE user_id = %s"
+            cursor.execute(query, (user_id,))
+        else:
+            cursor.execute(query)
+        result['facebook'] = serialize_records(cursor.fetchall())
+
+        # Fetch YouTube channels - ADDED NEW FIELDS
+        query = """SELECT id, user_id, username, email, sch_start_range, 
+                          sch_end_range, number_of_posts, posts_left, next_post_time,
+                          post_daily_range, post_daily_range_left, last_reset  -- ADDED
+                   FROM youtube"""
+        if user_id:
+            query += " WHERE user_id = %s"
+            cursor.execute(query, (user_id,))
+        else:
+            cursor.execute(query)
+        result['youtube'] = serialize_records(cursor.fetchall())
+
+        cursor.close()
+        conn.close()
+        return jsonify(result), 200
+    except mysql.connector.Error as e:
+        conn.close()
+        return jsonify({"error": f"Database error: {str(e)}"}), 500
@@ -0,0 +1,535 @@
+"""
+Login, signup, logout and the OTP flows for password reset and profile updates.
+"""
+from flask import Blueprint, request, jsonify, session
+import mysql.connector
+from datetime import datetime, timedelta
+import random
+import otp_store
+from api_common import get_db_connection, validate_email, TIMEZONE
+
+bp = Blueprint('auth', __name__)
+
+@bp.route('/forgot-password/send-otp', methods=['POST'])
+def send_password_reset_otp():
+    """Send OTP to user's email for password reset."""
+    data = request.get_json()
+    email = data.get('email')
+    phone_number = data.get('phone_number')
+
+    # Validation
+    if not email or not phone_number:
+        return jsonify({"error": "Email and phone number are required"}), 400
+
+    conn = get_db_connection()
+    if not conn:
+        return jsonify({"error": "Database connection failed"}), 500
+
+    try:
+        cursor = conn.cursor(dictionary=True)
+        # Verify user exists with matching email and phone number
+        cursor.execute(
+            "SELECT Id, Name FROM user WHERE email = %s AND phone_number = %s", 
+            (email, phone_number)
+        )
+        user = cursor.fetchone()
+        cursor.close()
+        conn.close()
+
+        if not user:
+            return jsonify({"error": "No user found with provided email and phone number"}), 404
+
+        # Generate 6-digit OTP
+        otp = str(random.randint(100000, 999999))
+        
+        # Store OTP (valid for otp_store.TTL_SECONDS)
+        otp_store.save('password_reset', email, otp, phone_number=phone_number)
+
+        # Send OTP via email
+        send_otp_email(email, otp, user['Name'])
+
+        return jsonify({"message": "OTP sent successfully"}), 200
+
+    except mysql.connector.Error as e:
+        if conn:
+            conn.close()
+        return jsonify({"error": f"Database error: {str(e)}"}), 500
+    except Exception as e:
+        return jsonify({"error": f"Failed to send OTP: {str(e)}"}), 500
+
+@bp.route('/forgot-password/verify-otp', methods=['POST'])
+def verify_password_reset_otp():
+    """Verify OTP for password reset."""
+    data = request.get_json()
+    email = data.get('email')
+    phone_number = data.get('phone_number')
+    otp = data.get('otp')
+
+    # Validation
+    if not email or not phone_number or not otp:
+        return jsonify({"error": "Email, phone number, and OTP are required"}), 400
+
+    try:
+        # Claim an attempt before comparing, so concurrent guesses can't exceed the limit
+        status, stored = otp_store.claim_attempt('password_reset', email)
+        if status == 'missing':
+            return jsonify({"error": "OTP not found or expired"}), 400
+        if status == 'expired':
+            return jsonify({"error": "OTP has expired"}), 400
+        if status == 'exhausted':
+            return jsonify({"error": "Too many failed attempts, please request a new OTP"}), 429
+
+        # Verify phone number matches
+        if stored['data'].get('phone_number') != phone_number:
+            return jsonify({"error": "Invalid phone number"}), 400
+
+        # Verify OTP
+        if not otp_store.matches(stored, otp):
+            return jsonify({"error": "Invalid OTP"}), 400
+
+        # Mark OTP as verified
+        otp_store.mark_verified('password_reset', email)
+    except mysql.connector.Error as e:
+        return jsonify({"error": f"Database error: {str(e)}"}), 500
+
+    return jsonify({"message": "OTP verified successfully"}), 200
+
+@bp.route('/forgot-password/reset', methods=['POST'])
+def reset_password():
+    """Reset user password after OTP verification."""
+    data = request.get_json()
+    email = data.get('email')
+    phone_number = data.get('phone_number')
+    otp = data.get('otp')
+    new_password = data.get('new_password')
+
+    # Validation
+    if not email or not phone_number or not otp or not new_password:
+        return jsonify({"error": "All fields are required"}), 400
+
+    if len(new_password) < 8:
+        return jsonify({"error": "Password must be at least 8 characters long"}), 400
+
+    # Verify OTP first
+    try:
+        status, stored = otp_store.claim_attempt('password_reset', email)
+    except mysql.connector.Error as e:
+        return jsonify({"error": f"Database error: {str(e)}"}), 500
+    if status == 'missing':
+        return jsonify({"error": "OTP verification required"}), 400
+    if status == 'expired':
+        return jsonify({"error": "OTP session expired"}), 400
+    if status == 'exhausted':
+        return jsonify({"error": "Too many failed attempts, please request a new OTP"}), 429
+
+    if not stored['verified']:
+        return jsonify({"error": "OTP not verified"}), 400
+
+    # Verify OTP matches
+    if not otp_store.matches(stored, otp) or stored['data'].get('phone_number') != phone_number:
+        return jsonify({"error": "Invalid OTP or phone number"}), 400
+
+    conn = get_db_connection()
+    if not conn:
+        return jsonify({"error": "Database connection failed"}), 500
+
+    try:
+        cursor = conn.cursor()
+        # Update user password
+        cursor.execute(
+            "UPDATE user SET passward = %s WHERE email = %s AND phone_number = %s",
+            (new_password, email, phone_number)
+        )
+        
+        if cursor.rowcount == 0:
+            cursor.close()
+            conn.close()
+            return jsonify({"error": "User not found"}), 404
+
+        conn.commit()
+        cursor.close()
+        conn.close()
+
+        # Clear OTP after successful password reset
+        otp_store.delete('password_reset', email)
+
+        return jsonify({"message": "Password reset successfully"}), 200
+
+    except mysql.connector.Error as e:
+        if conn:
+            conn.close()
+        return jsonify({"error": f"Database error: {str(e)}"}), 500
+
+def send_otp_email(email: str, otp: str, user_name: str):
+    """Send OTP email to user from Socio-Automate Hub."""
+    import smtplib
+    from email.mime.text import MIMEText
+    from email.mime.multipart import MIMEMultipart
+
+    try:
+        # Email configuration
+        smtp_server = "smtp.gmail.com"
+        smtp_port = 587
+        sender_email = "otpsender191@gmail.com"
+        sender_password = "euwd ghss ahwy rblq"  # Your app password
+
+        # Create message
+        message = MIMEMultipart()
+        message["From"] = f"Socio-Automate Hub <{sender_email}>"
+        message["To"] = email
+        message["Subject"] = "Password Reset OTP - Socio-Automate Hub"
+
+        # Email body
+        body = f"""
+        <html>
+            <body>
+                <h2>Password Reset Request</h2>
+                <p>Hello {user_name},</p>
+                <p>You have requested to reset your password for your Socio-Automate Hub account. Please use the following OTP to verify your identity:</p>
+                <h1 style="color: #007AFF; font-size: 32px; text-align: center; letter-spacing: 5px;">{otp}</h1>
+                <p>This OTP is valid for 10 minutes.</p>
+                <p>If you didn't request this reset, please ignore this email or contact our support team.</p>
+                <br>
+                <p>Best regards,<br>Socio-Automate Hub Team</p>
+            </body>
+        </html>
+        """
+
+        message.attach(MIMEText(body, "html"))
+
+        # Send email
+        with smtplib.SMTP(smtp_server, smtp_port) as server:
+            server.starttls()
+            server.login(sender_email, sender_password)
+            server.send_message(message)
+
+        print(f"OTP email sent to {email}")
+        
+    except Exception as e:
+        print(f"Failed to send email: {str(e)}")
+        raise e
+
+@bp.route('/login', methods=['POST'])
+def login():
+    """Authenticate a user and create a session."""
+    data = request.get_json()
+    email = data.get('email')
+    password = data.get('password')
+
+    # Validation
+    if not email or not validate_email(email):
+        return jsonify({"error": "Valid email is required"}), 400
+    if not password:
+        return jsonify({"error": "Password is required"}), 400
+
+    conn = get_db_connection()
+    if not conn:
+        return jsonify({"error": "Database connection failed"}), 500
+
+    try:
+        cursor = conn.cursor(dictionary=True)
+        cursor.execute("SELECT Id, Name, passward, expiry FROM user WHERE email = %s", (email,))
+        user = cursor.fetchone()
+        cursor.close()
+        conn.close()
+
+        if not user:
+            return jsonify({"error": "Invalid email or password"}), 401
+        if user['passward'] != password:
+            return jsonify({"error": "Invalid email or password"}), 401
+        if user['expiry'] < datetime.now(TIMEZONE).date():
+            return jsonify({"error": "Account expired"}), 403
+
+        # Store user info in session
+        session.permanent = True
+        session['user_id'] = user['Id']
+        session['user_name'] = user['Name']
+        session['user_email'] = email
+
+        return jsonify({
+            "message": "Login successful",
+            "user_id": user['Id'],
+            "name": user['Name']
+        }), 200
+    except mysql.connector.Error as e:
+        return jsonify({"error": f"Database error: {str(e)}"}), 500
+
+@bp.route('/user/<int:user_id>/password', methods=['PATCH'])
+def change_password(user_id):
+    if 'user_id' not in session or session['user_id'] != user_id:
+        return jsonify({"error": "Unauthorized access"}), 403
+    data = request.get_json()
+    new_password = data.get('new_password')
+    if not new_password or len(new_password) < 8:
+        return jsonify({"error": "New password must be at least 8 characters long"}), 400
+    conn = get_db_connection()
+    if not conn:
+        return jsonify({"error": "Database connection failed"}), 500
+    try:
+        cursor = conn.cursor()
+        cursor.execute("UPDATE user SET passward = %s WHERE Id = %s", (new_password, user_id))
+        conn.commit()
+        cursor.close()
+        conn.close()
+        return jsonify({"message": "Password updated successfully"}), 200
+    except mysql.connector.Error as e:
+        conn.close()
+        return jsonify({"error": f"Database error: {str(e)}"}), 500
+
+@bp.route('/logout', methods=['POST'])
+def logout():
+    """Clear the user session."""
+    session.clear()
+    return jsonify({"message": "Logged out successfully"}), 200
+
+@bp.route('/signup', methods=['POST'])
+def signup():
+    """Create a new user in the user table."""
+    data = request.get_json()
+    name = data.get('name')
+    password = data.get('password')
+    email = data.get('email')
+    expiry = data.get('expiry', (datetime.now(TIMEZONE) + timedelta(days=365)).strftime('%Y-%m-%d'))
+    phone_number = data.get('phone_number')
+
+    # Validation
+    if not name or len(name) < 3:
+        return jsonify({"error": "Name must be at least 3 characters long"}), 400
+    if not password or len(password) < 8:
+        return jsonify({"error": "Password must be at least 8 characters long"}), 400
+    if not validate_email(email):
+        return jsonify({"error": "Invalid email format"}), 400
+    try:
+        datetime.strptime(expiry, '%Y-%m-%d')
+    except ValueError:
+        return jsonify({"error": "Invalid expiry date format (use YYYY-MM-DD)"}), 400
+
+    conn = get_db_connection()
+    if not conn:
+        return jsonify({"error": "Database connection failed"}), 500
+
+    try:
+        cursor = conn.cursor()
+        # Check for duplicate email
+        cursor.execute("SELECT Id FROM user WHERE email = %s", (email,))
+        if cursor.fetchone():
+            cursor.close()
+            conn.close()
+            return jsonify({"error": "Email already exists"}), 400
+
+        # Insert user
+        query = "INSERT INTO user (Name, passward, email, expiry, phone_number) VALUES (%s, %s, %s, %s, %s)"
+        cursor.execute(query, (name, password, email, expiry, phone_number))
+        user_id = cursor.lastrowid
+        conn.commit()
+        cursor.close()
+        conn.close()
+        return jsonify({"message": "User created successfully", "user_id": user_id}), 200
+    except mysql.connector.Error as e:
+        conn.close()
+        return jsonify({"error": f"Database error: {str(e)}"}), 500
+
+@bp.route('/profile/update/send-otp', methods=['POST'])
+def send_profile_update_otp():
+    """Send OTP to user's current email for profile update verification."""
+    data = request.get_json()
+    user_id = data.get('user_id')
+    new_email = data.get('new_email')
+
+    # Validation
+    if not user_id or not new_email:
+        return jsonify({"error": "User ID and new email are required"}), 400
+
+    if not validate_email(new_email):
+        return jsonify({"error": "Invalid email format"}), 400
+
+    conn = get_db_connection()
+    if not conn:
+        return jsonify({"error": "Database connection failed"}), 500
+
+    try:
+        cursor = conn.cursor(dictionary=True)
+        # Get user's current email
+        cursor.execute(
+            "SELECT Id, Name, email FROM user WHERE Id = %s", 
+            (user_id,)
+        )
+        user = cursor.fetchone()
+        cursor.close()
+
+        if not user:
+            conn.close()
+            return jsonify({"error": "User not found"}), 404
+
+        current_email = user['email']
+        
+        # Check if new email already exists
+        if new_email != current_email:
+            cursor = conn.cursor()
+            cursor.execute("SELECT Id FROM user WHERE email = %s AND Id != %s", (new_email, user_id))
+            if cursor.fetchone():
+                cursor.close()
+                conn.close()
+                return jsonify({"error": "Email already exists"}), 400
+
+        # Generate 6-digit OTP
+        otp = str(random.randint(100000, 999999))
+        
+        # Store OTP (valid for otp_store.TTL_SECONDS)
+        otp_store.save('profile_update', current_email, otp, user_id=user_id, new_email=new_email)
+
+        # Send OTP via email to current email
+        send_profile_update_otp_email(current_email, otp, user['Name'], new_email)
+
+        conn.close()
+        return jsonify({
+            "message": "OTP sent successfully to your current email",
+            "current_email": current_email
+        }), 200
+
+    except mysql.connector.Error as e:
+        if conn:
+            conn.close()
+        return jsonify({"error": f"Database error: {str(e)}"}), 500
+    except Exception as e:
+        return jsonify({"error": f"Failed to send OTP: {str(e)}"}), 500
+
+@bp.route('/profile/update/verify-otp', methods=['POST'])
+def verify_profile_update_otp():
+    """Verify OTP and update user profile."""
+    data = request.get_json()
+    user_id = data.get('user_id')
+    otp = data.get('otp')
+    name = data.get('name')
+    phone_number = data.get('phone_number')
+
+    # Validation
+    if not user_id or not otp:
+        return jsonify({"error": "User ID and OTP are required"}), 400
+
+    conn = get_db_connection()
+    if not conn:
+        return jsonify({"error": "Database connection failed"}), 500
+
+    try:
+        cursor = conn.cursor(dictionary=True)
+        # Get user's current email
+        cursor.execute(
+            "SELECT Id, Name, email FROM user WHERE Id = %s", 
+            (user_id,)
+        )
+        user = cursor.fetchone()
+        cursor.close()
+
+        if not user:
+            conn.close()
+            return jsonify({"error": "User not found"}), 404
+
+        current_email = user['email']
+
+        # Claim an attempt before comparing, so concurrent guesses can't exceed the limit
+        status, stored = otp_store.claim_attempt('profile_update', current_email)
+        if status != 'ok':
+            conn.close()
+            if status == 'exhausted':
+                return jsonify({"error": "Too many failed attempts, please request a new OTP"}), 429
+            if status == 'expired':
+                return jsonify({"error": "OTP has expired"}), 400
+            return jsonify({"error": "OTP not found or expired"}), 400
+
+        # Verify OTP and the user it was issued to
+        if not otp_store.matches(stored, otp) or stored['data'].get('user_id') != user_id:
+            conn.close()
+            return jsonify({"error": "Invalid OTP"}), 400
+
+        # Update user profile
+        new_email = stored['data'].get('new_email', current_email)
+        
+        cursor = conn.cursor()
+        
+        # Build update query
+        updates = []
+        params = []
+        
+        if name and len(name) >= 3:
+            updates.append("Name = %s")
+            params.append(name)
+        
+        updates.append("email = %s")
+        params.append(new_email)
+        
+        if phone_number is not None:
+            updates.append("phone_number = %s")
+            params.append(phone_number)
+
+        query = f"UPDATE user SET {', '.join(updates)} WHERE Id = %s"
+        params.append(user_id)
+        
+        cursor.execute(query, params)
+        conn.commit()
+        cursor.close()
+        conn.close()
+
+        # Clear OTP after successful update
+        otp_store.delete('profile_update', current_email)
+
+        return jsonify({
+            "message": "Profile updated successfully",
+            "email_updated": new_email != current_email
+        }), 200
+
+    except mysql.connector.Error as e:
+        if conn:
+            conn.close()
+        return jsonify({"error": f"Database error: {str(e)}"}), 500
+
+def send_profile_update_otp_email(email: str, otp: str, user_name: str, new_email: str):
+    """Send OTP email for profile update verification."""
+    import smtplib
+    from email.mime.text import MIMEText
+    from email.mime.multipart import MIMEMultipart
+
+    try:
+        # Email configuration
+        smtp_server = "smtp.gmail.com"
+        smtp_port = 587
+        sender_email = "otpsender191@gmail.com"
+        sender_password = "euwd ghss ahwy rblq"
+
+        # Create message
+        message = MIMEMultipart()
+        message["From"] = f"Socio-Automate Hub <{sender_email}>"
+        message["To"] = email
+        message["Subject"] = "Profile Update Verification - Socio-Automate Hub"
+
+        # Email body
+        body = f"""
+        <html>
+            <body>
+                <h2>Profile Update Request</h2>
+                <p>Hello {user_name},</p>
+                <p>You have requested to update your profile information.</p>
+                <p>Your email will be changed to: <strong>{new_email}</strong></p>
+                <p>Please use the following OTP to verify this change:</p>
+                <h1 style="color: #007AFF; font-size: 32px; text-align: center; letter-spacing: 5px;">{otp}</h1>
+                <p>This OTP is valid for 10 minutes.</p>
+                <p>If you didn't request this change, please ignore this email or contact our support team immediately.</p>
+                <br>
+                <p>Best regards,<br>Socio-Automate Hub Team</p>
+            </body>
+        </html>
+        """
+
+        message.attach(MIMEText(body, "html"))
+
+        # Send email
+        with smtplib.SMTP(smtp_server, smtp_port) as server:
+            server.starttls()
+            server.login(sender_email, sender_password)
+            server.send_message(message)
+
+        print(f"Profile update OTP email sent to {email}")
+        
+    except Exception as e:
+        print(f"Failed to send profile update email: {str(e)}")
+        raise e
@@ -0,0 +1,77 @@
+"""
+Shared configuration and helpers for the API blueprints in api_*.py.
+
+Kept free of the Google client libraries and smtplib so that importing the
+API stays cheap; those are imported by the code paths that need them.
+"""
+import mysql.connector
+import re
+from datetime import datetime, timedelta
+import pytz
+import os
+from dotenv import load_dotenv
+import metrics
+
+# Load environment variables from .env file
+load_dotenv()
+
+# Database configuration from environment variables
+DB_CONFIG = {
+    "host": os.getenv("DB_HOST"),
+    "database": os.getenv("DB_DATABASE"),
+    "user": os.getenv("DB_USER"),
+    "password": os.getenv("DB_PASSWORD"),
+    "port": int(os.getenv("DB_PORT"))
+}
+TIMEZONE = pytz.timezone('Asia/Kolkata')
+
+# --- Helper Functions ---
+def get_db_connection():
+    """Establish connection to the MySQL database."""
+    try:
+        return metrics.instrument_connection(mysql.connector.connect(**DB_CONFIG), 'api')
+    except mysql.connector.Error as e:
+        print(f"ERROR: Database connection failed: {str(e)}")
+        return None
+
+def validate_email(email):
+    """Validate email format."""
+    return re.match(r"[^@]+@[^@]+\.[^@]+", email) is not None
+
+def time_to_timedelta(time_str):
+    """Convert time string (HH:MM:SS) to timedelta for database storage."""
+    if not time_str:
+        return None
+    try:
+        t = datetime.strptime(time_str, "%H:%M:%S")
+        return timedelta(hours=t.hour, minutes=t.minute, seconds=t.second)
+    except ValueError:
+        return None
+
+def get_user_id_from_email(email):
+    """Fetch user_id for a given email."""
+    conn = get_db_connection()
+    if not conn:
+        return None
+    try:
+        cursor = conn.cursor()
+        cursor.execute("SELECT Id FROM user WHERE email = %s", (email,))
+        result = cursor.fetchone()
+        cursor.close()
+        conn.close()
+        return result[0] if result else None
+    except mysql.connector.Error as e:
+        print(f"ERROR: Failed to fetch user_id: {str(e)}")
+        conn.close()
+        return None
+
+def serialize_timedelta(obj):
+    """Convert timedelta or datetime objects to JSON-serializable strings."""
+    if isinstance(obj, timedelta):
+        total_seconds = int(obj.total_seconds())
+        hours, remainder = divmod(total_seconds, 3600)
+        minutes, seconds = divmod(remainder, 60)
+        return f"{hours:02}:{minutes:02}:{seconds:02}"
+    if isinstance(obj, datetime):
+        return obj.strftime('%Y-%m-%d %H:%M:%S')
+    return str(obj)
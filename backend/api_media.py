@@ -0,0 +1,779 @@
+"""
+Media upload (single and chunked) to Google Drive, plus per-file schedule edits.
+
+The Google client libraries are imported on first use rather than at import
+time; they dominate the API's start-up cost and most requests never touch them.
+"""
+from flask import Blueprint, request, jsonify
+from datetime import datetime
+import uuid
+import os
+import json
+import re
+import time
+import threading
+from collections import defaultdict
+import media_transcoder
+import change_feed
+import metrics
+from api_common import get_db_connection
+
+bp = Blueprint('media', __name__)
+
+SCOPES = ["https://www.googleapis.com/auth/drive"]  # For Drive access
+
+# Add these global variables for chunk management
+upload_chunks = defaultdict(list)
+upload_status = {}
+
+# --- Metrics ---
+CHUNK_BYTES = metrics.counter("upload_chunk_bytes_total", "Bytes received by /upload-media-chunk", ["platform"])
+DRIVE_UPLOAD_SECONDS = metrics.histogram("drive_upload_duration_seconds", "Google Drive files.create duration",
+                                         ["endpoint"])
+
+# --- Google Drive ---
+def load_drive_credentials(token_info):
+    """Load (and refresh if expired) Drive credentials from a stored token dict."""
+    from google.oauth2.credentials import Credentials
+    from google.auth.transport.requests import Request
+
+    creds = Credentials.from_authorized_user_info(token_info, SCOPES)
+    if creds and creds.expired and creds.refresh_token:
+        creds.refresh(Request())
+    return creds
+
+def build_drive_service(creds):
+    """Drive v3 client for the given credentials."""
+    import google_clients
+
+    return google_clients.get_service('drive', 'v3', creds)
+
+@bp.route('/delete-media', methods=['DELETE'])
+def delete_media():
+    """Delete media from Google Drive and schedule."""
+    data = request.get_json()
+    platform = data.get('platform')
+    account_id = data.get('account_id')
+    file_id = data.get('file_id')
+
+    if not all([platform, account_id, file_id]):
+        return jsonify({"error": "Missing required parameters"}), 400
+
+    if platform not in ['instagram', 'telegram', 'facebook', 'youtube']:
+        return jsonify({"error": "Invalid platform"}), 400
+
+    conn = get_db_connection()
+    if not conn:
+        return jsonify({"error": "Database connection failed"}), 500
+
+    try:
+        cursor = conn.cursor(dictionary=True)
+        
+        # Get account details for Drive credentials
+        if platform == 'youtube':
+            cursor.execute(f"SELECT token_sesson FROM {platform} WHERE id = %s", (account_id,))
+        else:
+            cursor.execute(f"SELECT token_drive FROM {platform} WHERE id = %s", (account_id,))
+            
+        account = cursor.fetchone()
+        
+        if not account:
+            cursor.close()
+            conn.close()
+            return jsonify({"error": "Account not found"}), 404
+
+        # Delete from Google Drive
+        token_data = account.get('token_sesson' if platform == 'youtube' else 'token_drive', '{}')
+        if token_data and token_data != "{}":
+            try:
+                token_drive = json.loads(token_data)
+                creds = load_drive_credentials(token_drive)
+                
+                service = build_drive_service(creds)
+                service.files().delete(fileId=file_id).execute()
+                print(f"✅ Deleted file from Google Drive: {file_id}")
+            except Exception as e:
+                print(f"⚠️ Could not delete from Google Drive: {str(e)}")
+                # Continue with database deletion even if Drive delete fails
+
+        # Remove from custom_schedule_data
+        cursor.execute(f"SELECT custom_schedule_data FROM {platform} WHERE id = %s", (account_id,))
+        result = cursor.fetchone()
+        
+        if result and result['custom_schedule_data']:
+            try:
+                schedule_data = json.loads(result['custom_schedule_data'])
+                if isinstance(schedule_data, list):
+                    # Filter out the deleted media
+                    updated_schedule = [item for item in schedule_data if item.get('file_id') != file_id]
+                    updated_schedule_json = json.dumps(updated_schedule)
+                    
+                    # Update database
+                    cursor.execute(f"UPDATE {platform} SET custom_schedule_data = %s WHERE id = %s", 
+                                 (updated_schedule_json, account_id))
+                    conn.commit()
+            except json.JSONDecodeError:
+                pass
+
+        cursor.close()
+        conn.close()
+        
+        return jsonify({"message": "Media deleted successfully"}), 200
+
+    except Exception as e:
+        conn.close()
+        return jsonify({"error": f"Failed to delete media: {str(e)}"}), 500
+
+@bp.route('/update-media-schedule', methods=['PATCH'])
+def update_media_schedule():
+    """Update individual media schedule."""
+    data = request.get_json()
+    platform = data.get('platform')
+    account_id = data.get('account_id')
+    media_data = data.get('media_data')
+
+    if not all([platform, account_id, media_data]):
+        return jsonify({"error": "Missing required parameters"}), 400
+
+    if platform not in ['instagram', 'telegram', 'facebook', 'youtube']:
+        return jsonify({"error": "Invalid platform"}), 400
+
+    # FIXED: Validate media_data format properly
+    try:
+        if not isinstance(media_data, dict):
+            return jsonify({"error": "media_data must be an object"}), 400
+        
+        # Validate required fields
+        required_fields = ['media_name', 'file_id']
+        for field in required_fields:
+            if field not in media_data:
+                return jsonify({"error": f"Missing required field: {field}"}), 400
+        
+        # Only validate datetime if provided and not None
+        scheduled_datetime = media_data.get('scheduled_datetime')
+        if scheduled_datetime is not None:
+            try:
+                datetime.strptime(scheduled_datetime, '%Y-%m-%d %H:%M:%S')
+            except ValueError:
+                return jsonify({"error": "Invalid datetime format. Use YYYY-MM-DD HH:MM:SS"}), 400
+                
+    except Exception as e:
+        return jsonify({"error": f"Invalid media_data format: {str(e)}"}), 400
+
+    conn = get_db_connection()
+    if not conn:
+        return jsonify({"error": "Database connection failed"}), 500
+
+    try:
+        cursor = conn.cursor(dictionary=True)
+        
+        # Get current schedule data
+        cursor.execute(f"SELECT custom_schedule_data FROM {platform} WHERE id = %s", (account_id,))
+        result = cursor.fetchone()
+        
+        current_schedule_data = []
+        if result and result['custom_schedule_data']:
+            try:
+                current_schedule_data = json.loads(result['custom_schedule_data'])
+                if not isinstance(current_schedule_data, list):
+                    current_schedule_data = []
+            except json.JSONDecodeError:
+                current_schedule_data = []
+
+        # Update the specific media item
+        updated_schedule = []
+        for item in current_schedule_data:
+            if (item.get('media_name') == media_data.get('media_name') and 
+                item.get('file_id') == media_data.get('file_id')):
+                updated_schedule.append(media_data)
+            else:
+                updated_schedule.append(item)
+
+        # Update database
+        updated_schedule_json = json.dumps(updated_schedule)
+        cursor.execute(f"UPDATE {platform} SET custom_schedule_data = %s WHERE id = %s", 
+                     (updated_schedule_json, account_id))
+        change_feed.record_event(cursor, platform, account_id, 'media_schedule_updated')
+        conn.commit()
+        cursor.close()
+        conn.close()
+        change_feed.notify(platform, 'media_schedule_updated', account_id)
+
+        return jsonify({"message": "Media schedule updated successfully"}), 200
+
+    except Exception as e:
+        conn.close()
+        return jsonify({"error": f"Failed to update media schedule: {str(e)}"}), 500
+
+@bp.route('/upload-media-chunk', methods=['POST'])
+def upload_media_chunk():
+    """Handle chunked file uploads with caption support."""
+    try:
+        chunk_file = request.files.get('chunk')
+        account_id = request.form.get('account_id')
+        platform = request.form.get('platform')
+        user_id = request.form.get('user_id')
+        chunk_index = int(request.form.get('chunk_index', 0))
+        total_chunks = int(request.form.get('total_chunks', 1))
+        upload_id = request.form.get('upload_id')
+        original_name = request.form.get('original_name')
+        
+        # Extract caption from first chunk only to avoid duplication
+        caption = request.form.get('caption', '') if chunk_index == 0 else ''
+
+        if not all([chunk_file, account_id, platform, user_id, upload_id, original_name]):
+            return jsonify({"error": "Missing required parameters"}), 400
+
+        # Create upload directory if it doesn't exist
+        upload_dir = f"temp_uploads/{upload_id}"
+        os.makedirs(upload_dir, exist_ok=True)
+
+        # Save chunk
+        chunk_filename = f"{upload_dir}/chunk_{chunk_index:04d}"
+        chunk_file.save(chunk_filename)
+        CHUNK_BYTES.inc(os.path.getsize(chunk_filename), platform=platform)
+
+        # Track chunk progress
+        if upload_id not in upload_chunks:
+            upload_chunks[upload_id] = []
+        upload_chunks[upload_id].append(chunk_index)
+
+        # Update status with caption (store only from first chunk)
+        if upload_id not in upload_status:
+            upload_status[upload_id] = {
+                'uploaded_chunks': len(upload_chunks[upload_id]),
+                'total_chunks': total_chunks,
+                'account_id': account_id,
+                'platform': platform,
+                'user_id': user_id,
+                'original_name': original_name,
+                'caption': caption if chunk_index == 0 else ''
+            }
+        else:
+            upload_status[upload_id]['uploaded_chunks'] = len(upload_chunks[upload_id])
+            # Only update caption if it's the first chunk and we don't have one yet
+            if chunk_index == 0 and caption and not upload_status[upload_id].get('caption'):
+                upload_status[upload_id]['caption'] = caption
+
+        return jsonify({
+            "message": f"Chunk {chunk_index + 1}/{total_chunks} uploaded successfully",
+            "chunk_index": chunk_index,
+            "uploaded_chunks": len(upload_chunks[upload_id]),
+            "total_chunks": total_chunks,
+            "success": True
+        }), 200
+
+    except Exception as e:
+        return jsonify({"error": f"Chunk upload failed: {str(e)}", "success": False}), 500
+# Find the existing finalize-upload endpoint and UPDATE it:
+
+@bp.route('/finalize-upload', methods=['POST'])
+def finalize_upload():
+    """Combine chunks and upload to Google Drive with scheduling and caption support."""
+    try:
+        upload_id = request.form.get('upload_id')
+        account_id = request.form.get('account_id')
+        platform = request.form.get('platform')
+        user_id = request.form.get('user_id')
+        original_name = request.form.get('original_name')
+        total_chunks = int(request.form.get('total_chunks', 1))
+        
+        # Get scheduling data from form
+        schedule_type = request.form.get('schedule_type', 'range')
+        scheduled_datetime = request.form.get('scheduled_datetime')
+        
+        # Get caption from form data or from stored upload status
+        caption = request.form.get('caption', '')
+        if not caption and upload_id in upload_status:
+            caption = upload_status[upload_id].get('caption', '')
+
+        if not all([upload_id, account_id, platform, user_id, original_name]):
+            return jsonify({"error": "Missing required parameters"}), 400
+
+        # Verify all chunks are uploaded
+        uploaded_chunks = upload_chunks.get(upload_id, [])
+        if len(uploaded_chunks) != total_chunks:
+            return jsonify({
+                "error": f"Incomplete upload: {len(uploaded_chunks)}/{total_chunks} chunks received"
+            }), 400
+
+        # Combine chunks in a background thread with scheduling data and caption
+        thread = threading.Thread(
+            target=combine_and_upload_chunks,
+            args=(upload_id, account_id, platform, user_id, original_name, total_chunks, schedule_type, scheduled_datetime, caption)
+        )
+        thread.daemon = True
+        thread.start()
+
+        return jsonify({
+            "message": "Upload finalization started",
+            "upload_id": upload_id,
+            "status": "processing",
+            "caption": caption,  # Return caption in response
+            "success": True
+        }), 200
+
+    except Exception as e:
+        return jsonify({"error": f"Finalization failed: {str(e)}", "success": False}), 500
+
+
+
+
+
+# Add this after your existing endpoints, before the if __name__ block
+
+# Add this function after the helper functions section, before the API endpoints
+def process_upload_with_scheduling(platform, account_id, media_data):
+    """Process upload and update custom schedule data for both range and datetime scheduling with caption support."""
+    try:
+        schedule_type = media_data.get('schedule_type', 'range')
+        scheduled_datetime = media_data.get('scheduled_datetime')
+        caption = media_data.get('caption', '')  # EXTRACT CAPTION FROM MEDIA_DATA
+        
+        # Always process scheduling data, regardless of schedule type
+        conn = get_db_connection()
+        if not conn:
+            return
+            
+        try:
+            cursor = conn.cursor(dictionary=True)
+            cursor.execute(f"SELECT custom_schedule_data FROM {platform} WHERE id = %s", (account_id,))
+            result = cursor.fetchone()
+            
+            current_schedule_data = []
+            if result and result['custom_schedule_data']:
+                try:
+                    current_schedule_data = json.loads(result['custom_schedule_data'])
+                    if not isinstance(current_schedule_data, list):
+                        current_schedule_data = []
+                except json.JSONDecodeError:
+                    current_schedule_data = []
+            
+            # Check if this file was already added (prevent duplicates from retries)
+            existing_entry = None
+            for item in current_schedule_data:
+                if (item.get('media_name') == media_data.get('original_name') and 
+                    item.get('scheduled_datetime') == scheduled_datetime and
+                    item.get('schedule_type') == schedule_type):
+                    existing_entry = item
+                    break
+            
+            if existing_entry:
+                # Update existing entry with new file_id and caption if needed
+                existing_entry['file_id'] = media_data.get('file_id', existing_entry.get('file_id', ''))
+                existing_entry['upload_time'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+                existing_entry['caption'] = caption  # UPDATE CAPTION IN EXISTING ENTRY
+                print(f"✅ Updated existing schedule entry for {media_data.get('original_name')} with caption: {caption}")
+            else:
+                # Add new schedule item WITH CAPTION
+                new_schedule_item = {
+                    'media_name': media_data.get('original_name', 'unknown'),
+                    'scheduled_datetime': scheduled_datetime if schedule_type == 'datetime' else None,
+                    'file_id': media_data.get('file_id', ''),
+                    'status': 'pending',
+                    'upload_time': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+                    'schedule_type': schedule_type,
+                    'caption': caption  # ADD CAPTION FIELD HERE
+                }
+                
+                current_schedule_data.append(new_schedule_item)
+                print(f"✅ Added {schedule_type} schedule for {media_data.get('original_name')} with caption: {caption}")
+            
+            # Update database
+            updated_schedule_json = json.dumps(current_schedule_data)
+            cursor.execute(f"UPDATE {platform} SET custom_schedule_data = %s WHERE id = %s", 
+                         (updated_schedule_json, account_id))
+            change_feed.record_event(cursor, platform, account_id, 'media_uploaded')
+            conn.commit()
+            cursor.close()
+            change_feed.notify(platform, 'media_uploaded', account_id)
+            
+        except Exception as e:
+            print(f"Error updating custom schedule: {str(e)}")
+        finally:
+            conn.close()
+                
+    except Exception as e:
+        print(f"Error in process_upload_with_scheduling: {str(e)}")
+
+# Find the combine_and_upload_chunks function and UPDATE it:
+def combine_and_upload_chunks(upload_id, account_id, platform, user_id, original_name, total_chunks, schedule_type='range', scheduled_datetime=None, caption=''):
+    """Combine chunks and upload to Google Drive in background with scheduling and caption support."""
+    from googleapiclient.http import MediaFileUpload
+
+    try:
+        upload_dir = f"temp_uploads/{upload_id}"
+        combined_path = f"temp_uploads/{upload_id}_combined_{original_name}"
+        transcode_queued = False
+
+        # Combine chunks
+        with open(combined_path, 'wb') as output_file:
+            for chunk_index in range(total_chunks):
+                chunk_path = f"{upload_dir}/chunk_{chunk_index:04d}"
+                with open(chunk_path, 'rb') as chunk_file:
+                    output_file.write(chunk_file.read())
+
+        # Upload to Google Drive using existing logic
+        conn = get_db_connection()
+        if not conn:
+            upload_status[upload_id]['status'] = 'failed'
+            upload_status[upload_id]['error'] = 'Database connection failed'
+            return
+
+        try:
+            cursor = conn.cursor(dictionary=True)
+            
+            # Build query based on platform
+            if platform == 'youtube':
+                cursor.execute(f"SELECT google_drive_link, token_sesson FROM {platform} WHERE id = %s AND user_id = %s", (account_id, user_id))
+            else:
+                cursor.execute(f"SELECT google_drive_link, token_drive FROM {platform} WHERE id = %s AND user_id = %s", (account_id, user_id))
+                
+            account = cursor.fetchone()
+            cursor.close()
+
+            if not account:
+                upload_status[upload_id]['status'] = 'failed'
+                upload_status[upload_id]['error'] = 'Account not found'
+                return
+
+            # Extract folder ID and upload
+            folder_id_match = re.search(r'folders/([a-zA-Z0-9-_]+)', account.get('google_drive_link', ''))
+            if folder_id_match:
+                folder_id = folder_id_match.group(1)
+                
+                # Handle token
+                if platform == 'youtube':
+                    token_data = account.get('token_sesson', '{}')
+                else:
+                    token_data = account.get('token_drive', '{}')
+                
+                if token_data and token_data != "{}":
+                    token_drive = json.loads(token_data)
+                    creds = load_drive_credentials(token_drive)
+                    
+                    service = build_drive_service(creds)
+                    
+                    file_metadata = {
+                        'name': original_name,
+                        'parents': [folder_id]
+                    }
+                    
+                    # Determine MIME type
+                    mime_type = 'image/jpeg'
+                    if original_name.lower().endswith(('.mp4', '.mov', '.avi')):
+                        mime_type = 'video/mp4'
+                    elif original_name.lower().endswith('.png'):
+                        mime_type = 'image/png'
+                    elif original_name.lower().endswith('.gif'):
+                        mime_type = 'image/gif'
+
+                    media = MediaFileUpload(combined_path, mimetype=mime_type)
+                    
+                    with DRIVE_UPLOAD_SECONDS.time(endpoint='finalize-upload'):
+                        uploaded_file = service.files().create(
+                            body=file_metadata, 
+                            media_body=media, 
+                            fields='id,name,webViewLink,createdTime'
+                        ).execute()
+
+                    # Clean up duplicate files
+                    cleanup_duplicate_files(service, folder_id, original_name, uploaded_file['id'])
+
+                    media.stream().close() if hasattr(media, 'stream') else None
+
+                    # PROCESS SCHEDULING DATA WITH CAPTION AFTER SUCCESSFUL UPLOAD
+                    schedule_data = {
+                        'schedule_type': schedule_type,
+                        'scheduled_datetime': scheduled_datetime,
+                        'original_name': original_name,
+                        'file_id': uploaded_file['id'],
+                        'caption': caption  # INCLUDE CAPTION
+                    }
+                    process_upload_with_scheduling(platform, account_id, schedule_data)
+
+                    # Normalize Instagram videos now so the poster doesn't encode at posting time
+                    if platform == 'instagram' and media_transcoder.is_video_file(original_name):
+                        media_transcoder.submit_normalize(combined_path, remove_source=True)
+                        transcode_queued = True
+
+                    upload_status[upload_id]['status'] = 'completed'
+                    upload_status[upload_id]['file_id'] = uploaded_file['id']
+                    upload_status[upload_id]['drive_link'] = uploaded_file.get('webViewLink', '')
+                    upload_status[upload_id]['caption'] = caption  # STORE CAPTION IN STATUS
+                else:
+                    upload_status[upload_id]['status'] = 'completed'
+                    upload_status[upload_id]['message'] = 'File processed (no Drive token)'
+                    upload_status[upload_id]['caption'] = caption  # STORE CAPTION IN STATUS
+            else:
+                upload_status[upload_id]['status'] = 'completed'
+                upload_status[upload_id]['message'] = 'File processed (no Drive configured)'
+                upload_status[upload_id]['caption'] = caption  # STORE CAPTION IN STATUS
+
+        except Exception as e:
+            upload_status[upload_id]['status'] = 'failed'
+            upload_status[upload_id]['error'] = str(e)
+        finally:
+            conn.close()
+
+        # Cleanup (a queued transcode removes combined_path itself once done)
+        try:
+            import shutil
+            shutil.rmtree(upload_dir, ignore_errors=True)
+            if os.path.exists(combined_path) and not transcode_queued:
+                os.remove(combined_path)
+        except:
+            pass
+
+    except Exception as e:
+        upload_status[upload_id]['status'] = 'failed'
+        upload_status[upload_id]['error'] = str(e)
+
+@bp.route('/upload-status/<upload_id>', methods=['GET'])
+def get_upload_status(upload_id):
+    """Check status of chunked upload."""
+    status = upload_status.get(upload_id, {})
+    return jsonify(status), 200
+
+# Find the existing upload-media endpoint and UPDATE it:
+@bp.route('/upload-media', methods=['POST'])
+def upload_media():
+    """Handle both single file and chunked uploads with scheduling and caption support."""
+    from googleapiclient.http import MediaFileUpload
+    from googleapiclient.errors import HttpError
+
+    if 'file' not in request.files and 'chunk' not in request.files:
+        return jsonify({"error": "No file provided"}), 400
+
+    # If it's a chunk, redirect to chunk upload handler
+    if 'chunk' in request.files:
+        return upload_media_chunk()
+
+    file = request.files['file']
+    account_id = request.form.get('account_id')
+    platform = request.form.get('platform')
+    user_id = request.form.get('user_id')
+    
+    # Extract caption from form data
+    caption = request.form.get('caption', '')
+
+    if not account_id or not platform or not user_id:
+        return jsonify({"error": "Missing required parameters: account_id, platform, user_id"}), 400
+
+    if platform not in ['instagram', 'telegram', 'youtube']:
+        return jsonify({"error": "Invalid platform"}), 400
+
+    table = 'instagram' if platform == 'instagram' else 'telegram' if platform == 'telegram' else 'youtube'
+
+    conn = get_db_connection()
+    if not conn:
+        return jsonify({"error": "Database connection failed"}), 500
+
+    temp_path = None
+    try:
+        cursor = conn.cursor(dictionary=True)
+        
+        # Query tokens based on platform
+        if platform == 'youtube':
+            cursor.execute(f"SELECT google_drive_link, token_sesson FROM {table} WHERE id = %s AND user_id = %s", (account_id, user_id))
+        else:
+            cursor.execute(f"SELECT google_drive_link, token_drive FROM {table} WHERE id = %s AND user_id = %s", (account_id, user_id))
+            
+        account = cursor.fetchone()
+        cursor.close()
+
+        if not account:
+            conn.close()
+            return jsonify({"error": "Account not found or does not belong to user"}), 404
+
+        # Check Google Drive link
+        if not account.get('google_drive_link'):
+            conn.close()
+            return jsonify({"message": "File queued for upload (no Drive configured)", "file_id": "no_drive"}), 200
+
+        folder_id_match = re.search(r'folders/([a-zA-Z0-9-_]+)', account['google_drive_link'])
+        if not folder_id_match:
+            conn.close()
+            return jsonify({"error": "Invalid Google Drive link format"}), 400
+        folder_id = folder_id_match.group(1)
+
+        # Handle Drive token
+        token_data = account.get('token_sesson' if platform == 'youtube' else 'token_drive', '{}')
+        if not token_data or token_data == "{}":
+            conn.close()
+            return jsonify({"message": "File queued for upload (no Drive token)", "file_id": "no_token"}), 200
+
+        try:
+            token_drive = json.loads(token_data)
+            creds = load_drive_credentials(token_drive)
+        except Exception as e:
+            conn.close()
+            return jsonify({"error": f"Failed to load Google Drive credentials: {str(e)}"}), 500
+
+        # Build Google Drive service
+        service = build_drive_service(creds)
+
+        # Check if file already exists in the folder to prevent duplicates
+        try:
+            query = f"name = '{file.filename}' and '{folder_id}' in parents and trashed = false"
+            existing_files = service.files().list(
+                q=query,
+                spaces='drive',
+                fields='files(id, name)',
+                pageSize=1
+            ).execute()
+            
+            if existing_files.get('files'):
+                # File already exists, return success without uploading
+                existing_file = existing_files['files'][0]
+                print(f"📁 File already exists in Drive: {file.filename}, using existing file ID: {existing_file['id']}")
+                
+                # Still process scheduling data
+                schedule_data = {
+                    'schedule_type': request.form.get('schedule_type', 'range'),
+                    'scheduled_datetime': request.form.get('scheduled_datetime'),
+                    'original_name': file.filename,
+                    'file_id': existing_file['id'],
+                    'caption': caption
+                }
+                process_upload_with_scheduling(platform, account_id, schedule_data)
+                
+                conn.close()
+                return jsonify({
+                    "message": "File already exists in Drive, scheduling updated",
+                    "file_id": existing_file['id'],
+                    "file_name": file.filename,
+                    "drive_link": f"https://drive.google.com/file/d/{existing_file['id']}/view",
+                    "caption": caption,
+                    "success": True,
+                    "duplicate": True  # Add flag to identify duplicates
+                }), 200
+        except Exception as e:
+            print(f"⚠️ Could not check for existing files: {str(e)}")
+            # Continue with upload if check fails
+
+        # Save temp file
+        temp_dir = 'temp_uploads'
+        os.makedirs(temp_dir, exist_ok=True)
+        file_extension = os.path.splitext(file.filename)[1] if file.filename else '.jpg'
+        unique_filename = f"{uuid.uuid4()}{file_extension}"
+        temp_path = os.path.join(temp_dir, unique_filename)
+        file.save(temp_path)
+
+        # Detect MIME type
+        mime_type = 'image/jpeg'
+        if file.filename:
+            lower = file.filename.lower()
+            if lower.endswith(('.mp4', '.mov', '.avi')):
+                mime_type = 'video/mp4'
+            elif lower.endswith('.png'):
+                mime_type = 'image/png'
+            elif lower.endswith('.gif'):
+                mime_type = 'image/gif'
+
+        # Upload to Google Drive
+        file_metadata = {'name': file.filename or unique_filename, 'parents': [folder_id]}
+        media = MediaFileUpload(temp_path, mimetype=mime_type)
+        with DRIVE_UPLOAD_SECONDS.time(endpoint='upload-media'):
+            uploaded_file = service.files().create(
+                body=file_metadata, media_body=media, fields='id,name,webViewLink,createdTime'
+            ).execute()
+
+        # Clean up duplicate files (keep only the most recent)
+        cleanup_duplicate_files(service, folder_id, file.filename or unique_filename, uploaded_file['id'])
+
+        # Close and clean temp file
+        media.stream().close() if hasattr(media, 'stream') else None
+        max_retries = 3
+        if platform == 'instagram' and media_transcoder.is_video_file(file.filename or ''):
+            # Normalize Instagram videos now; the pool removes the temp file when done
+            media_transcoder.submit_normalize(temp_path, remove_source=True)
+            # The pool owns the file now, so the error handlers below must not remove it
+            temp_path = None
+            max_retries = 0
+        for attempt in range(max_retries):
+            try:
+                if os.path.exists(temp_path):
+                    os.remove(temp_path)
+                break
+            except PermissionError:
+                if attempt < max_retries - 1:
+                    time.sleep(0.1)
+                else:
+                    print(f"Warning: Could not delete temp file {temp_path}")
+
+        # PROCESS SCHEDULING DATA WITH CAPTION AFTER SUCCESSFUL UPLOAD
+        schedule_data = {
+            'schedule_type': request.form.get('schedule_type', 'range'),
+            'scheduled_datetime': request.form.get('scheduled_datetime'),
+            'original_name': file.filename or unique_filename,
+            'file_id': uploaded_file['id'],
+            'caption': caption
+        }
+        process_upload_with_scheduling(platform, account_id, schedule_data)
+
+        conn.close()
+        
+        # Return consistent success response
+        return jsonify({
+            "message": "Upload successful",
+            "file_id": uploaded_file['id'],
+            "file_name": uploaded_file['name'],
+            "drive_link": uploaded_file.get('webViewLink', ''),
+            "caption": caption,
+            "success": True
+        }), 200
+
+    except HttpError as e:
+        if temp_path and os.path.exists(temp_path):
+            try:
+                os.remove(temp_path)
+            except:
+                pass
+        conn.close()
+        return jsonify({"error": f"Google Drive error: {str(e)}", "success": False}), 500
+
+    except Exception as e:
+        if temp_path and os.path.exists(temp_path):
+            try:
+                os.remove(temp_path)
+            except:
+                pass
+        conn.close()
+        return jsonify({"error": f"Upload failed: {str(e)}", "success": False}), 500
+
+def cleanup_duplicate_files(service, folder_id, file_name, current_file_id):
+    """Check for and delete duplicate files with the same name in the same folder."""
+    try:
+        # Search for files with the same name in the same folder
+        query = f"name = '{file_name}' and '{folder_id}' in parents and trashed = false"
+        results = service.files().list(
+            q=query,
+            spaces='drive',
+            fields='files(id, name, createdTime)'
+        ).execute()
+        
+        files = results.get('files', [])
+        
+        # If multiple files with same name exist, keep only the most recent one
+        if len(files) > 1:
+            print(f"🔍 Found {len(files)} files with name '{file_name}' in folder {folder_id}")
+            
+            # Sort files by creation time (newest first)
+            files.sort(key=lambda x: x.get('createdTime', ''), reverse=True)
+            
+            # Keep the most recent file (which should be our current upload)
+            files_to_delete = files[1:]  # All except the first (most recent)
+            
+            for file_to_delete in files_to_delete:
+                if file_to_delete['id'] != current_file_id:
+                    try:
+                        service.files().delete(fileId=file_to_delete['id']).execute()
+                        print(f"🗑️ Deleted duplicate file: {file_to_delete['id']} ({file_name})")
+                    except Exception as e:
+                        print(f"⚠️ Failed to delete duplicate file {file_to_delete['id']}: {str(e)}")
+            
+            print(f"✅ Cleaned up {len(files_to_delete)} duplicate files")
+            
+    except Exception as e:
+        print(f"❌ Error during duplicate cleanup: {str(e)}")
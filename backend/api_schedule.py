@@ -0,0 +1,450 @@
+"""
+Custom schedules, schedule status/reset and bulk post creation.
+"""
+from flask import Blueprint, request, jsonify
+import mysql.connector
+from datetime import datetime, timedelta
+import json
+import change_feed
+from api_common import get_db_connection, get_user_id_from_email, serialize_timedelta, TIMEZONE
+
+bp = Blueprint('schedule', __name__)
+
+# Add this new endpoint for updating custom schedule data
+@bp.route('/<platform>/<int:record_id>/custom-schedule', methods=['PATCH'])
+def update_custom_schedule(platform, record_id):
+    """Update custom schedule data for a platform account."""
+    if platform not in ['instagram', 'telegram', 'facebook', 'youtube']:
+        return jsonify({"error": "Invalid platform"}), 400
+
+    data = request.get_json()
+    custom_schedule_data = data.get('custom_schedule_data')
+
+    # Validate custom_schedule_data format - FIXED: Handle None values properly
+    if custom_schedule_data is not None:
+        try:
+            # Validate it's a list
+            if not isinstance(custom_schedule_data, list):
+                return jsonify({"error": "custom_schedule_data must be a list"}), 400
+            
+            # Validate each item in the list
+            for item in custom_schedule_data:
+                if not isinstance(item, dict):
+                    return jsonify({"error": "Each schedule item must be an object"}), 400
+                
+                required_fields = ['media_name', 'file_id']
+                for field in required_fields:
+                    if field not in item:
+                        return jsonify({"error": f"Missing required field: {field}"}), 400
+                
+                # FIXED: Only validate datetime if it's provided and not None
+                scheduled_datetime = item.get('scheduled_datetime')
+                if scheduled_datetime is not None:
+                    try:
+                        datetime.strptime(scheduled_datetime, '%Y-%m-%d %H:%M:%S')
+                    except ValueError:
+                        return jsonify({"error": "Invalid datetime format. Use YYYY-MM-DD HH:MM:SS"}), 400
+
+            # Convert to JSON string for storage
+            custom_schedule_json = json.dumps(custom_schedule_data)
+        except Exception as e:
+            return jsonify({"error": f"Invalid custom_schedule_data format: {str(e)}"}), 400
+    else:
+        custom_schedule_json = None
+
+    conn = get_db_connection()
+    if not conn:
+        return jsonify({"error": "Database connection failed"}), 500
+
+    try:
+        cursor = conn.cursor()
+        
+        # Verify record exists
+        cursor.execute(f"SELECT id FROM {platform} WHERE id = %s", (record_id,))
+        if not cursor.fetchone():
+            cursor.close()
+            conn.close()
+            return jsonify({"error": f"{platform.capitalize()} record not found"}), 404
+
+        # Update custom_schedule_data
+        query = f"UPDATE {platform} SET custom_schedule_data = %s WHERE id = %s"
+        cursor.execute(query, (custom_schedule_json, record_id))
+        change_feed.record_event(cursor, platform, record_id, 'custom_schedule_updated')
+        conn.commit()
+        cursor.close()
+        conn.close()
+        change_feed.notify(platform, 'custom_schedule_updated', record_id)
+
+        return jsonify({"message": "Custom schedule data updated successfully"}), 200
+
+    except mysql.connector.Error as e:
+        conn.close()
+        return jsonify({"error": f"Database error: {str(e)}"}), 500
+
+# Add this new endpoint for getting custom schedule data
+@bp.route('/<platform>/<int:record_id>/custom-schedule', methods=['GET'])
+def get_custom_schedule(platform, record_id):
+    """Get custom schedule data for a platform account."""
+    if platform not in ['instagram', 'telegram', 'facebook', 'youtube']:
+        return jsonify({"error": "Invalid platform"}), 400
+
+    conn = get_db_connection()
+    if not conn:
+        return jsonify({"error": "Database connection failed"}), 500
+
+    try:
+        cursor = conn.cursor(dictionary=True)
+        
+        # Get custom_schedule_data
+        cursor.execute(f"SELECT custom_schedule_data FROM {platform} WHERE id = %s", (record_id,))
+        result = cursor.fetchone()
+        
+        if not result:
+            cursor.close()
+            conn.close()
+            return jsonify({"error": f"{platform.capitalize()} record not found"}), 404
+
+        custom_schedule_data = None
+        if result['custom_schedule_data']:
+            try:
+                custom_schedule_data = json.loads(result['custom_schedule_data'])
+            except json.JSONDecodeError:
+                custom_schedule_data = None
+
+        cursor.close()
+        conn.close()
+
+        return jsonify({
+            "custom_schedule_data": custom_schedule_data
+        }), 200
+
+    except mysql.connector.Error as e:
+        conn.close()
+        return jsonify({"error": f"Database error: {str(e)}"}), 500
+
+@bp.route('/schedule/reset', methods=['POST'])
+def reset_schedule():
+    """Reset scheduling for specified platforms."""
+    data = request.get_json()
+    platform = data.get('platform', 'both').lower()
+
+    if platform not in ['instagram', 'telegram', 'facebook', 'youtube', 'both']:
+        return jsonify({"error": "Invalid platform (use 'instagram', 'telegram', 'facebook', 'youtube', or 'both')"}), 400
+
+    conn = get_db_connection()
+    if not conn:
+        return jsonify({"error": "Database connection failed"}), 500
+
+    try:
+        cursor = conn.cursor()
+        instagram_count = 0
+        telegram_count = 0
+        facebook_count = 0
+        youtube_count = 0
+
+        if platform in ['instagram', 'both']:
+            cursor.execute("""
+                UPDATE instagram SET 
+                    selected = 'No', 
+                    done = 'No', 
+                    next_post_time = NULL 
+                WHERE posts_left > 0
+            """)
+            instagram_count = cursor.rowcount
+
+        if platform in ['telegram', 'both']:
+            cursor.execute("""
+                UPDATE telegram SET 
+                    selected = 'No', 
+                    done = 'No', 
+                    next_post_time = NULL 
+                WHERE posts_left > 0
+            """)
+            telegram_count = cursor.rowcount
+
+        if platform in ['facebook', 'both']:
+            cursor.execute("""
+                UPDATE facebook SET 
+                    selected = 'No', 
+                    done = 'No', 
+                    next_post_time = NULL 
+                WHERE posts_left > 0
+            """)
+            facebook_count = cursor.rowcount
+
+        if platform in ['youtube', 'both']:
+            cursor.execute("""
+                UPDATE youtube SET 
+                    selected = 'No', 
+                    done = 'No', 
+                    next_post_time = NULL 
+                WHERE posts_left > 0
+            """)
+            youtube_count = cursor.rowcount
+
+        conn.commit()
+        cursor.close()
+        conn.close()
+        return jsonify({
+            "message": f"Reset {instagram_count} Instagram, {telegram_count} Telegram, {facebook_count} Facebook, and {youtube_count} YouTube records"
+        }), 200
+    except mysql.connector.Error as e:
+        conn.close()
+        return jsonify({"error": f"Database error: {str(e)}"}), 500
+
+@bp.route('/schedule/status', methods=['GET'])
+def schedule_status():
+    """Retrieve scheduling status for specified platforms."""
+    platform = request.args.get('platform', 'both').lower()
+    email = request.args.get('email')
+
+    if platform not in ['instagram', 'telegram', 'facebook', 'youtube', 'both']:
+        return jsonify({"error": "Invalid platform (use 'instagram', 'telegram', 'facebook', 'youtube', or 'both')"}), 400
+
+    conn = get_db_connection()
+    if not conn:
+        return jsonify({"error": "Database connection failed"}), 500
+
+    try:
+        cursor = conn.cursor(dictionary=True)
+        result = {}
+
+        # Fetch user_id if email provided
+        user_id = None
+        if email:
+            user_id = get_user_id_from_email(email)
+            if not user_id:
+                cursor.close()
+                conn.close()
+                return jsonify({"error": "User not available for the provided email"}), 400
+
+        # Helper function to serialize records
+        def serialize_records(records):
+            serialized = []
+            for record in records:
+                serialized_record = {}
+                for key, value in record.items():
+                    if isinstance(value, (timedelta, datetime)):
+                        serialized_record[key] = serialize_timedelta(value)
+                    else:
+                        serialized_record[key] = value
+                serialized.append(serialized_record)
+            return serialized
+
+        # Fetch Instagram status
+        if platform in ['instagram', 'both']:
+            query = """
+                SELECT id, user_id, username, email, sch_start_range, sch_end_range, 
+                       number_of_posts, posts_left, next_post_time 
+                FROM instagram WHERE posts_left > 0
+            """
+            params = []
+            if user_id:
+                query += " AND user_id = %s"
+                params.append(user_id)
+            cursor.execute(query, params)
+            instagram_records = cursor.fetchall()
+            result['instagram'] = serialize_records(instagram_records)
+            result['instagram_count'] = len(instagram_records)  # Add row count
+
+        # Fetch Telegram status
+        if platform in ['telegram', 'both']:
+            query = """
+                SELECT id, user_id, channel_name, email, token_sesson, sch_start_range, 
+                       sch_end_range, number_of_posts, posts_left, next_post_time 
+                FROM telegram WHERE posts_left > 0
+            """
+            params = []
+            if user_id:
+                query += " AND user_id = %s"
+                params.append(user_id)
+            cursor.execute(query, params)
+            telegram_records = cursor.fetchall()
+            result['telegram'] = serialize_records(telegram_records)
+            result['telegram_count'] = len(telegram_records)  # Add row count
+
+        # Fetch Facebook status
+        if platform in ['facebook', 'both']:
+            query = """
+                SELECT id, user_id, username, email, channel_name, sch_start_range, 
+                       sch_end_range, number_of_posts, posts_left, next_post_time 
+                FROM facebook WHERE posts_left > 0
+            """
+            params = []
+            if user_id:
+                query += " AND user_id = %s"
+                params.append(user_id)
+            cursor.execute(query, params)
+            facebook_records = cursor.fetchall()
+            result['facebook'] = serialize_records(facebook_records)
+            result['facebook_count'] = len(facebook_records)  # Add row count
+
+        # Fetch YouTube status
+        if platform in ['youtube', 'both']:
+            query = """
+                SELECT id, user_id, username, email, sch_start_range, sch_end_range, 
+                       number_of_posts, posts_left, next_post_time 
+                FROM youtube WHERE posts_left > 0
+            """
+            params = []
+            if user_id:
+                query += " AND user_id = %s"
+                params.append(user_id)
+            cursor.execute(query, params)
+            youtube_records = cursor.fetchall()
+            result['youtube'] = serialize_records(youtube_records)
+            result['youtube_count'] = len(youtube_records)  # Add row count
+
+        cursor.close()
+        conn.close()
+        return jsonify(result), 200
+    except mysql.connector.Error as e:
+        conn.close()
+        return jsonify({"error": f"Database error: {str(e)}"}), 500
+
+@bp.route('/schedule/update-account', methods=['PATCH'])
+def update_schedule_account():
+    """Update account data from ScheduleScreen - supports all platforms."""
+    data = request.get_json()
+    platform = data.get('platform')
+    record_id = data.get('record_id')
+    update_data = data.get('update_data', {})
+
+    # Validation
+    if not platform or platform not in ['instagram', 'telegram', 'youtube', 'facebook']:
+        return jsonify({"error": "Invalid platform"}), 400
+    if not record_id:
+        return jsonify({"error": "Record ID is required"}), 400
+    if not update_data:
+        return jsonify({"error": "No update data provided"}), 400
+
+    conn = get_db_connection()
+    if not conn:
+        return jsonify({"error": "Database connection failed"}), 500
+
+    try:
+        cursor = conn.cursor()
+        
+        # Verify record exists
+        cursor.execute(f"SELECT id FROM {platform} WHERE id = %s", (record_id,))
+        if not cursor.fetchone():
+            cursor.close()
+            conn.close()
+            return jsonify({"error": f"{platform.capitalize()} record not found"}), 404
+
+        # Build dynamic update query
+        updates = []
+        params = []
+        
+        # Common fields for all platforms
+        common_fields = [
+            'username', 'email', 'google_drive_link', 'sch_start_range', 
+            'sch_end_range', 'post_daily_range', 'selected'
+        ]
+        
+        for field in common_fields:
+            if field in update_data and update_data[field] is not None:
+                if field == 'post_daily_range':
+                    # Handle post_daily_range with post_daily_range_left
+                    updates.append("post_daily_range = %s")
+                    updates.append("post_daily_range_left = %s")
+                    params.extend([update_data[field], update_data[field]])
+                    updates.append("last_reset = %s")
+                    params.append(datetime.now(TIMEZONE).strftime('%Y-%m-%d %H:%M:%S'))
+                elif field == 'selected':
+                    updates.append("selected = %s")
+                    params.append(update_data[field])
+                else:
+                    updates.append(f"{field} = %s")
+                    params.append(update_data[field])
+        
+        # Platform-specific fields
+        if platform == 'instagram' and 'password' in update_data and update_data['password']:
+            updates.append("passwand = %s")
+            params.append(update_data['password'])
+            
+        elif platform == 'telegram' and 'channel_name' in update_data:
+            updates.append("channel_name = %s")
+            params.append(update_data['channel_name'])
+            
+        elif platform == 'youtube' and 'channel_id' in update_data:
+            updates.append("channel_id = %s")
+            params.append(update_data['channel_id'])
+
+        if not updates:
+            cursor.close()
+            conn.close()
+            return jsonify({"error": "No valid fields to update"}), 400
+
+        # Reset scheduling fields
+        updates.extend(["done = 'No'", "next_post_time = NULL"])
+        
+        query = f"UPDATE {platform} SET {', '.join(updates)} WHERE id = %s"
+        params.append(record_id)
+
+        cursor.execute(query, params)
+        conn.commit()
+        cursor.close()
+        conn.close()
+        
+        return jsonify({"message": f"{platform.capitalize()} account updated successfully"}), 200
+        
+    except mysql.connector.Error as e:
+        conn.close()
+        return jsonify({"error": f"Database error: {str(e)}"}), 500
+
+@bp.route('/posts/add', methods=['POST'])
+def add_posts():
+    """Add posts to an existing platform record."""
+    data = request.get_json()
+    platform = data.get('platform')
+    record_id = data.get('record_id')
+    additional_posts = data.get('additional_posts')
+
+    # Validation
+    if platform not in ['instagram', 'telegram', 'facebook', 'youtube']:
+        return jsonify({"error": "Invalid platform (use 'instagram', 'telegram', 'facebook', or 'youtube')"}), 400
+    if not record_id or not isinstance(record_id, int):
+        return jsonify({"error": "Valid record_id is required"}), 400
+    if not additional_posts or not isinstance(additional_posts, int) or additional_posts <= 0:
+        return jsonify({"error": "Additional posts must be a positive integer"}), 400
+
+    conn = get_db_connection()
+    if not conn:
+        return jsonify({"error": "Database connection failed"}), 500
+
+    try:
+        cursor = conn.cursor()
+        table = platform
+        # Verify record exists
+        cursor.execute(f"SELECT id, number_of_posts, posts_left FROM {table} WHERE id = %s", (record_id,))
+        result = cursor.fetchone()
+        if not result:
+            cursor.close()
+            conn.close()
+            return jsonify({"error": f"{platform.capitalize()} record not found"}), 400
+
+        current_posts, current_posts_left = result[1], result[2]
+        new_posts = current_posts + additional_posts
+        new_posts_left = current_posts_left + additional_posts
+
+        # Update posts
+        query = f"""
+            UPDATE {table} SET 
+                number_of_posts = %s, 
+                posts_left = %s, 
+                selected = 'No', 
+                done = 'No', 
+                next_post_time = NULL 
+            WHERE id = %s
+        """
+        cursor.execute(query, (new_posts, new_posts_left, record_id))
+        change_feed.record_event(cursor, platform, record_id, 'posts_added')
+        conn.commit()
+        cursor.close()
+        conn.close()
+        change_feed.notify(platform, 'posts_added', record_id)
+        return jsonify({"message": f"Added {additional_posts} posts to {platform} record"}), 200
+    except mysql.connector.Error as e:
+        conn.close()
+        return jsonify({"error": f"Database error: {str(e)}"}), 500
@@ -0,0 +1,126 @@
+"""
+Compare caption backends on CPU: latency, peak memory and caption agreement.
+
+Each backend runs in its own subprocess so peak RSS is measured in isolation.
+Caption quality is reported as token F1 against the fp32 beam-5 reference,
+which is what post_reel_loop_AIcaption.py used before backends existed.
+
+Usage:
+    python benchmark_caption.py img1.jpg img2.jpg ... [--configs torch:5,int8:2,int8:1] [--repeat 3]
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import resource
+import statistics
+import subprocess
+
+REFERENCE_CONFIG = "torch:5"
+
+def run_config(image_paths, repeat):
+    """Child mode: load the backend selected via env vars and caption every image."""
+    import caption_model
+
+    started = time.perf_counter()
+    if not caption_model.load_caption_model():
+        sys.exit(1)
+    load_seconds = time.perf_counter() - started
+
+    captions = {}
+    latencies = []
+    for image_path in image_paths:
+        for _ in range(repeat):
+            started = time.perf_counter()
+            caption = caption_model.generate_captions([image_path])[0]
+            latencies.append(time.perf_counter() - started)
+        captions[image_path] = caption
+
+    print(json.dumps({
+        "load_seconds": load_seconds,
+        "latencies": latencies,
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "captions": captions
+    }))
+
+def token_f1(candidate, reference):
+    candidate_tokens = candidate.lower().split()
+    reference_tokens = reference.lower().split()
+    if not candidate_tokens or not reference_tokens:
+        return 0.0
+    common = 0
+    remaining = list(reference_tokens)
+    for token in candidate_tokens:
+        if token in remaining:
+            remaining.remove(token)
+            common += 1
+    if common == 0:
+        return 0.0
+    precision = common / len(candidate_tokens)
+    recall = common / len(reference_tokens)
+    return 2 * precision * recall / (precision + recall)
+
+def benchmark(config, image_paths, repeat):
+    backend, beams = config.split(":")
+    env = dict(os.environ, CAPTION_BACKEND=backend, CAPTION_NUM_BEAMS=beams)
+    result = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--child", "--repeat", str(repeat)] + image_paths,
+        env=env, capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        print(f"ERROR: {config} failed:\n{result.stderr[-2000:]}")
+        return None
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark caption model backends")
+    parser.add_argument("images", nargs="+", help="Image files to caption")
+    parser.add_argument("--configs", default="torch:5,torch:1,int8:2,int8:1",
+                        help="Comma-separated backend:num_beams pairs")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs per image")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_config(args.images, args.repeat)
+        return
+
+    configs = [c.strip() for c in args.configs.split(",") if c.strip()]
+    if REFERENCE_CONFIG not in configs:
+        configs.insert(0, REFERENCE_CONFIG)
+
+    results = {}
+    for config in configs:
+        print(f"Running {config} on {len(args.images)} images x {args.repeat}...")
+        results[config] = benchmark(config, args.images, args.repeat)
+
+    reference = results.get(REFERENCE_CONFIG)
+    print(f"\n{'Config':<10} | {'Load s':>7} | {'p50 ms':>8} | {'p95 ms':>8} | {'Peak MB':>8} | {'F1 vs ref':>9}")
+    print("-" * 66)
+    for config, result in results.items():
+        if not result:
+            print(f"{config:<10} | {'failed':>7}")
+            continue
+        latencies = sorted(result["latencies"])
+        p50 = statistics.median(latencies) * 1000
+        p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] * 1000
+        if reference:
+            f1 = statistics.mean(
+                token_f1(result["captions"][path], reference["captions"][path]) for path in args.images
+            )
+            f1_str = f"{f1:.3f}"
+        else:
+            f1_str = "n/a"
+        print(f"{config:<10} | {result['load_seconds']:>7.1f} | {p50:>8.0f} | {p95:>8.0f} | "
+              f"{result['peak_rss_mb']:>8.0f} | {f1_str:>9}")
+
+    print("\nCaptions:")
+    for path in args.images:
+        print(f"  {os.path.basename(path)}")
+        for config, result in results.items():
+            if result:
+                print(f"    {config:<10} {result['captions'][path]}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,384 @@
+"""
+End-to-end posting benchmark: the real workers against local fake platforms.
+
+Starts fake Google (Drive + YouTube), Telegram and Instagram servers from
+fake_servers.py, seeds a scratch MySQL database with accounts whose queued
+media live on the fake Drive, then runs post_reel_loop.py, post_on_telegram.py
+and post_on_youtube.py unchanged, pointed at the fakes through
+GOOGLE_API_ENDPOINT, TELEGRAM_API_ENDPOINT and INSTAGRAM_API_ENDPOINT.
+
+Each account gets --posts-per-account datetime posts, --post-interval
+seconds apart, with accounts staggered across the interval, so the offered
+load is accounts / interval posts per second per platform. Posts the workers
+cannot keep up with are marked upload_missed by the scheduler, as in
+production. Reports posts/minute, bytes/second through each fake service,
+post outcomes and lateness from the workers' metrics, and per-stage timings
+from their traces.
+
+The scratch database must already exist and must not be DB_DATABASE: its
+tables are dropped and recreated. The posting governor's limits are lifted
+unless --real-limits is given.
+
+Usage:
+    python benchmark_posting.py --database posting_bench --accounts 5 --posts-per-account 4 --post-interval 30
+    python benchmark_posting.py --database posting_bench --platforms telegram,youtube --latency-ms 50 --error-rate 0.02
+    python benchmark_posting.py --database posting_bench --platforms instagram --media-file sample_reel.mp4
+"""
+import io
+import os
+import re
+import sys
+import json
+import time
+import argparse
+import subprocess
+import urllib.request
+from datetime import datetime, timedelta
+import mysql.connector
+import pytz
+from PIL import Image
+from dotenv import load_dotenv
+import fake_servers
+import metrics
+import tracing
+
+# Load environment variables from .env file
+load_dotenv()
+
+DB_CONFIG = {
+    "host": os.getenv("DB_HOST"),
+    "port": int(os.getenv("DB_PORT")),
+    "user": os.getenv("DB_USER"),
+    "password": os.getenv("DB_PASSWORD"),
+    "database": os.getenv("DB_DATABASE")
+}
+
+TIMEZONE = pytz.timezone('Asia/Kolkata')
+DATETIME_FORMAT = '%Y-%m-%d %H:%M:%S'
+PLATFORMS = ['instagram', 'telegram', 'youtube']
+WORKERS = {
+    'instagram': 'post_reel_loop.py',
+    'telegram': 'post_on_telegram.py',
+    'youtube': 'post_on_youtube.py',
+}
+# Tables the workers and the scheduler create on demand; dropped so every run starts clean
+STATE_TABLES = ['schedule_slots', 'schedule_events', 'rate_buckets', 'api_quota_ledger', 'youtube_upload_session']
+UPLOAD_ROUTES = ('telegram.send', 'instagram.rupload', 'youtube.videos.insert')
+
+# --- Media ---
+def generate_photo():
+    """A 4:5 JPEG of noise, so it neither compresses away nor needs resizing for Instagram."""
+    buffer = io.BytesIO()
+    Image.effect_noise((1080, 1350), 64).convert('RGB').save(buffer, format='JPEG', quality=90)
+    return buffer.getvalue()
+
+def load_media(args):
+    """(extension, bytes) per platform. YouTube only needs bytes, the fake never decodes them."""
+    if args.media_file:
+        with open(args.media_file, 'rb') as f:
+            content = f.read()
+        extension = os.path.splitext(args.media_file)[1].lower()
+        return {platform: (extension, content) for platform in PLATFORMS}
+    photo = generate_photo()
+    return {
+        'instagram': ('.jpg', photo),
+        'telegram': ('.jpg', photo),
+        'youtube': ('.mp4', os.urandom(args.video_mb * 1024 * 1024)),
+    }
+
+# --- Seeding ---
+def drive_token(google_url, access_token="benchmark"):
+    return json.dumps({
+        "token": access_token,
+        "refresh_token": "benchmark",
+        "client_id": "benchmark",
+        "client_secret": "benchmark",
+        "token_uri": f"{google_url}/token",
+        "expiry": "2099-01-01T00:00:00Z"
+    })
+
+def instagram_session(n):
+    """instagrapi settings for an already logged-in account, so the worker never calls login."""
+    return json.dumps({
+        "authorization_data": {"ds_user_id": str(1000 + n), "sessionid": f"{1000 + n}%3Abenchmark"},
+        "cookies": {},
+        "uuids": {}
+    })
+
+def create_tables(cursor):
+    for table in PLATFORMS + ['user'] + STATE_TABLES:
+        cursor.execute(f"DROP TABLE IF EXISTS {table}")
+    cursor.execute("""
+        CREATE TABLE user (
+            Id INT AUTO_INCREMENT PRIMARY KEY,
+            Name VARCHAR(100), email VARCHAR(255), passward VARCHAR(255),
+            phone_number VARCHAR(20), expiry DATE
+        )
+    """)
+    for platform in PLATFORMS:
+        cursor.execute(f"""
+            CREATE TABLE {platform} (
+                id INT AUTO_INCREMENT PRIMARY KEY,
+                user_id INT NOT NULL,
+                username VARCHAR(255), passwand VARCHAR(255), email VARCHAR(255),
+                channel_name VARCHAR(255), channel_id VARCHAR(255),
+                token_sesson LONGTEXT, token_drive LONGTEXT, google_drive_link VARCHAR(512),
+                selected VARCHAR(3) DEFAULT 'No', done VARCHAR(3) DEFAULT 'No',
+                sch_start_range TIME NULL, sch_end_range TIME NULL,
+                sch_date DATE NULL, sch_time TIME NULL,
+                number_of_posts INT DEFAULT 0, posts_left INT DEFAULT 0,
+                schedule_type VARCHAR(20) NULL, next_post_time DATETIME NULL,
+                post_daily_range INT DEFAULT 0, post_daily_range_left INT DEFAULT 0,
+                last_reset DATETIME NULL, schedule_hash VARCHAR(64) NULL,
+                custom_schedule_data LONGTEXT NULL
+            )
+        """)
+
+def seed(db_config, args, google, media, start):
+    """
+    One user per account index with a row on every platform (the YouTube worker
+    reads its Drive token from the user's instagram row); only the benchmarked
+    platforms are selected. Returns the number of queued posts.
+    """
+    conn = mysql.connector.connect(**db_config)
+    cursor = conn.cursor()
+    create_tables(cursor)
+    token = drive_token(google.url)
+    queued = 0
+    for n in range(1, args.accounts + 1):
+        cursor.execute(
+            "INSERT INTO user (Name, email, passward, phone_number, expiry) VALUES (%s, %s, %s, %s, %s)",
+            (f"Benchmark {n}", f"bench{n}@example.com", "benchmark", f"{9000000000 + n}",
+             (start + timedelta(days=365)).date())
+        )
+        user_id = cursor.lastrowid
+        offset = timedelta(seconds=args.lead_seconds + (n - 1) * args.post_interval / args.accounts)
+        for platform in PLATFORMS:
+            folder_id = google.add_drive_folder(f"bench_{platform}_{n}")
+            extension, content = media[platform]
+            queue = []
+            for k in range(args.posts_per_account):
+                name = f"bench_{platform}_{n}_{k}{extension}"
+                queue.append({
+                    "media_name": name,
+                    "file_id": google.add_drive_file(name, content, folder_id),
+                    "status": "pending",
+                    "schedule_type": "datetime",
+                    "scheduled_datetime": (start + offset + timedelta(seconds=k * args.post_interval)).strftime(DATETIME_FORMAT),
+                    "caption": "benchmark post"
+                })
+            selected = platform in args.platforms
+            queued += len(queue) if selected else 0
+            channel_id = f"UCbench{n:017d}"
+            cursor.execute(f"""
+                INSERT INTO {platform} (user_id, username, passwand, email, channel_name, channel_id, token_sesson,
+                                        token_drive, google_drive_link, selected, sch_start_range, sch_end_range,
+                                        number_of_posts, posts_left, schedule_type, next_post_time,
+                                        post_daily_range, post_daily_range_left, last_reset, custom_schedule_data)
+                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, '00:00:00', '23:59:59', %s, %s, 'range', %s, %s, %s, %s, %s)
+            """, (
+                user_id, f"bench_{platform}_{n}", "benchmark", f"bench{n}@example.com", f"Benchmark {n}", channel_id,
+                {
+                    'instagram': instagram_session(n),
+                    'telegram': f"@bench_channel_{n}",
+                    # The fake channels.list answers with the channel named by the access token
+                    'youtube': drive_token(google.url, access_token=channel_id),
+                }[platform],
+                token, f"https://drive.google.com/drive/folders/{folder_id}", 'Yes' if selected else 'No',
+                len(queue), len(queue), queue[0]["scheduled_datetime"] if queue else None,
+                len(queue), len(queue), start, json.dumps(queue)
+            ))
+    conn.commit()
+    cursor.close()
+    conn.close()
+    print(f"Seeded {args.accounts} accounts per platform with {args.posts_per_account} posts each "
+          f"({queued} to post on {', '.join(args.platforms)})")
+    return queued
+
+# --- Progress ---
+def count_statuses(db_config, platforms):
+    conn = mysql.connector.connect(**db_config)
+    cursor = conn.cursor(dictionary=True)
+    counts = {}
+    for platform in platforms:
+        counts[platform] = {}
+        cursor.execute(f"SELECT custom_schedule_data FROM {platform}")
+        for row in cursor.fetchall():
+            for item in json.loads(row['custom_schedule_data'] or '[]'):
+                status = item.get('status', 'pending')
+                counts[platform][status] = counts[platform].get(status, 0) + 1
+    cursor.close()
+    conn.close()
+    return counts
+
+def scrape_worker_metrics(port):
+    """posts_total by result and mean post lateness from a worker's /metrics, or None."""
+    try:
+        with urllib.request.urlopen(f"http://127.0.0.1:{port}/metrics", timeout=5) as response:
+            text = response.read().decode('utf-8')
+    except OSError:
+        return None
+    posts = {result: float(value) for result, value in
+             re.findall(r'^posts_total\{[^}]*result="(\w+)"[^}]*\} (\S+)$', text, re.MULTILINE)}
+    lateness_sum = sum(float(v) for v in re.findall(r'^post_lateness_seconds_sum\{[^}]*\} (\S+)$', text, re.MULTILINE))
+    lateness_count = sum(float(v) for v in re.findall(r'^post_lateness_seconds_count\{[^}]*\} (\S+)$', text, re.MULTILINE))
+    return {"posts": posts, "mean_lateness": lateness_sum / lateness_count if lateness_count else None}
+
+# --- Reporting ---
+def print_report(args, queued, counts, completions, started, elapsed, worker_metrics, servers, trace_file):
+    print("\n=== Posting Benchmark ===")
+    print(f"Duration:            {elapsed:.1f} s, {queued} posts offered at "
+          f"{args.accounts / args.post_interval * 60:.1f} posts/min per platform")
+    for platform in args.platforms:
+        statuses = counts.get(platform, {})
+        completed = statuses.get('completed', 0)
+        history = completions.get(platform) or []
+        first_due = started + args.lead_seconds
+        window = (history[-1] - first_due) if history else 0
+        rate = completed / window * 60 if window > 0 else 0
+        print(f"{platform:<10} completed {completed:>5} | missed {statuses.get('upload_missed', 0):>4} | "
+              f"dead-lettered {statuses.get('dead_letter', 0):>4} | pending {statuses.get('pending', 0):>4} | "
+              f"{rate:>6.1f} posts/min")
+        scraped = worker_metrics.get(platform)
+        if scraped:
+            outcomes = ", ".join(f"{result} {int(value)}" for result, value in sorted(scraped['posts'].items()))
+            lateness = f"{scraped['mean_lateness']:.1f} s" if scraped['mean_lateness'] is not None else "n/a"
+            print(f"{'':<10} worker: {outcomes or 'no posts'} | mean lateness {lateness}")
+    print("\nFake service traffic:")
+    for name, server in servers.items():
+        with server.lock:
+            total = sum(entry['bytes_in'] + entry['bytes_out'] for entry in server.stats.values())
+            uploaded = sum(entry['bytes_in'] for route, entry in server.stats.items() if route.startswith(UPLOAD_ROUTES))
+        print(f"  {name:<10} {total / elapsed / 1e6:>8.2f} MB/s total, {uploaded / elapsed / 1e6:>8.2f} MB/s posted media")
+    for server in servers.values():
+        server.print_stats()
+    print("\nPer-stage timings:")
+    if os.path.exists(trace_file):
+        tracing.print_summary(trace_file)
+    else:
+        print(f"No traces written to {trace_file}")
+
+# --- Main ---
+def worker_env(args, servers, trace_file):
+    env = dict(
+        os.environ,
+        DB_DATABASE=args.database,
+        GOOGLE_API_ENDPOINT=servers['google'].url,
+        TELEGRAM_API_ENDPOINT=servers['telegram'].url,
+        INSTAGRAM_API_ENDPOINT=servers['instagram'].url,
+        TRACE_FILE=trace_file,
+        TRACING_ENABLED="1",
+        METRICS_BASE_PORT=str(args.metrics_base_port),
+        CHANGE_FEED_BASE_PORT=str(args.change_feed_base_port),
+        SCHEDULER_LOCK_PREFIX=f"{args.database}:scheduler",
+        SCHEDULE_WATCH_POLL_SECONDS="5",
+        RETRY_BASE_DELAY_SECONDS=str(args.retry_delay),
+        PYTHONUNBUFFERED="1",
+    )
+    if not args.real_limits:
+        env["YOUTUBE_DAILY_QUOTA"] = str(10 ** 9)
+        for platform in PLATFORMS:
+            for scope in ('ACCOUNT', 'PLATFORM'):
+                env[f"GOVERNOR_{platform.upper()}_{scope}_BURST"] = str(10 ** 6)
+                env[f"GOVERNOR_{platform.upper()}_{scope}_INTERVAL_SECONDS"] = "0.001"
+    return env
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the posting workers against local fake platforms")
+    parser.add_argument("--database", required=True, help="Scratch database (tables are dropped)")
+    parser.add_argument("--platforms", default=",".join(PLATFORMS), help="Comma-separated workers to run")
+    parser.add_argument("--accounts", type=int, default=5, help="Accounts per platform")
+    parser.add_argument("--posts-per-account", type=int, default=4)
+    parser.add_argument("--post-interval", type=float, default=60, help="Seconds between an account's posts")
+    parser.add_argument("--lead-seconds", type=float, default=30, help="Delay before the first post, for worker startup")
+    parser.add_argument("--grace-seconds", type=float, default=120, help="Extra time after the last scheduled post")
+    parser.add_argument("--media-file", help="Post this file everywhere instead of a generated photo (.mp4 for reels)")
+    parser.add_argument("--video-mb", type=int, default=16, help="Size of the generated YouTube upload")
+    parser.add_argument("--latency-ms", type=float, default=0, help="Latency added to every fake API call")
+    parser.add_argument("--bandwidth-kbps", type=float, default=0, help="Fake service throughput, 0 = unlimited")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of fake API calls failing with 503")
+    parser.add_argument("--retry-delay", type=int, default=10, help="RETRY_BASE_DELAY_SECONDS for the workers")
+    parser.add_argument("--real-limits", action="store_true", help="Keep the posting governor's rate limits")
+    parser.add_argument("--metrics-base-port", type=int, default=19100)
+    parser.add_argument("--change-feed-base-port", type=int, default=18770)
+    parser.add_argument("--work-dir", default="benchmark_posting_run", help="Worker temp folders, logs and traces")
+    parser.add_argument("--poll-seconds", type=float, default=2)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    args.platforms = [platform.strip() for platform in args.platforms.split(",") if platform.strip()]
+    unknown = set(args.platforms) - set(PLATFORMS)
+    if unknown:
+        parser.error(f"Unknown platforms: {', '.join(sorted(unknown))}")
+
+    if args.database == DB_CONFIG.get("database"):
+        print("ERROR: Refusing to benchmark against the configured DB_DATABASE; use a scratch database.")
+        sys.exit(1)
+    db_config = dict(DB_CONFIG, database=args.database)
+
+    work_dir = os.path.abspath(args.work_dir)
+    os.makedirs(work_dir, exist_ok=True)
+    trace_file = os.path.join(work_dir, "traces.jsonl")
+    if os.path.exists(trace_file):
+        os.remove(trace_file)
+
+    options = dict(latency_ms=args.latency_ms, bandwidth_kbps=args.bandwidth_kbps, error_rate=args.error_rate, seed=args.seed)
+    servers = {name: fake_servers.start_server(name, **options) for name in ('google', 'telegram', 'instagram')}
+    for name, server in servers.items():
+        print(f"Fake {name} on {server.url}")
+
+    start = datetime.now(TIMEZONE).replace(tzinfo=None)
+    queued = seed(db_config, args, servers['google'], load_media(args), start)
+
+    env = worker_env(args, servers, trace_file)
+    backend_dir = os.path.dirname(os.path.abspath(__file__))
+    processes = {}
+    for platform in args.platforms:
+        log = open(os.path.join(work_dir, f"{platform}.log"), "w")
+        processes[platform] = subprocess.Popen([sys.executable, os.path.join(backend_dir, WORKERS[platform])],
+                                               cwd=work_dir, env=env, stdout=log, stderr=subprocess.STDOUT)
+    print(f"Started {', '.join(processes)} workers; logs in {work_dir}")
+
+    started = time.monotonic()
+    deadline = started + args.lead_seconds + args.posts_per_account * args.post_interval + args.grace_seconds
+    completions = {platform: [] for platform in args.platforms}
+    completed_before = {platform: 0 for platform in args.platforms}
+    counts = {}
+    worker_metrics = {}
+    try:
+        while time.monotonic() < deadline:
+            time.sleep(args.poll_seconds)
+            counts = count_statuses(db_config, args.platforms)
+            for platform in args.platforms:
+                completed = counts[platform].get('completed', 0)
+                if completed > completed_before[platform]:
+                    completions[platform].append(time.monotonic())
+                    completed_before[platform] = completed
+            pending = sum(counts[platform].get('pending', 0) for platform in args.platforms)
+            print(f"  {time.monotonic() - started:>6.0f}s: " + " | ".join(
+                f"{platform} {counts[platform].get('completed', 0)} done" for platform in args.platforms
+            ) + f" | {pending} pending", end="\r")
+            exited = [platform for platform, process in processes.items() if process.poll() is not None]
+            if exited:
+                print(f"\nWARNING: {', '.join(exited)} worker exited; see its log in {work_dir}")
+                break
+            if pending == 0:
+                break
+        print()
+        for platform in args.platforms:
+            worker_metrics[platform] = scrape_worker_metrics(
+                args.metrics_base_port + 1 + metrics.PROCESSES.index(platform)
+            )
+    finally:
+        for process in processes.values():
+            process.terminate()
+        for process in processes.values():
+            try:
+                process.wait(timeout=30)
+            except subprocess.TimeoutExpired:
+                process.kill()
+    elapsed = time.monotonic() - started
+
+    print_report(args, queued, counts, completions, started, elapsed, worker_metrics, servers, trace_file)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,310 @@
+"""
+Simulate the combined scheduler at scale under a fast-forward virtual clock.
+
+Seeds a scratch MySQL database with synthetic instagram/telegram/youtube
+accounts and queues, then alternates scheduler runs with a simulated worker
+that posts every account whose next_post_time has come. Reports per-run wall
+time, queries issued, rows written and Python memory, plus how closely posts
+followed the schedule (lateness and range-post spacing drift).
+
+The scratch database must already exist and must not be DB_DATABASE: its
+platform tables are dropped and recreated.
+
+Usage:
+    python benchmark_scheduler.py --database scheduler_bench --accounts 10000 --queue-size 20 --days 3
+    python benchmark_scheduler.py --database scheduler_bench --scheduler my_scheduler:run_once
+"""
+import io
+import sys
+import json
+import time
+import random
+import argparse
+import importlib
+import statistics
+import tracemalloc
+import contextlib
+from datetime import datetime, timedelta
+import mysql.connector
+import pytz
+
+PLATFORMS = ['instagram', 'telegram', 'youtube']
+TIMEZONE = pytz.timezone('Asia/Kolkata')
+DATETIME_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+# --- Instrumented Connection ---
+class CountingCursor:
+    """Cursor wrapper that counts statements sent and rows written."""
+
+    def __init__(self, cursor, stats):
+        self._cursor = cursor
+        self._stats = stats
+
+    def execute(self, operation, params=None):
+        self._stats['queries'] += 1
+        result = self._cursor.execute(operation, params)
+        if not operation.lstrip().upper().startswith('SELECT') and self._cursor.rowcount > 0:
+            self._stats['rows_written'] += self._cursor.rowcount
+        return result
+
+    def executemany(self, operation, seq_params):
+        seq_params = list(seq_params)
+        # mysql.connector batches INSERTs into one statement but sends other statements one by one
+        if operation.lstrip().upper().startswith('INSERT'):
+            self._stats['queries'] += 1 if seq_params else 0
+        else:
+            self._stats['queries'] += len(seq_params)
+        result = self._cursor.executemany(operation, seq_params)
+        if self._cursor.rowcount and self._cursor.rowcount > 0:
+            self._stats['rows_written'] += self._cursor.rowcount
+        return result
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+class CountingConnection:
+    def __init__(self, conn, stats):
+        self._conn = conn
+        self._stats = stats
+        stats['connections'] += 1
+
+    def cursor(self, *args, **kwargs):
+        return CountingCursor(self._conn.cursor(*args, **kwargs), self._stats)
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+# --- Seeding ---
+def create_tables(cursor):
+    cursor.execute("DROP TABLE IF EXISTS schedule_slots")
+    for platform in PLATFORMS:
+        cursor.execute(f"DROP TABLE IF EXISTS {platform}")
+        cursor.execute(f"""
+            CREATE TABLE {platform} (
+                id INT AUTO_INCREMENT PRIMARY KEY,
+                user_id INT NOT NULL,
+                selected VARCHAR(3) DEFAULT 'No',
+                done VARCHAR(3) DEFAULT 'No',
+                posts_left INT DEFAULT 0,
+                next_post_time DATETIME NULL,
+                number_of_posts INT DEFAULT 0,
+                schedule_hash VARCHAR(64) NULL,
+                custom_schedule_data LONGTEXT NULL,
+                sch_start_range TIME NULL,
+                sch_end_range TIME NULL,
+                post_daily_range INT DEFAULT 0,
+                post_daily_range_left INT DEFAULT 0,
+                last_reset DATETIME NULL
+            )
+        """)
+
+def build_queue(rng, start, days, queue_size, datetime_ratio, start_hour, end_hour):
+    queue = []
+    for i in range(queue_size):
+        item = {
+            "media_name": f"media_{i}.mp4",
+            "file_id": f"file_{i}_{rng.randrange(1 << 30)}",
+            "status": "pending"
+        }
+        if rng.random() < datetime_ratio:
+            day = rng.randrange(days)
+            moment = start + timedelta(days=day, hours=rng.uniform(start_hour, end_hour))
+            item["schedule_type"] = "datetime"
+            item["scheduled_datetime"] = moment.strftime(DATETIME_FORMAT)
+        else:
+            item["schedule_type"] = "range"
+        queue.append(item)
+    return queue
+
+def seed(conn, args, start):
+    rng = random.Random(args.seed)
+    cursor = conn.cursor()
+    create_tables(cursor)
+    for platform in PLATFORMS:
+        rows = []
+        for account in range(args.accounts):
+            start_hour = rng.randint(6, 11)
+            end_hour = rng.randint(17, 23)
+            queue = build_queue(rng, start, args.days, args.queue_size, args.datetime_ratio, start_hour, end_hour)
+            rows.append((
+                account + 1, json.dumps(queue), f"{start_hour:02d}:00:00", f"{end_hour:02d}:00:00",
+                rng.randint(1, args.max_daily_posts)
+            ))
+            if len(rows) >= 1000:
+                insert_accounts(cursor, platform, rows)
+                rows = []
+        insert_accounts(cursor, platform, rows)
+        conn.commit()
+        print(f"Seeded {args.accounts} {platform} accounts with {args.queue_size} queued items each")
+    cursor.close()
+
+def insert_accounts(cursor, platform, rows):
+    if not rows:
+        return
+    cursor.executemany(f"""
+        INSERT INTO {platform} (user_id, custom_schedule_data, sch_start_range, sch_end_range, post_daily_range)
+        VALUES (%s, %s, %s, %s, %s)
+    """, rows)
+
+# --- Simulated Worker ---
+def simulate_posts(conn, now, accuracy):
+    """Post for every due account the way the workers do, recording schedule accuracy."""
+    now_naive = now.replace(tzinfo=None)
+    cursor = conn.cursor(dictionary=True)
+    posted = 0
+    for platform in PLATFORMS:
+        cursor.execute(f"""
+            SELECT id, next_post_time, custom_schedule_data, posts_left, post_daily_range_left,
+                   sch_start_range, sch_end_range, post_daily_range
+            FROM {platform}
+            WHERE selected = 'Yes' AND done = 'No' AND posts_left > 0
+              AND next_post_time IS NOT NULL AND next_post_time <= %s
+        """, (now_naive,))
+        updates = []
+        slot_pops = []
+        for row in cursor.fetchall():
+            queue = json.loads(row['custom_schedule_data'] or '[]')
+            media = None
+            for item in queue:
+                if (item.get('status') == 'pending' and item.get('schedule_type') == 'datetime'
+                        and datetime.strptime(item['scheduled_datetime'], DATETIME_FORMAT) <= now_naive):
+                    media = item
+                    break
+            if not media:
+                media = next((item for item in queue if item.get('status') == 'pending'
+                              and item.get('schedule_type') == 'range'), None)
+            if not media:
+                continue
+
+            media['status'] = 'completed'
+            accuracy['lateness'].append((now_naive - row['next_post_time']).total_seconds())
+            if media['schedule_type'] == 'range':
+                slot_pops.append((platform, row['id'], now.date()))
+                key = (platform, row['id'], now.date())
+                previous = accuracy['last_range_post'].get(key)
+                if previous and row['post_daily_range']:
+                    window = (row['sch_end_range'] - row['sch_start_range']).total_seconds()
+                    ideal = window / row['post_daily_range']
+                    actual = (now_naive - previous).total_seconds()
+                    accuracy['spacing_drift'].append(abs(actual - ideal) / ideal)
+                accuracy['last_range_post'][key] = now_naive
+
+            posts_left = row['posts_left'] - 1
+            daily_left = max(0, (row['post_daily_range_left'] or 0) - 1)
+            updates.append((json.dumps(queue), posts_left, daily_left, 'Yes' if posts_left <= 0 else 'No', row['id']))
+
+        if updates:
+            cursor.executemany(f"""
+                UPDATE {platform}
+                SET custom_schedule_data = %s, posts_left = %s, post_daily_range_left = %s,
+                    selected = 'No', done = %s, next_post_time = NULL
+                WHERE id = %s
+            """, updates)
+        if slot_pops:
+            cursor.executemany("""
+                UPDATE schedule_slots SET slot_index = slot_index + 1
+                WHERE platform = %s AND account_id = %s AND slot_date = %s
+            """, slot_pops)
+        posted += len(updates)
+    conn.commit()
+    cursor.close()
+    return posted
+
+# --- Reporting ---
+def percentile(values, fraction):
+    if not values:
+        return 0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+def print_report(runs, accuracy, posted):
+    wall = [run['wall_seconds'] for run in runs]
+    queries = [run['queries'] for run in runs]
+    written = [run['rows_written'] for run in runs]
+    processed = [run['processed'] for run in runs]
+    print("\n=== Scheduler Benchmark ===")
+    print(f"Runs:                {len(runs)}")
+    print(f"Wall time per run:   p50 {percentile(wall, 0.5) * 1000:.0f} ms | "
+          f"p95 {percentile(wall, 0.95) * 1000:.0f} ms | max {max(wall) * 1000:.0f} ms")
+    print(f"Queries per run:     mean {statistics.mean(queries):.1f} | max {max(queries)} | total {sum(queries)}")
+    print(f"Rows written/run:    mean {statistics.mean(written):.1f} | max {max(written)} | total {sum(written)}")
+    print(f"Accounts processed:  mean {statistics.mean(processed):.1f} per run")
+    print(f"Connections opened:  {sum(run['connections'] for run in runs)}")
+    print(f"Peak Python memory:  {max(run['peak_memory_mb'] for run in runs):.1f} MB")
+    print(f"Simulated posts:     {posted}")
+    lateness = accuracy['lateness']
+    print(f"Post lateness:       p50 {percentile(lateness, 0.5):.0f} s | p95 {percentile(lateness, 0.95):.0f} s "
+          f"(bounded below by the simulation step)")
+    drift = accuracy['spacing_drift']
+    if drift:
+        print(f"Range spacing drift: mean {statistics.mean(drift) * 100:.1f}% | p95 {percentile(drift, 0.95) * 100:.1f}% "
+              f"of the ideal window/post_daily_range gap")
+
+# --- Main ---
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the combined scheduler with a virtual clock")
+    parser.add_argument("--database", required=True, help="Scratch database (tables are dropped)")
+    parser.add_argument("--accounts", type=int, default=1000, help="Accounts per platform")
+    parser.add_argument("--queue-size", type=int, default=20, help="Queued media per account")
+    parser.add_argument("--datetime-ratio", type=float, default=0.2, help="Share of queue items with a fixed datetime")
+    parser.add_argument("--max-daily-posts", type=int, default=5, help="Upper bound for post_daily_range")
+    parser.add_argument("--days", type=int, default=2, help="Simulated days")
+    parser.add_argument("--step-seconds", type=int, default=300, help="Virtual time between scheduler runs")
+    parser.add_argument("--scheduler", default="scheduler_combined:run_scheduler_once",
+                        help="module:function accepting now= and launch_workers= keyword arguments")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--skip-seed", action="store_true", help="Reuse the rows from a previous run")
+    parser.add_argument("--verbose", action="store_true", help="Keep the scheduler's own output")
+    args = parser.parse_args()
+
+    module_name, function_name = args.scheduler.split(":")
+    scheduler = importlib.import_module(module_name)
+    run_once = getattr(scheduler, function_name)
+
+    if args.database == scheduler.DB_CONFIG.get("database"):
+        print("ERROR: Refusing to benchmark against the configured DB_DATABASE; use a scratch database.")
+        sys.exit(1)
+    db_config = dict(scheduler.DB_CONFIG, database=args.database)
+    scheduler.DB_CONFIG = db_config
+
+    start = TIMEZONE.localize(datetime.combine(datetime.now(TIMEZONE).date() + timedelta(days=1), datetime.min.time()))
+    sim_conn = mysql.connector.connect(**db_config)
+    if not args.skip_seed:
+        seed(sim_conn, args, start.replace(tzinfo=None))
+
+    stats = {'queries': 0, 'rows_written': 0, 'connections': 0}
+    scheduler.get_db_connection = lambda: CountingConnection(mysql.connector.connect(**db_config), stats)
+
+    runs = []
+    accuracy = {'lateness': [], 'spacing_drift': [], 'last_range_post': {}}
+    posted = 0
+    now = start
+    end = start + timedelta(days=args.days)
+    tracemalloc.start()
+    while now < end:
+        stats.update(queries=0, rows_written=0, connections=0)
+        tracemalloc.reset_peak()
+        output = contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(io.StringIO())
+        started = time.perf_counter()
+        with output:
+            result = run_once(now=now, launch_workers=False)
+        wall_seconds = time.perf_counter() - started
+        runs.append({
+            'wall_seconds': wall_seconds,
+            'queries': stats['queries'],
+            'rows_written': stats['rows_written'],
+            'connections': stats['connections'],
+            'processed': sum(result['processed'].values()) if isinstance(result, dict) else 0,
+            'peak_memory_mb': tracemalloc.get_traced_memory()[1] / (1024 * 1024)
+        })
+        posted += simulate_posts(sim_conn, now, accuracy)
+        now += timedelta(seconds=args.step_seconds)
+        if len(runs) % 50 == 0:
+            print(f"  {now.strftime(DATETIME_FORMAT)}: {len(runs)} runs, {posted} posts")
+    tracemalloc.stop()
+    sim_conn.close()
+
+    print_report(runs, accuracy, posted)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""
+Measure api.py cold start: import time and first-request latency.
+
+Each run starts a fresh Python process in the app directory, imports api
+(which builds the app), then sends a first and second request through
+Flask's test client to GET /metrics and to POST /login with an empty body.
+Neither request reaches the database, so no MySQL server is needed. Also
+reports which heavy modules were loaded at start-up and, when the Google
+client libraries were deferred, what importing them later costs.
+
+Pass --app-dir more than once to compare checkouts, e.g. against the
+previous commit:
+    git worktree add /tmp/api-before HEAD~1
+
+Usage:
+    python benchmark_startup.py --runs 10
+    python benchmark_startup.py --app-dir . --app-dir /tmp/api-before/backend --runs 10
+"""
+import os
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+import time
+
+HEAVY_MODULES = ['googleapiclient', 'google.oauth2', 'google_auth_httplib2', 'smtplib', 'email.mime']
+
+# Runs inside the child process; prints one JSON line of timings
+PROBE = r'''
+import sys, json, time
+started = time.perf_counter()
+import api
+import_seconds = time.perf_counter() - started
+
+create_app_seconds = None
+if hasattr(api, "create_app"):
+    started = time.perf_counter()
+    api.create_app()
+    create_app_seconds = time.perf_counter() - started
+
+client = api.app.test_client()
+latencies = {}
+for name, call in [("GET /metrics", lambda: client.get("/metrics")),
+                   ("POST /login", lambda: client.post("/login", json={}))]:
+    timings = []
+    for _ in range(2):
+        started = time.perf_counter()
+        call()
+        timings.append(time.perf_counter() - started)
+    latencies[name] = timings
+
+heavy = json.loads(sys.argv[1])
+loaded = [name for name in heavy if name in sys.modules]
+deferred_seconds = None
+if "googleapiclient" not in sys.modules:
+    started = time.perf_counter()
+    import google_clients
+    deferred_seconds = time.perf_counter() - started
+
+print(json.dumps({"import_seconds": import_seconds, "create_app_seconds": create_app_seconds,
+                  "requests": latencies, "loaded": loaded, "deferred_google_seconds": deferred_seconds}))
+'''
+
+def percentile(values, fraction):
+    if not values:
+        return 0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+def run_probe(app_dir):
+    env = dict(os.environ)
+    # DB_CONFIG parses DB_PORT at import time; no connection is ever opened
+    env.setdefault("DB_PORT", "3306")
+    started = time.perf_counter()
+    result = subprocess.run([sys.executable, "-c", PROBE, json.dumps(HEAVY_MODULES)], cwd=app_dir, env=env,
+                            capture_output=True, text=True)
+    process_seconds = time.perf_counter() - started
+    if result.returncode != 0:
+        raise RuntimeError(f"Probe failed in {app_dir}:\n{result.stderr}")
+    # api.py and its modules may print; the probe's JSON is the last line
+    sample = json.loads(result.stdout.strip().splitlines()[-1])
+    sample["process_seconds"] = process_seconds
+    return sample
+
+def ms(seconds):
+    return f"{seconds * 1000:8.1f}"
+
+def print_report(app_dir, samples):
+    print(f"\n=== {os.path.abspath(app_dir)} ({len(samples)} runs) ===")
+    print(f"{'':28}{'median ms':>10}{'p95 ms':>10}{'max ms':>10}")
+
+    def row(label, values):
+        values = [value for value in values if value is not None]
+        if values:
+            print(f"{label:28}{ms(statistics.median(values)):>10}{ms(percentile(values, 0.95)):>10}{ms(max(values)):>10}")
+
+    row("process (spawn+import+probe)", [sample["process_seconds"] for sample in samples])
+    row("import api", [sample["import_seconds"] for sample in samples])
+    row("create_app()", [sample["create_app_seconds"] for sample in samples])
+    for name in samples[0]["requests"]:
+        row(f"{name} first", [sample["requests"][name][0] for sample in samples])
+        row(f"{name} second", [sample["requests"][name][1] for sample in samples])
+    row("deferred Google import", [sample["deferred_google_seconds"] for sample in samples])
+    loaded = samples[0]["loaded"]
+    print(f"Heavy modules loaded at start-up: {', '.join(loaded) if loaded else 'none'}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure api.py import time and first-request latency")
+    parser.add_argument("--app-dir", action="append",
+                        help="Directory containing api.py (repeat to compare checkouts; default: this directory)")
+    parser.add_argument("--runs", type=int, default=5, help="Fresh processes per app directory")
+    args = parser.parse_args()
+
+    app_dirs = args.app_dir or [os.path.dirname(os.path.abspath(__file__))]
+    results = {}
+    for app_dir in app_dirs:
+        print(f"Probing {app_dir}...")
+        # One warm-up run so the first sample isn't paying for a cold page cache
+        run_probe(app_dir)
+        results[app_dir] = [run_probe(app_dir) for _ in range(args.runs)]
+
+    for app_dir, samples in results.items():
+        print_report(app_dir, samples)
+
+    if len(app_dirs) > 1:
+        baseline = statistics.median(sample["import_seconds"] for sample in results[app_dirs[-1]])
+        print(f"\nimport api vs {app_dirs[-1]}:")
+        for app_dir in app_dirs[:-1]:
+            current = statistics.median(sample["import_seconds"] for sample in results[app_dir])
+            print(f"  {app_dir}: {ms(current).strip()} ms vs {ms(baseline).strip()} ms ({baseline / current:.2f}x)")
+
+if __name__ == "__main__":
+    main()
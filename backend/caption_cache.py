@@ -0,0 +1,142 @@
+import os
+from datetime import datetime
+import mysql.connector
+from PIL import Image
+from dotenv import load_dotenv
+
+# Load environment variables from .env file
+load_dotenv()
+
+# --- Configuration ---
+DB_CONFIG = {
+    "host": os.getenv("DB_HOST"),
+    "database": os.getenv("DB_DATABASE"),
+    "user": os.getenv("DB_USER"),
+    "password": os.getenv("DB_PASSWORD"),
+    "port": int(os.getenv("DB_PORT"))
+}
+# The 64-bit hash is split into four 16-bit bands; any hash within distance 3
+# shares at least one band exactly, so band lookups never miss a near-duplicate.
+PHASH_MAX_DISTANCE = 3
+
+_table_ready = False
+
+# --- Database Functions ---
+def get_db_connection():
+    try:
+        return mysql.connector.connect(**DB_CONFIG)
+    except mysql.connector.Error as e:
+        print(f"ERROR: Database connection failed: {str(e)}")
+        return None
+
+def ensure_caption_cache_table():
+    """Create the caption cache table on first use."""
+    global _table_ready
+    if _table_ready:
+        return True
+    conn = get_db_connection()
+    if not conn:
+        return False
+    cursor = conn.cursor()
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS caption_cache (
+            content_hash CHAR(64) NOT NULL PRIMARY KEY,
+            phash BIGINT UNSIGNED NULL,
+            phash_band0 SMALLINT UNSIGNED NULL,
+            phash_band1 SMALLINT UNSIGNED NULL,
+            phash_band2 SMALLINT UNSIGNED NULL,
+            phash_band3 SMALLINT UNSIGNED NULL,
+            caption TEXT NOT NULL,
+            created_at DATETIME NOT NULL,
+            INDEX idx_caption_cache_band0 (phash_band0),
+            INDEX idx_caption_cache_band1 (phash_band1),
+            INDEX idx_caption_cache_band2 (phash_band2),
+            INDEX idx_caption_cache_band3 (phash_band3)
+        )
+    """)
+    conn.commit()
+    cursor.close()
+    conn.close()
+    _table_ready = True
+    return True
+
+# --- Perceptual Hash ---
+def perceptual_hash(image_path):
+    """64-bit difference hash (dHash) of an image."""
+    with Image.open(image_path) as image:
+        pixels = list(image.convert('L').resize((9, 8), Image.LANCZOS).getdata())
+    value = 0
+    for row in range(8):
+        for col in range(8):
+            left = pixels[row * 9 + col]
+            right = pixels[row * 9 + col + 1]
+            value = (value << 1) | (1 if left > right else 0)
+    return value
+
+def _bands(phash):
+    return [(phash >> shift) & 0xFFFF for shift in (48, 32, 16, 0)]
+
+# --- Cache Lookup ---
+def lookup(content_hash, image_path=None):
+    """
+    Cached caption for this exact content, or for a near-duplicate image.
+    image_path is the image (or video frame) used for the perceptual-hash lookup.
+    """
+    if not ensure_caption_cache_table():
+        return None
+    conn = get_db_connection()
+    if not conn:
+        return None
+    try:
+        cursor = conn.cursor(dictionary=True)
+        cursor.execute("SELECT caption FROM caption_cache WHERE content_hash = %s", (content_hash,))
+        exact = cursor.fetchone()
+        if exact:
+            cursor.close()
+            return exact['caption']
+
+        if not image_path:
+            cursor.close()
+            return None
+        phash = perceptual_hash(image_path)
+        bands = _bands(phash)
+        cursor.execute("""
+            SELECT caption, BIT_COUNT(phash ^ %s) AS distance
+            FROM caption_cache
+            WHERE phash_band0 = %s OR phash_band1 = %s OR phash_band2 = %s OR phash_band3 = %s
+            HAVING distance <= %s
+            ORDER BY distance ASC
+            LIMIT 1
+        """, (phash, *bands, PHASH_MAX_DISTANCE))
+        near = cursor.fetchone()
+        cursor.close()
+        return near['caption'] if near else None
+    except (mysql.connector.Error, OSError) as e:
+        print(f"WARNING: Caption cache lookup failed: {str(e)}")
+        return None
+    finally:
+        conn.close()
+
+def store(content_hash, caption, image_path=None):
+    """Remember a generated caption for this content (and its perceptual hash)."""
+    if not caption or not ensure_caption_cache_table():
+        return
+    conn = get_db_connection()
+    if not conn:
+        return
+    try:
+        phash = perceptual_hash(image_path) if image_path else None
+        bands = _bands(phash) if phash is not None else [None] * 4
+        cursor = conn.cursor()
+        cursor.execute("""
+            INSERT INTO caption_cache
+                (content_hash, phash, phash_band0, phash_band1, phash_band2, phash_band3, caption, created_at)
+            VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+            ON DUPLICATE KEY UPDATE caption = VALUES(caption)
+        """, (content_hash, phash, *bands, caption, datetime.now()))
+        conn.commit()
+        cursor.close()
+    except (mysql.connector.Error, OSError) as e:
+        print(f"WARNING: Could not store caption in cache: {str(e)}")
+    finally:
+        conn.close()
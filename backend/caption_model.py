@@ -0,0 +1,71 @@
+import os
+import threading
+from dotenv import load_dotenv
+
+# Hugging Face Transformers for AI caption generation
+from transformers import BlipProcessor, BlipForConditionalGeneration
+from PIL import Image
+import torch
+
+# Load environment variables from .env file
+load_dotenv()
+
+# --- Configuration ---
+CAPTION_MODEL_NAME = os.getenv("CAPTION_MODEL_NAME", "Salesforce/blip-image-captioning-base")
+CAPTION_CPU_THREADS = int(os.getenv("CAPTION_CPU_THREADS", "0"))  # 0 = let torch decide
+# "torch" = fp32 reference model, "int8" = dynamically quantized Linear layers for CPU hosts
+CAPTION_BACKEND = os.getenv("CAPTION_BACKEND", "torch").lower()
+CAPTION_BACKENDS = ("torch", "int8")
+CAPTION_MAX_LENGTH = int(os.getenv("CAPTION_MAX_LENGTH", "50"))
+# 1 = greedy decoding; the int8 backend defaults to a narrower beam
+CAPTION_NUM_BEAMS = int(os.getenv("CAPTION_NUM_BEAMS", "5" if CAPTION_BACKEND == "torch" else "2"))
+
+processor = None
+model = None
+_model_lock = threading.Lock()
+
+def load_caption_model():
+    """Load the BLIP processor and model once per process."""
+    global processor, model
+    with _model_lock:
+        if processor is not None and model is not None:
+            return True
+        try:
+            if CAPTION_CPU_THREADS > 0:
+                torch.set_num_threads(CAPTION_CPU_THREADS)
+            if CAPTION_BACKEND not in CAPTION_BACKENDS:
+                raise ValueError(f"Unknown CAPTION_BACKEND '{CAPTION_BACKEND}' (use one of {', '.join(CAPTION_BACKENDS)})")
+            print(f"→ Loading AI caption model ({CAPTION_MODEL_NAME}, {CAPTION_BACKEND} backend)...")
+            processor = BlipProcessor.from_pretrained(CAPTION_MODEL_NAME)
+            model = BlipForConditionalGeneration.from_pretrained(CAPTION_MODEL_NAME)
+            model.eval()
+            if CAPTION_BACKEND == "int8":
+                model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+            print(f"✓ AI caption model ready (beams: {CAPTION_NUM_BEAMS})")
+            return True
+        except Exception as e:
+            print(f"✗ Failed to load AI model: {str(e)}")
+            processor = None
+            model = None
+            return False
+
+def generate_captions(image_paths):
+    """
+    Caption a batch of images in one generate() call.
+    Returns plain captions (no hashtags) in the same order as image_paths.
+    """
+    if not load_caption_model():
+        raise RuntimeError("Caption model is not available")
+
+    images = [Image.open(path).convert('RGB') for path in image_paths]
+    inputs = processor(images=images, return_tensors="pt")
+
+    with torch.no_grad():
+        out = model.generate(
+            **inputs,
+            max_length=CAPTION_MAX_LENGTH,
+            num_beams=CAPTION_NUM_BEAMS,
+            early_stopping=CAPTION_NUM_BEAMS > 1
+        )
+
+    return [processor.decode(tokens, skip_special_tokens=True) for tokens in out]
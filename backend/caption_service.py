@@ -0,0 +1,271 @@
+import os
+import io
+import re
+import json
+import time
+import queue
+import threading
+from concurrent.futures import Future
+from datetime import datetime, timedelta
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+import pytz
+import mysql.connector
+from google.oauth2.credentials import Credentials
+from google.auth.transport.requests import Request
+from googleapiclient.http import MediaIoBaseDownload
+from dotenv import load_dotenv
+import caption_model
+import caption_cache
+import media_metadata
+import metrics
+import google_clients
+
+# Load environment variables from .env file
+load_dotenv()
+
+# --- Configuration ---
+DB_CONFIG = {
+    "host": os.getenv("DB_HOST"),
+    "database": os.getenv("DB_DATABASE"),
+    "user": os.getenv("DB_USER"),
+    "password": os.getenv("DB_PASSWORD"),
+    "port": int(os.getenv("DB_PORT"))
+}
+TIMEZONE = pytz.timezone('Asia/Kolkata')
+SCOPES = ["https://www.googleapis.com/auth/drive"]
+
+CAPTION_SERVICE_HOST = os.getenv("CAPTION_SERVICE_HOST", "127.0.0.1")
+CAPTION_SERVICE_PORT = int(os.getenv("CAPTION_SERVICE_PORT", "8765"))
+CAPTION_BATCH_SIZE = int(os.getenv("CAPTION_BATCH_SIZE", "8"))
+CAPTION_BATCH_WAIT_MS = int(os.getenv("CAPTION_BATCH_WAIT_MS", "50"))
+CAPTION_REQUEST_TIMEOUT_SECONDS = 120
+PREFETCH_FOLDER = "caption_prefetch"
+PREFETCH_INTERVAL_SECONDS = int(os.getenv("CAPTION_PREFETCH_INTERVAL_SECONDS", "300"))
+PREFETCH_HORIZON_MINUTES = int(os.getenv("CAPTION_PREFETCH_HORIZON_MINUTES", "120"))
+PRECOMPUTED_MAX_AGE_HOURS = 24
+
+# Batching queue: (image_path, Future) pairs waiting for the model
+_caption_queue = queue.Queue()
+
+# Captions generated ahead of time, keyed by Google Drive file id
+_precomputed = {}
+_precomputed_lock = threading.Lock()
+
+# --- Database Functions ---
+def get_db_connection():
+    try:
+        return mysql.connector.connect(**DB_CONFIG)
+    except mysql.connector.Error as e:
+        print(f"✗ Database connection failed: {str(e)}")
+        return None
+
+# --- Batched Inference ---
+def caption_image(image_path):
+    """Queue an image for the batcher and wait for its caption."""
+    future = Future()
+    _caption_queue.put((image_path, future))
+    return future.result(timeout=CAPTION_REQUEST_TIMEOUT_SECONDS)
+
+def caption_media(media_path, is_video=False):
+    """Caption an image, or the cached caption frame of a video, reusing cached captions."""
+    image_path = media_metadata.get_caption_frame(media_path) if is_video else media_path
+    if not image_path:
+        raise RuntimeError(f"No frame available for {os.path.basename(media_path)}")
+    content_hash = media_metadata.file_content_hash(media_path)
+    caption = caption_cache.lookup(content_hash, image_path)
+    if caption:
+        return caption
+    caption = caption_image(image_path)
+    caption_cache.store(content_hash, caption, image_path)
+    return caption
+
+CAPTION_BATCH_SECONDS = metrics.histogram("caption_batch_inference_seconds", "Model time per caption batch")
+
+def run_batcher():
+    """Drain the queue in batches of up to CAPTION_BATCH_SIZE images."""
+    while True:
+        batch = [_caption_queue.get()]
+        deadline = time.monotonic() + CAPTION_BATCH_WAIT_MS / 1000
+        while len(batch) < CAPTION_BATCH_SIZE:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(_caption_queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+
+        image_paths = [image_path for image_path, _ in batch]
+        try:
+            started = time.monotonic()
+            captions = caption_model.generate_captions(image_paths)
+            elapsed = time.monotonic() - started
+            CAPTION_BATCH_SECONDS.observe(elapsed)
+            print(f"✓ Captioned batch of {len(batch)} in {elapsed:.2f}s")
+            for (_, future), caption in zip(batch, captions):
+                future.set_result(caption)
+        except Exception as e:
+            print(f"✗ Caption batch failed: {str(e)}")
+            for _, future in batch:
+                future.set_exception(e)
+
+# --- Pre-generation ---
+def _load_drive_credentials(token_drive):
+    token_str = token_drive.strip('"').replace('\\"', '"').replace("\\'", "'")
+    creds = Credentials.from_authorized_user_info(json.loads(token_str), SCOPES)
+    if creds.expired and creds.refresh_token:
+        creds.refresh(Request())
+    return creds
+
+def _oldest_media_file(drive_service, drive_link):
+    """Same pick as the Instagram AI worker: oldest image/video in the account folder."""
+    match = re.search(r'folders/([a-zA-Z0-9_-]+)', drive_link or '')
+    if not match:
+        return None
+    results = drive_service.files().list(
+        q=f"'{match.group(1)}' in parents",
+        fields="files(id, name, mimeType, createdTime)",
+        orderBy="createdTime"
+    ).execute()
+    for file in results.get('files', []):
+        if file['mimeType'].startswith('image/') or file['mimeType'].startswith('video/'):
+            return file
+    return None
+
+def get_upcoming_accounts():
+    """Instagram accounts due to post within the prefetch horizon."""
+    conn = get_db_connection()
+    if not conn:
+        return []
+    cursor = conn.cursor(dictionary=True)
+    horizon = datetime.now(TIMEZONE) + timedelta(minutes=PREFETCH_HORIZON_MINUTES)
+    cursor.execute("""
+        SELECT id, username, token_drive, google_drive_link
+        FROM instagram
+        WHERE selected = 'Yes' AND done = 'No' AND posts_left > 0
+          AND next_post_time IS NOT NULL AND next_post_time <= %s
+        ORDER BY next_post_time ASC
+    """, (horizon.replace(tzinfo=None),))
+    accounts = cursor.fetchall()
+    cursor.close()
+    conn.close()
+    return accounts
+
+def prefetch_captions_once():
+    """Download and caption the next media of every account that posts soon."""
+    os.makedirs(PREFETCH_FOLDER, exist_ok=True)
+    for account in get_upcoming_accounts():
+        if not account['token_drive']:
+            continue
+        local_path = None
+        try:
+            drive_service = google_clients.get_service('drive', 'v3', _load_drive_credentials(account['token_drive']))
+            media_file = _oldest_media_file(drive_service, account['google_drive_link'])
+            if not media_file:
+                continue
+            with _precomputed_lock:
+                if media_file['id'] in _precomputed:
+                    continue
+
+            local_path = os.path.join(PREFETCH_FOLDER, f"{media_file['id']}_{media_file['name']}")
+            with io.FileIO(local_path, 'wb') as fh:
+                downloader = MediaIoBaseDownload(fh, drive_service.files().get_media(fileId=media_file['id']))
+                done = False
+                while not done:
+                    _, done = downloader.next_chunk()
+
+            caption = caption_media(local_path, is_video=media_file['mimeType'].startswith('video/'))
+            with _precomputed_lock:
+                _precomputed[media_file['id']] = (caption, time.time())
+            print(f"✓ Pre-generated caption for {account['username']}: {media_file['name']}")
+        except Exception as e:
+            print(f"⚠ Caption prefetch failed for {account['username']}: {str(e)}")
+        finally:
+            if local_path and os.path.exists(local_path):
+                os.remove(local_path)
+
+def run_prefetcher():
+    while True:
+        try:
+            cutoff = time.time() - PRECOMPUTED_MAX_AGE_HOURS * 3600
+            with _precomputed_lock:
+                for file_id in [k for k, (_, created) in _precomputed.items() if created < cutoff]:
+                    del _precomputed[file_id]
+            prefetch_captions_once()
+        except Exception as e:
+            print(f"✗ Caption prefetcher error: {str(e)}")
+        time.sleep(PREFETCH_INTERVAL_SECONDS)
+
+# --- HTTP Interface ---
+class CaptionRequestHandler(BaseHTTPRequestHandler):
+    def _send_json(self, status, payload):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path == '/health':
+            self._send_json(200, {"status": "ok", "queued": _caption_queue.qsize(), "precomputed": len(_precomputed)})
+        elif self.path == '/metrics':
+            body = metrics.render().encode('utf-8')
+            self.send_response(200)
+            self.send_header("Content-Type", metrics.CONTENT_TYPE)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        else:
+            self._send_json(404, {"error": "Not found"})
+
+    def do_POST(self):
+        if self.path != '/caption':
+            self._send_json(404, {"error": "Not found"})
+            return
+        try:
+            length = int(self.headers.get('Content-Length', 0))
+            data = json.loads(self.rfile.read(length) or b'{}')
+        except (ValueError, json.JSONDecodeError):
+            self._send_json(400, {"error": "Invalid JSON body"})
+            return
+
+        file_id = data.get('file_id')
+        if file_id:
+            with _precomputed_lock:
+                precomputed = _precomputed.pop(file_id, None)
+            if precomputed:
+                self._send_json(200, {"caption": precomputed[0], "precomputed": True})
+                return
+
+        media_path = data.get('path')
+        if not media_path or not os.path.exists(media_path):
+            self._send_json(400, {"error": "A readable 'path' is required"})
+            return
+        try:
+            with metrics.CAPTION_SECONDS.time(source='service'):
+                caption = caption_media(media_path, is_video=bool(data.get('is_video')))
+            self._send_json(200, {"caption": caption, "precomputed": False})
+        except Exception as e:
+            self._send_json(500, {"error": f"Caption failed: {str(e)}"})
+
+    def log_message(self, format, *args):
+        pass
+
+def main():
+    print("=== Caption Service ===")
+    if not caption_model.load_caption_model():
+        return
+    threading.Thread(target=run_batcher, daemon=True).start()
+    threading.Thread(target=run_prefetcher, daemon=True).start()
+
+    server = ThreadingHTTPServer((CAPTION_SERVICE_HOST, CAPTION_SERVICE_PORT), CaptionRequestHandler)
+    print(f"Listening on http://{CAPTION_SERVICE_HOST}:{CAPTION_SERVICE_PORT} "
+          f"(batch size {CAPTION_BATCH_SIZE}, CPU threads {caption_model.CAPTION_CPU_THREADS or 'auto'})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\nCaption service stopped.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,197 @@
+"""
+Local change notifications from api.py to the scheduler and posting workers.
+
+Writers record an event in the schedule_events outbox table (inside their own
+transaction where possible) and, after committing, send a UDP datagram to the
+subscribers on localhost. Subscribers wake immediately on a datagram; if a
+subscriber cannot bind its port it falls back to polling MAX(id) of the outbox.
+
+Subscriber ports: CHANGE_FEED_BASE_PORT + 1.. for scheduler, instagram,
+telegram, youtube and instagram_ai (the AI-caption Instagram worker), in that
+order. A platform's change goes to every worker of that platform. Scheduler
+shard K > 0 subscribes as 'scheduler_K' on CHANGE_FEED_BASE_PORT + 10 + K,
+and api.py's notifications go to every shard of SCHEDULER_SHARDS.
+"""
+import os
+import json
+import time
+import socket
+import threading
+from datetime import datetime, timedelta
+import mysql.connector
+from dotenv import load_dotenv
+import leader_lock
+
+# Load environment variables from .env file
+load_dotenv()
+
+# --- Configuration ---
+CHANGE_FEED_HOST = os.getenv("CHANGE_FEED_HOST", "127.0.0.1")
+CHANGE_FEED_BASE_PORT = int(os.getenv("CHANGE_FEED_BASE_PORT", "8770"))
+SUBSCRIBERS = ('scheduler', 'instagram', 'telegram', 'youtube', 'instagram_ai')
+SCHEDULER_SHARD_PORT_OFFSET = 10
+# Posting workers that claim each platform's rows
+PLATFORM_WORKERS = {
+    'instagram': ('instagram', 'instagram_ai'),
+    'telegram': ('telegram',),
+    'youtube': ('youtube',)
+}
+FALLBACK_POLL_SECONDS = 5
+EVENT_MAX_AGE_HOURS = 24
+
+def subscriber_port(name):
+    if name.startswith('scheduler_'):
+        return CHANGE_FEED_BASE_PORT + SCHEDULER_SHARD_PORT_OFFSET + int(name[len('scheduler_'):])
+    return CHANGE_FEED_BASE_PORT + 1 + SUBSCRIBERS.index(name)
+
+def scheduler_subscriber(shard=0):
+    """Subscriber (and metrics) name of a scheduler shard; shard 0 keeps the plain 'scheduler'."""
+    return 'scheduler' if shard == 0 else f'scheduler_{shard}'
+
+def scheduler_subscribers():
+    """Every scheduler shard, since any of them may own the changed account."""
+    return tuple(scheduler_subscriber(shard) for shard in range(max(leader_lock.SCHEDULER_SHARDS, 1)))
+
+def worker_subscribers(platform):
+    """Subscriber names of the posting workers for a platform."""
+    return PLATFORM_WORKERS.get(platform, (platform,))
+
+# --- Outbox ---
+def ensure_events_table(cursor):
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS schedule_events (
+            id BIGINT AUTO_INCREMENT PRIMARY KEY,
+            platform VARCHAR(20) NOT NULL,
+            account_id INT NULL,
+            event_type VARCHAR(40) NOT NULL,
+            created_at DATETIME NOT NULL,
+            INDEX idx_schedule_events_platform (platform, id),
+            INDEX idx_schedule_events_created (created_at)
+        )
+    """)
+
+def record_event(cursor, platform, account_id, event_type):
+    """Add an event to the outbox as part of the caller's transaction."""
+    try:
+        cursor.execute(
+            "INSERT INTO schedule_events (platform, account_id, event_type, created_at) VALUES (%s, %s, %s, %s)",
+            (platform, account_id, event_type, datetime.now())
+        )
+    except mysql.connector.Error as e:
+        # 1146 = table does not exist yet; subscribers still get the datagram
+        if e.errno != 1146:
+            print(f"WARNING: Could not record {event_type} event for {platform}: {str(e)}")
+
+def notify(platform, event_type='schedule_changed', account_id=None, targets=None):
+    """Send a best-effort datagram to each target subscriber (default: the schedulers). Call after committing."""
+    targets = targets or scheduler_subscribers()
+    payload = json.dumps({"platform": platform, "event": event_type, "account_id": account_id}).encode('utf-8')
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    try:
+        for target in targets:
+            try:
+                sock.sendto(payload, (CHANGE_FEED_HOST, subscriber_port(target)))
+            except OSError:
+                pass
+    finally:
+        sock.close()
+
+def prune_events(cursor, max_age_hours=EVENT_MAX_AGE_HOURS):
+    cursor.execute("DELETE FROM schedule_events WHERE created_at < %s",
+                   (datetime.now() - timedelta(hours=max_age_hours),))
+
+# --- Subscriber ---
+class ChangeSubscriber:
+    """
+    Listens for change notifications addressed to one subscriber name.
+    `changed` is set on every notification; on_change (if given) is called
+    with the notified platform.
+    """
+
+    def __init__(self, name, get_db_connection, platforms=None, on_change=None):
+        self.name = name
+        self.changed = threading.Event()
+        self._get_db_connection = get_db_connection
+        self._platforms = platforms
+        self._on_change = on_change
+        self._sock = None
+        self._last_event_id = None
+
+    def _bind(self):
+        """Try to take the subscriber's port; returns the error if it is in use."""
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        try:
+            sock.bind((CHANGE_FEED_HOST, subscriber_port(self.name)))
+        except OSError as e:
+            sock.close()
+            return e
+        self._sock = sock
+        return None
+
+    def start(self):
+        error = self._bind()
+        if error is None:
+            target = self._listen
+        else:
+            # Usually a second process subscribed under the same name (e.g. a standby scheduler)
+            print(f"ERROR: Change feed port {subscriber_port(self.name)} for '{self.name}' could not be bound "
+                  f"({str(error)}). Is another '{self.name}' subscriber already running? "
+                  f"Polling the outbox every {FALLBACK_POLL_SECONDS}s until the port is free.")
+            target = self._poll
+        threading.Thread(target=target, name=f"{self.name}-change-feed", daemon=True).start()
+        return self
+
+    def wait(self, timeout):
+        """Block until a notification arrives or timeout passes. Returns True if notified."""
+        notified = self.changed.wait(timeout)
+        self.changed.clear()
+        return notified
+
+    def _fire(self, platform):
+        if self._platforms and platform not in self._platforms:
+            return
+        self.changed.set()
+        if self._on_change:
+            self._on_change(platform)
+
+    def _listen(self):
+        while True:
+            try:
+                data, _ = self._sock.recvfrom(4096)
+                self._fire(json.loads(data).get('platform'))
+            except (OSError, ValueError):
+                time.sleep(1)
+
+    def _latest_event_id(self):
+        conn = self._get_db_connection()
+        if not conn:
+            return None
+        try:
+            cursor = conn.cursor()
+            if self._platforms:
+                placeholders = ", ".join(["%s"] * len(self._platforms))
+                cursor.execute(f"SELECT MAX(id) FROM schedule_events WHERE platform IN ({placeholders})",
+                               tuple(self._platforms))
+            else:
+                cursor.execute("SELECT MAX(id) FROM schedule_events")
+            result = cursor.fetchone()
+            cursor.close()
+            return result[0] if result else None
+        except mysql.connector.Error:
+            return None
+        finally:
+            conn.close()
+
+    def _poll(self):
+        self._last_event_id = self._latest_event_id()
+        while True:
+            time.sleep(FALLBACK_POLL_SECONDS)
+            # Take over the port once the process holding it has gone
+            if self._bind() is None:
+                print(f"Change feed port {subscriber_port(self.name)} for '{self.name}' is free again; listening.")
+                self._listen()
+                return
+            latest = self._latest_event_id()
+            if latest is not None and latest != self._last_event_id:
+                self._last_event_id = latest
+                self._fire(self._platforms[0] if self._platforms else None)
@@ -0,0 +1,260 @@
+"""
+Versioned schema migrations for indexes the hot queries depend on.
+
+Applied migrations are recorded in schema_migrations, so running this again
+only applies new versions. The scheduler runs migrate() at startup.
+
+Usage:
+    python db_migrations.py migrate
+    python db_migrations.py status
+    python db_migrations.py explain [--database scratch_db --seed-rows 20000]
+
+`explain` runs EXPLAIN on every hot query and exits non-zero if any of them
+falls back to a full table or full index scan (test_db_migrations.py runs
+the same check under pytest). With --seed-rows it first creates and fills
+the tables in a scratch database so the optimizer sees realistic row counts.
+"""
+import os
+import sys
+import random
+import argparse
+from datetime import datetime, timedelta
+import mysql.connector
+from dotenv import load_dotenv
+
+# Load environment variables from .env file
+load_dotenv()
+
+# --- Configuration ---
+DB_CONFIG = {
+    "host": os.getenv("DB_HOST"),
+    "database": os.getenv("DB_DATABASE"),
+    "user": os.getenv("DB_USER"),
+    "password": os.getenv("DB_PASSWORD"),
+    "port": int(os.getenv("DB_PORT"))
+}
+SCHEDULED_PLATFORMS = ['instagram', 'telegram', 'youtube']
+ACCOUNT_PLATFORMS = SCHEDULED_PLATFORMS + ['facebook']
+
+# Hot queries checked by `explain`; each must use an index
+DUE_FILTER = "selected = 'Yes' AND done = 'No' AND posts_left > 0 AND next_post_time IS NOT NULL"
+HOT_QUERIES = (
+    [(f"{p}: next scheduled account",
+      f"SELECT id, next_post_time FROM {p} WHERE {DUE_FILTER} ORDER BY next_post_time ASC LIMIT 1")
+     for p in SCHEDULED_PLATFORMS] +
+    [(f"{p}: earliest post time", f"SELECT MIN(next_post_time) FROM {p} WHERE {DUE_FILTER}")
+     for p in SCHEDULED_PLATFORMS] +
+    [(f"{p}: accounts of a user", f"SELECT id FROM {p} WHERE user_id = 42") for p in SCHEDULED_PLATFORMS] +
+    [("user: lookup by email", "SELECT Id FROM user WHERE email = 'user42@example.com'")]
+)
+# EXPLAIN access types that read every row: of the table ('ALL') or of a whole index ('index')
+FULL_SCAN_TYPES = ('ALL', 'index')
+
+# --- Database Functions ---
+def get_db_connection(db_config=None):
+    try:
+        return mysql.connector.connect(**(db_config or DB_CONFIG))
+    except mysql.connector.Error as e:
+        print(f"ERROR: Database connection failed: {str(e)}")
+        return None
+
+def table_exists(cursor, table):
+    cursor.execute("""
+        SELECT COUNT(*) FROM information_schema.TABLES
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s
+    """, (table,))
+    return cursor.fetchone()[0] > 0
+
+def add_index(cursor, table, index_name, columns):
+    """CREATE INDEX unless it already exists (MySQL has no IF NOT EXISTS for indexes)."""
+    if not table_exists(cursor, table):
+        print(f"  Skipped {index_name}: table {table} does not exist")
+        return
+    cursor.execute("""
+        SELECT COUNT(*) FROM information_schema.STATISTICS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND INDEX_NAME = %s
+    """, (table, index_name))
+    if cursor.fetchone()[0]:
+        return
+    cursor.execute(f"CREATE INDEX {index_name} ON {table} ({', '.join(columns)})")
+    print(f"  Created {index_name} on {table}({', '.join(columns)})")
+
+# --- Migrations ---
+def migration_due_indexes(cursor):
+    # Equality columns first, then next_post_time so ORDER BY ... LIMIT 1 and MIN() read
+    # the first index entry; posts_left is included so the filter never touches the row
+    for platform in SCHEDULED_PLATFORMS:
+        add_index(cursor, platform, f"idx_{platform}_due", ["selected", "done", "next_post_time", "posts_left"])
+
+def migration_user_id_indexes(cursor):
+    for platform in ACCOUNT_PLATFORMS:
+        add_index(cursor, platform, f"idx_{platform}_user_id", ["user_id"])
+
+def migration_user_email_index(cursor):
+    add_index(cursor, "user", "idx_user_email", ["email"])
+
+MIGRATIONS = [
+    (1, "Due-post indexes for worker and scheduler polling", migration_due_indexes),
+    (2, "user_id indexes on account tables", migration_user_id_indexes),
+    (3, "user.email index for login lookups", migration_user_email_index),
+]
+
+def ensure_migrations_table(cursor):
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version INT NOT NULL PRIMARY KEY,
+            description VARCHAR(255) NOT NULL,
+            applied_at DATETIME NOT NULL
+        )
+    """)
+
+def get_applied_versions(cursor):
+    cursor.execute("SELECT version FROM schema_migrations")
+    return {row[0] for row in cursor.fetchall()}
+
+def migrate(db_config=None):
+    """Apply every migration that has not been recorded yet. Returns the versions applied."""
+    conn = get_db_connection(db_config)
+    if not conn:
+        return []
+    applied = []
+    try:
+        cursor = conn.cursor()
+        ensure_migrations_table(cursor)
+        done = get_applied_versions(cursor)
+        for version, description, apply in MIGRATIONS:
+            if version in done:
+                continue
+            print(f"Applying migration {version}: {description}")
+            apply(cursor)
+            cursor.execute(
+                "INSERT INTO schema_migrations (version, description, applied_at) VALUES (%s, %s, %s)",
+                (version, description, datetime.now())
+            )
+            conn.commit()
+            applied.append(version)
+        cursor.close()
+    except mysql.connector.Error as e:
+        print(f"ERROR: Migration failed: {str(e)}")
+    finally:
+        conn.close()
+    return applied
+
+def print_status(db_config=None):
+    conn = get_db_connection(db_config)
+    if not conn:
+        return
+    cursor = conn.cursor()
+    ensure_migrations_table(cursor)
+    done = get_applied_versions(cursor)
+    for version, description, _ in MIGRATIONS:
+        print(f"  [{'x' if version in done else ' '}] {version}: {description}")
+    cursor.close()
+    conn.close()
+
+# --- EXPLAIN Checks ---
+def seed_scratch_tables(db_config, rows):
+    """Create minimal copies of the hot tables and fill them with a realistic mix of rows."""
+    conn = get_db_connection(db_config)
+    cursor = conn.cursor()
+    rng = random.Random(7)
+    for table in SCHEDULED_PLATFORMS + ['user', 'schema_migrations']:
+        cursor.execute(f"DROP TABLE IF EXISTS {table}")
+    cursor.execute("""
+        CREATE TABLE user (
+            Id INT AUTO_INCREMENT PRIMARY KEY,
+            Name VARCHAR(100), email VARCHAR(255), passward VARCHAR(255),
+            phone_number VARCHAR(20), expiry DATE
+        )
+    """)
+    cursor.executemany(
+        "INSERT INTO user (Name, email, passward, phone_number) VALUES (%s, %s, %s, %s)",
+        [(f"User {i}", f"user{i}@example.com", "x", f"{9000000000 + i}") for i in range(rows // 10)]
+    )
+    now = datetime.now()
+    for platform in SCHEDULED_PLATFORMS:
+        cursor.execute(f"""
+            CREATE TABLE {platform} (
+                id INT AUTO_INCREMENT PRIMARY KEY,
+                user_id INT NOT NULL,
+                selected VARCHAR(3), done VARCHAR(3),
+                posts_left INT, next_post_time DATETIME NULL
+            )
+        """)
+        batch = []
+        for _ in range(rows):
+            # Most accounts are idle or finished; a small share is waiting to post
+            active = rng.random() < 0.05
+            batch.append((
+                rng.randrange(1, rows // 10 + 1),
+                'Yes' if active else 'No',
+                'No' if active else 'Yes',
+                rng.randint(1, 20) if active else 0,
+                now + timedelta(minutes=rng.randint(1, 1440)) if active else None
+            ))
+        cursor.executemany(
+            f"INSERT INTO {platform} (user_id, selected, done, posts_left, next_post_time) VALUES (%s, %s, %s, %s, %s)",
+            batch
+        )
+        cursor.execute(f"ANALYZE TABLE {platform}")
+        cursor.fetchall()
+    cursor.execute("ANALYZE TABLE user")
+    cursor.fetchall()
+    conn.commit()
+    cursor.close()
+    conn.close()
+    print(f"Seeded {rows} rows per platform table and {rows // 10} users")
+
+def explain_hot_queries(db_config=None):
+    """EXPLAIN every hot query; returns the names of queries that do a full table or index scan."""
+    conn = get_db_connection(db_config)
+    if not conn:
+        return [name for name, _ in HOT_QUERIES]
+    cursor = conn.cursor(dictionary=True)
+    failures = []
+    for name, query in HOT_QUERIES:
+        cursor.execute(f"EXPLAIN {query}")
+        plan = cursor.fetchall()
+        full_scans = [step for step in plan if step.get('type') in FULL_SCAN_TYPES]
+        keys = ", ".join(str(step.get('key')) for step in plan)
+        if full_scans:
+            failures.append(name)
+            scans = ", ".join(f"{step['type']} on {step['table']}" for step in full_scans)
+            print(f"  FAIL {name}: full scan ({scans})")
+        else:
+            print(f"  ok   {name}: {plan[0].get('type') or plan[0].get('Extra')} via {keys}")
+    cursor.close()
+    conn.close()
+    return failures
+
+# --- Main ---
+def main():
+    parser = argparse.ArgumentParser(description="Schema migrations and hot-query EXPLAIN checks")
+    parser.add_argument("command", choices=["migrate", "status", "explain"], nargs="?", default="migrate")
+    parser.add_argument("--database", help="Run against this database instead of DB_DATABASE")
+    parser.add_argument("--seed-rows", type=int, default=0,
+                        help="explain only: recreate and seed the hot tables first (scratch databases only)")
+    args = parser.parse_args()
+
+    db_config = dict(DB_CONFIG, database=args.database) if args.database else DB_CONFIG
+
+    if args.command == "migrate":
+        applied = migrate(db_config)
+        print(f"Applied {len(applied)} migration(s)")
+    elif args.command == "status":
+        print_status(db_config)
+    else:
+        if args.seed_rows:
+            if db_config["database"] == DB_CONFIG["database"]:
+                print("ERROR: --seed-rows drops tables; pass --database with a scratch database.")
+                sys.exit(2)
+            seed_scratch_tables(db_config, args.seed_rows)
+        migrate(db_config)
+        failures = explain_hot_queries(db_config)
+        if failures:
+            print(f"{len(failures)} hot query(s) fall back to a full table or index scan")
+            sys.exit(1)
+        print("All hot queries use an index")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Opt-in per-request database profiling for api.py.
+
+With DB_PROFILE=1 every request counts its queries and the time spent in
+them (all connections opened through metrics.instrument_connection, nested
+ones included), logs statements slower than DB_SLOW_QUERY_MS with literals
+and parameters redacted, and reports the totals in a Server-Timing header:
+
+    Server-Timing: db;dur=12.4;desc="8 queries", app;dur=31.0
+
+Requests that run DB_PROFILE_MAX_QUERIES or more queries are logged too, to
+make N+1 patterns easy to spot.
+"""
+import os
+import re
+import time
+from flask import g, has_request_context, request
+import metrics
+
+# --- Configuration ---
+DB_PROFILE = os.getenv("DB_PROFILE", "0") == "1"
+DB_SLOW_QUERY_MS = float(os.getenv("DB_SLOW_QUERY_MS", "100"))
+DB_PROFILE_MAX_QUERIES = int(os.getenv("DB_PROFILE_MAX_QUERIES", "10"))
+
+_STRING_LITERAL = re.compile(r"'(?:[^'\\]|\\.|'')*'|\"(?:[^\"\\]|\\.)*\"")
+_NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+_WHITESPACE = re.compile(r"\s+")
+
+def redact_statement(statement):
+    """Collapse whitespace and replace inline string and number literals with '?'."""
+    if isinstance(statement, bytes):
+        statement = statement.decode('utf-8', 'replace')
+    statement = _STRING_LITERAL.sub("?", str(statement))
+    statement = _NUMBER_LITERAL.sub("?", statement)
+    return _WHITESPACE.sub(" ", statement).strip()
+
+def redact_params(params):
+    """Keep only the type of each parameter, never its value."""
+    if params is None:
+        return "()"
+    if isinstance(params, dict):
+        return "{" + ", ".join(f"{key}: <{type(value).__name__}>" for key, value in params.items()) + "}"
+    if isinstance(params, (list, tuple)) and params and isinstance(params[0], (list, tuple, dict)):
+        return f"[{len(params)} rows of {redact_params(params[0])}]"
+    return "(" + ", ".join(f"<{type(value).__name__}>" for value in params) + ")"
+
+# --- Flask Hooks ---
+def _on_query(source, statement, params, seconds):
+    if not has_request_context():
+        return
+    profile = g.get('db_profile')
+    if profile is None:
+        return
+    profile['queries'] += 1
+    profile['seconds'] += seconds
+    if seconds * 1000 >= DB_SLOW_QUERY_MS:
+        print(f"SLOW QUERY {seconds * 1000:.1f}ms [{request.method} {request.path}] "
+              f"{redact_statement(statement)} params={redact_params(params)}")
+
+def _start_profile():
+    g.db_profile = {'queries': 0, 'seconds': 0.0, 'started': time.perf_counter()}
+
+def _finish_profile(response):
+    profile = g.pop('db_profile', None)
+    if profile is None:
+        return response
+    db_ms = profile['seconds'] * 1000
+    total_ms = (time.perf_counter() - profile['started']) * 1000
+    response.headers.add(
+        'Server-Timing',
+        f'db;dur={db_ms:.1f};desc="{profile["queries"]} queries", app;dur={max(total_ms - db_ms, 0):.1f}'
+    )
+    if profile['queries'] >= DB_PROFILE_MAX_QUERIES:
+        rule = request.url_rule.rule if request.url_rule else request.path
+        print(f"DB PROFILE [{request.method} {rule}] {profile['queries']} queries, "
+              f"{db_ms:.1f}ms in DB of {total_ms:.1f}ms")
+    return response
+
+def init_app(app):
+    """Register the profiler on app when DB_PROFILE=1. Returns whether it was enabled."""
+    if not DB_PROFILE:
+        return False
+    metrics.add_query_listener(_on_query)
+    app.before_request(_start_profile)
+    app.after_request(_finish_profile)
+    print(f"DB profiling enabled (slow query threshold {DB_SLOW_QUERY_MS:.0f}ms)")
+    return True
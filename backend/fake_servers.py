@@ -0,0 +1,455 @@
+"""
+Local stand-ins for external services, for load tests and benchmarks.
+
+FakeGoogleServer implements the parts of the Google APIs that api.py and the
+workers use: Drive v3 files.list/get/create/delete (alt=media downloads with
+Range, multipart/media/resumable uploads), YouTube channels.list and
+videos.insert, and the OAuth token endpoint. Point clients at it with
+GOOGLE_API_ENDPOINT (see google_endpoint.py).
+
+FakeTelegramServer answers Bot API calls (TELEGRAM_API_ENDPOINT) and
+FakeInstagramServer the private API endpoints instagrapi uses to upload
+photos and clips (INSTAGRAM_API_ENDPOINT, see instagram_endpoint.py).
+
+Every server can inject latency, limit bandwidth and fail a share of
+requests, and counts requests and bytes per route.
+
+Usage:
+    python fake_servers.py google --port 8089 --latency-ms 40 --bandwidth-kbps 20000 --error-rate 0.01
+    python fake_servers.py telegram --port 8090
+    python fake_servers.py instagram --port 8091
+"""
+import re
+import json
+import time
+import uuid
+import random
+import argparse
+import threading
+from collections import defaultdict
+from datetime import datetime, timezone
+from email import policy
+from email.parser import BytesParser
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+
+IO_BLOCK_SIZE = 64 * 1024
+
+# --- Server Base ---
+class FakeServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, handler_class, latency_ms=0, bandwidth_kbps=0, error_rate=0.0, seed=None):
+        super().__init__(address, handler_class)
+        self.latency_ms = latency_ms
+        self.bandwidth_kbps = bandwidth_kbps
+        self.error_rate = error_rate
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.stats = defaultdict(lambda: {"requests": 0, "errors": 0, "bytes_in": 0, "bytes_out": 0})
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def record(self, route, **amounts):
+        with self.lock:
+            entry = self.stats[route]
+            for key, value in amounts.items():
+                entry[key] += value
+
+    def should_fail(self):
+        with self.lock:
+            return self.error_rate > 0 and self.rng.random() < self.error_rate
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, name=f"{type(self).__name__}", daemon=True).start()
+        return self
+
+    def print_stats(self):
+        print(f"{type(self).__name__} at {self.url}")
+        with self.lock:
+            for route, entry in sorted(self.stats.items()):
+                print(f"  {route:<32} {entry['requests']:>7} req {entry['errors']:>5} injected errors "
+                      f"{entry['bytes_in'] / 1e6:>9.2f} MB in {entry['bytes_out'] / 1e6:>9.2f} MB out")
+
+class FakeHandler(BaseHTTPRequestHandler):
+    """Routes requests to handler methods and applies the server's fault injection."""
+    protocol_version = "HTTP/1.1"
+    # Headers and body go out as separate writes; without TCP_NODELAY a kept-alive
+    # client waits out the delayed-ACK timer (~40ms) on every response
+    disable_nagle_algorithm = True
+    # (method, path regex, handler method name, route label)
+    routes = []
+
+    def _throttle(self, size):
+        if self.server.bandwidth_kbps and size:
+            time.sleep(size / (self.server.bandwidth_kbps * 1024 / 8))
+
+    def read_body(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        chunks = []
+        while length > 0:
+            chunk = self.rfile.read(min(IO_BLOCK_SIZE, length))
+            if not chunk:
+                break
+            chunks.append(chunk)
+            length -= len(chunk)
+            self._throttle(len(chunk))
+        body = b"".join(chunks)
+        self.server.record(self.route, bytes_in=len(body))
+        return body
+
+    def send_body(self, status, body=b"", content_type="application/json", headers=None):
+        if isinstance(body, (dict, list)):
+            body = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        for start in range(0, len(body), IO_BLOCK_SIZE):
+            block = body[start:start + IO_BLOCK_SIZE]
+            self.wfile.write(block)
+            self._throttle(len(block))
+        self.server.record(self.route, bytes_out=len(body))
+
+    def _dispatch(self, method):
+        parts = urlsplit(self.path)
+        self.path_only = parts.path
+        self.query = {key: values[0] for key, values in parse_qs(parts.query).items()}
+        for route_method, pattern, handler_name, label in self.routes:
+            match = re.fullmatch(pattern, parts.path)
+            if route_method == method and match:
+                # Labels may use the path groups, e.g. 'telegram.{1}' for the Bot API method
+                label = label.format(*match.groups())
+                self.route = label
+                self.server.record(label, requests=1)
+                if self.server.latency_ms:
+                    time.sleep(self.server.latency_ms / 1000)
+                if self.server.should_fail():
+                    # Drain the body so the keep-alive connection stays usable
+                    self.read_body()
+                    self.server.record(label, errors=1)
+                    self.send_body(503, {"error": {"code": 503, "message": "Injected failure"}})
+                    return
+                getattr(self, handler_name)(*match.groups())
+                return
+        self.route = "unmatched"
+        self.read_body()
+        self.send_body(404, {"error": {"code": 404, "message": f"No fake route for {method} {parts.path}"}})
+
+    def do_GET(self):
+        self._dispatch('GET')
+
+    def do_POST(self):
+        self._dispatch('POST')
+
+    def do_PUT(self):
+        self._dispatch('PUT')
+
+    def do_DELETE(self):
+        self._dispatch('DELETE')
+
+    def bearer_token(self):
+        return self.headers.get('Authorization', '').partition('Bearer ')[2]
+
+    def log_message(self, format, *args):
+        pass
+
+# --- Google Drive and YouTube ---
+def _now_rfc3339():
+    return datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.%f')[:-3] + 'Z'
+
+class FakeGoogleHandler(FakeHandler):
+    routes = [
+        ('POST', r'/token', 'oauth_token', 'oauth.token'),
+        ('GET', r'/drive/v3/files', 'drive_list', 'drive.files.list'),
+        ('POST', r'/drive/v3/files', 'drive_create_metadata', 'drive.files.create'),
+        ('GET', r'/drive/v3/files/([^/]+)', 'drive_get', 'drive.files.get'),
+        ('DELETE', r'/drive/v3/files/([^/]+)', 'drive_delete', 'drive.files.delete'),
+        ('POST', r'/drive/v3/files/([^/]+)/permissions', 'drive_permission', 'drive.permissions.create'),
+        ('POST', r'/upload/(drive)/v3/files', 'upload', 'drive.files.create'),
+        ('PUT', r'/upload/(drive)/v3/files', 'upload_chunk', 'drive.files.create'),
+        ('GET', r'/youtube/v3/channels', 'youtube_channels', 'youtube.channels.list'),
+        ('POST', r'/upload/(youtube)/v3/videos', 'upload', 'youtube.videos.insert'),
+        ('PUT', r'/upload/(youtube)/v3/videos', 'upload_chunk', 'youtube.videos.insert'),
+    ]
+
+    def oauth_token(self):
+        self.read_body()
+        self.send_body(200, {"access_token": f"fake-{uuid.uuid4().hex}", "expires_in": 3600, "token_type": "Bearer"})
+
+    # files.list only understands the name/parent filters the callers use
+    def drive_list(self):
+        q = self.query.get('q', '')
+        name = re.search(r"name = '((?:[^'\\]|\\.)*)'", q)
+        parent = re.search(r"'([^']+)' in parents", q)
+        files = self.server.drive_files(name.group(1) if name else None, parent.group(1) if parent else None)
+        page_size = int(self.query.get('pageSize', 100))
+        self.send_body(200, {"files": [self.server.drive_metadata(f) for f in files[:page_size]]})
+
+    def drive_create_metadata(self):
+        metadata = json.loads(self.read_body() or b'{}')
+        self.send_body(200, self.server.drive_metadata(self.server.drive_create(metadata, b"")))
+
+    def drive_get(self, file_id):
+        entry = self.server.drive_file(file_id)
+        if not entry:
+            self.send_body(404, {"error": {"code": 404, "message": "File not found"}})
+            return
+        if self.query.get('alt') != 'media':
+            self.send_body(200, self.server.drive_metadata(entry))
+            return
+        content = entry['content']
+        ranged = re.match(r'bytes=(\d+)-(\d*)', self.headers.get('Range', ''))
+        if ranged:
+            start = int(ranged.group(1))
+            end = min(int(ranged.group(2)) if ranged.group(2) else len(content) - 1, len(content) - 1)
+            self.send_body(206, content[start:end + 1], 'application/octet-stream',
+                           {"Content-Range": f"bytes {start}-{end}/{len(content)}"})
+        else:
+            self.send_body(200, content, 'application/octet-stream')
+
+    def drive_delete(self, file_id):
+        removed = self.server.drive_remove(file_id)
+        self.send_body(204 if removed else 404, b"" if removed else {"error": {"code": 404, "message": "File not found"}})
+
+    def drive_permission(self, file_id):
+        self.read_body()
+        self.send_body(200, {"kind": "drive#permission", "id": "anyoneWithLink", "type": "anyone", "role": "reader"})
+
+    # The token is the channel id when the caller seeded one (see benchmark_posting.py)
+    def youtube_channels(self):
+        token = self.bearer_token()
+        channel_id = token if token.startswith('UC') else 'UCfakechannel'
+        self.send_body(200, {"kind": "youtube#channelListResponse",
+                             "items": [{"id": channel_id, "snippet": {"title": f"Fake {channel_id}"}}]})
+
+    def upload(self, api):
+        upload_type = self.query.get('uploadType', 'media')
+        body = self.read_body()
+        if upload_type == 'resumable':
+            session_id = self.server.start_session(api, json.loads(body or b'{}'))
+            location = f"http://{self.headers.get('Host')}{self.path_only}?uploadType=resumable&upload_id={session_id}"
+            self.send_body(200, b"", headers={"Location": location})
+            return
+        if upload_type == 'multipart':
+            message = BytesParser(policy=policy.HTTP).parsebytes(
+                f"Content-Type: {self.headers.get('Content-Type')}\r\n\r\n".encode('utf-8') + body
+            )
+            parts = list(message.iter_parts())
+            metadata = json.loads(parts[0].get_content()) if parts else {}
+            content = parts[1].get_payload(decode=True) if len(parts) > 1 else b""
+        else:
+            metadata, content = {}, body
+        self.send_body(200, self.server.finish_upload(api, metadata, content))
+
+    def upload_chunk(self, api):
+        session_id = self.query.get('upload_id')
+        session = self.server.sessions.get(session_id)
+        body = self.read_body()
+        if not session:
+            self.send_body(404, {"error": {"code": 404, "message": "Upload session not found"}})
+            return
+        content_range = re.match(r'bytes (?:(\d+)-(\d+)|\*)/(\d+|\*)', self.headers.get('Content-Range', ''))
+        start = int(content_range.group(1)) if content_range and content_range.group(1) is not None else None
+        if start is not None or not content_range:
+            start = session['received'] if start is None else start
+            session['received'] = start + len(body)
+            if self.server.keep_content:
+                session['content'] = session['content'][:start] + body
+        total = content_range.group(3) if content_range else str(session['received'])
+        if total != '*' and session['received'] >= int(total):
+            self.server.sessions.pop(session_id, None)
+            content = session['content'] if self.server.keep_content else bytes(session['received'])
+            self.send_body(200, self.server.finish_upload(api, session['metadata'], content))
+        else:
+            headers = {"Range": f"bytes=0-{session['received'] - 1}"} if session['received'] else {}
+            self.send_body(308, b"", headers=headers)
+
+class FakeGoogleServer(FakeServer):
+    def __init__(self, address, keep_content=True, **options):
+        super().__init__(address, FakeGoogleHandler, **options)
+        # Load tests upload far more than they download; keep_content=False only tracks sizes
+        self.keep_content = keep_content
+        self.files = {}
+        self.sessions = {}
+        self.videos = {}
+
+    def drive_create(self, metadata, content, file_id=None):
+        file_id = file_id or uuid.uuid4().hex
+        entry = {
+            "id": file_id,
+            "name": metadata.get('name') or file_id,
+            "parents": metadata.get('parents') or [],
+            "mimeType": metadata.get('mimeType', 'application/octet-stream'),
+            "createdTime": _now_rfc3339(),
+            "size": len(content),
+            "content": content if self.keep_content else b"",
+        }
+        with self.lock:
+            self.files[file_id] = entry
+        return entry
+
+    def drive_file(self, file_id):
+        with self.lock:
+            return self.files.get(file_id)
+
+    def drive_files(self, name=None, parent=None):
+        with self.lock:
+            return [entry for entry in self.files.values()
+                    if (name is None or entry['name'] == name) and (parent is None or parent in entry['parents'])]
+
+    def drive_remove(self, file_id):
+        with self.lock:
+            return self.files.pop(file_id, None) is not None
+
+    def drive_metadata(self, entry):
+        return {
+            "id": entry['id'],
+            "name": entry['name'],
+            "parents": entry['parents'],
+            "mimeType": entry['mimeType'],
+            "createdTime": entry['createdTime'],
+            "size": str(entry['size']),
+            "webViewLink": f"https://drive.google.com/file/d/{entry['id']}/view",
+        }
+
+    def add_drive_folder(self, folder_id, name=None):
+        """Pre-create a folder with a known id, e.g. the one in an account's google_drive_link."""
+        return self.drive_create({"name": name or folder_id, "mimeType": "application/vnd.google-apps.folder"},
+                                 b"", file_id=folder_id)['id']
+
+    def add_drive_file(self, name, content, parent):
+        """Pre-load a file, e.g. media for the posting workers to download."""
+        # Media to download is always kept, whatever keep_content says
+        entry = self.drive_create({"name": name, "parents": [parent]}, b"")
+        entry.update(size=len(content), content=content)
+        return entry['id']
+
+    def start_session(self, api, metadata):
+        session_id = uuid.uuid4().hex
+        with self.lock:
+            self.sessions[session_id] = {"api": api, "metadata": metadata, "content": b"", "received": 0}
+        return session_id
+
+    def finish_upload(self, api, metadata, content):
+        if api == 'drive':
+            return self.drive_metadata(self.drive_create(metadata, content))
+        video_id = uuid.uuid4().hex[:11]
+        with self.lock:
+            self.videos[video_id] = len(content)
+        return {"kind": "youtube#video", "id": video_id, "snippet": metadata.get('snippet', {}),
+                "status": {"uploadStatus": "uploaded", **metadata.get('status', {})}}
+
+# --- Telegram Bot API ---
+class FakeTelegramHandler(FakeHandler):
+    routes = [
+        ('POST', r'/bot([^/]+)/(\w+)', 'bot_method', 'telegram.{1}'),
+        ('GET', r'/bot([^/]+)/(\w+)', 'bot_method', 'telegram.{1}'),
+    ]
+
+    def bot_method(self, token, method):
+        self.read_body()
+        if method == 'getMe':
+            result = {"id": 1000001, "is_bot": True, "first_name": "Fake Bot", "username": "fake_bot"}
+        elif method.startswith('send'):
+            result = {
+                "message_id": self.server.next_message_id(),
+                "date": int(time.time()),
+                "chat": {"id": -1001000000001, "type": "channel", "title": "Fake channel"},
+            }
+        else:
+            result = True
+        self.send_body(200, {"ok": True, "result": result})
+
+class FakeTelegramServer(FakeServer):
+    def __init__(self, address, **options):
+        super().__init__(address, FakeTelegramHandler, **options)
+        self.message_id = 0
+
+    def next_message_id(self):
+        with self.lock:
+            self.message_id += 1
+            return self.message_id
+
+# --- Instagram private API (as used by instagrapi) ---
+class FakeInstagramHandler(FakeHandler):
+    routes = [
+        ('GET', r'/rupload_(igvideo|igphoto)/([^/]+)', 'rupload_offset', 'instagram.rupload_{0}'),
+        ('POST', r'/rupload_(igvideo|igphoto)/([^/]+)', 'rupload', 'instagram.rupload_{0}'),
+        ('POST', r'/api/v1/media/(configure|configure_to_clips)/', 'configure', 'instagram.media.{0}'),
+        ('GET', r'/api/v1/(.+)', 'private_ok', 'instagram.api'),
+        ('POST', r'/api/v1/(.+)', 'private_ok', 'instagram.api'),
+    ]
+
+    def rupload_offset(self, kind, name):
+        self.send_body(200, {"offset": 0, "status": "ok"})
+
+    def rupload(self, kind, name):
+        self.read_body()
+        params = json.loads(self.headers.get('X-Instagram-Rupload-Params') or '{}')
+        self.send_body(200, {"upload_id": params.get('upload_id', name.split('_')[0]), "status": "ok"})
+
+    def configure(self, kind):
+        self.read_body()
+        pk = self.server.next_media_pk()
+        self.send_body(200, {"status": "ok", "media": {
+            "pk": str(pk),
+            "id": f"{pk}_1",
+            "code": f"Fake{pk}",
+            "taken_at": int(time.time()),
+            "media_type": 2 if kind == 'configure_to_clips' else 1,
+            "product_type": "clips" if kind == 'configure_to_clips' else "",
+            "user": {"pk": "1", "username": "fake_user"},
+            "caption": None,
+            "like_count": 0,
+        }})
+
+    def private_ok(self, endpoint):
+        self.read_body()
+        self.send_body(200, {"status": "ok"})
+
+class FakeInstagramServer(FakeServer):
+    def __init__(self, address, **options):
+        super().__init__(address, FakeInstagramHandler, **options)
+        self.media_pk = 3000000000000000000
+
+    def next_media_pk(self):
+        with self.lock:
+            self.media_pk += 1
+            return self.media_pk
+
+SERVERS = {
+    'google': FakeGoogleServer,
+    'telegram': FakeTelegramServer,
+    'instagram': FakeInstagramServer,
+}
+
+def start_server(kind, host='127.0.0.1', port=0, **options):
+    """Start a fake server in a daemon thread; port 0 picks a free port (see server.url)."""
+    return SERVERS[kind]((host, port), **options).start()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run a local stand-in for an external service")
+    parser.add_argument("kind", choices=sorted(SERVERS))
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--latency-ms", type=float, default=0, help="Added to every request")
+    parser.add_argument("--bandwidth-kbps", type=float, default=0, help="Per-connection body throughput, 0 = unlimited")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of requests answered with 503")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--discard-content", action="store_true", help="google: keep file sizes only, not bytes")
+    args = parser.parse_args()
+
+    options = {"keep_content": False} if args.kind == 'google' and args.discard_content else {}
+    server = SERVERS[args.kind]((args.host, args.port), latency_ms=args.latency_ms, bandwidth_kbps=args.bandwidth_kbps,
+                                error_rate=args.error_rate, seed=args.seed, **options)
+    print(f"Fake {args.kind} server listening on {server.url} (Ctrl+C to stop)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.print_stats()
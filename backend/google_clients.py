@@ -0,0 +1,105 @@
+"""
+Shared, cached Google API clients (Drive, YouTube).
+
+get_service() replaces build() for every Drive/YouTube client in the API and
+the posting workers. A plain build() reads and parses the discovery document
+and creates a new HTTP transport, so each call pays for fresh TLS connections
+to googleapis.com. Here:
+
+- discovery documents are the ones bundled with googleapiclient (no network
+  fetch) and are read from disk once per process;
+- each thread keeps one AuthorizedHttp per credential (keyed by client id and
+  refresh token, so a reloaded or refreshed token reuses the same connections)
+  and one built client per API on top of it;
+- per-thread caches keep it thread-safe, since httplib2.Http must not be
+  shared between threads, and are capped at MAX_CREDENTIALS_PER_THREAD.
+
+When GOOGLE_API_ENDPOINT is set the transport is google_endpoint's
+RedirectingHttp, so the clients talk to the fake server instead.
+"""
+import os
+import threading
+from collections import OrderedDict
+import httplib2
+import google_auth_httplib2
+from googleapiclient.discovery import build_from_document
+from googleapiclient.discovery_cache import get_static_doc
+from googleapiclient.http import DEFAULT_HTTP_TIMEOUT_SEC
+from dotenv import load_dotenv
+import google_endpoint
+
+# Load environment variables from .env file
+load_dotenv()
+
+MAX_CREDENTIALS_PER_THREAD = int(os.getenv("GOOGLE_CLIENTS_PER_THREAD", "32"))
+
+_documents = {}
+_documents_lock = threading.Lock()
+_local = threading.local()
+
+def discovery_document(name, version):
+    """Bundled discovery document for an API, read once per process."""
+    key = (name, version)
+    with _documents_lock:
+        if key not in _documents:
+            document = get_static_doc(name, version)
+            if document is None:
+                raise ValueError(f"No bundled discovery document for {name} {version}")
+            _documents[key] = document
+        return _documents[key]
+
+def credential_key(credentials):
+    """Identify the account behind credentials, stable across token refreshes and reloads."""
+    refresh_token = getattr(credentials, "refresh_token", None)
+    if refresh_token:
+        return (getattr(credentials, "client_id", None), refresh_token)
+    return ("token", getattr(credentials, "token", None) or id(credentials))
+
+def new_http():
+    """Keep-alive httplib2 transport, redirected to GOOGLE_API_ENDPOINT when it is set."""
+    if google_endpoint.GOOGLE_API_ENDPOINT:
+        return google_endpoint.RedirectingHttp(timeout=DEFAULT_HTTP_TIMEOUT_SEC)
+    http = httplib2.Http(timeout=DEFAULT_HTTP_TIMEOUT_SEC)
+    # Resumable uploads answer 308 without a Location header (same as googleapiclient's build_http())
+    http.redirect_codes = http.redirect_codes - {308}
+    return http
+
+def get_service(name, version, credentials):
+    """Cached client for an API, sharing this thread's connection pool for the credential."""
+    entries = getattr(_local, "entries", None)
+    if entries is None:
+        entries = _local.entries = OrderedDict()
+
+    key = credential_key(credentials)
+    entry = entries.get(key)
+    if entry is None:
+        entry = {"http": google_auth_httplib2.AuthorizedHttp(credentials, http=new_http()), "services": {}}
+        entries[key] = entry
+        while len(entries) > MAX_CREDENTIALS_PER_THREAD:
+            _, evicted = entries.popitem(last=False)
+            close_http(evicted["http"])
+    else:
+        entries.move_to_end(key)
+        # Same account, possibly a freshly loaded/refreshed token
+        entry["http"].credentials = credentials
+
+    service = entry["services"].get((name, version))
+    if service is None:
+        service = build_from_document(discovery_document(name, version), http=entry["http"])
+        entry["services"][(name, version)] = service
+    return service
+
+def close_http(http):
+    for connection in list(http.http.connections.values()):
+        try:
+            connection.close()
+        except OSError:
+            pass
+    http.http.connections.clear()
+
+def clear_thread_cache():
+    """Close this thread's connections and drop its cached clients."""
+    entries = getattr(_local, "entries", None) or {}
+    for entry in entries.values():
+        close_http(entry["http"])
+    _local.entries = OrderedDict()
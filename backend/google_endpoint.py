@@ -0,0 +1,36 @@
+"""
+Point Google API clients at a local stand-in instead of googleapis.com.
+
+When GOOGLE_API_ENDPOINT is set (e.g. http://127.0.0.1:8089, the fake server
+from fake_servers.py), google_clients builds its transports from
+RedirectingHttp, so every request a client sends to a *.googleapis.com host,
+uploads and downloads included, goes to that endpoint instead.
+"""
+import os
+from urllib.parse import urlsplit, urlunsplit
+import httplib2
+from dotenv import load_dotenv
+
+# Load environment variables from .env file
+load_dotenv()
+
+GOOGLE_API_ENDPOINT = os.getenv("GOOGLE_API_ENDPOINT")
+
+def rewrite_url(uri, endpoint=None):
+    endpoint = endpoint or GOOGLE_API_ENDPOINT
+    parts = urlsplit(uri)
+    if not endpoint or not parts.hostname or not parts.hostname.endswith("googleapis.com"):
+        return uri
+    target = urlsplit(endpoint)
+    return urlunsplit((target.scheme, target.netloc, parts.path, parts.query, parts.fragment))
+
+class RedirectingHttp(httplib2.Http):
+    """httplib2 transport that sends Google API traffic to GOOGLE_API_ENDPOINT."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Resumable uploads answer 308 without a Location header, as googleapiclient's build_http() expects
+        self.redirect_codes = self.redirect_codes - {308}
+
+    def request(self, uri, method="GET", body=None, headers=None, *args, **kwargs):
+        return super().request(rewrite_url(uri), method, body, headers, *args, **kwargs)
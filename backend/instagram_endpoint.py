@@ -0,0 +1,40 @@
+"""
+Point instagrapi clients at a local stand-in instead of instagram.com.
+
+When INSTAGRAM_API_ENDPOINT is set (e.g. http://127.0.0.1:8091, the fake
+server from fake_servers.py), redirect_client() makes every request the
+client sends to an *.instagram.com host go to that endpoint instead.
+Without it the client is left untouched.
+"""
+import os
+from urllib.parse import urlsplit, urlunsplit
+from requests.adapters import HTTPAdapter
+from dotenv import load_dotenv
+
+# Load environment variables from .env file
+load_dotenv()
+
+INSTAGRAM_API_ENDPOINT = os.getenv("INSTAGRAM_API_ENDPOINT")
+
+def rewrite_url(url, endpoint=None):
+    endpoint = endpoint or INSTAGRAM_API_ENDPOINT
+    parts = urlsplit(url)
+    if not endpoint or not parts.hostname or not parts.hostname.endswith("instagram.com"):
+        return url
+    target = urlsplit(endpoint)
+    return urlunsplit((target.scheme, target.netloc, parts.path, parts.query, parts.fragment))
+
+class RedirectingAdapter(HTTPAdapter):
+    """requests transport that sends Instagram traffic to INSTAGRAM_API_ENDPOINT."""
+
+    def send(self, request, *args, **kwargs):
+        request.url = rewrite_url(request.url)
+        return super().send(request, *args, **kwargs)
+
+def redirect_client(client):
+    """Route an instagrapi Client's private and public sessions to INSTAGRAM_API_ENDPOINT when it is set."""
+    if not INSTAGRAM_API_ENDPOINT:
+        return client
+    for session in (client.private, client.public):
+        session.mount("https://", RedirectingAdapter())
+    return client
@@ -0,0 +1,95 @@
+"""
+Scheduler leader election with MySQL advisory locks (GET_LOCK).
+
+Each partition (a platform, or one shard of a platform) has its own lock
+name. A scheduler only writes a partition while its dedicated lock
+connection holds that lock; standbys keep trying and take over as soon as
+the leader's connection closes, which MySQL notices immediately when the
+process dies.
+"""
+import os
+import mysql.connector
+from dotenv import load_dotenv
+
+# Load environment variables from .env file
+load_dotenv()
+
+# GET_LOCK names are server-wide, so scope them to the database
+LOCK_PREFIX = os.getenv("SCHEDULER_LOCK_PREFIX", f"{os.getenv('DB_DATABASE')}:scheduler")
+# Shards the combined scheduler is deployed with. Sharded partitions are locked as
+# platform:K/N, which the single-platform schedulers' plain locks do not exclude
+SCHEDULER_SHARDS = int(os.getenv("SCHEDULER_SHARDS", "1"))
+
+def partition_name(platform, shard=0, shards=1):
+    """Unsharded partitions keep the plain platform name used by the single-platform schedulers."""
+    if shards <= 1:
+        return platform
+    return f"{platform}:{shard}/{shards}"
+
+def lock_name(partition):
+    return f"{LOCK_PREFIX}:{partition}"[:64]
+
+class LeaderLock:
+    """Advisory locks for a set of partitions, held on one dedicated connection."""
+
+    def __init__(self, get_db_connection, partitions):
+        self._get_db_connection = get_db_connection
+        self._partitions = list(partitions)
+        self._conn = None
+        self.held = set()
+
+    def _connection(self):
+        if self._conn is None:
+            self._conn = self._get_db_connection()
+        return self._conn
+
+    def _drop_connection(self):
+        if self._conn is not None:
+            try:
+                self._conn.close()
+            except mysql.connector.Error:
+                pass
+        self._conn = None
+        self.held = set()
+
+    def refresh(self, timeout=0):
+        """
+        Confirm the locks still held and try to take the free ones.
+        Returns the set of partitions this process currently leads.
+        """
+        conn = self._connection()
+        if conn is None:
+            self.held = set()
+            return self.held
+        try:
+            cursor = conn.cursor()
+            for partition in list(self.held):
+                cursor.execute("SELECT IS_USED_LOCK(%s) = CONNECTION_ID()", (lock_name(partition),))
+                if not cursor.fetchone()[0]:
+                    self.held.discard(partition)
+                    print(f"WARNING: Lost scheduler leadership for {partition}")
+            for partition in self._partitions:
+                if partition in self.held:
+                    continue
+                cursor.execute("SELECT GET_LOCK(%s, %s)", (lock_name(partition), timeout))
+                if cursor.fetchone()[0] == 1:
+                    self.held.add(partition)
+                    print(f"Acquired scheduler leadership for {partition}")
+            cursor.close()
+        except mysql.connector.Error as e:
+            # Whatever was held died with the connection; start over next time
+            print(f"WARNING: Leader lock connection failed: {str(e)}")
+            self._drop_connection()
+        return self.held
+
+    def release(self):
+        if self._conn is not None:
+            try:
+                cursor = self._conn.cursor()
+                for partition in self.held:
+                    cursor.execute("SELECT RELEASE_LOCK(%s)", (lock_name(partition),))
+                    cursor.fetchone()
+                cursor.close()
+            except mysql.connector.Error:
+                pass
+        self._drop_connection()
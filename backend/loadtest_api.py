@@ -0,0 +1,410 @@
+"""
+HTTP load test for api.py against a scratch MySQL database and a fake Google Drive.
+
+Seeds the scratch database with users and instagram/telegram/youtube/facebook
+accounts whose Drive tokens point at fake_servers.FakeGoogleServer, starts
+api.py (gunicorn, or Flask's threaded server) with DB_DATABASE and
+GOOGLE_API_ENDPOINT set accordingly, then runs --concurrency virtual users
+for --duration seconds. Each virtual user keeps its own session and picks
+requests from a weighted mix: login, dashboard, user fetch, custom-schedule
+read/write, single-file upload and chunked upload + finalize (polled until
+the background Drive upload finishes). Reports throughput, latency
+percentiles and error rates per endpoint, plus what the fake Drive saw.
+
+The scratch database must already exist and must not be DB_DATABASE: its
+tables are dropped and recreated. Chunked uploads keep their status in the
+API process's memory, so run a single gunicorn worker (the default) and
+scale with --gunicorn-threads when the mix includes chunked_upload.
+
+Usage:
+    python loadtest_api.py --database api_loadtest --users 50 --concurrency 20 --duration 60
+    python loadtest_api.py --database api_loadtest --mix dashboard=5,user=3,upload=1 --drive-latency-ms 80
+    python loadtest_api.py --database api_loadtest --api-url http://127.0.0.1:5000 --skip-seed
+"""
+import os
+import sys
+import json
+import time
+import uuid
+import random
+import argparse
+import threading
+import subprocess
+from collections import defaultdict
+from datetime import datetime, timedelta
+import mysql.connector
+import requests
+from dotenv import load_dotenv
+import fake_servers
+
+# Load environment variables from .env file
+load_dotenv()
+
+DB_CONFIG = {
+    "host": os.getenv("DB_HOST"),
+    "port": int(os.getenv("DB_PORT")),
+    "user": os.getenv("DB_USER"),
+    "password": os.getenv("DB_PASSWORD"),
+    "database": os.getenv("DB_DATABASE")
+}
+
+PLATFORMS = ['instagram', 'telegram', 'youtube', 'facebook']
+UPLOAD_PLATFORMS = ['instagram', 'telegram', 'youtube']
+OPERATIONS = ('login', 'dashboard', 'user', 'schedule_read', 'schedule_write', 'upload', 'chunked_upload')
+DEFAULT_MIX = "login=1,dashboard=4,user=4,schedule_read=4,schedule_write=2,upload=1,chunked_upload=1"
+PASSWORD = "loadtest"
+DATETIME_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+# --- Seeding ---
+def drive_token(drive_url):
+    """Authorized-user info with a valid access token; refreshes go to the fake token endpoint."""
+    return json.dumps({
+        "token": "loadtest",
+        "refresh_token": "loadtest",
+        "client_id": "loadtest",
+        "client_secret": "loadtest",
+        "token_uri": f"{drive_url}/token",
+        "expiry": "2099-01-01T00:00:00Z"
+    })
+
+def create_tables(cursor):
+    for table in PLATFORMS + ['user']:
+        cursor.execute(f"DROP TABLE IF EXISTS {table}")
+    cursor.execute("""
+        CREATE TABLE user (
+            Id INT AUTO_INCREMENT PRIMARY KEY,
+            Name VARCHAR(100), email VARCHAR(255), passward VARCHAR(255),
+            phone_number VARCHAR(20), expiry DATE,
+            INDEX idx_user_email (email)
+        )
+    """)
+    for platform in PLATFORMS:
+        cursor.execute(f"""
+            CREATE TABLE {platform} (
+                id INT AUTO_INCREMENT PRIMARY KEY,
+                user_id VARCHAR(255) NOT NULL,
+                username VARCHAR(255), passwand VARCHAR(255), email VARCHAR(255),
+                channel_name VARCHAR(255), channel_id VARCHAR(255),
+                token_sesson LONGTEXT, token_drive LONGTEXT, google_drive_link VARCHAR(512),
+                selected VARCHAR(3) DEFAULT 'No', done VARCHAR(3) DEFAULT 'No',
+                sch_start_range TIME NULL, sch_end_range TIME NULL,
+                sch_date DATE NULL, sch_time TIME NULL,
+                number_of_posts INT DEFAULT 0, posts_left INT DEFAULT 0,
+                schedule_type VARCHAR(20) NULL, next_post_time DATETIME NULL,
+                post_daily_range INT DEFAULT 0, post_daily_range_left INT DEFAULT 0,
+                last_reset DATETIME NULL, custom_schedule_data LONGTEXT NULL,
+                INDEX idx_{platform}_user_id (user_id)
+            )
+        """)
+
+def build_queue(rng, size):
+    queue = []
+    for i in range(size):
+        item = {
+            "media_name": f"loadtest_{i}.jpg",
+            "file_id": uuid.uuid4().hex,
+            "status": "pending",
+            "schedule_type": "range",
+            "scheduled_datetime": None,
+            "caption": ""
+        }
+        if rng.random() < 0.2:
+            item["schedule_type"] = "datetime"
+            item["scheduled_datetime"] = (datetime.now() + timedelta(hours=rng.randint(1, 72))).strftime(DATETIME_FORMAT)
+        queue.append(item)
+    return queue
+
+def seed(db_config, args, drive_url):
+    """Create one user per virtual user identity with one account per platform. Returns the identities."""
+    rng = random.Random(args.seed)
+    conn = mysql.connector.connect(**db_config)
+    cursor = conn.cursor()
+    create_tables(cursor)
+    expiry = (datetime.now() + timedelta(days=365)).date()
+    token = drive_token(drive_url)
+    identities = []
+    for n in range(1, args.users + 1):
+        email = f"loadtest{n}@example.com"
+        cursor.execute(
+            "INSERT INTO user (Name, email, passward, phone_number, expiry) VALUES (%s, %s, %s, %s, %s)",
+            (f"Load Test {n}", email, PASSWORD, f"{9000000000 + n}", expiry)
+        )
+        identity = {"user_id": cursor.lastrowid, "email": email, "accounts": {}}
+        for platform in PLATFORMS:
+            queue = json.dumps(build_queue(rng, args.queue_size))
+            cursor.execute(f"""
+                INSERT INTO {platform} (user_id, username, email, channel_name, channel_id, token_sesson, token_drive,
+                                        google_drive_link, selected, sch_start_range, sch_end_range, number_of_posts,
+                                        posts_left, schedule_type, post_daily_range, post_daily_range_left,
+                                        custom_schedule_data)
+                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, 'Yes', '09:00:00', '21:00:00', %s, %s, 'range', 3, 3, %s)
+            """, (
+                str(identity["user_id"]), f"loadtest_{platform}_{n}", email, f"Load Test {n}", f"UC{uuid.uuid4().hex[:22]}",
+                token, token, f"https://drive.google.com/drive/folders/loadtest{n}",
+                args.queue_size, args.queue_size, queue
+            ))
+            identity["accounts"][platform] = cursor.lastrowid
+        identities.append(identity)
+    conn.commit()
+    cursor.close()
+    conn.close()
+    print(f"Seeded {args.users} users with one account per platform and {args.queue_size} queued items each")
+    return identities
+
+def load_identities(db_config, users):
+    """Read back the identities of a previous seed (--skip-seed)."""
+    conn = mysql.connector.connect(**db_config)
+    cursor = conn.cursor(dictionary=True)
+    cursor.execute("SELECT Id, email FROM user WHERE email LIKE 'loadtest%%' ORDER BY Id LIMIT %s", (users,))
+    identities = [{"user_id": row['Id'], "email": row['email'], "accounts": {}} for row in cursor.fetchall()]
+    for identity in identities:
+        for platform in PLATFORMS:
+            cursor.execute(f"SELECT id FROM {platform} WHERE user_id = %s LIMIT 1", (str(identity["user_id"]),))
+            row = cursor.fetchone()
+            if row:
+                identity["accounts"][platform] = row['id']
+    cursor.close()
+    conn.close()
+    return identities
+
+# --- API Process ---
+def start_api(args, database, drive_url):
+    env = dict(os.environ, DB_DATABASE=database, GOOGLE_API_ENDPOINT=drive_url, PYTHONUNBUFFERED="1")
+    if args.server == 'gunicorn':
+        command = [sys.executable, "-m", "gunicorn", "--workers", str(args.gunicorn_workers),
+                   "--threads", str(args.gunicorn_threads), "--bind", f"127.0.0.1:{args.api_port}",
+                   "--timeout", "300", "api:app"]
+    else:
+        command = [sys.executable, "-c",
+                   f"import api; api.app.run(host='127.0.0.1', port={args.api_port}, threaded=True, debug=False)"]
+    log = open(args.api_log, "w")
+    process = subprocess.Popen(command, cwd=os.path.dirname(os.path.abspath(__file__)), env=env,
+                               stdout=log, stderr=subprocess.STDOUT)
+    api_url = f"http://127.0.0.1:{args.api_port}"
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"api.py exited with code {process.returncode}; see {args.api_log}")
+        try:
+            requests.get(f"{api_url}/metrics", timeout=2)
+            print(f"api.py ({args.server}) listening on {api_url}, output in {args.api_log}")
+            return process, api_url
+        except requests.RequestException:
+            time.sleep(0.5)
+    process.terminate()
+    raise RuntimeError(f"api.py did not start within 60s; see {args.api_log}")
+
+# --- Virtual Users ---
+class VirtualUser(threading.Thread):
+    def __init__(self, index, api_url, identity, weights, args, deadline, results):
+        super().__init__(name=f"vu-{index}", daemon=True)
+        self.api_url = api_url
+        self.identity = identity
+        self.operations, self.weights = zip(*weights.items())
+        self.args = args
+        self.deadline = deadline
+        self.results = results
+        self.rng = random.Random(args.seed + index)
+        self.http = requests.Session()
+        self.logged_in = False
+
+    def record(self, endpoint, seconds, ok):
+        entry = self.results[endpoint]
+        entry['latencies'].append(seconds)
+        if not ok:
+            entry['errors'] += 1
+
+    def call(self, endpoint, method, path, **kwargs):
+        started = time.perf_counter()
+        try:
+            response = self.http.request(method, f"{self.api_url}{path}", timeout=self.args.timeout, **kwargs)
+        except requests.RequestException:
+            self.record(endpoint, time.perf_counter() - started, False)
+            return None
+        self.record(endpoint, time.perf_counter() - started, response.status_code < 400)
+        return response
+
+    def account(self, platforms):
+        platform = self.rng.choice(platforms)
+        return platform, self.identity["accounts"][platform]
+
+    def login(self):
+        response = self.call("POST /login", "POST", "/login",
+                             json={"email": self.identity["email"], "password": PASSWORD})
+        self.logged_in = response is not None and response.status_code == 200
+
+    def dashboard(self):
+        self.call("GET /dashboard", "GET", "/dashboard")
+
+    def user(self):
+        self.call("GET /user/<id>", "GET", f"/user/{self.identity['user_id']}")
+
+    def schedule_read(self):
+        platform, account_id = self.account(PLATFORMS)
+        self.call("GET /<platform>/<id>/custom-schedule", "GET", f"/{platform}/{account_id}/custom-schedule")
+
+    def schedule_write(self):
+        platform, account_id = self.account(PLATFORMS)
+        queue = build_queue(self.rng, self.args.queue_size)
+        self.call("PATCH /<platform>/<id>/custom-schedule", "PATCH", f"/{platform}/{account_id}/custom-schedule",
+                  json={"custom_schedule_data": queue})
+
+    def upload(self):
+        platform, account_id = self.account(UPLOAD_PLATFORMS)
+        name = f"loadtest_{uuid.uuid4().hex}.jpg"
+        self.call("POST /upload-media", "POST", "/upload-media",
+                  files={"file": (name, os.urandom(self.args.file_kb * 1024), "image/jpeg")},
+                  data={"account_id": account_id, "platform": platform, "user_id": self.identity["user_id"],
+                        "caption": "load test", "schedule_type": "range"})
+
+    def chunked_upload(self):
+        platform, account_id = self.account(UPLOAD_PLATFORMS)
+        upload_id = uuid.uuid4().hex
+        name = f"loadtest_{upload_id}.jpg"
+        form = {"account_id": account_id, "platform": platform, "user_id": self.identity["user_id"],
+                "upload_id": upload_id, "original_name": name, "total_chunks": self.args.chunks}
+        started = time.perf_counter()
+        for chunk_index in range(self.args.chunks):
+            response = self.call("POST /upload-media-chunk", "POST", "/upload-media-chunk",
+                                 files={"chunk": (name, os.urandom(self.args.chunk_kb * 1024), "application/octet-stream")},
+                                 data=dict(form, chunk_index=chunk_index, caption="load test"))
+            if response is None or response.status_code >= 400:
+                self.record("chunked upload (end to end)", time.perf_counter() - started, False)
+                return
+        response = self.call("POST /finalize-upload", "POST", "/finalize-upload",
+                             data=dict(form, schedule_type="range", caption="load test"))
+        if response is None or response.status_code >= 400:
+            self.record("chunked upload (end to end)", time.perf_counter() - started, False)
+            return
+        status = None
+        while time.perf_counter() - started < self.args.timeout:
+            response = self.call("GET /upload-status/<id>", "GET", f"/upload-status/{upload_id}")
+            status = response.json().get('status') if response is not None and response.status_code == 200 else None
+            if status in ('completed', 'failed'):
+                break
+            time.sleep(self.args.poll_interval)
+        self.record("chunked upload (end to end)", time.perf_counter() - started, status == 'completed')
+
+    def run(self):
+        while time.monotonic() < self.deadline:
+            operation = 'login' if not self.logged_in else self.rng.choices(self.operations, self.weights)[0]
+            getattr(self, operation)()
+
+# --- Reporting ---
+def percentile(values, fraction):
+    if not values:
+        return 0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+def merge_results(per_user):
+    merged = defaultdict(lambda: {'latencies': [], 'errors': 0})
+    for results in per_user:
+        for endpoint, entry in results.items():
+            merged[endpoint]['latencies'].extend(entry['latencies'])
+            merged[endpoint]['errors'] += entry['errors']
+    return merged
+
+def print_report(results, elapsed, args, drive):
+    total = sum(len(entry['latencies']) for endpoint, entry in results.items() if not endpoint.endswith(')'))
+    errors = sum(entry['errors'] for endpoint, entry in results.items() if not endpoint.endswith(')'))
+    print("\n=== API Load Test ===")
+    print(f"Virtual users:       {args.concurrency} over {args.users} seeded users for {elapsed:.1f} s")
+    print(f"Requests:            {total} ({total / elapsed:.1f} req/s), {errors} errors "
+          f"({errors / total * 100 if total else 0:.2f}%)")
+    print(f"\n{'endpoint':<40} {'count':>7} {'req/s':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9} {'errors':>8}")
+    for endpoint, entry in sorted(results.items()):
+        latencies = entry['latencies']
+        if not latencies:
+            continue
+        print(f"{endpoint:<40} {len(latencies):>7} {len(latencies) / elapsed:>8.1f} "
+              f"{percentile(latencies, 0.5) * 1000:>9.1f} {percentile(latencies, 0.95) * 1000:>9.1f} "
+              f"{percentile(latencies, 0.99) * 1000:>9.1f} {max(latencies) * 1000:>9.1f} "
+              f"{entry['errors'] / len(latencies) * 100:>7.2f}%")
+    print()
+    drive.print_stats()
+
+# --- Main ---
+def parse_mix(mix):
+    weights = {}
+    for part in mix.split(","):
+        name, _, weight = part.partition("=")
+        if name.strip() not in OPERATIONS:
+            raise argparse.ArgumentTypeError(f"Unknown operation in --mix: {name}")
+        weights[name.strip()] = float(weight or 1)
+    return weights
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test api.py against a scratch database and a fake Google Drive")
+    parser.add_argument("--database", required=True, help="Scratch database (tables are dropped)")
+    parser.add_argument("--users", type=int, default=20, help="Seeded users, each with one account per platform")
+    parser.add_argument("--concurrency", type=int, default=10, help="Virtual users running at once")
+    parser.add_argument("--duration", type=float, default=30, help="Seconds to run")
+    parser.add_argument("--mix", type=parse_mix, default=DEFAULT_MIX, help=f"Operation weights (default {DEFAULT_MIX})")
+    parser.add_argument("--queue-size", type=int, default=10, help="Items per custom schedule written")
+    parser.add_argument("--file-kb", type=int, default=256, help="Single-file upload size")
+    parser.add_argument("--chunk-kb", type=int, default=512, help="Chunk size for chunked uploads")
+    parser.add_argument("--chunks", type=int, default=4, help="Chunks per chunked upload")
+    parser.add_argument("--drive-port", type=int, default=8089, help="Port of the fake Google Drive")
+    parser.add_argument("--drive-latency-ms", type=float, default=0, help="Latency added to every fake Drive call")
+    parser.add_argument("--drive-bandwidth-kbps", type=float, default=0, help="Fake Drive throughput, 0 = unlimited")
+    parser.add_argument("--drive-error-rate", type=float, default=0.0, help="Share of fake Drive calls failing with 503")
+    parser.add_argument("--server", choices=["gunicorn", "flask"], default="gunicorn", help="How to run api.py")
+    parser.add_argument("--gunicorn-workers", type=int, default=1)
+    parser.add_argument("--gunicorn-threads", type=int, default=16)
+    parser.add_argument("--api-port", type=int, default=5055)
+    parser.add_argument("--api-url", help="Use an already running api.py (started with GOOGLE_API_ENDPOINT "
+                                          "pointing at --drive-port) instead of starting one")
+    parser.add_argument("--api-log", default="loadtest_api_server.log", help="Where the started api.py writes its output")
+    parser.add_argument("--timeout", type=float, default=120, help="Per-request timeout and chunked upload deadline")
+    parser.add_argument("--poll-interval", type=float, default=0.2, help="Seconds between /upload-status polls")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--skip-seed", action="store_true", help="Reuse the rows from a previous run")
+    args = parser.parse_args()
+
+    if args.database == DB_CONFIG.get("database"):
+        print("ERROR: Refusing to load test against the configured DB_DATABASE; use a scratch database.")
+        sys.exit(1)
+    if args.server == 'gunicorn' and args.gunicorn_workers > 1 and args.mix.get('chunked_upload') and not args.api_url:
+        print("WARNING: Upload status lives in each worker's memory; chunked uploads may report errors "
+              "with more than one gunicorn worker.")
+    db_config = dict(DB_CONFIG, database=args.database)
+
+    drive = fake_servers.start_server('google', port=args.drive_port, latency_ms=args.drive_latency_ms,
+                                      bandwidth_kbps=args.drive_bandwidth_kbps, error_rate=args.drive_error_rate,
+                                      seed=args.seed, keep_content=False)
+    print(f"Fake Google Drive on {drive.url}")
+
+    identities = load_identities(db_config, args.users) if args.skip_seed else seed(db_config, args, drive.url)
+    if not identities:
+        print("ERROR: No seeded users found; run without --skip-seed first.")
+        sys.exit(1)
+
+    process = None
+    api_url = args.api_url
+    if not api_url:
+        process, api_url = start_api(args, args.database, drive.url)
+
+    try:
+        deadline = time.monotonic() + args.duration
+        per_user = [defaultdict(lambda: {'latencies': [], 'errors': 0}) for _ in range(args.concurrency)]
+        users = [
+            VirtualUser(i, api_url, identities[i % len(identities)], args.mix, args, deadline, per_user[i])
+            for i in range(args.concurrency)
+        ]
+        print(f"Running {args.concurrency} virtual users for {args.duration:.0f}s against {api_url}...")
+        started = time.monotonic()
+        for user in users:
+            user.start()
+        for user in users:
+            user.join()
+        elapsed = time.monotonic() - started
+    finally:
+        if process:
+            process.terminate()
+            process.wait(timeout=30)
+
+    print_report(merge_results(per_user), elapsed, args, drive)
+
+if __name__ == "__main__":
+    main()
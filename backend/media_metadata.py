@@ -0,0 +1,151 @@
+import os
+import json
+import time
+import shutil
+import hashlib
+import threading
+import ffmpeg
+from dotenv import load_dotenv
+
+# Load environment variables from .env file
+load_dotenv()
+
+# --- Configuration ---
+MEDIA_CACHE_DIR = os.getenv(
+    "MEDIA_CACHE_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "media_cache")
+)
+CAPTION_FRAME_WIDTH = 384  # BLIP resizes to 384x384, so larger frames are wasted work
+FRAME_OFFSET_SECONDS = 1
+
+# Content hashes by (path, size, mtime) so the same file is only read once per process
+_hash_memo = {}
+_hash_lock = threading.Lock()
+
+# --- Hashing ---
+def file_content_hash(path):
+    """SHA-256 of the file contents, read in 1 MB blocks and memoized per file version."""
+    stat = os.stat(path)
+    memo_key = (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+    with _hash_lock:
+        if memo_key in _hash_memo:
+            return _hash_memo[memo_key]
+
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    content_hash = digest.hexdigest()
+
+    with _hash_lock:
+        _hash_memo[memo_key] = content_hash
+    return content_hash
+
+# --- Cache Layout ---
+def _entry_dir(content_hash):
+    return os.path.join(MEDIA_CACHE_DIR, content_hash)
+
+def _write_json_atomic(path, data):
+    partial_path = f"{path}.{os.getpid()}.partial"
+    with open(partial_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f)
+    os.replace(partial_path, path)
+
+def _load_meta(content_hash):
+    meta_path = os.path.join(_entry_dir(content_hash), "meta.json")
+    if not os.path.exists(meta_path):
+        return None
+    try:
+        with open(meta_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return None
+
+# --- Probing and Frame Extraction ---
+def probe_media(path, content_hash=None):
+    """
+    Width, height, duration and codec of the first video stream.
+    ffprobe runs once per file content; later calls read meta.json.
+    """
+    content_hash = content_hash or file_content_hash(path)
+    meta = _load_meta(content_hash)
+    if meta:
+        return meta
+
+    probe = ffmpeg.probe(path)
+    video_stream = next((s for s in probe['streams'] if s['codec_type'] == 'video'), None)
+    if not video_stream:
+        raise ValueError(f"No video stream found in {os.path.basename(path)}")
+
+    meta = {
+        'content_hash': content_hash,
+        'width': int(video_stream['width']),
+        'height': int(video_stream['height']),
+        'duration': float(probe.get('format', {}).get('duration') or 0),
+        'codec': video_stream.get('codec_name')
+    }
+    os.makedirs(_entry_dir(content_hash), exist_ok=True)
+    _write_json_atomic(os.path.join(_entry_dir(content_hash), "meta.json"), meta)
+    return meta
+
+def _extract_frames(path, meta):
+    """Grab the thumbnail and the caption frame in a single ffmpeg pass."""
+    entry_dir = _entry_dir(meta['content_hash'])
+    thumbnail_path = os.path.join(entry_dir, "thumb.jpg")
+    caption_frame_path = os.path.join(entry_dir, "caption_frame.jpg")
+    if os.path.exists(thumbnail_path) and os.path.exists(caption_frame_path):
+        return thumbnail_path, caption_frame_path
+
+    # Short clips have no frame at 1s, so fall back to the middle of the clip
+    offset = FRAME_OFFSET_SECONDS
+    if meta['duration'] and meta['duration'] <= FRAME_OFFSET_SECONDS:
+        offset = meta['duration'] / 2
+
+    partial_thumb = os.path.join(entry_dir, f"thumb.{os.getpid()}.partial.jpg")
+    partial_frame = os.path.join(entry_dir, f"caption_frame.{os.getpid()}.partial.jpg")
+    split = ffmpeg.input(path, ss=offset).video.filter_multi_output('split')
+    thumb_out = split[0].output(partial_thumb, vframes=1)
+    frame_out = split[1].filter('scale', CAPTION_FRAME_WIDTH, -2).output(partial_frame, vframes=1)
+    ffmpeg.merge_outputs(thumb_out, frame_out).run(overwrite_output=True, quiet=True)
+
+    os.replace(partial_thumb, thumbnail_path)
+    os.replace(partial_frame, caption_frame_path)
+    return thumbnail_path, caption_frame_path
+
+def get_media_info(path):
+    """
+    Probe metadata plus cached thumbnail and caption frame paths for a video.
+    Every worker shares the same entry, keyed by content hash.
+    """
+    meta = dict(probe_media(path))
+    meta['thumbnail_path'], meta['caption_frame_path'] = _extract_frames(path, meta)
+    return meta
+
+def get_thumbnail(path):
+    """Cached thumbnail for a video, or None if it cannot be extracted."""
+    try:
+        return get_media_info(path)['thumbnail_path']
+    except Exception as e:
+        print(f"ERROR: Could not extract thumbnail for {os.path.basename(path)}: {str(e)}")
+        return None
+
+def get_caption_frame(path):
+    """Cached caption frame for a video, or None if it cannot be extracted."""
+    try:
+        return get_media_info(path)['caption_frame_path']
+    except Exception as e:
+        print(f"ERROR: Could not extract caption frame for {os.path.basename(path)}: {str(e)}")
+        return None
+
+def prune_cache(max_age_hours=72):
+    """Remove cache entries that have not been written for max_age_hours."""
+    if not os.path.isdir(MEDIA_CACHE_DIR):
+        return
+    cutoff = time.time() - max_age_hours * 3600
+    for entry in os.listdir(MEDIA_CACHE_DIR):
+        entry_dir = os.path.join(MEDIA_CACHE_DIR, entry)
+        try:
+            if os.path.isdir(entry_dir) and os.path.getmtime(entry_dir) < cutoff:
+                shutil.rmtree(entry_dir, ignore_errors=True)
+        except OSError:
+            pass
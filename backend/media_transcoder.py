@@ -0,0 +1,178 @@
+import os
+import json
+import time
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+import ffmpeg
+from dotenv import load_dotenv
+import media_metadata
+
+# Load environment variables from .env file
+load_dotenv()
+
+# --- Configuration ---
+TRANSCODE_CACHE_DIR = os.getenv(
+    "TRANSCODE_CACHE_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "transcode_cache")
+)
+TRANSCODE_WORKERS = int(os.getenv("TRANSCODE_WORKERS", "2"))
+TRANSCODE_CACHE_MAX_AGE_HOURS = int(os.getenv("TRANSCODE_CACHE_MAX_AGE_HOURS", "72"))
+REELS_WIDTH = 1080
+REELS_HEIGHT = 1920
+VIDEO_EXTENSIONS = ('.mp4', '.mov', '.avi', '.mkv')
+PRUNE_INTERVAL_SECONDS = 3600
+
+_executor = None
+_executor_lock = threading.Lock()
+_last_prune = 0.0
+
+# --- Cache Helpers ---
+def _cache_paths(content_hash):
+    return (
+        os.path.join(TRANSCODE_CACHE_DIR, f"{content_hash}.mp4"),
+        os.path.join(TRANSCODE_CACHE_DIR, f"{content_hash}.json")
+    )
+
+def _load_entry(content_hash):
+    video_path, meta_path = _cache_paths(content_hash)
+    if not os.path.exists(meta_path):
+        return None
+    try:
+        with open(meta_path, 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return None
+    if meta.get('normalized') and not os.path.exists(video_path):
+        return None
+    return meta
+
+def prune_cache():
+    """Remove cache entries older than TRANSCODE_CACHE_MAX_AGE_HOURS."""
+    if not os.path.isdir(TRANSCODE_CACHE_DIR):
+        return
+    cutoff = time.time() - TRANSCODE_CACHE_MAX_AGE_HOURS * 3600
+    for filename in os.listdir(TRANSCODE_CACHE_DIR):
+        path = os.path.join(TRANSCODE_CACHE_DIR, filename)
+        try:
+            if os.path.isfile(path) and os.path.getmtime(path) < cutoff:
+                os.unlink(path)
+        except OSError:
+            pass
+
+def maybe_prune_caches():
+    """
+    Prune this cache and media_metadata's at most once per PRUNE_INTERVAL_SECONDS
+    per process. Called from both the API (submit_normalize) and the posting
+    workers (prepare_for_reels), so every host that fills the caches prunes them.
+    """
+    global _last_prune
+    now = time.monotonic()
+    with _executor_lock:
+        if _last_prune and now - _last_prune < PRUNE_INTERVAL_SECONDS:
+            return
+        _last_prune = now
+    prune_cache()
+    media_metadata.prune_cache(TRANSCODE_CACHE_MAX_AGE_HOURS)
+
+# --- Transcoding ---
+def needs_normalization(meta):
+    """True unless the video is already 9:16."""
+    return abs((meta['width'] / meta['height']) - (9 / 16)) >= 0.01
+
+def normalize_video(source_path, remove_source=False):
+    """
+    Normalize a video to 1080x1920 and store it in the cache under its content hash.
+    Runs inside the process pool, so it must stay a top-level function.
+    Returns the cache metadata.
+    """
+    try:
+        content_hash = media_metadata.file_content_hash(source_path)
+        meta = _load_entry(content_hash)
+        if meta:
+            return meta
+
+        os.makedirs(TRANSCODE_CACHE_DIR, exist_ok=True)
+        video_path, meta_path = _cache_paths(content_hash)
+        meta = dict(media_metadata.probe_media(source_path, content_hash))
+        meta['normalized'] = needs_normalization(meta)
+
+        if meta['normalized']:
+            partial_path = f"{video_path}.{os.getpid()}.partial.mp4"
+            (ffmpeg.input(source_path).filter('scale', f'{REELS_WIDTH}:{REELS_HEIGHT}:force_original_aspect_ratio=decrease')
+             .filter('pad', str(REELS_WIDTH), str(REELS_HEIGHT), '(ow-iw)/2', '(oh-ih)/2', 'black')
+             .output(partial_path, vcodec='libx264', acodec='aac').run(overwrite_output=True, quiet=True))
+            os.replace(partial_path, video_path)
+
+        with open(f"{meta_path}.{os.getpid()}.partial", 'w', encoding='utf-8') as f:
+            json.dump(meta, f)
+        os.replace(f"{meta_path}.{os.getpid()}.partial", meta_path)
+        return meta
+    finally:
+        if remove_source:
+            try:
+                os.remove(source_path)
+            except OSError:
+                pass
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(
+                max_workers=TRANSCODE_WORKERS,
+                mp_context=multiprocessing.get_context('spawn')
+            )
+        return _executor
+
+def is_video_file(path):
+    return path.lower().endswith(VIDEO_EXTENSIONS)
+
+def submit_normalize(source_path, remove_source=False):
+    """
+    Queue a video for background normalization in the bounded process pool.
+    With remove_source=True the pool deletes source_path once it has been read.
+    """
+    maybe_prune_caches()
+    future = _get_executor().submit(normalize_video, source_path, remove_source)
+
+    def _report(done_future):
+        error = done_future.exception()
+        if error:
+            print(f"ERROR: Background transcode failed for {os.path.basename(source_path)}: {str(error)}")
+        else:
+            print(f"Transcode cache ready for {os.path.basename(source_path)}")
+
+    future.add_done_callback(_report)
+    return future
+
+def get_ready_path(source_path):
+    """
+    Return the ready-to-post path for a video if it is already in the cache:
+    the normalized file, or source_path itself when no re-encode was needed.
+    Returns None on a cache miss.
+    """
+    meta = _load_entry(media_metadata.file_content_hash(source_path))
+    if not meta:
+        return None
+    if meta['normalized']:
+        return _cache_paths(meta['content_hash'])[0]
+    return source_path
+
+def prepare_for_reels(source_path):
+    """
+    Ready-to-post path for a video, encoding synchronously only on a cache miss.
+    Falls back to the original file if the video cannot be normalized.
+    """
+    maybe_prune_caches()
+    try:
+        ready_path = get_ready_path(source_path)
+        if ready_path:
+            return ready_path, True
+        meta = normalize_video(source_path)
+        if meta['normalized']:
+            return _cache_paths(meta['content_hash'])[0], False
+        return source_path, False
+    except Exception as e:
+        print(f"ERROR: Failed to adjust aspect ratio for {source_path}: {str(e)}")
+        return source_path, False
@@ -0,0 +1,274 @@
+"""
+Prometheus-style metrics for the API, the scheduler and the posting workers.
+
+Counters and histograms live in a per-process registry and are rendered in
+the Prometheus text exposition format. api.py serves them at /metrics; the
+scheduler and each worker call serve(<name>) to expose them on their own
+port: METRICS_BASE_PORT + 1.. for scheduler, instagram, telegram, youtube
+and instagram_ai (the AI-caption Instagram worker), in that order, and
+METRICS_BASE_PORT + 10 + K for scheduler shard K > 0 ('scheduler_K'). They
+listen on METRICS_HOST, loopback unless it is set (e.g. to 0.0.0.0 for a
+Prometheus on another host).
+
+Database connections returned by instrument_connection() count every
+connection, query and query duration by source, and pass each statement to
+the listeners registered with add_query_listener().
+"""
+import os
+import time
+import threading
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# --- Configuration ---
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+METRICS_BASE_PORT = int(os.getenv("METRICS_BASE_PORT", "9100"))
+PROCESSES = ('scheduler', 'instagram', 'telegram', 'youtube', 'instagram_ai')
+SCHEDULER_SHARD_PORT_OFFSET = 10
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+def metrics_port(name):
+    if name.startswith('scheduler_'):
+        return METRICS_BASE_PORT + SCHEDULER_SHARD_PORT_OFFSET + int(name[len('scheduler_'):])
+    return METRICS_BASE_PORT + 1 + PROCESSES.index(name)
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+def _format_value(value):
+    if value == float('inf'):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+# --- Metric Types ---
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def _key(self, labels):
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def _header(self):
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self):
+        lines = self._header()
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}")
+        return lines
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, value, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float('inf'),)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = {"counts": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state["counts"][index] += 1
+                    break
+            state["sum"] += value
+            state["count"] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def render(self):
+        lines = self._header()
+        with self._lock:
+            for key, state in sorted(self._values.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets, state["counts"]):
+                    cumulative += count
+                    labels = _format_labels(self.labelnames, key, [("le", _format_value(bound))])
+                    lines.append(f"{self.name}_bucket{labels} {cumulative}")
+                labels = _format_labels(self.labelnames, key)
+                lines.append(f"{self.name}_sum{labels} {_format_value(state['sum'])}")
+                lines.append(f"{self.name}_count{labels} {state['count']}")
+        return lines
+
+# --- Registry ---
+_registry = {}
+_registry_lock = threading.Lock()
+
+def _register(cls, name, documentation, labelnames, **kwargs):
+    with _registry_lock:
+        metric = _registry.get(name)
+        if metric is None:
+            metric = _registry[name] = cls(name, documentation, labelnames, **kwargs)
+        return metric
+
+def counter(name, documentation, labelnames=()):
+    return _register(Counter, name, documentation, labelnames)
+
+def gauge(name, documentation, labelnames=()):
+    return _register(Gauge, name, documentation, labelnames)
+
+def histogram(name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+    return _register(Histogram, name, documentation, labelnames, buckets=buckets)
+
+def render():
+    with _registry_lock:
+        metrics = list(_registry.values())
+    lines = []
+    for metric in metrics:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+# --- Shared Metrics ---
+DB_CONNECTIONS = counter("db_connections_total", "MySQL connections opened", ["source"])
+DB_QUERIES = counter("db_queries_total", "SQL statements executed", ["source"])
+DB_QUERY_SECONDS = histogram("db_query_duration_seconds", "Time spent executing SQL statements", ["source"])
+POSTS = counter("posts_total", "Posting attempts by outcome", ["platform", "result"])
+POST_LATENESS = histogram("post_lateness_seconds", "Delay between next_post_time and the worker starting the post",
+                          ["platform"], buckets=(0.1, 0.5, 1, 2, 5, 10, 30, 60, 300, 900, 3600))
+CAPTION_SECONDS = histogram("caption_inference_seconds", "Time to produce a caption, cache hits included", ["source"])
+
+# --- Database Instrumentation ---
+_query_listeners = []
+
+def add_query_listener(listener):
+    """
+    Call listener(source, statement, params, seconds) after every instrumented
+    query, failed ones included. Exceptions from a listener are logged and
+    swallowed.
+    """
+    _query_listeners.append(listener)
+
+class CountingCursor:
+    """Cursor proxy that records every execute/executemany."""
+
+    def __init__(self, cursor, source):
+        self._cursor = cursor
+        self._source = source
+
+    def _timed(self, method, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return method(*args, **kwargs)
+        finally:
+            elapsed = time.perf_counter() - started
+            DB_QUERIES.inc(source=self._source)
+            DB_QUERY_SECONDS.observe(elapsed, source=self._source)
+            if _query_listeners:
+                statement = args[0] if args else kwargs.get('operation')
+                params = args[1] if len(args) > 1 else kwargs.get('params') or kwargs.get('seq_params')
+                for listener in _query_listeners:
+                    # A broken listener must not replace the query's own result or DB error
+                    try:
+                        listener(self._source, statement, params, elapsed)
+                    except Exception as e:
+                        print(f"WARNING: Query listener {getattr(listener, '__name__', listener)} failed: {str(e)}")
+
+    def execute(self, *args, **kwargs):
+        return self._timed(self._cursor.execute, *args, **kwargs)
+
+    def executemany(self, *args, **kwargs):
+        return self._timed(self._cursor.executemany, *args, **kwargs)
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self._cursor.close()
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+class CountingConnection:
+    """Connection proxy whose cursors are CountingCursors."""
+
+    def __init__(self, conn, source):
+        self._conn = conn
+        self._source = source
+
+    def cursor(self, *args, **kwargs):
+        return CountingCursor(self._conn.cursor(*args, **kwargs), self._source)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self._conn.close()
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+def instrument_connection(conn, source):
+    """Count a newly opened connection and wrap it so its queries are counted too."""
+    if conn is None:
+        return None
+    DB_CONNECTIONS.inc(source=source)
+    return CountingConnection(conn, source)
+
+# --- HTTP Exposition ---
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split('?')[0] not in ('/', '/metrics'):
+            self.send_error(404)
+            return
+        body = render().encode('utf-8')
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+def serve(name):
+    """Expose this process's metrics on its port in a daemon thread. Returns the server, or None."""
+    try:
+        server = ThreadingHTTPServer((METRICS_HOST, metrics_port(name)), _MetricsHandler)
+    except OSError as e:
+        print(f"WARNING: Metrics port for {name} unavailable: {str(e)}")
+        return None
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name=f"{name}-metrics", daemon=True).start()
+    print(f"Metrics for {name} on port {metrics_port(name)}")
+    return server
@@ -0,0 +1,196 @@
+"""
+One-time passwords for the password-reset and profile-update flows.
+
+OTPs live in the otp_codes table instead of process memory, so a verify
+request can land on a different gunicorn worker than the send request, and
+nothing accumulates: rows expire after OTP_TTL_SECONDS, are deleted when
+found expired, and are swept in bulk through the expires_at index. Lookups
+go through the (purpose, email) primary key. Expiry uses the database clock
+so workers on different hosts agree. Every check first claims one of
+OTP_MAX_ATTEMPTS atomically in the database and only then compares the
+code, so concurrent guesses cannot get past the limit.
+"""
+import os
+import json
+import time
+import hashlib
+import hmac
+import threading
+import mysql.connector
+from dotenv import load_dotenv
+from api_common import get_db_connection
+
+# Load environment variables from .env file
+load_dotenv()
+
+# --- Configuration ---
+TTL_SECONDS = int(os.getenv("OTP_TTL_SECONDS", "600"))
+MAX_ATTEMPTS = int(os.getenv("OTP_MAX_ATTEMPTS", "5"))
+SWEEP_INTERVAL_SECONDS = 60
+SWEEP_BATCH = 1000
+
+_table_ready = False
+_last_sweep = 0.0
+_lock = threading.Lock()
+
+# --- Table ---
+def ensure_otp_table(cursor):
+    """Create the OTP table if it does not exist."""
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS otp_codes (
+            purpose VARCHAR(32) NOT NULL,
+            email VARCHAR(255) NOT NULL,
+            otp_hash CHAR(64) NOT NULL,
+            data TEXT,
+            attempts INT NOT NULL DEFAULT 0,
+            verified TINYINT(1) NOT NULL DEFAULT 0,
+            expires_at DATETIME NOT NULL,
+            PRIMARY KEY (purpose, email),
+            INDEX idx_otp_codes_expires_at (expires_at)
+        )
+    """)
+
+def _connect():
+    """Connection with the table in place (created once per process)."""
+    global _table_ready
+    conn = get_db_connection()
+    if conn and not _table_ready:
+        with _lock:
+            if not _table_ready:
+                cursor = conn.cursor()
+                ensure_otp_table(cursor)
+                cursor.close()
+                _table_ready = True
+    return conn
+
+def hash_otp(otp):
+    return hashlib.sha256(str(otp).encode('utf-8')).hexdigest()
+
+def matches(entry, otp):
+    """Constant-time comparison of a submitted OTP against a stored entry."""
+    return hmac.compare_digest(entry['otp_hash'], hash_otp(otp))
+
+# --- Store Operations ---
+def save(purpose, email, otp, **data):
+    """Store a fresh OTP for (purpose, email), replacing any earlier one and resetting its attempts."""
+    conn = _connect()
+    if not conn:
+        raise mysql.connector.Error("Database connection failed")
+    try:
+        cursor = conn.cursor()
+        cursor.execute("""
+            INSERT INTO otp_codes (purpose, email, otp_hash, data, attempts, verified, expires_at)
+            VALUES (%s, %s, %s, %s, 0, 0, NOW() + INTERVAL %s SECOND)
+            ON DUPLICATE KEY UPDATE otp_hash = VALUES(otp_hash), data = VALUES(data), attempts = 0,
+                                    verified = 0, expires_at = VALUES(expires_at)
+        """, (purpose, email, hash_otp(otp), json.dumps(data), TTL_SECONDS))
+        maybe_sweep(cursor)
+        conn.commit()
+        cursor.close()
+    finally:
+        conn.close()
+
+def _fetch(conn, purpose, email):
+    cursor = conn.cursor(dictionary=True)
+    cursor.execute("""
+        SELECT otp_hash, data, attempts, verified, expires_at <= NOW() AS expired
+        FROM otp_codes WHERE purpose = %s AND email = %s
+    """, (purpose, email))
+    entry = cursor.fetchone()
+    cursor.close()
+    if not entry:
+        return None
+    entry['data'] = json.loads(entry['data'] or '{}')
+    entry['verified'] = bool(entry['verified'])
+    entry['expired'] = bool(entry['expired'])
+    return entry
+
+def get(purpose, email):
+    """
+    The stored entry for (purpose, email) as a dict (otp_hash, data, attempts,
+    verified, expired), or None if there is none.
+    """
+    conn = _connect()
+    if not conn:
+        raise mysql.connector.Error("Database connection failed")
+    try:
+        return _fetch(conn, purpose, email)
+    finally:
+        conn.close()
+
+def _execute(query, params):
+    conn = _connect()
+    if not conn:
+        raise mysql.connector.Error("Database connection failed")
+    try:
+        cursor = conn.cursor()
+        cursor.execute(query, params)
+        conn.commit()
+        rowcount = cursor.rowcount
+        cursor.close()
+        return rowcount
+    finally:
+        conn.close()
+
+def claim_attempt(purpose, email):
+    """
+    Count one attempt at the OTP before it is compared. Returns (status, entry):
+    'ok' with the entry (as from get()) when an attempt was claimed, otherwise
+    'missing', 'expired' or 'exhausted' (a new OTP must be requested).
+    """
+    conn = _connect()
+    if not conn:
+        raise mysql.connector.Error("Database connection failed")
+    try:
+        cursor = conn.cursor()
+        # The guard is evaluated per row by MySQL, so no two requests can claim the last attempt
+        cursor.execute("""
+            UPDATE otp_codes SET attempts = attempts + 1
+            WHERE purpose = %s AND email = %s AND attempts < %s AND expires_at > NOW()
+        """, (purpose, email, MAX_ATTEMPTS))
+        claimed = cursor.rowcount == 1
+        conn.commit()
+        cursor.close()
+        entry = _fetch(conn, purpose, email)
+        if not entry:
+            return 'missing', None
+        if claimed:
+            return 'ok', entry
+        if entry['expired']:
+            cursor = conn.cursor()
+            cursor.execute("DELETE FROM otp_codes WHERE purpose = %s AND email = %s", (purpose, email))
+            conn.commit()
+            cursor.close()
+            return 'expired', entry
+        # Kept until it expires, so further guesses keep getting 'exhausted'
+        return 'exhausted', entry
+    finally:
+        conn.close()
+
+def mark_verified(purpose, email):
+    _execute("UPDATE otp_codes SET verified = 1 WHERE purpose = %s AND email = %s", (purpose, email))
+
+def delete(purpose, email):
+    _execute("DELETE FROM otp_codes WHERE purpose = %s AND email = %s", (purpose, email))
+
+# --- Expiry Sweep ---
+def sweep(cursor):
+    """Delete expired OTPs in batches through the expires_at index. Returns rows removed."""
+    removed = 0
+    while True:
+        cursor.execute("DELETE FROM otp_codes WHERE expires_at <= NOW() LIMIT %s", (SWEEP_BATCH,))
+        removed += cursor.rowcount
+        if cursor.rowcount < SWEEP_BATCH:
+            return removed
+
+def maybe_sweep(cursor):
+    """Run sweep() at most once per SWEEP_INTERVAL_SECONDS in this process."""
+    global _last_sweep
+    now = time.monotonic()
+    with _lock:
+        if now - _last_sweep < SWEEP_INTERVAL_SECONDS:
+            return
+        _last_sweep = now
+    removed = sweep(cursor)
+    if removed:
+        print(f"🧹 Swept {removed} expired OTP(s)")
@@ -0,0 +1,251 @@
+"""
+Posting governor: token buckets per account and per platform, plus a daily
+YouTube Data API quota ledger per Google Cloud project.
+
+Workers call acquire() once a post is due and before claiming its media. If
+a bucket is empty or the project's quota would be exceeded, nothing is
+consumed and the worker calls defer() to move the account's next_post_time
+to the moment a token (or the quota reset) is available, so other accounts
+keep posting in the meantime. defer() also sets deferred_until, which the
+scheduler treats as the earliest time it may schedule the account, so a
+deferral into the next day is not replaced by one of today's slots. It is
+the only writer of deferred_until; the scheduler clears it once it has
+passed and the workers clear it after a successful post. Quota
+reserved for an upload that did not complete is given back with
+refund_quota().
+
+Limits can be overridden per platform with environment variables, e.g.
+GOVERNOR_INSTAGRAM_ACCOUNT_BURST=2 or GOVERNOR_INSTAGRAM_ACCOUNT_INTERVAL_SECONDS=5400.
+"""
+import os
+from datetime import datetime, timedelta
+import pytz
+import mysql.connector
+from dotenv import load_dotenv
+
+# Load environment variables from .env file
+load_dotenv()
+
+# --- Configuration ---
+DB_CONFIG = {
+    "host": os.getenv("DB_HOST"),
+    "database": os.getenv("DB_DATABASE"),
+    "user": os.getenv("DB_USER"),
+    "password": os.getenv("DB_PASSWORD"),
+    "port": int(os.getenv("DB_PORT"))
+}
+TIMEZONE = pytz.timezone('Asia/Kolkata')
+# YouTube quota days reset at midnight Pacific time
+QUOTA_TIMEZONE = pytz.timezone('America/Los_Angeles')
+
+# (burst, seconds per token) for each account and for the platform as a whole; None = no bucket
+DEFAULT_LIMITS = {
+    # Content publishing allows 25 posts per account per 24h; stay just under it
+    'instagram': {'account': (3, 3600), 'platform': (10, 120)},
+    # Bots may send about 20 messages a minute to one channel and 30 a second overall
+    'telegram': {'account': (20, 3), 'platform': (30, 1 / 30)},
+    # Uploads are bounded by the project quota below; the bucket only spreads them out
+    'youtube': {'account': (3, 4 * 3600), 'platform': None},
+}
+
+YOUTUBE_QUOTA_PROJECT = os.getenv("GOOGLE_PROJECT_ID") or "default"
+YOUTUBE_DAILY_QUOTA = int(os.getenv("YOUTUBE_DAILY_QUOTA", "10000"))
+QUOTA_COSTS = {
+    "videos.insert": 1600,
+    "channels.list": 1,
+}
+# Every upload verifies the channel and then inserts the video
+YOUTUBE_UPLOAD_COST = QUOTA_COSTS["videos.insert"] + QUOTA_COSTS["channels.list"]
+
+_tables_ready = False
+
+def get_limit(platform, scope):
+    default = DEFAULT_LIMITS.get(platform, {}).get(scope)
+    prefix = f"GOVERNOR_{platform.upper()}_{scope.upper()}"
+    burst = os.getenv(f"{prefix}_BURST")
+    interval = os.getenv(f"{prefix}_INTERVAL_SECONDS")
+    if burst is None and interval is None:
+        return default
+    default_burst, default_interval = default or (1, 0)
+    return (int(burst) if burst else default_burst, float(interval) if interval else default_interval)
+
+# --- Database Functions ---
+def get_db_connection():
+    try:
+        return mysql.connector.connect(**DB_CONFIG)
+    except mysql.connector.Error as e:
+        print(f"ERROR: Database connection failed: {str(e)}")
+        return None
+
+def ensure_governor_tables(cursor):
+    global _tables_ready
+    if _tables_ready:
+        return
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS rate_buckets (
+            bucket_key VARCHAR(100) NOT NULL PRIMARY KEY,
+            tokens DOUBLE NOT NULL,
+            updated_at DATETIME(6) NOT NULL
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS api_quota_ledger (
+            project VARCHAR(100) NOT NULL,
+            quota_date DATE NOT NULL,
+            units_used INT NOT NULL DEFAULT 0,
+            PRIMARY KEY (project, quota_date)
+        )
+    """)
+    _tables_ready = True
+
+def quota_date(now=None):
+    now = now or datetime.now(TIMEZONE)
+    return now.astimezone(QUOTA_TIMEZONE).date()
+
+def next_quota_reset(now=None):
+    """Next Pacific midnight, as a naive Asia/Kolkata datetime like the DB columns."""
+    now = now or datetime.now(TIMEZONE)
+    midnight = QUOTA_TIMEZONE.localize(datetime.combine(quota_date(now) + timedelta(days=1), datetime.min.time()))
+    return midnight.astimezone(TIMEZONE).replace(tzinfo=None)
+
+# --- Governor ---
+def _bucket_specs(platform, account_id):
+    specs = []
+    for scope, key in (('account', f"{platform}:account:{account_id}"), ('platform', f"{platform}:platform")):
+        limit = get_limit(platform, scope)
+        if limit:
+            specs.append((key, limit[0], limit[1]))
+    return specs
+
+def acquire(platform, account_id, quota_units=0, project=YOUTUBE_QUOTA_PROJECT):
+    """
+    Take one token from each of the account's and platform's buckets and reserve
+    quota_units of the project's daily quota, all or nothing.
+    Returns (allowed, retry_at, reason); retry_at is a naive Asia/Kolkata datetime.
+    Fails open if the database is unreachable.
+    """
+    conn = get_db_connection()
+    if not conn:
+        return True, None, None
+    now = datetime.now(TIMEZONE).replace(tzinfo=None)
+    specs = _bucket_specs(platform, account_id)
+    try:
+        cursor = conn.cursor()
+        ensure_governor_tables(cursor)
+        if specs:
+            cursor.executemany(
+                "INSERT IGNORE INTO rate_buckets (bucket_key, tokens, updated_at) VALUES (%s, %s, %s)",
+                [(key, burst, now) for key, burst, _ in specs]
+            )
+            placeholders = ", ".join(["%s"] * len(specs))
+            cursor.execute(
+                f"SELECT bucket_key, tokens, updated_at FROM rate_buckets WHERE bucket_key IN ({placeholders}) FOR UPDATE",
+                tuple(key for key, _, _ in specs)
+            )
+            stored = {key: (tokens, updated_at) for key, tokens, updated_at in cursor.fetchall()}
+
+        waits = []
+        refilled = {}
+        for key, burst, interval in specs:
+            tokens, updated_at = stored[key]
+            if interval > 0:
+                tokens = min(burst, tokens + max((now - updated_at).total_seconds(), 0) / interval)
+            else:
+                tokens = burst
+            refilled[key] = tokens
+            if tokens < 1:
+                waits.append((now + timedelta(seconds=(1 - tokens) * interval), f"{key} rate limit"))
+
+        if quota_units:
+            day = quota_date()
+            cursor.execute(
+                "INSERT IGNORE INTO api_quota_ledger (project, quota_date, units_used) VALUES (%s, %s, 0)",
+                (project, day)
+            )
+            cursor.execute(
+                "SELECT units_used FROM api_quota_ledger WHERE project = %s AND quota_date = %s FOR UPDATE",
+                (project, day)
+            )
+            units_used = cursor.fetchone()[0]
+            if units_used + quota_units > YOUTUBE_DAILY_QUOTA:
+                waits.append((next_quota_reset(), f"{project} quota ({units_used}/{YOUTUBE_DAILY_QUOTA} units used)"))
+
+        if waits:
+            conn.rollback()
+            retry_at, reason = max(waits)
+            return False, retry_at, reason
+
+        cursor.executemany(
+            "UPDATE rate_buckets SET tokens = %s, updated_at = %s WHERE bucket_key = %s",
+            [(refilled[key] - 1, now, key) for key, _, _ in specs]
+        )
+        if quota_units:
+            cursor.execute(
+                "UPDATE api_quota_ledger SET units_used = units_used + %s WHERE project = %s AND quota_date = %s",
+                (quota_units, project, quota_date())
+            )
+        conn.commit()
+        cursor.close()
+        return True, None, None
+    except mysql.connector.Error as e:
+        print(f"WARNING: Posting governor unavailable, allowing post: {str(e)}")
+        return True, None, None
+    finally:
+        conn.close()
+
+def charge_quota(units, project=YOUTUBE_QUOTA_PROJECT):
+    """Record quota spent outside a reservation, e.g. a restarted upload session."""
+    conn = get_db_connection()
+    if not conn:
+        return
+    try:
+        cursor = conn.cursor()
+        ensure_governor_tables(cursor)
+        cursor.execute("""
+            INSERT INTO api_quota_ledger (project, quota_date, units_used) VALUES (%s, %s, %s)
+            ON DUPLICATE KEY UPDATE units_used = units_used + VALUES(units_used)
+        """, (project, quota_date(), units))
+        conn.commit()
+        cursor.close()
+    except mysql.connector.Error as e:
+        print(f"WARNING: Could not record {units} quota units: {str(e)}")
+    finally:
+        conn.close()
+
+def refund_quota(units, project=YOUTUBE_QUOTA_PROJECT):
+    """Give back quota reserved by acquire() for a call that was never made or did not complete."""
+    conn = get_db_connection()
+    if not conn:
+        return
+    try:
+        cursor = conn.cursor()
+        ensure_governor_tables(cursor)
+        cursor.execute("""
+            UPDATE api_quota_ledger SET units_used = GREATEST(units_used - %s, 0)
+            WHERE project = %s AND quota_date = %s
+        """, (units, project, quota_date()))
+        conn.commit()
+        cursor.close()
+    except mysql.connector.Error as e:
+        print(f"WARNING: Could not refund {units} quota units: {str(e)}")
+    finally:
+        conn.close()
+
+def defer(platform, account_id, retry_at):
+    """
+    Push the account's next_post_time back to retry_at so the worker moves on to
+    other accounts; deferred_until keeps the scheduler from moving it earlier.
+    """
+    conn = get_db_connection()
+    if not conn:
+        return
+    try:
+        cursor = conn.cursor()
+        cursor.execute(f"UPDATE {platform} SET next_post_time = %s, deferred_until = %s WHERE id = %s",
+                       (retry_at, retry_at, account_id))
+        conn.commit()
+        cursor.close()
+    except mysql.connector.Error as e:
+        print(f"ERROR: Could not defer {platform} account {account_id}: {str(e)}")
+    finally:
+        conn.close()
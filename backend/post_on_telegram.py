@@ -1,14 +1,11 @@
 import os
-import sys
 import json
 import re
-from time import sleep
 from google.oauth2.credentials import Credentials
 from google_auth_oauthlib.flow import InstalledAppFlow
-from googleapiclient.discovery import build
 from googleapiclient.http import MediaIoBaseDownload
 import io
-from datetime import datetime, timedelta
+from datetime import datetime
 import pytz
 import mysql.connector
 from google.auth.transport.requests import Request
@@ -17,6 +14,13 @@ from telegram.error import TelegramError
 import asyncio
 import subprocess
 from dotenv import load_dotenv
+import slot_table
+import wake_timer
+import post_governor
+import retry_queue
+import metrics
+import tracing
+import google_clients
 
 # Load environment variables from .env file
 load_dotenv()
@@ -24,6 +28,8 @@ load_dotenv()
 # --- Configuration ---
 TEMP_FOLDER = "temp_telegram"
 BOT_TOKEN = '7763155216:AAGcbS81suUb5lMCVqg--fhhJJf8YNens8w'
+# Bot API base URL override, e.g. the fake server from fake_servers.py
+TELEGRAM_API_ENDPOINT = os.getenv("TELEGRAM_API_ENDPOINT")
 SCOPES = ['https://www.googleapis.com/auth/drive']
 
 # Database configuration from environment variables
@@ -34,10 +40,7 @@ DB_CONFIG = {
     "password": os.getenv("DB_PASSWORD"),
     "port": int(os.getenv("DB_PORT"))
 }
-ACTIVE_COUNTDOWN_SECONDS = 1*60
 IDLE_SLEEP_MINUTES = 0.3
-RESCHEDULE_THRESHOLD_MINUTES = 15
-over_time = 1
 
 # In-memory cache for credentials
 _credentials_cache = {}
@@ -69,25 +72,30 @@ def print_countdown(message):
 # --- Database Functions ---
 def get_db_connection():
     try:
-        return mysql.connector.connect(**DB_CONFIG)
+        return metrics.instrument_connection(mysql.connector.connect(**DB_CONFIG), 'telegram')
     except mysql.connector.Error as e:
         print_error(f"Database connection failed: {str(e)}")
         return None
 
+# The channel the worker claims next; the schedule watcher waits on this same row
+NEXT_CHANNEL_SQL = """
+    FROM telegram t
+    WHERE t.selected = 'Yes' AND t.done = 'No' AND t.posts_left > 0 AND t.next_post_time IS NOT NULL
+    ORDER BY t.next_post_time ASC
+    LIMIT 1
+"""
+
 def get_next_scheduled_channel():
     conn = get_db_connection()
     if not conn:
         return None
     cursor = conn.cursor(dictionary=True)
-    query = """
+    query = f"""
         SELECT 
             t.id, t.channel_name, t.token_sesson, t.token_drive, 
             t.google_drive_link, t.next_post_time, t.posts_left,
             t.custom_schedule_data, t.post_daily_range_left
-        FROM telegram t
-        WHERE t.selected = 'Yes' AND t.done = 'No' AND t.posts_left > 0 AND t.next_post_time IS NOT NULL
-        ORDER BY t.next_post_time ASC
-        LIMIT 1
+        {NEXT_CHANNEL_SQL}
     """
     cursor.execute(query)
     channel = cursor.fetchone()
@@ -139,6 +147,13 @@ def get_scheduled_media_for_telegram(channel_id):
         next_post_time = result['next_post_time']
         
         print(f"  Debug: Looking for scheduled media. Next post time: {next_post_time}")
+
+        # Failed posts whose retry time has come go first; items still backing off are never claimed
+        retry_media = retry_queue.next_due_retry(schedule_data, now)
+        if retry_media:
+            print(f"  Debug: Retrying failed post: {retry_media.get('media_name')} (attempt {retry_media.get('attempts', 0) + 1})")
+            return retry_media
+        schedule_data = [media for media in schedule_data if not retry_queue.is_backing_off(media, now)]
         
         # If we have a next_post_time, find which media matches it
         if next_post_time:
@@ -204,9 +219,11 @@ def update_channel_after_post(channel_id, media_file_id):
         
         # Update the specific media status to 'completed'
         schedule_data = json.loads(result['custom_schedule_data']) if result['custom_schedule_data'] else []
+        uses_slot = False
         for media in schedule_data:
             if media.get('file_id') == media_file_id:
                 media['status'] = 'completed'
+                uses_slot = slot_table.consumes_slot(media)
                 break
         
         # Update counters
@@ -222,7 +239,8 @@ def update_channel_after_post(channel_id, media_file_id):
                 post_daily_range_left = %s,
                 selected = 'No', 
                 done = %s, 
-                next_post_time = NULL 
+                next_post_time = NULL,
+                deferred_until = NULL
             WHERE id = %s
         """
         cursor.execute(update_query, (
@@ -232,6 +250,10 @@ def update_channel_after_post(channel_id, media_file_id):
             done_status, 
             channel_id
         ))
+
+        # Range posts consume the next slot of today's timetable (retries do not)
+        if uses_slot:
+            slot_table.pop_slot(cursor, 'telegram', channel_id)
         
         conn.commit()
         cursor.close()
@@ -329,7 +351,7 @@ def get_drive_credentials(channel, max_retries=3):
             except Exception as e:
                 print_warning(f"Token refresh failed (attempt {attempt + 1}/{max_retries}): {str(e)}")
                 if attempt < max_retries - 1:
-                    sleep(5)
+                    tracing.sleep(5)
                 else:
                     print_error("Max refresh attempts reached")
                     creds = None
@@ -364,7 +386,7 @@ def extract_folder_id(drive_link):
     return None
 
 def create_telegram_feed_folder(creds, channel_name):
-    drive_service = build('drive', 'v3', credentials=creds)
+    drive_service = google_clients.get_service('drive', 'v3', creds)
     folder_name = f"telegram_{channel_name}"
     query = f"name = '{folder_name}' and mimeType = 'application/vnd.google-apps.folder' and 'root' in parents"
     results = drive_service.files().list(q=query, fields="files(id, name)").execute()
@@ -410,7 +432,7 @@ def get_drive_folder_id(creds, channel):
         folder_id = extract_folder_id(drive_link)
         if folder_id:
             try:
-                drive_service = build('drive', 'v3', credentials=creds)
+                drive_service = google_clients.get_service('drive', 'v3', creds)
                 drive_service.files().get(fileId=folder_id, fields='id').execute()
                 print_info("Using existing Drive folder")
                 if conn:
@@ -437,7 +459,7 @@ def download_specific_media(creds, file_id, media_name):
     local_path = os.path.join(TEMP_FOLDER, media_name)
     
     try:
-        drive_service = build('drive', 'v3', credentials=creds)
+        drive_service = google_clients.get_service('drive', 'v3', creds)
         request = drive_service.files().get_media(fileId=file_id)
         fh = io.FileIO(local_path, 'wb')
         downloader = MediaIoBaseDownload(fh, request)
@@ -453,7 +475,7 @@ def download_specific_media(creds, file_id, media_name):
 def delete_file_from_drive(file_id, creds):
     """Delete a file from Google Drive with proper permissions"""
     try:
-        drive_service = build('drive', 'v3', credentials=creds)
+        drive_service = google_clients.get_service('drive', 'v3', creds)
         
         # FIX: First try to get the file to verify permissions
         try:
@@ -486,7 +508,7 @@ def cleanup_temp_folder():
                 break
             except Exception as e:
                 if attempt < max_attempts - 1:
-                    sleep(3)
+                    tracing.sleep(3)
                 else:
                     print_warning(f"Could not delete: {filename}")
 
@@ -500,7 +522,10 @@ def make_aware(dt):
 
 async def send_file_to_channel(file_path, channel_id, caption=None):
     try:
-        bot = Bot(token=BOT_TOKEN)
+        if TELEGRAM_API_ENDPOINT:
+            bot = Bot(token=BOT_TOKEN, base_url=f"{TELEGRAM_API_ENDPOINT.rstrip('/')}/bot")
+        else:
+            bot = Bot(token=BOT_TOKEN)
         file_title = caption or os.path.splitext(os.path.basename(file_path))[0]
         
         print_step(f"Sending to Telegram...")
@@ -539,37 +564,28 @@ async def process_channel(channel):
 
     channel_name, channel_id = get_channel_details(channel)
     if not channel_name or not channel_id:
-        print_error("Invalid channel details")
-        # Skip this channel
-        conn = get_db_connection()
-        if conn:
-            cursor = conn.cursor()
-            cursor.execute("UPDATE telegram SET selected = 'No' WHERE id = %s", (channel['id'],))
-            conn.commit()
-            cursor.close()
-            conn.close()
+        print_error("Invalid channel details - scheduling a retry")
+        retry_queue.record_account_failure('telegram', channel['id'], "invalid channel details")
+        metrics.POSTS.inc(platform='telegram', result='failed')
         cleanup_temp_folder()
         return
 
-    creds = get_drive_credentials(channel)
+    with tracing.span('drive_credentials'):
+        creds = get_drive_credentials(channel)
     if not creds:
-        print_error("Drive credentials unavailable")
-        # Skip this channel
-        conn = get_db_connection()
-        if conn:
-            cursor = conn.cursor()
-            cursor.execute("UPDATE telegram SET selected = 'No' WHERE id = %s", (channel['id'],))
-            conn.commit()
-            cursor.close()
-            conn.close()
+        print_error("Drive credentials unavailable - scheduling a retry")
+        retry_queue.record_account_failure('telegram', channel['id'], "drive credentials unavailable")
+        metrics.POSTS.inc(platform='telegram', result='failed')
         cleanup_temp_folder()
         return
 
     # DEBUG: See what's scheduled
-    debug_schedule_data_telegram(channel['id'])
+    with tracing.span('debug_schedule_data'):
+        debug_schedule_data_telegram(channel['id'])
 
     # Get the SPECIFIC scheduled media to post (NEW!)
-    scheduled_media = get_scheduled_media_for_telegram(channel['id'])
+    with tracing.span('get_scheduled_media'):
+        scheduled_media = get_scheduled_media_for_telegram(channel['id'])
     if not scheduled_media:
         print_error("No scheduled media found for this channel")
         # Skip this channel
@@ -586,36 +602,47 @@ async def process_channel(channel):
     print_success(f"Scheduled media: {scheduled_media.get('media_name', 'Unknown')}")
 
     # Download the specific scheduled media
-    media_to_post = download_specific_media(
-        creds, 
-        scheduled_media['file_id'], 
-        scheduled_media['media_name']
-    )
+    with tracing.span('download'):
+        media_to_post = download_specific_media(
+            creds, 
+            scheduled_media['file_id'], 
+            scheduled_media['media_name']
+        )
     
     if not media_to_post:
         print_error("Failed to download scheduled media")
+        retry_queue.record_failure('telegram', channel['id'], scheduled_media['file_id'], "download failed")
+        metrics.POSTS.inc(platform='telegram', result='failed')
         cleanup_temp_folder()
         return
 
     # Use media-specific caption if available
     media_caption = scheduled_media.get('caption')
 
-    if await send_file_to_channel(media_to_post, channel_id, caption=media_caption):
+    with tracing.span('send_file'):
+        posted = await send_file_to_channel(media_to_post, channel_id, caption=media_caption)
+    if posted:
         # Delete from Google Drive after successful posting
         print_header("Cleanup")
         if scheduled_media.get('file_id'):
             print_step("Removing file from Google Drive...")
-            if delete_file_from_drive(scheduled_media['file_id'], creds):
+            with tracing.span('drive_delete'):
+                deleted = delete_file_from_drive(scheduled_media['file_id'], creds)
+            if deleted:
                 print_success("File removed from Drive")
             else:
                 print_warning("File posted but could not delete from Drive")
                 print_info("Check folder permissions in Google Drive")
         
         # Update database with specific media info (NEW!)
-        update_channel_after_post(channel['id'], scheduled_media['file_id'])
+        with tracing.span('update_channel_after_post'):
+            update_channel_after_post(channel['id'], scheduled_media['file_id'])
+        metrics.POSTS.inc(platform='telegram', result='posted')
     else:
         print_error("Post failed - keeping files in Drive")
-        # Do not update database on failure, and don't delete from Drive
+        # Keep the Drive file and schedule a retry instead of marking it posted
+        retry_queue.record_failure('telegram', channel['id'], scheduled_media['file_id'], "send failed")
+        metrics.POSTS.inc(platform='telegram', result='failed')
     
     cleanup_temp_folder()
 
@@ -628,12 +655,16 @@ async def main():
         os.makedirs(TEMP_FOLDER)
         print_success(f"Created temp folder: {TEMP_FOLDER}")
 
+    metrics.serve('telegram')
+    schedule_watcher = wake_timer.ScheduleWatcher(get_db_connection, 'telegram',
+                                                  f"SELECT t.next_post_time {NEXT_CHANNEL_SQL}").start()
+
     while True:
         channel = get_next_scheduled_channel()
 
         if not channel:
             print_info(f"No channels scheduled. Checking again in {IDLE_SLEEP_MINUTES} minutes...")
-            await asyncio.sleep(IDLE_SLEEP_MINUTES * 60)
+            await asyncio.to_thread(schedule_watcher.wait_for_change, IDLE_SLEEP_MINUTES * 60)
             subprocess.run(["python", os.path.join(os.path.dirname(__file__), "scheduler_combined.py")])
             continue
 
@@ -641,49 +672,35 @@ async def main():
         print(f"📢 Channel: {channel['channel_name']}")
         print(f"⏰ Time: {channel['next_post_time'].strftime('%Y-%m-%d %H:%M:%S %Z')}")
 
-        # Countdown logic
-        while True:
-            IST_OFFSET = timedelta(hours=5, minutes=30)
-            incorrect_local_time = channel['next_post_time']
-            corrected_utc_time = incorrect_local_time - IST_OFFSET
-            next_post_time_aware = pytz.utc.localize(corrected_utc_time)
-            now_aware = datetime.now(pytz.utc)
-            wait_seconds = (next_post_time_aware - now_aware).total_seconds()
-
-            if wait_seconds <= 0:
-                print_success("Time to post!")
-                break
-
-            if wait_seconds > RESCHEDULE_THRESHOLD_MINUTES * 60:
-                minutes, seconds = divmod(int(wait_seconds), 60)
-                print_warning(f"Post in {minutes}m {seconds}s - Running scheduler...")
-                await asyncio.sleep(over_time * 60)
-                try:
-                    subprocess.run(["python", os.path.join(os.path.dirname(__file__), "scheduler_combined.py")])
-                    print_success("Scheduler updated")
-                except subprocess.CalledProcessError as e:
-                    print_error(f"Scheduler failed: {str(e)}")
-                print_info("Restarting Telegram poster...")
-                os.execv(sys.executable, [sys.executable] + sys.argv)
-            elif wait_seconds > ACTIVE_COUNTDOWN_SECONDS*60:
-                minutes, seconds = divmod(int(wait_seconds), 60)
-                print_countdown(f"Next post in {minutes}m {seconds}s - Monitoring...")
-                await asyncio.sleep(1)
-            else:
-                minutes, seconds = divmod(int(wait_seconds), 60)
-                print_countdown(f"Posting in {minutes}m {seconds}s...")
-                await asyncio.sleep(1)
+        # Sleep until the post is due; the watcher re-arms the timer if the schedule changes
+        if not await asyncio.to_thread(schedule_watcher.wait_until, channel['next_post_time']):
+            print_info("Schedule changed - re-checking next post...")
+            continue
+        print_success("Time to post!")
+
+        metrics.POST_LATENESS.observe(max(-wake_timer.seconds_until(channel['next_post_time']), 0), platform='telegram')
+        allowed, retry_at, reason = post_governor.acquire('telegram', channel['id'])
+        if not allowed:
+            print_warning(f"Throttled by {reason} - deferring to {retry_at.strftime('%Y-%m-%d %H:%M:%S')}")
+            post_governor.defer('telegram', channel['id'], retry_at)
+            metrics.POSTS.inc(platform='telegram', result='throttled')
+            continue
 
         # Posting logic
         print_header("Starting Post")
         print_step(f"Processing: {channel['channel_name']}")
         
-        await process_channel(channel)
-        
-        print_header("Completed")
-        print_success("Ready for next post")
+        # One trace per post, one span per pipeline stage (see tracing.py for the p50/p95 summary)
+        with tracing.trace('telegram_post', channel_id=channel['id']):
+            await process_channel(channel)
+            
+            print_header("Completed")
+            print_success("Ready for next post")
+
+        # After the post's trace, so its duration covers the pipeline and not the pause
         await asyncio.sleep(2)
-        subprocess.run(["python", os.path.join(os.path.dirname(__file__), "scheduler_combined.py")])
+        with tracing.trace('scheduler_subprocess'):
+            subprocess.run(["python", os.path.join(os.path.dirname(__file__), "scheduler_combined.py")])
 
 if __name__ == "__main__":
     asyncio.run(main())
\ No newline at end of file
@@ -1,20 +1,25 @@
 import os
 import json
-import time as sleep
 import mysql.connector
 from dotenv import load_dotenv
 from google_auth_oauthlib.flow import InstalledAppFlow
-from googleapiclient.discovery import build
 from googleapiclient.http import MediaFileUpload, MediaIoBaseDownload
 from google.oauth2.credentials import Credentials
 from google.auth.transport.requests import Request
 from googleapiclient.errors import HttpError
+import httplib2
 import io
 import re
-import sys
 import subprocess
 from datetime import datetime, timedelta
 import pytz
+import slot_table
+import wake_timer
+import post_governor
+import retry_queue
+import metrics
+import tracing
+import google_clients
 
 # Load environment variables from .env
 load_dotenv()
@@ -50,10 +55,12 @@ VIDEO_EXTENSIONS = {".mp4", ".mov", ".avi", ".mkv", ".wmv", ".flv"}
 
 # Configuration
 TEMP_FOLDER = "vid_yt_upload"
-ACTIVE_COUNTDOWN_SECONDS = 300
 IDLE_SLEEP_MINUTES = 0.3
-RESCHEDULE_THRESHOLD_MINUTES = 15
-over_time = 1
+
+# Resumable upload configuration (chunk size must be a multiple of 256 KB)
+UPLOAD_CHUNK_SIZE = int(os.getenv("YOUTUBE_UPLOAD_CHUNK_MB", "8")) * 1024 * 1024
+UPLOAD_MAX_RETRIES = 5
+UPLOAD_SESSION_MAX_AGE_HOURS = 24 * 6  # YouTube keeps upload sessions for about a week
 
 # --- User-Friendly Logging Functions ---
 def print_step(message):
@@ -82,28 +89,33 @@ def print_countdown(message):
 # --- Database Functions ---
 def get_db_connection():
     try:
-        return mysql.connector.connect(**DB_CONFIG)
+        return metrics.instrument_connection(mysql.connector.connect(**DB_CONFIG), 'youtube')
     except mysql.connector.Error as e:
         print_error(f"Database connection failed: {str(e)}")
         return None
 
+# The channel the worker claims next; the schedule watcher waits on this same row
+NEXT_CHANNEL_SQL = """
+    FROM youtube y
+    JOIN user u ON y.user_id = u.Id
+    WHERE y.selected = 'Yes' AND y.done = 'No' AND y.posts_left > 0 AND y.next_post_time IS NOT NULL
+    ORDER BY y.next_post_time ASC
+    LIMIT 1
+"""
+
 def get_next_scheduled_youtube():
     """Get the next scheduled YouTube channel to post."""
     conn = get_db_connection()
     if not conn:
         return None
     cursor = conn.cursor(dictionary=True)
-    query = """
+    query = f"""
         SELECT 
             y.id, y.user_id, y.username, y.channel_id, y.token_sesson, 
             y.google_drive_link, y.next_post_time, y.posts_left,
             y.custom_schedule_data, y.post_daily_range_left,
             u.Name AS user_name
-        FROM youtube y
-        JOIN user u ON y.user_id = u.Id
-        WHERE y.selected = 'Yes' AND y.done = 'No' AND y.posts_left > 0 AND y.next_post_time IS NOT NULL
-        ORDER BY y.next_post_time ASC
-        LIMIT 1
+        {NEXT_CHANNEL_SQL}
     """
     cursor.execute(query)
     channel = cursor.fetchone()
@@ -155,6 +167,13 @@ def get_scheduled_media_for_youtube(channel_id):
         next_post_time = result['next_post_time']
         
         print(f"  Debug: Looking for scheduled media. Next post time: {next_post_time}")
+
+        # Failed posts whose retry time has come go first; items still backing off are never claimed
+        retry_media = retry_queue.next_due_retry(schedule_data, now)
+        if retry_media:
+            print(f"  Debug: Retrying failed post: {retry_media.get('media_name')} (attempt {retry_media.get('attempts', 0) + 1})")
+            return retry_media
+        schedule_data = [media for media in schedule_data if not retry_queue.is_backing_off(media, now)]
         
         # If we have a next_post_time, find which media matches it
         if next_post_time:
@@ -220,9 +239,11 @@ def update_channel_after_post(channel_id, media_file_id):
         
         # Update the specific media status to 'completed'
         schedule_data = json.loads(result['custom_schedule_data']) if result['custom_schedule_data'] else []
+        uses_slot = False
         for media in schedule_data:
             if media.get('file_id') == media_file_id:
                 media['status'] = 'completed'
+                uses_slot = slot_table.consumes_slot(media)
                 break
         
         # Update counters
@@ -238,7 +259,8 @@ def update_channel_after_post(channel_id, media_file_id):
                 post_daily_range_left = %s,
                 selected = 'No', 
                 done = %s, 
-                next_post_time = NULL 
+                next_post_time = NULL,
+                deferred_until = NULL
             WHERE id = %s
         """
         cursor.execute(update_query, (
@@ -248,6 +270,10 @@ def update_channel_after_post(channel_id, media_file_id):
             done_status, 
             channel_id
         ))
+
+        # Range posts consume the next slot of today's timetable (retries do not)
+        if uses_slot:
+            slot_table.pop_slot(cursor, 'youtube', channel_id)
         
         conn.commit()
         cursor.close()
@@ -338,6 +364,89 @@ def load_token_from_db(user_id):
         print_error(f"Failed to load token: {str(e)}")
         return None
 
+# --- Resumable Upload Session Functions ---
+def ensure_upload_session_table():
+    """Create the table that tracks in-progress resumable uploads."""
+    conn = get_db_connection()
+    if not conn:
+        return
+    cursor = conn.cursor()
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS youtube_upload_session (
+            media_file_id VARCHAR(255) NOT NULL PRIMARY KEY,
+            channel_row_id INT NULL,
+            session_uri TEXT NOT NULL,
+            file_size BIGINT NOT NULL,
+            bytes_sent BIGINT NOT NULL DEFAULT 0,
+            created_at DATETIME NOT NULL,
+            updated_at DATETIME NOT NULL
+        )
+    """)
+    conn.commit()
+    cursor.close()
+    conn.close()
+
+def load_upload_session(media_file_id, file_size):
+    """Return the saved upload session for this media if it is still resumable."""
+    conn = get_db_connection()
+    if not conn:
+        return None
+    cursor = conn.cursor(dictionary=True)
+    cursor.execute(
+        "SELECT session_uri, file_size, bytes_sent, created_at FROM youtube_upload_session WHERE media_file_id = %s",
+        (media_file_id,)
+    )
+    saved = cursor.fetchone()
+    cursor.close()
+    conn.close()
+
+    if not saved:
+        return None
+    if saved['file_size'] != file_size:
+        print_warning("Local file differs from the interrupted upload - starting over")
+        clear_upload_session(media_file_id)
+        return None
+    if datetime.now() - saved['created_at'] > timedelta(hours=UPLOAD_SESSION_MAX_AGE_HOURS):
+        print_warning("Saved upload session is too old - starting over")
+        clear_upload_session(media_file_id)
+        return None
+    return saved
+
+def save_upload_session(media_file_id, channel_row_id, session_uri, file_size, bytes_sent):
+    """Persist the session URI and committed offset after each chunk."""
+    conn = get_db_connection()
+    if not conn:
+        return
+    try:
+        cursor = conn.cursor()
+        now = datetime.now()
+        cursor.execute("""
+            INSERT INTO youtube_upload_session
+                (media_file_id, channel_row_id, session_uri, file_size, bytes_sent, created_at, updated_at)
+            VALUES (%s, %s, %s, %s, %s, %s, %s)
+            ON DUPLICATE KEY UPDATE
+                session_uri = VALUES(session_uri),
+                bytes_sent = VALUES(bytes_sent),
+                updated_at = VALUES(updated_at)
+        """, (media_file_id, channel_row_id, session_uri, file_size, bytes_sent, now, now))
+        conn.commit()
+        cursor.close()
+    except mysql.connector.Error as e:
+        print_warning(f"Could not save upload progress: {str(e)}")
+    finally:
+        conn.close()
+
+def clear_upload_session(media_file_id):
+    """Forget the upload session once it has finished or can no longer be resumed."""
+    conn = get_db_connection()
+    if not conn:
+        return
+    cursor = conn.cursor()
+    cursor.execute("DELETE FROM youtube_upload_session WHERE media_file_id = %s", (media_file_id,))
+    conn.commit()
+    cursor.close()
+    conn.close()
+
 # --- Authentication Functions ---
 def authenticate_youtube(user_id):
     """Authenticate and create a YouTube API client."""
@@ -366,7 +475,7 @@ def authenticate_youtube(user_id):
                 save_token_to_db(user_id, token_data)
             if creds.valid:
                 print_success("YouTube authentication successful")
-                return build("youtube", "v3", credentials=creds)
+                return google_clients.get_service("youtube", "v3", creds)
         except Exception as e:
             print_error(f"Failed to load token from database: {str(e)}")
 
@@ -393,7 +502,7 @@ def authenticate_youtube(user_id):
     
     os.remove("temp_client_secrets.json")
     print_success("YouTube authentication completed")
-    return build("youtube", "v3", credentials=creds)
+    return google_clients.get_service("youtube", "v3", creds)
 
 def authenticate_drive(user_id):
     """Authenticate Google Drive API."""
@@ -418,7 +527,7 @@ def authenticate_drive(user_id):
             save_drive_token_to_db(user_id, token_data)
         if creds.valid:
             print_success("Drive authentication successful")
-            return build("drive", "v3", credentials=creds)
+            return google_clients.get_service("drive", "v3", creds)
         return None
     except Exception as e:
         print_error(f"Drive authentication failed: {str(e)}")
@@ -440,7 +549,7 @@ def download_specific_media(creds, file_id, media_name):
     local_path = os.path.join(TEMP_FOLDER, media_name)
     
     try:
-        drive_service = build('drive', 'v3', credentials=creds)
+        drive_service = google_clients.get_service('drive', 'v3', creds)
         request = drive_service.files().get_media(fileId=file_id)
         fh = io.FileIO(local_path, 'wb')
         downloader = MediaIoBaseDownload(fh, request)
@@ -456,7 +565,7 @@ def download_specific_media(creds, file_id, media_name):
 def delete_file_from_drive(file_id, creds):
     """Delete a file from Google Drive."""
     try:
-        drive_service = build('drive', 'v3', credentials=creds)
+        drive_service = google_clients.get_service('drive', 'v3', creds)
         
         # Check permissions first
         try:
@@ -490,7 +599,7 @@ def cleanup_temp_folder():
                 break
             except Exception as e:
                 if attempt < max_attempts - 1:
-                    sleep(3)
+                    tracing.sleep(3)
                 else:
                     print_warning(f"Could not delete: {filename}")
 
@@ -534,8 +643,8 @@ def get_caption(media_caption=None):
         f.write(default_caption)
     return default_caption
 
-def upload_video(youtube, file_path, channel_name, title=None, description=None):
-    """Upload a video to YouTube."""
+def upload_video(youtube, file_path, channel_name, title=None, description=None, media_key=None, channel_row_id=None):
+    """Upload a video to YouTube in chunks, resuming a saved session for media_key if one exists."""
     try:
         if not title:
             title = os.path.splitext(os.path.basename(file_path))[0]
@@ -559,19 +668,61 @@ def upload_video(youtube, file_path, channel_name, title=None, description=None)
         }
 
         print_step(f"Uploading to YouTube: {os.path.basename(file_path)}")
-        media = MediaFileUpload(file_path, chunksize=-1, resumable=True)
+        media = MediaFileUpload(file_path, chunksize=UPLOAD_CHUNK_SIZE, resumable=True)
         request = youtube.videos().insert(
             part="snippet,status",
             body=body,
             media_body=media
         )
-
-        response = request.execute()
+        file_size = media.size()
+
+        if media_key:
+            saved_session = load_upload_session(media_key, file_size)
+            if saved_session:
+                request.resumable_uri = saved_session['session_uri']
+                request.resumable_progress = saved_session['bytes_sent']
+                # Ask YouTube for the committed offset before sending more bytes
+                request._in_error_state = True
+                print_step(f"Resuming upload from {saved_session['bytes_sent'] / (1024 * 1024):.1f} MB")
+
+        response = None
+        network_errors = 0
+        while response is None:
+            try:
+                status, response = request.next_chunk(num_retries=UPLOAD_MAX_RETRIES)
+                network_errors = 0
+                if status:
+                    if media_key:
+                        save_upload_session(media_key, channel_row_id, request.resumable_uri, file_size, request.resumable_progress)
+                    print_countdown(f"Uploaded {int(status.progress() * 100)}%")
+            except HttpError as e:
+                if e.resp.status in (404, 410) and request.resumable_uri:
+                    print_warning("Upload session expired - starting a new one")
+                    post_governor.charge_quota(post_governor.QUOTA_COSTS["videos.insert"])
+                    if media_key:
+                        clear_upload_session(media_key)
+                    request.resumable_uri = None
+                    request.resumable_progress = 0
+                    request._in_error_state = False
+                    continue
+                raise
+            except (OSError, httplib2.HttpLib2Error) as e:
+                network_errors += 1
+                if network_errors > UPLOAD_MAX_RETRIES:
+                    raise
+                delay = 2 ** network_errors
+                print_warning(f"Network error during upload, retrying in {delay}s: {str(e)}")
+                tracing.sleep(delay)
+
+        if media_key:
+            clear_upload_session(media_key)
         print_success(f"Uploaded to YouTube: {response['id']}")
         return True
         
     except Exception as e:
         print_error(f"Upload failed: {str(e)}")
+        if media_key:
+            print_info("Upload progress saved - the next attempt will resume")
         return False
 
 def make_aware(dt):
@@ -584,28 +735,36 @@ def make_aware(dt):
 
 # --- Main Execution Logic ---
 async def process_youtube_channel(channel):
-    """Process a single YouTube channel."""
+    """Process a single YouTube channel. Returns True if the video was uploaded."""
     print_header("Processing YouTube Channel")
     print(f"🎬 Channel: {channel['username']}")
     print(f"👤 User: {channel['user_name']}")
 
     # Authenticate YouTube
-    youtube = authenticate_youtube(channel['user_id'])
+    with tracing.span('youtube_auth'):
+        youtube = authenticate_youtube(channel['user_id'])
     if not youtube:
-        print_error("YouTube authentication failed")
+        print_error("YouTube authentication failed - scheduling a retry")
+        retry_queue.record_account_failure('youtube', channel['id'], "youtube authentication failed")
+        metrics.POSTS.inc(platform='youtube', result='failed')
         return
 
     # Verify channel
-    channel_name, channel_id = get_channel_info(youtube, channel['channel_id'])
+    with tracing.span('get_channel_info'):
+        channel_name, channel_id = get_channel_info(youtube, channel['channel_id'])
     if not channel_name:
-        print_error("Channel verification failed")
+        print_error("Channel verification failed - scheduling a retry")
+        retry_queue.record_account_failure('youtube', channel['id'], "channel verification failed")
+        metrics.POSTS.inc(platform='youtube', result='failed')
         return
 
     # DEBUG: See what's scheduled
-    debug_schedule_data_youtube(channel['id'])
+    with tracing.span('debug_schedule_data'):
+        debug_schedule_data_youtube(channel['id'])
 
     # Get SPECIFIC scheduled media (NEW!)
-    scheduled_media = get_scheduled_media_for_youtube(channel['id'])
+    with tracing.span('get_scheduled_media'):
+        scheduled_media = get_scheduled_media_for_youtube(channel['id'])
     if not scheduled_media:
         print_error("No scheduled media found for this channel")
         # Skip this channel
@@ -621,15 +780,17 @@ async def process_youtube_channel(channel):
     print_step(f"Scheduled media: {scheduled_media.get('media_name', 'Unknown')}")
 
     # Get video from Drive using specific file_id
-    drive_creds = authenticate_drive(channel['user_id'])
+    with tracing.span('drive_credentials'):
+        drive_creds = authenticate_drive(channel['user_id'])
     video_path = None
     
     if drive_creds and scheduled_media.get('file_id'):
-        video_path = download_specific_media(
-            drive_creds, 
-            scheduled_media['file_id'], 
-            scheduled_media['media_name']
-        )
+        with tracing.span('download'):
+            video_path = download_specific_media(
+                drive_creds, 
+                scheduled_media['file_id'], 
+                scheduled_media['media_name']
+            )
     
     # Fallback to local files if specific download fails
     if not video_path:
@@ -652,12 +813,17 @@ async def process_youtube_channel(channel):
     media_title = scheduled_media.get('title') or os.path.splitext(scheduled_media['media_name'])[0]
     media_caption = scheduled_media.get('caption')
     
-    if upload_video(youtube, video_path, channel_name, title=media_title, description=media_caption):
+    with tracing.span('videos_insert'):
+        uploaded = upload_video(youtube, video_path, channel_name, title=media_title, description=media_caption,
+                                media_key=scheduled_media.get('file_id'), channel_row_id=channel['id'])
+    if uploaded:
         # Cleanup
         print_header("Cleanup")
         if scheduled_media.get('file_id') and drive_creds:
             print_step("Removing file from Google Drive...")
-            if delete_file_from_drive(scheduled_media['file_id'], drive_creds):
+            with tracing.span('drive_delete'):
+                deleted = delete_file_from_drive(scheduled_media['file_id'], drive_creds)
+            if deleted:
                 print_success("File removed from Drive")
             else:
                 print_warning("File uploaded but could not delete from Drive")
@@ -670,11 +836,16 @@ async def process_youtube_channel(channel):
             print_warning(f"Could not delete local file: {str(e)}")
         
         # Update database with specific media info (NEW!)
-        update_channel_after_post(channel['id'], scheduled_media['file_id'])
+        with tracing.span('update_channel_after_post'):
+            update_channel_after_post(channel['id'], scheduled_media['file_id'])
+        metrics.POSTS.inc(platform='youtube', result='posted')
     else:
         print_error("Upload failed - keeping files")
+        retry_queue.record_failure('youtube', channel['id'], scheduled_media['file_id'], "upload failed")
+        metrics.POSTS.inc(platform='youtube', result='failed')
 
     cleanup_temp_folder()
+    return uploaded
 
 async def main():
     print_header("YouTube Auto-Uploader")
@@ -684,12 +855,18 @@ async def main():
         os.makedirs(TEMP_FOLDER)
         print_success(f"Created temp folder: {TEMP_FOLDER}")
 
+    ensure_upload_session_table()
+
+    metrics.serve('youtube')
+    schedule_watcher = wake_timer.ScheduleWatcher(get_db_connection, 'youtube',
+                                                  f"SELECT y.next_post_time {NEXT_CHANNEL_SQL}").start()
+
     while True:
         channel = get_next_scheduled_youtube()
 
         if not channel:
             print_info(f"No channels scheduled. Checking again in {IDLE_SLEEP_MINUTES} minutes...")
-            await asyncio.sleep(IDLE_SLEEP_MINUTES * 60)
+            await asyncio.to_thread(schedule_watcher.wait_for_change, IDLE_SLEEP_MINUTES * 60)
             subprocess.run(["python", os.path.join(os.path.dirname(__file__), "scheduler_combined.py")])
             continue
 
@@ -698,47 +875,38 @@ async def main():
         print(f"👤 User: {channel['user_name']}")
         print(f"⏰ Time: {channel['next_post_time'].strftime('%Y-%m-%d %H:%M:%S %Z')}")
 
-        # Countdown logic
-        while True:
-            IST_OFFSET = timedelta(hours=5, minutes=30)
-            incorrect_local_time = channel['next_post_time']
-            corrected_utc_time = incorrect_local_time - IST_OFFSET
-            next_post_time_aware = pytz.utc.localize(corrected_utc_time)
-            now_aware = datetime.now(pytz.utc)
-            wait_seconds = (next_post_time_aware - now_aware).total_seconds()
-
-            if wait_seconds <= 0:
-                print_success("Time to upload!")
-                break
-
-            if wait_seconds > RESCHEDULE_THRESHOLD_MINUTES * 60:
-                minutes, seconds = divmod(int(wait_seconds), 60)
-                print_warning(f"Upload in {minutes}m {seconds}s - Running scheduler...")
-                await asyncio.sleep(over_time * 60)
-                try:
-                    subprocess.run(["python", os.path.join(os.path.dirname(__file__), "scheduler_combined.py")])
-                    print_success("Scheduler updated")
-                except subprocess.CalledProcessError as e:
-                    print_error(f"Scheduler failed: {str(e)}")
-                print_info("Restarting YouTube uploader...")
-                os.execv(sys.executable, [sys.executable] + sys.argv)
-            elif wait_seconds > ACTIVE_COUNTDOWN_SECONDS:
-                minutes, seconds = divmod(int(wait_seconds), 60)
-                print_countdown(f"Next upload in {minutes}m {seconds}s - Monitoring...")
-                await asyncio.sleep(1)
-            else:
-                minutes, seconds = divmod(int(wait_seconds), 60)
-                print_countdown(f"Uploading in {minutes}m {seconds}s...")
-                await asyncio.sleep(1)
+        # Sleep until the post is due; the watcher re-arms the timer if the schedule changes
+        if not await asyncio.to_thread(schedule_watcher.wait_until, channel['next_post_time']):
+            print_info("Schedule changed - re-checking next upload...")
+            continue
+        print_success("Time to upload!")
+
+        # Reserve the upload's quota up front so a busy day defers uploads instead of failing them
+        metrics.POST_LATENESS.observe(max(-wake_timer.seconds_until(channel['next_post_time']), 0), platform='youtube')
+        allowed, retry_at, reason = post_governor.acquire('youtube', channel['id'],
+                                                          quota_units=post_governor.YOUTUBE_UPLOAD_COST)
+        if not allowed:
+            print_warning(f"Throttled by {reason} - deferring to {retry_at.strftime('%Y-%m-%d %H:%M:%S')}")
+            post_governor.defer('youtube', channel['id'], retry_at)
+            metrics.POSTS.inc(platform='youtube', result='throttled')
+            continue
 
         # Upload process
         print_header("Starting Upload")
-        await process_youtube_channel(channel)
-        
-        print_header("Completed")
-        print_success("Ready for next upload")
+        # One trace per upload, one span per pipeline stage (see tracing.py for the p50/p95 summary)
+        with tracing.trace('youtube_post', channel_id=channel['id']):
+            uploaded = await process_youtube_channel(channel)
+            if not uploaded:
+                # Only a completed insert is worth its reservation; channels.list stays charged
+                post_governor.refund_quota(post_governor.QUOTA_COSTS["videos.insert"])
+            
+            print_header("Completed")
+            print_success("Ready for next upload")
+
+        # After the post's trace, so its duration covers the pipeline and not the pause
         await asyncio.sleep(2)
-        subprocess.run(["python", os.path.join(os.path.dirname(__file__), "scheduler_combined.py")])
+        with tracing.trace('scheduler_subprocess'):
+            subprocess.run(["python", os.path.join(os.path.dirname(__file__), "scheduler_combined.py")])
 
 if __name__ == "__main__":
     import asyncio
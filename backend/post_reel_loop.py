@@ -1,21 +1,28 @@
 import os
 import re
 import json
-import sys
 from time import sleep
 from google.oauth2.credentials import Credentials
 from google_auth_oauthlib.flow import InstalledAppFlow
-from googleapiclient.discovery import build
 from googleapiclient.http import MediaIoBaseDownload
 import io
-from datetime import datetime, timedelta
+from datetime import datetime
 import pytz
 from instagrapi import Client
-import ffmpeg
 import subprocess
 import mysql.connector
 from google.auth.transport.requests import Request
 from dotenv import load_dotenv
+import media_transcoder
+import media_metadata
+import slot_table
+import wake_timer
+import post_governor
+import retry_queue
+import metrics
+import tracing
+import google_clients
+import instagram_endpoint
 
 # Load environment variables from .env file
 load_dotenv()
@@ -33,11 +40,8 @@ DB_CONFIG = {
     "password": os.getenv("DB_PASSWORD"),
     "port": int(os.getenv("DB_PORT"))
 }
-ACTIVE_COUNTDOWN_SECONDS = 300  # 5 minutes
 IDLE_SLEEP_MINUTES = 0.3  # How long to wait if no accounts are scheduled
-RESCHEDULE_THRESHOLD_MINUTES = 15  # If wait time exceeds this, run scheduler and restart
 
-over_time = 1
 
 # In-memory cache for credentials to avoid redundant database queries
 _credentials_cache = {}
@@ -45,25 +49,30 @@ _credentials_cache = {}
 # --- Database Functions ---
 def get_db_connection():
     try:
-        return mysql.connector.connect(**DB_CONFIG)
+        return metrics.instrument_connection(mysql.connector.connect(**DB_CONFIG), 'instagram')
     except mysql.connector.Error as e:
         print(f"ERROR: Database connection failed: {str(e)}")
         return None
 
+# The account the worker claims next; the schedule watcher waits on this same row
+NEXT_ACCOUNT_SQL = """
+    FROM instagram i
+    JOIN user u ON i.user_id = u.Id
+    WHERE i.selected = 'Yes' AND i.done = 'No' AND i.posts_left > 0 AND i.next_post_time IS NOT NULL
+    ORDER BY i.next_post_time ASC
+    LIMIT 1
+"""
+
 def get_next_scheduled_account():
     conn = get_db_connection()
     if not conn:
         return None
     cursor = conn.cursor(dictionary=True)
-    query = """
+    query = f"""
         SELECT 
             i.id, i.username, i.passwand, i.token_sesson, i.token_drive, 
             i.google_drive_link, i.next_post_time, u.Name AS user_name 
-        FROM instagram i
-        JOIN user u ON i.user_id = u.Id
-        WHERE i.selected = 'Yes' AND i.done = 'No' AND i.posts_left > 0 AND i.next_post_time IS NOT NULL
-        ORDER BY i.next_post_time ASC
-        LIMIT 1
+        {NEXT_ACCOUNT_SQL}
     """
     cursor.execute(query)
     account = cursor.fetchone()
@@ -115,6 +124,13 @@ def get_scheduled_media_for_account(account_id):
         next_post_time = result['next_post_time']
         
         print(f"  Debug: Looking for scheduled media. Next post time: {next_post_time}")
+
+        # Failed posts whose retry time has come go first; items still backing off are never claimed
+        retry_media = retry_queue.next_due_retry(schedule_data, now)
+        if retry_media:
+            print(f"  Debug: Retrying failed post: {retry_media.get('media_name')} (attempt {retry_media.get('attempts', 0) + 1})")
+            return retry_media
+        schedule_data = [media for media in schedule_data if not retry_queue.is_backing_off(media, now)]
         
         # If we have a next_post_time, find which media matches it
         if next_post_time:
@@ -180,9 +196,11 @@ def update_account_after_post(account_id, media_file_id):
         
         # Update the specific media status to 'completed'
         schedule_data = json.loads(result['custom_schedule_data']) if result['custom_schedule_data'] else []
+        uses_slot = False
         for media in schedule_data:
             if media.get('file_id') == media_file_id:
                 media['status'] = 'completed'
+                uses_slot = slot_table.consumes_slot(media)
                 break
         
         # Update counters
@@ -198,7 +216,8 @@ def update_account_after_post(account_id, media_file_id):
                 post_daily_range_left = %s,
                 selected = 'No', 
                 done = %s, 
-                next_post_time = NULL 
+                next_post_time = NULL,
+                deferred_until = NULL
             WHERE id = %s
         """
         cursor.execute(update_query, (
@@ -208,6 +227,10 @@ def update_account_after_post(account_id, media_file_id):
             done_status, 
             account_id
         ))
+
+        # Range posts consume the next slot of today's timetable (retries do not)
+        if uses_slot:
+            slot_table.pop_slot(cursor, 'instagram', account_id)
         
         conn.commit()
         cursor.close()
@@ -230,11 +253,11 @@ def update_account_after_post(account_id, media_file_id):
 
 # --- Helper Functions ---
 def get_instagram_session(account):
-    cl = Client()
+    cl = instagram_endpoint.redirect_client(Client())
     if account['token_sesson'] and account['token_sesson'] != '{}':
         try:
             cl.set_settings(json.loads(account['token_sesson']))
-            sleep(2)
+            tracing.sleep(2)
             print(f"Loaded Instagram session for {account['username']}.")
             return cl
         except Exception as e:
@@ -307,7 +330,7 @@ def get_drive_credentials(account, max_retries=3):
             except Exception as e:
                 print(f"ERROR: Refresh attempt {attempt + 1}/{max_retries} failed for {username}: {str(e)}")
                 if attempt < max_retries - 1:
-                    sleep(5)  # Wait before retrying
+                    tracing.sleep(5)  # Wait before retrying
                 else:
                     print(f"ERROR: Max refresh retries reached for {username}. Attempting re-authentication.")
                     creds = None
@@ -342,7 +365,7 @@ def extract_folder_id(drive_link):
     return None
 
 def create_instagram_feed_folder(creds, username):
-    drive_service = build('drive', 'v3', credentials=creds)
+    drive_service = google_clients.get_service('drive', 'v3', creds)
     folder_name = f"instagram_{username}"
     query = f"name = '{folder_name}' and mimeType = 'application/vnd.google-apps.folder' and 'root' in parents"
     results = drive_service.files().list(q=query, fields="files(id, name)").execute()
@@ -377,7 +400,7 @@ def download_specific_media(creds, file_id, media_name):
     local_path = os.path.join(TEMP_FOLDER, media_name)
     
     try:
-        drive_service = build('drive', 'v3', credentials=creds)
+        drive_service = google_clients.get_service('drive', 'v3', creds)
         request = drive_service.files().get_media(fileId=file_id)
         fh = io.FileIO(local_path, 'wb')
         downloader = MediaIoBaseDownload(fh, request)
@@ -393,7 +416,7 @@ def download_specific_media(creds, file_id, media_name):
 def delete_file_from_drive(file_id, creds):
     """Delete a file from Google Drive."""
     try:
-        drive_service = build('drive', 'v3', credentials=creds)
+        drive_service = google_clients.get_service('drive', 'v3', creds)
         drive_service.files().delete(fileId=file_id).execute()
         print(f"SUCCESS: Deleted file {file_id} from Google Drive")
         return True
@@ -401,36 +424,18 @@ def delete_file_from_drive(file_id, creds):
         print(f"ERROR: Failed to delete file {file_id} from Google Drive: {str(e)}")
         return False
 
-def adjust_aspect_ratio(video_path, output_path):
-    try:
-        probe = ffmpeg.probe(video_path)
-        video_stream = next((s for s in probe['streams'] if s['codec_type'] == 'video'), None)
-        width, height = int(video_stream['width']), int(video_stream['height'])
-        if abs((width / height) - (9 / 16)) < 0.01:
-            return False
-        (ffmpeg.input(video_path).filter('scale', '1080:1920:force_original_aspect_ratio=decrease')
-         .filter('pad', '1080', '1920', '(ow-iw)/2', '(oh-ih)/2', 'black')
-         .output(output_path, vcodec='libx264', acodec='aac').run(overwrite_output=True, quiet=True))
-        return True
-    except Exception as e:
-        print(f"ERROR: Failed to adjust aspect ratio for {video_path}: {str(e)}")
-        return False
-
 def post_media(client, media_path, caption, is_video=True):
     try:
         media_name = os.path.basename(media_path)
         full_caption = f"{caption}"
-        thumbnail_path = None
         if is_video:
-            thumbnail_path = os.path.splitext(media_path)[0] + "_thumb.jpg"
-            try:
-                ffmpeg.input(media_path, ss=1).output(thumbnail_path, vframes=1).run(overwrite_output=True, quiet=True)
-            except ffmpeg.Error:
-                thumbnail_path = None
-        if is_video:
-            client.clip_upload(media_path, caption=full_caption, thumbnail=thumbnail_path)
+            with tracing.span('thumbnail'):
+                thumbnail_path = media_metadata.get_thumbnail(media_path)
+            with tracing.span('clip_upload'):
+                client.clip_upload(media_path, caption=full_caption, thumbnail=thumbnail_path)
         else:
-            client.photo_upload(media_path, caption=full_caption)
+            with tracing.span('photo_upload'):
+                client.photo_upload(media_path, caption=full_caption)
         print(f"SUCCESS: Posted {media_name} to {client.username}'s account.")
         return True
     except Exception as e:
@@ -451,7 +456,7 @@ def cleanup_temp_folder():
             except Exception as e:
                 if attempt < max_attempts - 1:
                     print(f"Failed to delete {file_path} (attempt {attempt + 1}/{max_attempts}): {str(e)}. Retrying in 3 seconds...")
-                    sleep(3)
+                    tracing.sleep(3)
                 else:
                     print(f"ERROR: Failed to delete {file_path} after {max_attempts} attempts: {str(e)}")
 
@@ -473,12 +478,16 @@ def main():
         with open(CAPTION_FILE, "w", encoding="utf-8") as f:
             f.write("#default #caption #instagood")
     
+    metrics.serve('instagram')
+    schedule_watcher = wake_timer.ScheduleWatcher(get_db_connection, 'instagram',
+                                                  f"SELECT i.next_post_time {NEXT_ACCOUNT_SQL}").start()
+
     while True:
         account = get_next_scheduled_account()
         
         if not account:
             print(f"No accounts currently scheduled. Waiting for {IDLE_SLEEP_MINUTES} minutes...")
-            sleep(IDLE_SLEEP_MINUTES * 60)
+            schedule_watcher.wait_for_change(IDLE_SLEEP_MINUTES * 60)
             continue
 
         print("\n----------------------------------------------------")
@@ -487,129 +496,123 @@ def main():
         print(f"  >> Account: {account.get('username', 'N/A')}")
         print("----------------------------------------------------")
 
-        # Countdown logic
-        while True:
-            IST_OFFSET = timedelta(hours=5, minutes=30)
-            incorrect_local_time = account['next_post_time']
-            corrected_utc_time = incorrect_local_time - IST_OFFSET
-            next_post_time_aware = pytz.utc.localize(corrected_utc_time)
-            now_aware = datetime.now(pytz.utc)
-            wait_seconds = (next_post_time_aware - now_aware).total_seconds()
-
-            if wait_seconds <= 0:
-                print("Time to post!")
-                break
-
-            if wait_seconds > RESCHEDULE_THRESHOLD_MINUTES * 60:
-                minutes, seconds = divmod(int(wait_seconds), 60)
-                print(f"Next post in {minutes}m {seconds}s is over {RESCHEDULE_THRESHOLD_MINUTES} minutes. Running scheduler_intagram.py in {over_time * 60} seconds and restarting...")
-                sleep(over_time * 60)
-                try:
-                    subprocess.run(["python", os.path.join(os.path.dirname(__file__), "scheduler_combined.py")])
-                    print("Ran scheduler_intagram.py successfully.")
-                except subprocess.CalledProcessError as e:
-                    print(f"ERROR: Failed to run scheduler_intagram.py: {str(e)}")
-                print("Restarting post_reel_loop.py...")
-                # Restart the script
-                os.execv(sys.executable, [sys.executable] + sys.argv)
-            elif wait_seconds > ACTIVE_COUNTDOWN_SECONDS:
-                minutes, seconds = divmod(int(wait_seconds), 60)
-                print(f"Next post in {minutes}m {seconds}s. Waiting... (Checking every 30s)", end='\r')
-                sleep(15)
-            else:
-                minutes, seconds = divmod(int(wait_seconds), 60)
-                print(f"Active countdown: Post in {minutes}m {seconds}s...", end='\r')
-                sleep(1)
-
-        # Posting logic
-        print(f"Initiating post for {account['username']}...")
-
-        # DEBUG: See what's scheduled
-        debug_schedule_data(account['id'])
-
-        client = get_instagram_session(account)
-        if not client:
-            print("ERROR: Login failed. Skipping this account and looking for the next one.")
-            sleep(10)
+        # Sleep until the post is due; the watcher re-arms the timer if the schedule changes
+        if not schedule_watcher.wait_until(account['next_post_time']):
+            print("Schedule changed while waiting. Re-checking...")
             continue
-
-        creds = get_drive_credentials(account)
-        if not creds:
-            print("ERROR: Google Drive credentials not valid or could not be obtained. Skipping this account.")
-            # Skip this account by marking it as done temporarily
-            conn = get_db_connection()
-            if conn:
-                cursor = conn.cursor()
-                cursor.execute("UPDATE instagram SET selected = 'No' WHERE id = %s", (account['id'],))
-                conn.commit()
-                cursor.close()
-                conn.close()
-            sleep(10)
+        print("Time to post!")
+
+        metrics.POST_LATENESS.observe(max(-wake_timer.seconds_until(account['next_post_time']), 0), platform='instagram')
+        allowed, retry_at, reason = post_governor.acquire('instagram', account['id'])
+        if not allowed:
+            print(f"Throttled by {reason}. Deferring {account['username']} to {retry_at.strftime('%Y-%m-%d %H:%M:%S')}.")
+            post_governor.defer('instagram', account['id'], retry_at)
+            metrics.POSTS.inc(platform='instagram', result='throttled')
             continue
 
-        # Get the SPECIFIC scheduled media to post (not oldest)
-        scheduled_media = get_scheduled_media_for_account(account['id'])
-        if not scheduled_media:
-            print(f"ERROR: No scheduled media found for {account['username']}. Skipping.")
-            # Skip this account
-            conn = get_db_connection()
-            if conn:
-                cursor = conn.cursor()
-                cursor.execute("UPDATE instagram SET selected = 'No' WHERE id = %s", (account['id'],))
-                conn.commit()
-                cursor.close()
-                conn.close()
-            cleanup_temp_folder()
-            continue
+        # One trace per post, one span per pipeline stage (see tracing.py for the p50/p95 summary)
+        with tracing.trace('instagram_post', account_id=account['id']):
+            print(f"Initiating post for {account['username']}...")
+
+            # DEBUG: See what's scheduled
+            with tracing.span('debug_schedule_data'):
+                debug_schedule_data(account['id'])
+
+            with tracing.span('session_login'):
+                client = get_instagram_session(account)
+            if not client:
+                print("ERROR: Login failed. Scheduling a retry and looking for the next account.")
+                retry_queue.record_account_failure('instagram', account['id'], "login failed")
+                metrics.POSTS.inc(platform='instagram', result='failed')
+                continue
+
+            with tracing.span('drive_credentials'):
+                creds = get_drive_credentials(account)
+            if not creds:
+                print("ERROR: Google Drive credentials not valid or could not be obtained. Scheduling a retry.")
+                retry_queue.record_account_failure('instagram', account['id'], "drive credentials unavailable")
+                metrics.POSTS.inc(platform='instagram', result='failed')
+                continue
+
+            # Get the SPECIFIC scheduled media to post (not oldest)
+            with tracing.span('get_scheduled_media'):
+                scheduled_media = get_scheduled_media_for_account(account['id'])
+            if not scheduled_media:
+                print(f"ERROR: No scheduled media found for {account['username']}. Skipping.")
+                # Skip this account
+                conn = get_db_connection()
+                if conn:
+                    cursor = conn.cursor()
+                    cursor.execute("UPDATE instagram SET selected = 'No' WHERE id = %s", (account['id'],))
+                    conn.commit()
+                    cursor.close()
+                    conn.close()
+                cleanup_temp_folder()
+                continue
+
+            print(f"Selected scheduled media to post: {scheduled_media.get('media_name', 'Unknown')}")
+
+            # Download the specific scheduled media
+            with tracing.span('download'):
+                media_to_post = download_specific_media(
+                    creds, 
+                    scheduled_media['file_id'], 
+                    scheduled_media['media_name']
+                )
+            
+            if not media_to_post:
+                print(f"ERROR: Failed to download scheduled media for {account['username']}. Skipping.")
+                retry_queue.record_failure('instagram', account['id'], scheduled_media['file_id'], "download failed")
+                metrics.POSTS.inc(platform='instagram', result='failed')
+                cleanup_temp_folder()
+                continue
+
+            # Determine if it's video or image
+            is_video = scheduled_media['media_name'].lower().endswith(('.mp4', '.mov', '.avi', '.mkv'))
+
+            post_path = media_to_post
+            if is_video:
+                with tracing.span('adjust_aspect_ratio'):
+                    post_path, cache_hit = media_transcoder.prepare_for_reels(media_to_post)
+                if cache_hit:
+                    print("Using pre-normalized video from the transcode cache.")
 
-        print(f"Selected scheduled media to post: {scheduled_media.get('media_name', 'Unknown')}")
+            try:
+                caption = scheduled_media.get('caption', '')
+                if not caption:
+                    with open(CAPTION_FILE, "r", encoding="utf-8") as f:
+                        caption = f.read()
+            except FileNotFoundError:
+                caption = "#reels #instagram"
+
+            with tracing.span('post_media'):
+                posted = post_media(client, post_path, caption, is_video=is_video)
+            if posted:
+                # Delete from Google Drive after successful posting
+                if scheduled_media.get('file_id'):
+                    with tracing.span('drive_delete'):
+                        deleted = delete_file_from_drive(scheduled_media['file_id'], creds)
+                    if deleted:
+                        print(f"SUCCESS: File deleted from Google Drive after posting")
+                    else:
+                        print(f"WARNING: File posted but could not delete from Google Drive")
+                
+                # Update database - specific media status and counters
+                with tracing.span('update_account_after_post'):
+                    update_account_after_post(account['id'], scheduled_media['file_id'])
+                metrics.POSTS.inc(platform='instagram', result='posted')
+            else:
+                print("ERROR: Post failed. Scheduling a retry and looking for the next task.")
+                retry_queue.record_failure('instagram', account['id'], scheduled_media['file_id'], "post failed")
+                metrics.POSTS.inc(platform='instagram', result='failed')
 
-        # Download the specific scheduled media
-        media_to_post = download_specific_media(
-            creds, 
-            scheduled_media['file_id'], 
-            scheduled_media['media_name']
-        )
-        
-        if not media_to_post:
-            print(f"ERROR: Failed to download scheduled media for {account['username']}. Skipping.")
             cleanup_temp_folder()
-            continue
-
-        # Determine if it's video or image
-        is_video = scheduled_media['media_name'].lower().endswith(('.mp4', '.mov', '.avi', '.mkv'))
-
-        post_path = media_to_post
-        if is_video:
-            adjusted_path = os.path.join(TEMP_FOLDER, f"adjusted_{os.path.basename(media_to_post)}")
-            if adjust_aspect_ratio(media_to_post, adjusted_path):
-                post_path = adjusted_path
-
-        try:
-            caption = scheduled_media.get('caption', '')
-            if not caption:
-                with open(CAPTION_FILE, "r", encoding="utf-8") as f:
-                    caption = f.read()
-        except FileNotFoundError:
-            caption = "#reels #instagram"
-
-        if post_media(client, post_path, caption, is_video=is_video):
-            # Delete from Google Drive after successful posting
-            if scheduled_media.get('file_id'):
-                if delete_file_from_drive(scheduled_media['file_id'], creds):
-                    print(f"SUCCESS: File deleted from Google Drive after posting")
-                else:
-                    print(f"WARNING: File posted but could not delete from Google Drive")
-            
-            # Update database - specific media status and counters
-            update_account_after_post(account['id'], scheduled_media['file_id'])
-        else:
-            print("ERROR: Post failed. Database will not be updated for this run. Looking for next task.")
+            print("Task complete. Looking for the next scheduled post...")
 
-        cleanup_temp_folder()
-        print("Task complete. Looking for the next scheduled post...")
+        # After the post's trace, so its duration covers the pipeline and not the pause
         sleep(2)
-        subprocess.run(["python", os.path.join(os.path.dirname(__file__), "scheduler_combined.py")])
+        with tracing.trace('scheduler_subprocess'):
+            subprocess.run(["python", os.path.join(os.path.dirname(__file__), "scheduler_combined.py")])
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -1,26 +1,30 @@
 import os
 import re
 import json
-import sys
 from time import sleep
 from google.oauth2.credentials import Credentials
 from google_auth_oauthlib.flow import InstalledAppFlow
-from googleapiclient.discovery import build
 from googleapiclient.http import MediaIoBaseDownload
 import io
-from datetime import datetime, timedelta
-import pytz
 from instagrapi import Client
-import ffmpeg
 import subprocess
 import mysql.connector
 from google.auth.transport.requests import Request
 from dotenv import load_dotenv
-
-# Hugging Face Transformers for AI caption generation
-from transformers import BlipProcessor, BlipForConditionalGeneration
-from PIL import Image
-import torch
+import media_transcoder
+import media_metadata
+import caption_model
+import caption_cache
+import slot_table
+import wake_timer
+import post_governor
+import retry_queue
+import metrics
+import tracing
+import google_clients
+import instagram_endpoint
+import urllib.request
+import urllib.error
 
 # Load environment variables from .env file
 load_dotenv()
@@ -38,17 +42,14 @@ DB_CONFIG = {
     "password": os.getenv("DB_PASSWORD"),
     "port": int(os.getenv("DB_PORT"))
 }
-ACTIVE_COUNTDOWN_SECONDS = 300
 IDLE_SLEEP_MINUTES = 0.3
-RESCHEDULE_THRESHOLD_MINUTES = 15
-over_time = 1
 
 # In-memory cache for credentials
 _credentials_cache = {}
 
-# AI Model for caption generation
-processor = None
-model = None
+# Warm caption service (see caption_service.py); falls back to in-process inference
+CAPTION_SERVICE_URL = os.getenv("CAPTION_SERVICE_URL", "http://127.0.0.1:8765")
+CAPTION_SERVICE_TIMEOUT_SECONDS = 120
 
 # --- User-Friendly Logging Functions ---
 def print_step(message):
@@ -75,62 +76,51 @@ def print_countdown(message):
     print(f"⏰ {message}", end='\r')
 
 # --- AI Caption Generation Functions ---
-def load_caption_model():
-    global processor, model
+def request_caption_from_service(media_path, is_video=False, file_id=None):
+    """Ask the caption service for a caption; returns None if it is unavailable."""
+    payload = json.dumps({
+        "path": os.path.abspath(media_path),
+        "is_video": is_video,
+        "file_id": file_id
+    }).encode('utf-8')
+    request = urllib.request.Request(
+        f"{CAPTION_SERVICE_URL}/caption",
+        data=payload,
+        headers={"Content-Type": "application/json"},
+        method="POST"
+    )
     try:
-        print_step("Loading AI caption model...")
-        processor = BlipProcessor.from_pretrained("Salesforce/blip-image-captioning-base")
-        model = BlipForConditionalGeneration.from_pretrained("Salesforce/blip-image-captioning-base")
-        print_success("AI caption model ready")
-    except Exception as e:
-        print_error(f"Failed to load AI model: {str(e)}")
+        with urllib.request.urlopen(request, timeout=CAPTION_SERVICE_TIMEOUT_SECONDS) as response:
+            result = json.loads(response.read())
+        if result.get('precomputed'):
+            print_success("Using pre-generated caption")
+        return result.get('caption')
+    except (urllib.error.URLError, OSError, ValueError) as e:
+        print_warning(f"Caption service unavailable, captioning locally: {str(e)}")
+        return None
 
-def generate_caption_from_image(image_path):
-    global processor, model
-    
-    if processor is None or model is None:
-        load_caption_model()
-        if processor is None or model is None:
-            return get_fallback_caption()
-    
+def format_caption(caption):
+    hashtags = generate_smart_hashtags(caption)
+    print_success(f"Caption: {caption}")
+    return f"{caption}\n\n{hashtags}"
+
+def generate_caption_from_image(image_path, content_hash=None):
     try:
-        image = Image.open(image_path).convert('RGB')
-        inputs = processor(image, return_tensors="pt")
-        
-        with torch.no_grad():
-            out = model.generate(**inputs, max_length=50, num_beams=5, early_stopping=True)
-        
-        caption = processor.decode(out[0], skip_special_tokens=True)
-        hashtags = generate_smart_hashtags(caption)
-        
-        final_caption = f"{caption}\n\n{hashtags}"
-        print_success(f"Caption: {caption}")
-        return final_caption
+        caption = caption_model.generate_captions([image_path])[0]
+        caption_cache.store(content_hash or media_metadata.file_content_hash(image_path), caption, image_path)
+        return format_caption(caption)
         
     except Exception as e:
         print_error(f"AI caption failed: {str(e)}")
         return get_fallback_caption()
 
-def generate_caption_from_video(video_path):
+def generate_caption_from_video(video_path, content_hash=None):
     try:
-        frame_path = os.path.join(TEMP_FOLDER, "video_frame.jpg")
-        
-        try:
-            ffmpeg.input(video_path, ss=1).output(frame_path, vframes=1).run(overwrite_output=True, quiet=True)
-            
-            if os.path.exists(frame_path):
-                caption = generate_caption_from_image(frame_path)
-                try:
-                    os.remove(frame_path)
-                except:
-                    pass
-                return caption
-            else:
-                return get_fallback_caption()
-                
-        except Exception as e:
-            print_error(f"Could not extract video frame: {str(e)}")
-            return get_fallback_caption()
+        # Same cached frame the thumbnail comes from, so ffmpeg only runs once per video
+        frame_path = media_metadata.get_caption_frame(video_path)
+        if frame_path:
+            return generate_caption_from_image(frame_path, content_hash or media_metadata.file_content_hash(video_path))
+        return get_fallback_caption()
             
     except Exception as e:
         print_error(f"Video caption failed: {str(e)}")
@@ -184,14 +174,31 @@ def get_fallback_caption():
     
     return f"{base_caption}\n\n{hashtags}"
 
-def get_auto_caption(media_path, is_video=False):
+def get_auto_caption(media_path, is_video=False, file_id=None):
+    """
+    Caption the original Drive download (not the transcoded copy), so the cache
+    key matches the one the caption service's prefetch stored it under.
+    """
     try:
         print_step(f"Creating caption for {os.path.basename(media_path)}...")
-        
+
+        # The service looks up and fills the caption cache itself
+        caption = request_caption_from_service(media_path, is_video=is_video, file_id=file_id)
+        if caption:
+            return format_caption(caption)
+
+        # Cross-posted or re-queued media reuses its earlier caption without touching the model
+        content_hash = media_metadata.file_content_hash(media_path)
+        image_path = media_metadata.get_caption_frame(media_path) if is_video else media_path
+        caption = caption_cache.lookup(content_hash, image_path)
+        if caption:
+            print_success("Using cached caption")
+            return format_caption(caption)
+
         if is_video:
-            caption = generate_caption_from_video(media_path)
+            caption = generate_caption_from_video(media_path, content_hash)
         else:
-            caption = generate_caption_from_image(media_path)
+            caption = generate_caption_from_image(media_path, content_hash)
         
         return caption
         
@@ -202,25 +209,35 @@ def get_auto_caption(media_path, is_video=False):
 # --- Database Functions ---
 def get_db_connection():
     try:
-        return mysql.connector.connect(**DB_CONFIG)
+        return metrics.instrument_connection(mysql.connector.connect(**DB_CONFIG), 'instagram')
     except mysql.connector.Error as e:
         print_error(f"Database connection failed: {str(e)}")
         return None
 
+# Failures are counted under this name in retry_queue's drive_post_failures table
+RETRY_WORKER = 'instagram_ai'
+
+# The account the worker claims next; the schedule watcher waits on this same row.
+# Accounts backing off after a failure (or dead-lettered) are not claimed.
+NEXT_ACCOUNT_SQL = f"""
+    FROM instagram i
+    JOIN user u ON i.user_id = u.Id
+    WHERE i.selected = 'Yes' AND i.done = 'No' AND i.posts_left > 0 AND i.next_post_time IS NOT NULL
+      AND {retry_queue.drive_backoff_filter(RETRY_WORKER, 'i.id')}
+    ORDER BY i.next_post_time ASC
+    LIMIT 1
+"""
+
 def get_next_scheduled_account():
     conn = get_db_connection()
     if not conn:
         return None
     cursor = conn.cursor(dictionary=True)
-    query = """
+    query = f"""
         SELECT 
             i.id, i.username, i.passwand, i.token_sesson, i.token_drive, 
             i.google_drive_link, i.next_post_time, u.Name AS user_name 
-        FROM instagram i
-        JOIN user u ON i.user_id = u.Id
-        WHERE i.selected = 'Yes' AND i.done = 'No' AND i.posts_left > 0 AND i.next_post_time IS NOT NULL
-        ORDER BY i.next_post_time ASC
-        LIMIT 1
+        {NEXT_ACCOUNT_SQL}
     """
     cursor.execute(query)
     account = cursor.fetchone()
@@ -237,8 +254,10 @@ def update_account_after_post(account_id):
     cursor.execute("SELECT posts_left FROM instagram WHERE id = %s", (account_id,))
     posts_left = cursor.fetchone()[0]
     done_status = 'Yes' if posts_left <= 0 else 'No'
-    update_query = "UPDATE instagram SET selected = 'No', done = %s, next_post_time = NULL WHERE id = %s"
+    update_query = "UPDATE instagram SET selected = 'No', done = %s, next_post_time = NULL, deferred_until = NULL WHERE id = %s"
     cursor.execute(update_query, (done_status, account_id))
+    # This worker posts from the Drive folder, so every post uses a timetable slot
+    slot_table.pop_slot(cursor, 'instagram', account_id)
     conn.commit()
     cursor.close()
     conn.close()
@@ -246,11 +265,11 @@ def update_account_after_post(account_id):
 
 # --- Helper Functions ---
 def get_instagram_session(account):
-    cl = Client()
+    cl = instagram_endpoint.redirect_client(Client())
     if account['token_sesson'] and account['token_sesson'] != '{}':
         try:
             cl.set_settings(json.loads(account['token_sesson']))
-            sleep(2)
+            tracing.sleep(2)
             print_success(f"Session restored for {account['username']}")
             return cl
         except Exception as e:
@@ -319,7 +338,7 @@ def get_drive_credentials(account, max_retries=3):
             except Exception as e:
                 print_warning(f"Token refresh failed (attempt {attempt + 1}/{max_retries}): {str(e)}")
                 if attempt < max_retries - 1:
-                    sleep(5)
+                    tracing.sleep(5)
                 else:
                     print_error("Max refresh attempts reached")
                     creds = None
@@ -354,7 +373,7 @@ def extract_folder_id(drive_link):
     return None
 
 def create_instagram_feed_folder(creds, username):
-    drive_service = build('drive', 'v3', credentials=creds)
+    drive_service = google_clients.get_service('drive', 'v3', creds)
     folder_name = f"instagram_{username}"
     query = f"name = '{folder_name}' and mimeType = 'application/vnd.google-apps.folder' and 'root' in parents"
     results = drive_service.files().list(q=query, fields="files(id, name)").execute()
@@ -391,7 +410,7 @@ def create_instagram_feed_folder(creds, username):
     return folder_id, folder_link
 
 def download_from_drive(file_id, local_path, creds):
-    drive_service = build('drive', 'v3', credentials=creds)
+    drive_service = google_clients.get_service('drive', 'v3', creds)
     request = drive_service.files().get_media(fileId=file_id)
     fh = io.FileIO(local_path, 'wb')
     downloader = MediaIoBaseDownload(fh, request)
@@ -401,7 +420,7 @@ def download_from_drive(file_id, local_path, creds):
     print_success(f"Downloaded: {os.path.basename(local_path)}")
 
 def get_oldest_media_file(creds, account):
-    drive_service = build('drive', 'v3', credentials=creds)
+    drive_service = google_clients.get_service('drive', 'v3', creds)
     conn = get_db_connection()
     if not conn:
         return None, None, None
@@ -454,8 +473,12 @@ def get_oldest_media_file(creds, account):
         print_error("No media files found in Drive folder")
         return None, None, None
 
+    # Files that failed MAX_ATTEMPTS times stay in the folder but are no longer tried
+    dead_letters = retry_queue.dead_lettered_files(RETRY_WORKER, account['id'])
     oldest_file = None
     for file in files:
+        if file['id'] in dead_letters:
+            continue
         if file['mimeType'].startswith('image/') or file['mimeType'].startswith('video/'):
             oldest_file = file
             break
@@ -474,7 +497,7 @@ def get_oldest_media_file(creds, account):
 def delete_file_from_drive(file_id, creds):
     """Delete a file from Google Drive with proper permissions"""
     try:
-        drive_service = build('drive', 'v3', credentials=creds)
+        drive_service = google_clients.get_service('drive', 'v3', creds)
         
         # FIX: First try to get the file to verify permissions
         try:
@@ -494,39 +517,24 @@ def delete_file_from_drive(file_id, creds):
         print_info("Note: Make sure the Google account has 'Editor' access to the folder")
         return False
 
-def adjust_aspect_ratio(video_path, output_path):
-    try:
-        probe = ffmpeg.probe(video_path)
-        video_stream = next((s for s in probe['streams'] if s['codec_type'] == 'video'), None)
-        width, height = int(video_stream['width']), int(video_stream['height'])
-        if abs((width / height) - (9 / 16)) < 0.01:
-            return False
-        (ffmpeg.input(video_path).filter('scale', '1080:1920:force_original_aspect_ratio=decrease')
-         .filter('pad', '1080', '1920', '(ow-iw)/2', '(oh-ih)/2', 'black')
-         .output(output_path, vcodec='libx264', acodec='aac').run(overwrite_output=True, quiet=True))
-        return True
-    except Exception as e:
-        print_error(f"Video adjustment failed: {str(e)}")
-        return False
-
-def post_media(client, media_path, caption, is_video=True):
+def post_media(client, media_path, caption, is_video=True, frame_source=None):
+    """
+    frame_source is the file the caption frame came from; the thumbnail is taken
+    from it too, so both frames come out of one cached ffmpeg pass.
+    """
     try:
         media_name = os.path.basename(media_path)
         full_caption = caption
         
-        thumbnail_path = None
-        if is_video:
-            thumbnail_path = os.path.splitext(media_path)[0] + "_thumb.jpg"
-            try:
-                ffmpeg.input(media_path, ss=1).output(thumbnail_path, vframes=1).run(overwrite_output=True, quiet=True)
-            except ffmpeg.Error:
-                thumbnail_path = None
-        
         print_step(f"Uploading to Instagram...")
         if is_video:
-            client.clip_upload(media_path, caption=full_caption, thumbnail=thumbnail_path)
+            with tracing.span('thumbnail'):
+                thumbnail_path = media_metadata.get_thumbnail(frame_source or media_path)
+            with tracing.span('clip_upload'):
+                client.clip_upload(media_path, caption=full_caption, thumbnail=thumbnail_path)
         else:
-            client.photo_upload(media_path, caption=full_caption)
+            with tracing.span('photo_upload'):
+                client.photo_upload(media_path, caption=full_caption)
         
         print_success(f"Posted successfully: {media_name}")
         return True
@@ -547,7 +555,7 @@ def cleanup_temp_folder():
                 break
             except Exception as e:
                 if attempt < max_attempts - 1:
-                    sleep(3)
+                    tracing.sleep(3)
                 else:
                     print_warning(f"Could not delete: {filename}")
 
@@ -556,18 +564,31 @@ def main():
     print_header("Instagram Auto-Poster")
     print_info("Starting automation service...")
     
-    load_caption_model()
-    
     if not os.path.exists(TEMP_FOLDER):
         os.makedirs(TEMP_FOLDER)
         print_success(f"Created temp folder: {TEMP_FOLDER}")
     
+    # The claim query reads drive_post_failures, so create it before the first claim
+    conn = get_db_connection()
+    if conn:
+        cursor = conn.cursor()
+        retry_queue.ensure_drive_failures_table(cursor)
+        conn.commit()
+        cursor.close()
+        conn.close()
+
+    # Its own port, so it can run next to post_reel_loop.py
+    metrics.serve('instagram_ai')
+    schedule_watcher = wake_timer.ScheduleWatcher(get_db_connection, 'instagram',
+                                                  f"SELECT i.next_post_time {NEXT_ACCOUNT_SQL}",
+                                                  subscriber='instagram_ai').start()
+
     while True:
         account = get_next_scheduled_account()
         
         if not account:
             print_info(f"No posts scheduled. Checking again in {IDLE_SLEEP_MINUTES} minutes...")
-            sleep(IDLE_SLEEP_MINUTES * 60)
+            schedule_watcher.wait_for_change(IDLE_SLEEP_MINUTES * 60)
             continue
 
         print_header("Next Scheduled Post")
@@ -575,92 +596,95 @@ def main():
         print(f"📱 Account: {account.get('username', 'N/A')}")
         print(f"⏰ Time: {account['next_post_time'].strftime('%Y-%m-%d %H:%M:%S %Z')}")
 
-        # Countdown logic
-        while True:
-            IST_OFFSET = timedelta(hours=5, minutes=30)
-            incorrect_local_time = account['next_post_time']
-            corrected_utc_time = incorrect_local_time - IST_OFFSET
-            next_post_time_aware = pytz.utc.localize(corrected_utc_time)
-            now_aware = datetime.now(pytz.utc)
-            wait_seconds = (next_post_time_aware - now_aware).total_seconds()
-
-            if wait_seconds <= 0:
-                print_success("Time to post!")
-                break
-
-            if wait_seconds > RESCHEDULE_THRESHOLD_MINUTES * 60:
-                minutes, seconds = divmod(int(wait_seconds), 60)
-                print_warning(f"Post in {minutes}m {seconds}s - Running scheduler...")
-                sleep(over_time * 60)
-                try:
-                    subprocess.run(["python", os.path.join(os.path.dirname(__file__), "scheduler_combined.py")])
-                    print_success("Scheduler updated")
-                except subprocess.CalledProcessError as e:
-                    print_error(f"Scheduler failed: {str(e)}")
-                os.execv(sys.executable, [sys.executable] + sys.argv)
-            elif wait_seconds > ACTIVE_COUNTDOWN_SECONDS:
-                minutes, seconds = divmod(int(wait_seconds), 60)
-                print_countdown(f"Next post in {minutes}m {seconds}s - Monitoring...")
-                sleep(15)
-            else:
-                minutes, seconds = divmod(int(wait_seconds), 60)
-                print_countdown(f"Posting in {minutes}m {seconds}s...")
-                sleep(1)
-
-        # Posting process
-        print_header("Processing Media")
-        
-        client = get_instagram_session(account)
-        if not client:
-            print_error("Instagram login failed")
-            sleep(10)
-            continue
-
-        creds = get_drive_credentials(account)
-        if not creds:
-            print_error("Google Drive access failed")
-            update_account_after_post(account['id'])
-            sleep(10)
+        # Sleep until the post is due; the watcher re-arms the timer if the schedule changes
+        if not schedule_watcher.wait_until(account['next_post_time']):
+            print_info("Schedule changed - re-checking next post...")
             continue
-
-        media_to_post, drive_file_id, is_video = get_oldest_media_file(creds, account)
-        if not media_to_post:
-            print_error("No media files available")
-            update_account_after_post(account['id'])
-            cleanup_temp_folder()
+        print_success("Time to post!")
+
+        metrics.POST_LATENESS.observe(max(-wake_timer.seconds_until(account['next_post_time']), 0), platform='instagram')
+        allowed, retry_at, reason = post_governor.acquire('instagram', account['id'])
+        if not allowed:
+            print_warning(f"Throttled by {reason} - deferring to {retry_at.strftime('%Y-%m-%d %H:%M:%S')}")
+            post_governor.defer('instagram', account['id'], retry_at)
+            metrics.POSTS.inc(platform='instagram', result='throttled')
             continue
 
-        print_success(f"Selected: {os.path.basename(media_to_post)}")
-
-        post_path = media_to_post
-        if is_video:
-            adjusted_path = os.path.join(TEMP_FOLDER, f"adjusted_{os.path.basename(media_to_post)}")
-            if adjust_aspect_ratio(media_to_post, adjusted_path):
-                post_path = adjusted_path
-                print_success("Video optimized for Instagram")
-
-        caption = get_auto_caption(post_path, is_video=is_video)
-
-        print_header("Uploading to Instagram")
-        if post_media(client, post_path, caption, is_video=is_video):
-            print_header("Cleanup")
-            if drive_file_id:
-                print_step("Removing file from Google Drive...")
-                if delete_file_from_drive(drive_file_id, creds):
-                    print_success("File removed from Drive")
-                else:
-                    print_warning("File posted but could not delete from Drive")
-                    print_info("Check folder permissions in Google Drive")
+        # One trace per post, one span per pipeline stage (see tracing.py for the p50/p95 summary)
+        with tracing.trace('instagram_ai_post', account_id=account['id']):
+            print_header("Processing Media")
             
-            update_account_after_post(account['id'])
-        else:
-            print_error("Post failed - keeping files in Drive")
+            with tracing.span('session_login'):
+                client = get_instagram_session(account)
+            if not client:
+                print_error("Instagram login failed - scheduling a retry")
+                retry_queue.record_drive_failure(RETRY_WORKER, account['id'], error="login failed")
+                metrics.POSTS.inc(platform='instagram', result='failed')
+                continue
+
+            with tracing.span('drive_credentials'):
+                creds = get_drive_credentials(account)
+            if not creds:
+                print_error("Google Drive access failed - scheduling a retry")
+                retry_queue.record_drive_failure(RETRY_WORKER, account['id'], error="drive credentials unavailable")
+                metrics.POSTS.inc(platform='instagram', result='failed')
+                continue
+
+            with tracing.span('download'):
+                media_to_post, drive_file_id, is_video = get_oldest_media_file(creds, account)
+            if not media_to_post:
+                print_error("No media files available")
+                update_account_after_post(account['id'])
+                cleanup_temp_folder()
+                continue
+
+            print_success(f"Selected: {os.path.basename(media_to_post)}")
+
+            post_path = media_to_post
+            if is_video:
+                with tracing.span('adjust_aspect_ratio'):
+                    post_path, cache_hit = media_transcoder.prepare_for_reels(media_to_post)
+                if cache_hit:
+                    print_success("Using pre-optimized video from cache")
+                elif post_path != media_to_post:
+                    print_success("Video optimized for Instagram")
+
+            with tracing.span('caption'), metrics.CAPTION_SECONDS.time(source='worker'):
+                # Keyed on the original download, like the service's prefetch
+                caption = get_auto_caption(media_to_post, is_video=is_video, file_id=drive_file_id)
+
+            print_header("Uploading to Instagram")
+            with tracing.span('post_media'):
+                posted = post_media(client, post_path, caption, is_video=is_video, frame_source=media_to_post)
+            if posted:
+                print_header("Cleanup")
+                if drive_file_id:
+                    print_step("Removing file from Google Drive...")
+                    with tracing.span('drive_delete'):
+                        deleted = delete_file_from_drive(drive_file_id, creds)
+                    if deleted:
+                        print_success("File removed from Drive")
+                    else:
+                        print_warning("File posted but could not delete from Drive")
+                        print_info("Check folder permissions in Google Drive")
+                
+                with tracing.span('update_account_after_post'):
+                    update_account_after_post(account['id'])
+                retry_queue.clear_drive_failures(RETRY_WORKER, account['id'], drive_file_id)
+                metrics.POSTS.inc(platform='instagram', result='posted')
+            else:
+                print_error("Post failed - keeping files in Drive")
+                retry_queue.record_drive_failure(RETRY_WORKER, account['id'], drive_file_id, "post failed")
+                metrics.POSTS.inc(platform='instagram', result='failed')
+
+            cleanup_temp_folder()
+            print_header("Completed")
+            print_success("Ready for next post")
 
-        cleanup_temp_folder()
-        print_header("Completed")
-        print_success("Ready for next post")
+        # After the post's trace, so its duration covers the pipeline and not the pause
         sleep(2)
-        subprocess.run(["python", os.path.join(os.path.dirname(__file__), "scheduler_combined.py")])
+        with tracing.trace('scheduler_subprocess'):
+            subprocess.run(["python", os.path.join(os.path.dirname(__file__), "scheduler_combined.py")])
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -4,7 +4,7 @@ import json
 from time import sleep
 from google.oauth2.credentials import Credentials
 from google_auth_oauthlib.flow import InstalledAppFlow
-from googleapiclient.discovery import build
+import google_clients
 from google.auth.transport.requests import Request
 import mysql.connector
 from dotenv import load_dotenv
@@ -191,7 +191,7 @@ def validate_credentials(creds):
         return False
     
     try:
-        drive_service = build('drive', 'v3', credentials=creds)
+        drive_service = google_clients.get_service('drive', 'v3', creds)
         drive_service.files().list(pageSize=1, fields="files(id)").execute()
         return True
     except Exception as e:
@@ -0,0 +1,301 @@
+"""
+Retry schedule for media items whose post failed.
+
+A failed item stays 'pending' in custom_schedule_data with an attempts count
+and a retry_at time that backs off exponentially. Workers never claim an item
+before its retry_at, and the account's next_post_time is moved past the
+failure so the worker goes on to other accounts instead of retrying the same
+one in a loop. The backoff applies to the failed item only: when the
+scheduler recalculates the account, other items that are due sooner still
+bring next_post_time forward. After MAX_ATTEMPTS failures
+the item is parked as 'dead_letter' and no longer counts towards posts_left.
+Failures that happen before any media is picked (login, credentials) go
+through record_account_failure() and count against the next pending item.
+Posts picked straight from a Drive folder have no schedule item; their
+failures are counted per file and per account in drive_post_failures.
+"""
+import os
+import json
+import random
+from datetime import datetime, timedelta
+import pytz
+import mysql.connector
+from dotenv import load_dotenv
+import change_feed
+
+# Load environment variables from .env file
+load_dotenv()
+
+# --- Configuration ---
+DB_CONFIG = {
+    "host": os.getenv("DB_HOST"),
+    "database": os.getenv("DB_DATABASE"),
+    "user": os.getenv("DB_USER"),
+    "password": os.getenv("DB_PASSWORD"),
+    "port": int(os.getenv("DB_PORT"))
+}
+TIMEZONE = pytz.timezone('Asia/Kolkata')
+RETRY_FORMAT = '%Y-%m-%d %H:%M:%S'
+MAX_ATTEMPTS = int(os.getenv("RETRY_MAX_ATTEMPTS", "5"))
+BASE_DELAY_SECONDS = int(os.getenv("RETRY_BASE_DELAY_SECONDS", "300"))
+MAX_DELAY_SECONDS = 6 * 3600
+DEAD_LETTER_STATUS = 'dead_letter'
+
+# --- Database Functions ---
+def get_db_connection():
+    try:
+        return mysql.connector.connect(**DB_CONFIG)
+    except mysql.connector.Error as e:
+        print(f"ERROR: Database connection failed: {str(e)}")
+        return None
+
+# --- Backoff ---
+def backoff_seconds(attempts):
+    """Exponential delay for the given failure count, with +/-20% jitter so retries don't bunch up."""
+    delay = min(MAX_DELAY_SECONDS, BASE_DELAY_SECONDS * 2 ** max(attempts - 1, 0))
+    return delay * random.uniform(0.8, 1.2)
+
+def retry_at(item):
+    """The item's retry time as an aware datetime, or None if it has never failed."""
+    if not item.get('retry_at'):
+        return None
+    try:
+        return TIMEZONE.localize(datetime.strptime(item['retry_at'], RETRY_FORMAT))
+    except ValueError:
+        return None
+
+def is_backing_off(item, now):
+    retry_time = retry_at(item)
+    return retry_time is not None and retry_time > now
+
+def next_due_retry(schedule_data, now):
+    """The first pending item whose retry time has come, so it is retried before fresh items."""
+    for item in schedule_data:
+        retry_time = retry_at(item)
+        if item.get('status') == 'pending' and retry_time is not None and retry_time <= now:
+            return item
+    return None
+
+# --- Failure Recording ---
+def record_failure(platform, account_id, file_id, error=None):
+    """
+    Count a failed attempt for the item with file_id and schedule its retry, or
+    dead-letter it after MAX_ATTEMPTS. The account's next_post_time moves to the
+    retry time (the scheduler brings it forward again if another item is due sooner).
+    Returns the item's new status, or None if nothing was recorded.
+    """
+    conn = get_db_connection()
+    if not conn:
+        return None
+    now = datetime.now(TIMEZONE)
+    status = None
+    try:
+        cursor = conn.cursor(dictionary=True)
+        cursor.execute(f"SELECT custom_schedule_data FROM {platform} WHERE id = %s FOR UPDATE", (account_id,))
+        row = cursor.fetchone()
+        data = []
+        if row and row['custom_schedule_data']:
+            try:
+                data = json.loads(row['custom_schedule_data'])
+            except json.JSONDecodeError:
+                data = []
+
+        item = None
+        if file_id:
+            item = next((m for m in data if m.get('file_id') == file_id and m.get('status') == 'pending'), None)
+        if item:
+            item['attempts'] = item.get('attempts', 0) + 1
+            item['last_error'] = str(error)[:300] if error else None
+            if item['attempts'] >= MAX_ATTEMPTS:
+                item['status'] = DEAD_LETTER_STATUS
+                item.pop('retry_at', None)
+                status = DEAD_LETTER_STATUS
+                print(f"WARNING: {item.get('media_name')} failed {item['attempts']} times; moved to dead letter")
+                next_try = now + timedelta(seconds=BASE_DELAY_SECONDS)
+            else:
+                next_try = now + timedelta(seconds=backoff_seconds(item['attempts']))
+                item['retry_at'] = next_try.strftime(RETRY_FORMAT)
+                status = 'pending'
+                print(f"Retry {item['attempts']}/{MAX_ATTEMPTS - 1} for {item.get('media_name')} at {item['retry_at']}")
+            cursor.execute(f"""
+                UPDATE {platform}
+                SET custom_schedule_data = %s,
+                    posts_left = GREATEST(posts_left - %s, 0),
+                    next_post_time = %s
+                WHERE id = %s
+            """, (json.dumps(data), 1 if status == DEAD_LETTER_STATUS else 0,
+                  next_try.replace(tzinfo=None), account_id))
+        else:
+            # Nothing to track per item (e.g. media picked straight from Drive); just back the account off
+            next_try = now + timedelta(seconds=BASE_DELAY_SECONDS)
+            cursor.execute(f"UPDATE {platform} SET next_post_time = %s WHERE id = %s",
+                           (next_try.replace(tzinfo=None), account_id))
+        change_feed.record_event(cursor, platform, account_id, 'post_failed')
+        conn.commit()
+        cursor.close()
+    except mysql.connector.Error as e:
+        print(f"ERROR: Could not record failed post for {platform} account {account_id}: {str(e)}")
+        return None
+    finally:
+        conn.close()
+    change_feed.notify(platform, 'post_failed', account_id)
+    return status
+
+def record_account_failure(platform, account_id, error=None):
+    """
+    Record a failure that happened before any media was picked, e.g. a failed
+    login or missing Drive credentials. It counts against the account's next
+    pending item (a due retry first), so a broken account backs off like any
+    failed post and is eventually dead-lettered instead of retried in a loop.
+    """
+    conn = get_db_connection()
+    if not conn:
+        return None
+    try:
+        cursor = conn.cursor(dictionary=True)
+        cursor.execute(f"SELECT custom_schedule_data FROM {platform} WHERE id = %s", (account_id,))
+        row = cursor.fetchone()
+        cursor.close()
+    except mysql.connector.Error as e:
+        print(f"ERROR: Could not read schedule of {platform} account {account_id}: {str(e)}")
+        return None
+    finally:
+        conn.close()
+    data = []
+    if row and row['custom_schedule_data']:
+        try:
+            data = json.loads(row['custom_schedule_data'])
+        except json.JSONDecodeError:
+            data = []
+    now = datetime.now(TIMEZONE)
+    item = next_due_retry(data, now) or next(
+        (m for m in data if m.get('status') == 'pending' and not is_backing_off(m, now)), None)
+    return record_failure(platform, account_id, item.get('file_id') if item else None, error)
+
+# --- Drive-folder Posts ---
+# post_reel_loop_AIcaption.py posts the oldest file of the account's Drive folder, which never
+# appears in custom_schedule_data. Its failures are counted here instead, one row per Drive file
+# and one per account (file_id '') for failures before any file is picked (login, credentials).
+DRIVE_FAILURES_ACCOUNT = ''
+
+_drive_table_ready = False
+
+def ensure_drive_failures_table(cursor):
+    """Create the Drive-folder failure table if it does not exist."""
+    global _drive_table_ready
+    if _drive_table_ready:
+        return
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS drive_post_failures (
+            worker VARCHAR(32) NOT NULL,
+            account_id INT NOT NULL,
+            file_id VARCHAR(255) NOT NULL,
+            attempts INT NOT NULL DEFAULT 0,
+            retry_at DATETIME NULL,
+            dead_letter TINYINT(1) NOT NULL DEFAULT 0,
+            last_error VARCHAR(300) NULL,
+            PRIMARY KEY (worker, account_id, file_id)
+        )
+    """)
+    _drive_table_ready = True
+
+def drive_backoff_filter(worker, account_column):
+    """
+    SQL predicate for a worker's claim query: the account is not backing off
+    and not dead-lettered. Uses the database clock, like the retry times.
+    """
+    return f"""NOT EXISTS (
+        SELECT 1 FROM drive_post_failures f
+        WHERE f.worker = '{worker}' AND f.account_id = {account_column} AND f.file_id = ''
+          AND (f.dead_letter = 1 OR f.retry_at > NOW()))"""
+
+def record_drive_failure(worker, account_id, file_id=None, error=None):
+    """
+    Count a failure of a Drive-folder post. With file_id it counts against that
+    file, otherwise against the account. Either way the account is held back
+    for backoff_seconds(attempts). After MAX_ATTEMPTS a file is dead-lettered
+    (dead_lettered_files() leaves it out of the folder) and the next file is
+    tried straight away; a dead-lettered account is no longer claimed until
+    its row is deleted. Returns the new status, or None if nothing was recorded.
+    """
+    conn = get_db_connection()
+    if not conn:
+        return None
+    key = file_id or DRIVE_FAILURES_ACCOUNT
+    try:
+        cursor = conn.cursor()
+        ensure_drive_failures_table(cursor)
+        cursor.execute("""
+            INSERT INTO drive_post_failures (worker, account_id, file_id, attempts, last_error)
+            VALUES (%s, %s, %s, 1, %s)
+            ON DUPLICATE KEY UPDATE attempts = attempts + 1, last_error = VALUES(last_error)
+        """, (worker, account_id, key, str(error)[:300] if error else None))
+        cursor.execute("SELECT attempts FROM drive_post_failures WHERE worker = %s AND account_id = %s AND file_id = %s",
+                       (worker, account_id, key))
+        attempts = cursor.fetchone()[0]
+        label = f"file {file_id}" if file_id else f"account {account_id}"
+        if attempts >= MAX_ATTEMPTS:
+            status = DEAD_LETTER_STATUS
+            cursor.execute("""
+                UPDATE drive_post_failures SET dead_letter = 1, retry_at = NULL
+                WHERE worker = %s AND account_id = %s AND file_id = %s
+            """, (worker, account_id, key))
+            print(f"WARNING: {worker} {label} failed {attempts} times; moved to dead letter")
+        else:
+            status = 'pending'
+            delay = int(backoff_seconds(attempts))
+            # The account row carries the wait for both kinds of failure
+            cursor.execute("""
+                INSERT INTO drive_post_failures (worker, account_id, file_id, attempts, retry_at)
+                VALUES (%s, %s, '', 0, NOW() + INTERVAL %s SECOND)
+                ON DUPLICATE KEY UPDATE retry_at = VALUES(retry_at)
+            """, (worker, account_id, delay))
+            print(f"Retry {attempts}/{MAX_ATTEMPTS - 1} for {worker} {label} in {delay}s")
+        conn.commit()
+        cursor.close()
+    except mysql.connector.Error as e:
+        print(f"ERROR: Could not record failed {worker} post for account {account_id}: {str(e)}")
+        return None
+    finally:
+        conn.close()
+    return status
+
+def clear_drive_failures(worker, account_id, file_id=None):
+    """Forget the account's (and the posted file's) failures after a successful post."""
+    conn = get_db_connection()
+    if not conn:
+        return
+    try:
+        cursor = conn.cursor()
+        ensure_drive_failures_table(cursor)
+        cursor.execute("""
+            DELETE FROM drive_post_failures
+            WHERE worker = %s AND account_id = %s AND file_id IN (%s, %s)
+        """, (worker, account_id, DRIVE_FAILURES_ACCOUNT, file_id or DRIVE_FAILURES_ACCOUNT))
+        conn.commit()
+        cursor.close()
+    except mysql.connector.Error as e:
+        print(f"WARNING: Could not clear failures of {worker} account {account_id}: {str(e)}")
+    finally:
+        conn.close()
+
+def dead_lettered_files(worker, account_id):
+    """Drive file ids of the account that are dead-lettered and must be skipped."""
+    conn = get_db_connection()
+    if not conn:
+        return set()
+    try:
+        cursor = conn.cursor()
+        ensure_drive_failures_table(cursor)
+        cursor.execute("""
+            SELECT file_id FROM drive_post_failures
+            WHERE worker = %s AND account_id = %s AND file_id <> '' AND dead_letter = 1
+        """, (worker, account_id))
+        files = {row[0] for row in cursor.fetchall()}
+        cursor.close()
+        return files
+    except mysql.connector.Error as e:
+        print(f"WARNING: Could not read dead-lettered files of {worker} account {account_id}: {str(e)}")
+        return set()
+    finally:
+        conn.close()
@@ -1,11 +1,18 @@
 import subprocess
+import argparse
 import mysql.connector
 from datetime import datetime, time, timedelta
 import pytz
-from time import sleep
+from time import sleep, perf_counter
 import os
 import hashlib
 import json
+import slot_table
+import db_migrations
+import change_feed
+import leader_lock
+import retry_queue
+import metrics
 
 # Configuration
 from dotenv import load_dotenv
@@ -20,12 +27,17 @@ DB_CONFIG = {
     "port": int(os.getenv("DB_PORT"))
 }
 TIMEZONE = pytz.timezone('Asia/Kolkata')
+PLATFORMS = ['instagram', 'telegram', 'youtube']
+# A standby retries the leader locks this often, so failover takes at most this long
+STANDBY_RETRY_SECONDS = 5
+# Coalesce a burst of change notifications (e.g. a multi-file upload) into one run
+CHANGE_DEBOUNCE_SECONDS = 0.2
 
 # Helper Functions
 def get_db_connection():
     """Establish connection to the MySQL database."""
     try:
-        return mysql.connector.connect(**DB_CONFIG)
+        return metrics.instrument_connection(mysql.connector.connect(**DB_CONFIG), 'scheduler')
     except mysql.connector.Error as e:
         print(f"[ERROR] Database connection failed: {e}")
         return None
@@ -64,62 +76,117 @@ def get_schedule_hash(start_range, end_range, posts_left, custom_data, daily_ran
     schedule_string = f"{start_range}_{end_range}_{posts_left}_{custom_data}_{daily_range}_{current_date}"
     return hashlib.md5(schedule_string.encode()).hexdigest()
 
-def calculate_initial_schedule(now, start_time, end_time, num_posts, post_daily_range_left):
+# Fingerprint of everything the scheduler reads from a row, computed by MySQL so unchanged
+# accounts can be filtered out without transferring or parsing custom_schedule_data
+QUEUE_DIGEST_SQL = """MD5(CONCAT_WS('|',
+    IFNULL(custom_schedule_data, ''), IFNULL(sch_start_range, ''), IFNULL(sch_end_range, ''),
+    IFNULL(post_daily_range, ''), IFNULL(post_daily_range_left, ''), IFNULL(posts_left, ''),
+    IFNULL(number_of_posts, ''), IFNULL(next_post_time, ''), IFNULL(schedule_hash, ''),
+    IFNULL(selected, ''), IFNULL(done, '')))"""
+
+_schema_ready = False
+
+def ensure_scheduler_schema(cursor):
     """
-    Calculate the initial posting schedule for the day for range posts.
-    Uses post_daily_range_left if available, otherwise falls back to num_posts.
-    For 1 post, schedules at the midpoint of the remaining window.
-    For multiple posts, spaces evenly from now to end_time.
-    Returns list of datetime objects for each post.
+    Add queue_digest / digest_valid_until / deferred_until to the platform
+    tables if they are missing and create the schedule_slots timetable table.
     """
-    # If post_daily_range_left is 0, skip range posts
-    if post_daily_range_left == 0:
-        return []
-    
-    start_datetime = now.replace(hour=start_time.hour, minute=start_time.minute, second=start_time.second, microsecond=0)
-    end_datetime = now.replace(hour=end_time.hour, minute=end_time.minute, second=end_time.second, microsecond=0)
-    
-    if end_datetime <= start_datetime:
-        end_datetime += timedelta(days=1)
-    
-    # Check if schedule end time has already passed
-    if now > end_datetime:
-        return []  # Skip range posts if past sch_end_range
-    
-    current_time = now.time()
-    if start_time <= current_time <= end_time and now.date() == start_datetime.date():
-        start_datetime = now
-    else:
-        return []  # Schedule for next day only if explicitly needed
-    
-    # Use post_daily_range_left if available, otherwise use num_posts
-    effective_posts = post_daily_range_left if post_daily_range_left > 0 else num_posts
-    
-    total_seconds = (end_datetime - start_datetime).total_seconds()
-    
-    if effective_posts <= 0 or total_seconds <= 0:
-        return []
-    
-    if effective_posts == 1:
-        # Schedule single post at midpoint of remaining window
-        midpoint_seconds = total_seconds / 2
-        post_time = start_datetime + timedelta(seconds=midpoint_seconds)
-        if post_time > now:
-            return [post_time]
-        return []
-    
-    # Multiple posts: space evenly
-    interval_seconds = max(total_seconds / effective_posts, 60)
-    post_times = []
-    for i in range(effective_posts):
-        post_time = start_datetime + timedelta(seconds=interval_seconds * i)
-        if post_time > now:
-            post_times.append(post_time)
-    
-    return post_times
+    global _schema_ready
+    if _schema_ready:
+        return
+    slot_table.ensure_slot_table(cursor)
+    change_feed.ensure_events_table(cursor)
+    for platform in ['instagram', 'telegram', 'youtube']:
+        cursor.execute("""
+            SELECT COLUMN_NAME FROM information_schema.COLUMNS
+            WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s
+              AND COLUMN_NAME IN ('queue_digest', 'digest_valid_until', 'deferred_until')
+        """, (platform,))
+        existing = {row['COLUMN_NAME'] for row in cursor.fetchall()}
+        if 'queue_digest' not in existing:
+            cursor.execute(f"ALTER TABLE {platform} ADD COLUMN queue_digest CHAR(32) NULL")
+        if 'digest_valid_until' not in existing:
+            cursor.execute(f"ALTER TABLE {platform} ADD COLUMN digest_valid_until DATETIME NULL")
+        # Set by post_governor.defer(); the scheduler never schedules the account earlier, and it is
+        # cleared once it has passed or a post succeeds
+        if 'deferred_until' not in existing:
+            cursor.execute(f"ALTER TABLE {platform} ADD COLUMN deferred_until DATETIME NULL")
+    _schema_ready = True
+
+def get_digest_valid_until(now, next_post, earliest_pending_datetime, window_start):
+    """
+    Latest moment the current scheduling decision for a row stays correct
+    without anything in the row changing: the next post, the next datetime
+    post that would become missed, the opening of today's range window,
+    or midnight, whichever comes first.
+    """
+    candidates = [TIMEZONE.localize(datetime.combine(now.date() + timedelta(days=1), time(0, 0)))]
+    for moment in (next_post, earliest_pending_datetime, window_start):
+        if moment and moment > now:
+            candidates.append(moment)
+    return min(candidates).astimezone(TIMEZONE).replace(tzinfo=None)
+
+def shard_filter(shard, shards):
+    """
+    SQL predicate and params for the accounts of one shard. Stable across
+    scheduler processes; all of a user's accounts share a shard, and rows
+    without a user_id go to shard 0. Unsharded runs get no predicate.
+    """
+    if shards <= 1:
+        return "TRUE", ()
+    return "MOD(CRC32(COALESCE(user_id, 0)), %s) = %s", (shards, shard)
+
+# Columns run_scheduler_once may change; flushed together in one batched UPDATE per platform
+SCHEDULER_COLUMNS = (
+    'post_daily_range_left', 'last_reset', 'custom_schedule_data', 'number_of_posts',
+    'posts_left', 'selected', 'done', 'next_post_time', 'schedule_hash', 'deferred_until'
+)
+
+def flush_platform_updates(cursor, platform, pending_updates):
+    """
+    Write the changed columns of every changed row in a single executemany.
+    Each column is only overwritten when it actually changed for that row,
+    so values the workers write concurrently are left alone. The queue digest
+    is assigned last, so MySQL computes it from the row's new values.
+    Returns the number of rows written.
+    """
+    if not pending_updates:
+        return 0
+    assignments = ", ".join(f"{column} = IF(%s, %s, {column})" for column in SCHEDULER_COLUMNS)
+    assignments += f", queue_digest = {QUEUE_DIGEST_SQL}, digest_valid_until = %s"
+    params = []
+    for row_id, changes, valid_until in pending_updates:
+        row_params = []
+        for column in SCHEDULER_COLUMNS:
+            row_params.extend((column in changes, changes.get(column)))
+        row_params.extend((valid_until, row_id))
+        params.append(tuple(row_params))
+    cursor.executemany(f"UPDATE {platform} SET {assignments} WHERE id = %s", params)
+    return len(pending_updates)
+
+def flush_digest_refreshes(cursor, platform, digest_updates):
+    """
+    Store a fresh queue digest and validity window for rows whose schedule
+    did not change, so the next pass can skip them. Returns rows written.
+    """
+    if not digest_updates:
+        return 0
+    cursor.executemany(
+        f"UPDATE {platform} SET queue_digest = {QUEUE_DIGEST_SQL}, digest_valid_until = %s WHERE id = %s",
+        [(valid_until, row_id) for row_id, valid_until in digest_updates]
+    )
+    return len(digest_updates)
 
 # Main Logic
-def run_scheduler_once():
+RUN_SECONDS = metrics.histogram("scheduler_run_duration_seconds", "Time to compute and flush one scheduler pass")
+ROWS_TOUCHED = metrics.counter("scheduler_rows_touched_total", "Account rows whose schedule the scheduler changed", ["platform"])
+DIGEST_REFRESHES = metrics.counter("scheduler_digest_refreshes_total",
+                                   "Unchanged account rows whose queue digest or validity window was refreshed",
+                                   ["platform"])
+ACCOUNTS_PROCESSED = metrics.counter("scheduler_accounts_processed_total", "Accounts re-evaluated", ["platform"])
+ACCOUNTS_SKIPPED = metrics.counter("scheduler_accounts_skipped_total", "Accounts skipped by the queue digest", ["platform"])
+
+def run_scheduler_once(now=None, launch_workers=True, platforms=None, shard=0, shards=1, notify_workers=None):
     """
     Combined scheduler for Instagram, Telegram, and YouTube.
     Updates number_of_posts and posts_left from custom_schedule_data.
@@ -127,40 +194,72 @@ def run_scheduler_once():
     Sets 'upload_missed' for past datetime posts.
     Prioritizes earliest future scheduled_datetime over range posts.
     Supports post_daily_range_left for dynamic daily posting limits.
+    All changes are computed in memory and flushed once per platform.
+    Accounts whose queue digest is unchanged since their last pass, on the
+    same day and before their digest_valid_until, are skipped in SQL.
+    now overrides the clock (used by benchmark_scheduler.py); launch_workers=False
+    only updates the schedule; platforms limits the run to the partitions this
+    instance leads. With shards > 1 only accounts whose user_id hashes to
+    `shard` are processed. notify_workers (default: launch_workers) sends the
+    change feed a wake-up when a next_post_time moved. Returns per-run counters.
     """
+    run_started = perf_counter()
     conn = get_db_connection()
     if not conn:
         print("[ERROR] Failed to connect to database. Exiting.")
         return
 
     cursor = conn.cursor(dictionary=True)
-    now = datetime.now(TIMEZONE)
+    ensure_scheduler_schema(cursor)
+    now = now or datetime.now(TIMEZONE)
     
     print(f"\nScheduler Run: {now.strftime('%Y-%m-%d %H:%M:%S %Z')}")
     print("-" * 50)
 
-    platforms = ['instagram', 'telegram', 'youtube']
+    platforms = platforms or PLATFORMS
+    if notify_workers is None:
+        notify_workers = launch_workers
+    shard_sql, shard_params = shard_filter(shard, shards)
     completed_ids = {platform: [] for platform in platforms}
+    rows_touched = {platform: 0 for platform in platforms}
+    digest_refreshed = {platform: 0 for platform in platforms}
+    accounts_skipped = {platform: 0 for platform in platforms}
+    accounts_processed = {platform: 0 for platform in platforms}
+    now_naive = now.replace(tzinfo=None)
     
     for platform in platforms:
         print(f"\nPlatform: {platform.capitalize()}")
-        
+
+        cursor.execute(f"SELECT COUNT(*) AS total FROM {platform} WHERE {shard_sql}", shard_params)
+        total_accounts = cursor.fetchone()['total']
         cursor.execute(f"""
             SELECT id, sch_start_range, sch_end_range, posts_left, next_post_time, 
                    number_of_posts, schedule_hash, custom_schedule_data, 
-                   post_daily_range, post_daily_range_left, last_reset
+                   post_daily_range, post_daily_range_left, last_reset,
+                   selected, done, deferred_until, digest_valid_until,
+                   queue_digest <=> {QUEUE_DIGEST_SQL} AS digest_current
             FROM {platform}
-        """)
+            WHERE {shard_sql}
+              AND NOT (queue_digest <=> {QUEUE_DIGEST_SQL}
+                       AND last_reset IS NOT NULL AND DATE(last_reset) = %s
+                       AND digest_valid_until IS NOT NULL AND digest_valid_until > %s)
+        """, shard_params + (now.date(), now_naive))
         rows = cursor.fetchall()
+        accounts_skipped[platform] = total_accounts - len(rows)
+        accounts_processed[platform] = len(rows)
+        slot_states = slot_table.load_slots(cursor, platform, [row['id'] for row in rows])
+        pending_updates = []
 
         for row in rows:
             row_id = row['id']
-            start_time = timedelta_to_time(row['sch_start_range'])
-            end_time = timedelta_to_time(row['sch_end_range'])
+            changes = {}
+            entry = [row_id, changes, None]
 
-            if not start_time or not end_time:
-                print(f"  ID {row_id}: Missing schedule range. Skipped.")
-                continue
+            def set_column(column, value):
+                if row.get(column) != value:
+                    changes[column] = value
+
+            pending_updates.append(entry)
 
             # Check if we need to reset post_daily_range_left for new day
             last_reset_date = row['last_reset'].date() if row['last_reset'] else None
@@ -168,17 +267,29 @@ def run_scheduler_once():
             if last_reset_date != now.date():
                 # Reset post_daily_range_left for new day
                 post_daily_range = row['post_daily_range'] if row['post_daily_range'] is not None else 0
-                cursor.execute(f"""
-                    UPDATE {platform} SET 
-                        post_daily_range_left = %s,
-                        last_reset = %s
-                    WHERE id = %s
-                """, (post_daily_range, now, row_id))
+                set_column('post_daily_range_left', post_daily_range)
+                changes['last_reset'] = now
                 print(f"  ID {row_id}: Reset post_daily_range_left to {post_daily_range} for new day.")
                 post_daily_range_left = post_daily_range
             else:
                 post_daily_range_left = row['post_daily_range_left'] if row['post_daily_range_left'] is not None else 0
 
+            # A governor deferral (post_governor.defer) that has run out no longer holds the account back
+            deferred_until = make_aware(row['deferred_until']) if row['deferred_until'] else None
+            if deferred_until and deferred_until <= now:
+                set_column('deferred_until', None)
+                deferred_until = None
+
+            start_time = timedelta_to_time(row['sch_start_range'])
+            end_time = timedelta_to_time(row['sch_end_range'])
+
+            if not start_time or not end_time:
+                print(f"  ID {row_id}: Missing schedule range. Skipped.")
+                # Still gets a digest valid until midnight (and today's last_reset above),
+                # so it is skipped until the row changes instead of re-processed every pass
+                entry[2] = get_digest_valid_until(now, None, None, None)
+                continue
+
             custom_data = row['custom_schedule_data']
             data = []
             if custom_data:
@@ -189,7 +300,11 @@ def run_scheduler_once():
                     data = []
 
             data_updated = False
+            earliest_pending_datetime = None
+            has_pending_range = False
             for item in data:
+                retry_time = retry_queue.retry_at(item) if item.get('status') == 'pending' else None
+
                 # Handle RANGE posts: upload_missed → pending (ALWAYS)
                 if item.get('schedule_type') == 'range' and item.get('status') == 'upload_missed':
                     item['status'] = 'pending'
@@ -208,44 +323,45 @@ def run_scheduler_once():
                             data_updated = True
                             print(f"  ID {row_id}: Reverted status to 'pending' for future datetime media {item.get('media_name')}.")
                         
-                        # PAST datetime: pending → upload_missed
-                        elif item.get('status') == 'pending' and scheduled_dt_aware < now:
+                        # PAST datetime: pending → upload_missed (failed posts keep their retry schedule)
+                        elif item.get('status') == 'pending' and scheduled_dt_aware < now and retry_time is None:
                             item['status'] = 'upload_missed'
                             data_updated = True
                             print(f"  ID {row_id}: Marked media {item.get('media_name')} as 'upload_missed' (past scheduled time).")
+
+                        if item.get('status') == 'pending' and scheduled_dt_aware > now:
+                            if earliest_pending_datetime is None or scheduled_dt_aware < earliest_pending_datetime:
+                                earliest_pending_datetime = scheduled_dt_aware
                     
                     except ValueError:
                         print(f"  ID {row_id}: Invalid scheduled_datetime for media {item.get('media_name')}.")
 
+                if item.get('schedule_type') == 'range' and item.get('status') == 'pending':
+                    has_pending_range = True
+
+                if retry_time and retry_time > now:
+                    if earliest_pending_datetime is None or retry_time < earliest_pending_datetime:
+                        earliest_pending_datetime = retry_time
+
             if data_updated:
-                cursor.execute(f"""
-                    UPDATE {platform} SET 
-                        custom_schedule_data = %s
-                    WHERE id = %s
-                """, (json.dumps(data), row_id))
+                changes['custom_schedule_data'] = json.dumps(data)
 
             total_media = len(data) if data else 0
             pending_count = sum(1 for item in data if item.get('status') == 'pending') if data else 0
 
             if total_media != row['number_of_posts'] or pending_count != row['posts_left']:
-                cursor.execute(f"""
-                    UPDATE {platform} SET 
-                        number_of_posts = %s, 
-                        posts_left = %s 
-                    WHERE id = %s
-                """, (total_media, pending_count, row_id))
+                set_column('number_of_posts', total_media)
+                set_column('posts_left', pending_count)
                 print(f"  ID {row_id}: Updated posts: total={total_media}, pending={pending_count}.")
 
             posts_left = pending_count
-            selected = 'Yes' if posts_left > 0 else 'No'
-            cursor.execute(f"UPDATE {platform} SET selected = %s WHERE id = %s", (selected, row_id))
-
-            done = 'Yes' if posts_left == 0 else 'No'
-            cursor.execute(f"UPDATE {platform} SET done = %s WHERE id = %s", (done, row_id))
+            set_column('selected', 'Yes' if posts_left > 0 else 'No')
+            set_column('done', 'Yes' if posts_left == 0 else 'No')
 
             if posts_left == 0:
                 completed_ids[platform].append(row_id)
-                cursor.execute(f"UPDATE {platform} SET next_post_time = NULL WHERE id = %s", (row_id,))
+                set_column('next_post_time', None)
+                entry[2] = get_digest_valid_until(now, None, None, None)
                 continue
 
             next_post_time_aware = make_aware(row['next_post_time']) if row['next_post_time'] else None
@@ -275,11 +391,16 @@ def run_scheduler_once():
                 print(f"  ID {row_id}: Recalculating schedule ({reason}).")
                 
                 pending_datetime_times = []
+                pending_retry_times = []
                 pending_range_count = 0
                 if data:
                     for item in data:
                         if item.get('status') == 'pending':
-                            if item.get('schedule_type') == 'datetime' and item.get('scheduled_datetime'):
+                            retry_time = retry_queue.retry_at(item)
+                            if retry_time is not None:
+                                # Failed posts come back at their retry time, or straight away once it has passed
+                                pending_retry_times.append(max(retry_time, now))
+                            elif item.get('schedule_type') == 'datetime' and item.get('scheduled_datetime'):
                                 try:
                                     dt = datetime.strptime(item['scheduled_datetime'], '%Y-%m-%d %H:%M:%S')
                                     dt_aware = make_aware(dt)
@@ -293,55 +414,93 @@ def run_scheduler_once():
                     pending_range_count = posts_left
 
                 min_datetime = min(pending_datetime_times) if pending_datetime_times else None
+                min_retry = min(pending_retry_times) if pending_retry_times else None
                 min_range = None
                  
                 # Use post_daily_range_left for scheduling range posts
                 daily_range_posts = min(pending_range_count, post_daily_range_left) if post_daily_range_left > 0 else 0
                 
                 if daily_range_posts > 0:
-                    range_post_times = calculate_initial_schedule(now, start_time, end_time, daily_range_posts, post_daily_range_left)
-                    if range_post_times:
-                        min_range = range_post_times[0]
-                        print(f"  ID {row_id}: Range post times: {[pt.strftime('%Y-%m-%d %H:%M:%S %Z') for pt in range_post_times]}")
+                    # The day's timetable is built once and then only read; workers pop slots as they post
+                    slot_config = slot_table.get_config_digest(
+                        row['sch_start_range'], row['sch_end_range'], row['post_daily_range'], now.date()
+                    )
+                    slot_state, rebuilt = slot_table.ensure_daily_slots(
+                        slot_states.get(row_id), now, start_time, end_time, post_daily_range_left, slot_config
+                    )
+                    slot_states[row_id] = slot_state
+                    if rebuilt:
+                        print(f"  ID {row_id}: Built today's range timetable: {json.loads(slot_state['slots'])}")
+                    min_range = slot_table.next_slot(slot_state, now)
                 
-                if min_datetime and min_range:
-                    next_post = min(min_datetime, min_range)
-                    print(f"  ID {row_id}: Selected {'datetime' if next_post == min_datetime else 'range'} time: {next_post.strftime('%Y-%m-%d %H:%M:%S %Z')}")
-                elif min_datetime:
-                    next_post = min_datetime
-                    print(f"  ID {row_id}: Selected datetime time: {next_post.strftime('%Y-%m-%d %H:%M:%S %Z')}")
-                elif min_range:
-                    next_post = min_range
-                    print(f"  ID {row_id}: Selected range time: {next_post.strftime('%Y-%m-%d %H:%M:%S %Z')}")
+                candidates = [(moment, kind) for moment, kind in
+                              ((min_datetime, 'datetime'), (min_range, 'range'), (min_retry, 'retry')) if moment]
+                if candidates:
+                    next_post, kind = min(candidates, key=lambda candidate: candidate[0])
+                    print(f"  ID {row_id}: Selected {kind} time: {next_post.strftime('%Y-%m-%d %H:%M:%S %Z')}")
+                    # A governor deferral holds even across the day boundary
+                    if deferred_until and deferred_until > next_post:
+                        next_post = deferred_until
+                        print(f"  ID {row_id}: Deferred until {next_post.strftime('%Y-%m-%d %H:%M:%S %Z')}.")
                 else:
                     next_post = None
                     print(f"  ID {row_id}: No schedulable posts (range: {pending_range_count}, datetime: {len(pending_datetime_times)}, daily_range_left: {post_daily_range_left}).")
 
+                set_column('schedule_hash', current_schedule_hash)
                 if next_post:
-                    cursor.execute(f"""
-                        UPDATE {platform} SET 
-                            next_post_time = %s, 
-                            schedule_hash = %s 
-                        WHERE id = %s
-                    """, (next_post, current_schedule_hash, row_id))
+                    # DB values come back naive in TIMEZONE, so compare on that basis
+                    set_column('next_post_time', next_post.astimezone(TIMEZONE).replace(tzinfo=None))
                     print(f"  ID {row_id}: Set next post time to {next_post.strftime('%Y-%m-%d %H:%M:%S %Z')}.")
                 else:
-                    cursor.execute(f"""
-                        UPDATE {platform} SET 
-                            next_post_time = NULL,
-                            schedule_hash = %s
-                        WHERE id = %s
-                    """, (current_schedule_hash, row_id))
+                    set_column('next_post_time', None)
                     print(f"  ID {row_id}: No posts scheduled.")
             else:
+                next_post = next_post_time_aware
                 print(f"  ID {row_id}: Using existing schedule: {next_post_time_aware.strftime('%Y-%m-%d %H:%M:%S %Z')}.")
 
+            window_start = None
+            if has_pending_range or not data:
+                window_start = now.replace(hour=start_time.hour, minute=start_time.minute,
+                                           second=start_time.second, microsecond=0)
+            entry[2] = get_digest_valid_until(now, next_post, earliest_pending_datetime, window_start)
+
         if completed_ids[platform]:
             print(f"  Completed accounts (no posts left): {', '.join(map(str, completed_ids[platform]))}.")
 
-    conn.commit()
+        # Rows with real changes get the full update; unchanged rows are only written when
+        # their stored digest is stale or their validity window moved (e.g. it expired)
+        stored_digests = {row['id']: (row['digest_current'], row['digest_valid_until']) for row in rows}
+        changed_updates = [entry for entry in pending_updates if entry[1]]
+        digest_updates = [(row_id, valid_until) for row_id, changes, valid_until in pending_updates
+                          if not changes and stored_digests[row_id] != (1, valid_until)]
+        rows_touched[platform] = flush_platform_updates(cursor, platform, changed_updates)
+        digest_refreshed[platform] = flush_digest_refreshes(cursor, platform, digest_updates)
+        slot_table.save_slots(cursor, platform, slot_states)
+        # Wake the platform's worker only when a next_post_time actually moved
+        schedule_changed = any('next_post_time' in changes for _, changes, _ in pending_updates)
+        if schedule_changed:
+            change_feed.record_event(cursor, platform, None, 'next_post_time_changed')
+        conn.commit()
+        if schedule_changed and notify_workers:
+            change_feed.notify(platform, 'next_post_time_changed',
+                               targets=change_feed.worker_subscribers(platform))
+        print(f"  Accounts processed: {len(rows)}, skipped (unchanged): {accounts_skipped[platform]}, "
+              f"rows changed: {rows_touched[platform]}, digests refreshed: {digest_refreshed[platform]}.")
+
     cursor.close()
     conn.close()
+    RUN_SECONDS.observe(perf_counter() - run_started)
+    for platform in platforms:
+        ROWS_TOUCHED.inc(rows_touched[platform], platform=platform)
+        DIGEST_REFRESHES.inc(digest_refreshed[platform], platform=platform)
+        ACCOUNTS_PROCESSED.inc(accounts_processed[platform], platform=platform)
+        ACCOUNTS_SKIPPED.inc(accounts_skipped[platform], platform=platform)
+    print(f"\nRows changed this run: {sum(rows_touched.values())} "
+          f"({', '.join(f'{p}={n}' for p, n in rows_touched.items())})")
+    print(f"Digests refreshed this run: {sum(digest_refreshed.values())} "
+          f"({', '.join(f'{p}={n}' for p, n in digest_refreshed.items())})")
+    print(f"Accounts skipped this run: {sum(accounts_skipped.values())} "
+          f"({', '.join(f'{p}={n}' for p, n in accounts_skipped.items())})")
     
     print("\nEarliest Post Times:")
     instagram_time = get_earliest_post_time('instagram')
@@ -352,7 +511,9 @@ def run_scheduler_once():
     print(f"  Telegram: {telegram_time.strftime('%Y-%m-%d %H:%M:%S %Z') if telegram_time else 'None'}")
     print(f"  YouTube: {youtube_time.strftime('%Y-%m-%d %H:%M:%S %Z') if youtube_time else 'None'}")
 
-    if not instagram_time and not telegram_time and not youtube_time:
+    if not launch_workers:
+        print("\nWorker launch disabled for this run.")
+    elif not instagram_time and not telegram_time and not youtube_time:
         print("\nNo posts scheduled. Running all workers...")
         subprocess.run(["python", os.path.join(os.path.dirname(__file__), "post_reel_loop.py")], check=False)
         subprocess.run(["python", os.path.join(os.path.dirname(__file__), "post_on_telegram.py")], check=False)
@@ -385,20 +546,76 @@ def run_scheduler_once():
     print(f"\nScheduler Run Complete: {now.strftime('%Y-%m-%d %H:%M:%S %Z')}")
     print("-" * 50)
 
-def run_continuous_scheduler():
-    """Run the scheduler continuously with error handling."""
+    return {
+        "processed": accounts_processed,
+        "skipped": accounts_skipped,
+        "rows_touched": rows_touched,
+        "digest_refreshed": digest_refreshed
+    }
+
+def prune_schedule_events():
+    """Drop change-feed events older than a day."""
+    conn = get_db_connection()
+    if not conn:
+        return
+    cursor = conn.cursor()
+    change_feed.prune_events(cursor)
+    conn.commit()
+    cursor.close()
+    conn.close()
+
+def run_continuous_scheduler(shard=0, shards=1):
+    """
+    Run the scheduler continuously with error handling.
+    Each shard is a separate process (on any host) with its own leader locks,
+    so shards run in parallel while standbys of the same shard wait.
+    """
     print("Combined Scheduler Service: Instagram, Telegram, YouTube")
     print(f"Timezone: Asia/Kolkata")
+    print(f"Shard: {shard + 1} of {shards}")
     print(f"Interval: Every 30 seconds (Ctrl+C to stop)")
     print("-" * 50)
+    if shard == 0:
+        db_migrations.migrate()
+    # Each shard has its own ports; a standby of the same shard on this host takes them over
+    # (the change feed on its own, metrics once it leads) when the instance holding them exits
+    name = change_feed.scheduler_subscriber(shard)
+    metrics_server = metrics.serve(name)
+    changes = change_feed.ChangeSubscriber(name, get_db_connection).start()
+    partitions = {leader_lock.partition_name(platform, shard, shards): platform for platform in PLATFORMS}
+    leader = leader_lock.LeaderLock(get_db_connection, partitions)
+    last_prune = 0
     
     while True:
         try:
-            run_scheduler_once()
+            held = leader.refresh()
+            if not held:
+                print(f"Standby: other scheduler instances lead every platform of this shard. Retrying in {STANDBY_RETRY_SECONDS}s...")
+                sleep(STANDBY_RETRY_SECONDS)
+                continue
+            if metrics_server is None:
+                metrics_server = metrics.serve(name)
+            # Only the shard-0 instance leading every platform launches workers, so nothing double-launches,
+            # but every leader wakes the workers for the partitions it changed
+            run_scheduler_once(
+                platforms=[platform for partition, platform in partitions.items() if partition in held],
+                launch_workers=shard == 0 and len(held) == len(PLATFORMS),
+                notify_workers=True,
+                shard=shard,
+                shards=shards
+            )
+            if shard == 0 and datetime.now().timestamp() - last_prune > 3600:
+                prune_schedule_events()
+                last_prune = datetime.now().timestamp()
             print(f"Next run in 30 seconds: {datetime.now(TIMEZONE).strftime('%Y-%m-%d %H:%M:%S %Z')}")
-            sleep(30)
+            # Uploads and schedule edits from api.py wake the scheduler early
+            if changes.wait(30):
+                print("Change notification received. Running scheduler now.")
+                sleep(CHANGE_DEBOUNCE_SECONDS)
+                changes.changed.clear()
         except KeyboardInterrupt:
             print("\nScheduler terminated by user.")
+            leader.release()
             break
         except Exception as e:
             print(f"[ERROR] Scheduler error: {e}")
@@ -406,4 +623,15 @@ def run_continuous_scheduler():
             sleep(30)
 
 if __name__ == "__main__":
-    run_continuous_scheduler()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Combined Instagram/Telegram/YouTube scheduler")
+    parser.add_argument("--shard", type=int, default=int(os.getenv("SCHEDULER_SHARD", "0")),
+                        help="Shard owned by this process (0-based)")
+    parser.add_argument("--shards", type=int, default=int(os.getenv("SCHEDULER_SHARDS", "1")),
+                        help="Total number of scheduler shards")
+    args = parser.parse_args()
+    if not 0 <= args.shard < args.shards:
+        parser.error("--shard must be between 0 and --shards - 1")
+    if args.shards > 1 and leader_lock.SCHEDULER_SHARDS != args.shards:
+        # The single-platform schedulers read SCHEDULER_SHARDS to know they must not run
+        parser.error("set SCHEDULER_SHARDS to --shards when running sharded")
+    run_continuous_scheduler(args.shard, args.shards)
\ No newline at end of file
@@ -4,6 +4,7 @@ from datetime import datetime, time, timedelta
 import pytz
 from time import sleep
 import os
+import leader_lock
 # --- Configuration ---
 from dotenv import load_dotenv
 
@@ -58,71 +59,86 @@ def run_scheduler_once():
     Connects to the DB to update 'done', 'selected', and 'next_post_time' statuses.
     Runs post_on_telegram.py if there are scheduled Telegram posts.
     """
-    conn = get_db_connection()
-    if not conn:
-        print("ERROR: Failed to connect to database. Exiting.")
+    # A sharded combined scheduler locks telegram:K/N, which the lock below would not exclude
+    if leader_lock.SCHEDULER_SHARDS > 1:
+        print("ERROR: SCHEDULER_SHARDS > 1, so scheduler_combined.py owns the schedule. Exiting.")
+        return
+
+    # Only one scheduler may rewrite the telegram rows at a time (see leader_lock.py)
+    leader = leader_lock.LeaderLock(get_db_connection, ['telegram'])
+    if not leader.refresh():
+        print("Another scheduler is currently leading telegram. Skipping this run.")
         return
 
-    cursor = conn.cursor(dictionary=True)
+    try:
+        conn = get_db_connection()
+        if not conn:
+            print("ERROR: Failed to connect to database. Exiting.")
+            return
+
+        cursor = conn.cursor(dictionary=True)
     
-    # Get the current time in the specified timezone ('Asia/Kolkata')
-    now = datetime.now(TIMEZONE)
-    current_time = now.time()
+        # Get the current time in the specified timezone ('Asia/Kolkata')
+        now = datetime.now(TIMEZONE)
+        current_time = now.time()
     
-    print(f"\n--- Running Scheduler at {now.strftime('%Y-%m-%d %H:%M:%S %Z')} ---")
+        print(f"\n--- Running Scheduler at {now.strftime('%Y-%m-%d %H:%M:%S %Z')} ---")
 
-    table = 'telegram'
-    print(f"\nProcessing table: {table}\n")
+        table = 'telegram'
+        print(f"\nProcessing table: {table}\n")
     
-    cursor.execute(f"SELECT id, sch_start_range, sch_end_range, posts_left FROM {table}")
-    rows = cursor.fetchall()
+        cursor.execute(f"SELECT id, sch_start_range, sch_end_range, posts_left FROM {table}")
+        rows = cursor.fetchall()
 
-    for row in rows:
-        row_id = row['id']
+        for row in rows:
+            row_id = row['id']
         
-        # 1. Reset 'done' status if posts are left.
-        if row['posts_left'] > 0:
-            cursor.execute(f"UPDATE {table} SET done = 'No' WHERE id = %s", (row_id,))
-            print(f"  - ID {row_id}: posts_left > 0. Ensured 'done' is 'No'.")
-
-        # 2. Check schedule and update 'selected' and 'next_post_time'.
-        start_time = timedelta_to_time(row['sch_start_range'])
-        end_time = timedelta_to_time(row['sch_end_range'])
-
-        if not start_time or not end_time:
-            print(f"  - ID {row_id}: Missing schedule range. Cannot select.")
-            continue
-
-        # Check if the current time is within the allowed range and there are posts left
-        if start_time <= current_time <= end_time and row['posts_left'] > 0:
-            # Set 'selected' to 'Yes'
-            cursor.execute(f"UPDATE {table} SET selected = 'Yes' WHERE id = %s", (row_id,))
-            print(f"  - ID {row_id}: Is within schedule. Set 'selected' to 'Yes'.")
-
-            # Calculate next_post_time based on IST
-            end_datetime = now.replace(hour=end_time.hour, minute=end_time.minute, second=end_time.second, microsecond=0)
+            # 1. Reset 'done' status if posts are left.
+            if row['posts_left'] > 0:
+                cursor.execute(f"UPDATE {table} SET done = 'No' WHERE id = %s", (row_id,))
+                print(f"  - ID {row_id}: posts_left > 0. Ensured 'done' is 'No'.")
+
+            # 2. Check schedule and update 'selected' and 'next_post_time'.
+            start_time = timedelta_to_time(row['sch_start_range'])
+            end_time = timedelta_to_time(row['sch_end_range'])
+
+            if not start_time or not end_time:
+                print(f"  - ID {row_id}: Missing schedule range. Cannot select.")
+                continue
+
+            # Check if the current time is within the allowed range and there are posts left
+            if start_time <= current_time <= end_time and row['posts_left'] > 0:
+                # Set 'selected' to 'Yes'
+                cursor.execute(f"UPDATE {table} SET selected = 'Yes' WHERE id = %s", (row_id,))
+                print(f"  - ID {row_id}: Is within schedule. Set 'selected' to 'Yes'.")
+
+                # Calculate next_post_time based on IST
+                end_datetime = now.replace(hour=end_time.hour, minute=end_time.minute, second=end_time.second, microsecond=0)
             
-            if end_datetime < now:
-                end_datetime += timedelta(days=1)
+                if end_datetime < now:
+                    end_datetime += timedelta(days=1)
 
-            time_left = end_datetime - now
-            posts_left = row['posts_left']
+                time_left = end_datetime - now
+                posts_left = row['posts_left']
             
-            if posts_left > 0 and time_left.total_seconds() > 0:
-                interval = time_left / posts_left
-                next_post_time = now + interval
+                if posts_left > 0 and time_left.total_seconds() > 0:
+                    interval = time_left / posts_left
+                    next_post_time = now + interval
                 
-                # Store the calculated time in IST
-                cursor.execute(f"UPDATE {table} SET next_post_time = %s WHERE id = %s", (next_post_time, row_id))
-                print(f"    -> Calculated next post time: {next_post_time.strftime('%Y-%m-%d %H:%M:%S %Z')}")
-        else:
-            # If not in range, ensure 'selected' is 'No' and clear the next post time
-            cursor.execute(f"UPDATE {table} SET selected = 'No', next_post_time = NULL WHERE id = %s", (row_id,))
-
-    # Commit all changes made during this run
-    conn.commit()
-    cursor.close()
-    conn.close()
+                    # Store the calculated time in IST
+                    cursor.execute(f"UPDATE {table} SET next_post_time = %s WHERE id = %s", (next_post_time, row_id))
+                    print(f"    -> Calculated next post time: {next_post_time.strftime('%Y-%m-%d %H:%M:%S %Z')}")
+            else:
+                # If not in range, ensure 'selected' is 'No' and clear the next post time
+                cursor.execute(f"UPDATE {table} SET selected = 'No', next_post_time = NULL WHERE id = %s", (row_id,))
+
+        # Commit all changes made during this run
+        conn.commit()
+        cursor.close()
+        conn.close()
+    finally:
+        # Also on errors and early returns, so the next run is not locked out
+        leader.release()
     print("\n--- Scheduler run complete ---\n")
     sleep(3)
 
@@ -2,6 +2,7 @@ import mysql.connector
 from datetime import datetime, time, timedelta
 import pytz
 import os
+import leader_lock
 from dotenv import load_dotenv
 
 # Load environment variables
@@ -71,57 +72,72 @@ def calculate_initial_schedule(now, start_time, end_time, posts_left):
 
 # --- Main Scheduler Logic ---
 def run_scheduler_once():
-    conn = get_db_connection()
-    if not conn:
-        print("ERROR: Failed to connect to database")
+    # A sharded combined scheduler locks youtube:K/N, which the lock below would not exclude
+    if leader_lock.SCHEDULER_SHARDS > 1:
+        print("ERROR: SCHEDULER_SHARDS > 1, so scheduler_combined.py owns the schedule. Exiting.")
+        return
+
+    # Only one scheduler may rewrite the youtube rows at a time (see leader_lock.py)
+    leader = leader_lock.LeaderLock(get_db_connection, ['youtube'])
+    if not leader.refresh():
+        print("Another scheduler is currently leading youtube. Skipping this run.")
         return
 
-    cursor = conn.cursor(dictionary=True)
-    now = datetime.now(TIMEZONE)
-    current_time = now.time()
+    try:
+        conn = get_db_connection()
+        if not conn:
+            print("ERROR: Failed to connect to database")
+            return
+
+        cursor = conn.cursor(dictionary=True)
+        now = datetime.now(TIMEZONE)
+        current_time = now.time()
     
-    print(f"\n--- Running YouTube Scheduler at {now.strftime('%Y-%m-%d %H:%M:%S %Z')} ---")
+        print(f"\n--- Running YouTube Scheduler at {now.strftime('%Y-%m-%d %H:%M:%S %Z')} ---")
 
-    # Reset done status for channels with posts left
-    cursor.execute("UPDATE youtube SET done = 'No' WHERE posts_left > 0")
+        # Reset done status for channels with posts left
+        cursor.execute("UPDATE youtube SET done = 'No' WHERE posts_left > 0")
     
-    # Get all active YouTube channels
-    cursor.execute("SELECT id, sch_start_range, sch_end_range, posts_left, next_post_time FROM youtube WHERE posts_left > 0")
-    rows = cursor.fetchall()
+        # Get all active YouTube channels
+        cursor.execute("SELECT id, sch_start_range, sch_end_range, posts_left, next_post_time FROM youtube WHERE posts_left > 0")
+        rows = cursor.fetchall()
 
-    for row in rows:
-        row_id = row['id']
-        start_time = timedelta_to_time(row['sch_start_range'])
-        end_time = timedelta_to_time(row['sch_end_range'])
+        for row in rows:
+            row_id = row['id']
+            start_time = timedelta_to_time(row['sch_start_range'])
+            end_time = timedelta_to_time(row['sch_end_range'])
 
-        if not start_time or not end_time:
-            print(f"  - ID {row_id}: Missing schedule range")
-            continue
+            if not start_time or not end_time:
+                print(f"  - ID {row_id}: Missing schedule range")
+                continue
 
-        if start_time <= current_time <= end_time and row['posts_left'] > 0:
-            cursor.execute("UPDATE youtube SET selected = 'Yes' WHERE id = %s", (row_id,))
-            print(f"  - ID {row_id}: Within schedule. Set 'selected' to 'Yes'")
+            if start_time <= current_time <= end_time and row['posts_left'] > 0:
+                cursor.execute("UPDATE youtube SET selected = 'Yes' WHERE id = %s", (row_id,))
+                print(f"  - ID {row_id}: Within schedule. Set 'selected' to 'Yes'")
 
-            if not row['next_post_time'] or row['next_post_time'] <= now:
-                post_times = calculate_initial_schedule(now, start_time, end_time, row['posts_left'])
+                if not row['next_post_time'] or row['next_post_time'] <= now:
+                    post_times = calculate_initial_schedule(now, start_time, end_time, row['posts_left'])
                 
-                if post_times:
-                    next_post = post_times[0]
-                    cursor.execute("UPDATE youtube SET next_post_time = %s WHERE id = %s", (next_post, row_id))
-                    print(f"    → Next upload: {next_post.strftime('%Y-%m-%d %H:%M:%S %Z')}")
+                    if post_times:
+                        next_post = post_times[0]
+                        cursor.execute("UPDATE youtube SET next_post_time = %s WHERE id = %s", (next_post, row_id))
+                        print(f"    → Next upload: {next_post.strftime('%Y-%m-%d %H:%M:%S %Z')}")
+                    else:
+                        cursor.execute("UPDATE youtube SET selected = 'No', next_post_time = NULL WHERE id = %s", (row_id,))
+                        print(f"    → No uploads can be scheduled")
                 else:
-                    cursor.execute("UPDATE youtube SET selected = 'No', next_post_time = NULL WHERE id = %s", (row_id,))
-                    print(f"    → No uploads can be scheduled")
+                    print(f"    → Next upload already scheduled: {row['next_post_time'].strftime('%Y-%m-%d %H:%M:%S %Z')}")
             else:
-                print(f"    → Next upload already scheduled: {row['next_post_time'].strftime('%Y-%m-%d %H:%M:%S %Z')}")
-        else:
-            cursor.execute("UPDATE youtube SET selected = 'No', next_post_time = NULL WHERE id = %s", (row_id,))
-            if row['posts_left'] > 0:
-                print(f"  - ID {row_id}: Outside schedule range")
-
-    conn.commit()
-    cursor.close()
-    conn.close()
+                cursor.execute("UPDATE youtube SET selected = 'No', next_post_time = NULL WHERE id = %s", (row_id,))
+                if row['posts_left'] > 0:
+                    print(f"  - ID {row_id}: Outside schedule range")
+
+        conn.commit()
+        cursor.close()
+        conn.close()
+    finally:
+        # Also on errors and early returns, so the next run is not locked out
+        leader.release()
     print("\n--- YouTube scheduler complete ---\n")
 
     # Check for scheduled posts
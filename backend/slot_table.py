@@ -0,0 +1,161 @@
+import json
+import hashlib
+from datetime import datetime, timedelta
+import mysql.connector
+import pytz
+
+TIMEZONE = pytz.timezone('Asia/Kolkata')
+SLOT_FORMAT = '%Y-%m-%d %H:%M:%S'
+# A slot missed by more than this (e.g. the worker was down) is dropped instead of posted late
+SLOT_GRACE_MINUTES = 10
+SLOT_LOAD_CHUNK = 1000
+
+# --- Table Setup ---
+def ensure_slot_table(cursor):
+    """Create the per-account daily timetable table if it does not exist."""
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS schedule_slots (
+            platform VARCHAR(20) NOT NULL,
+            account_id INT NOT NULL,
+            slot_date DATE NOT NULL,
+            slots TEXT NOT NULL,
+            slot_index INT NOT NULL DEFAULT 0,
+            config_digest CHAR(32) NOT NULL,
+            PRIMARY KEY (platform, account_id)
+        )
+    """)
+
+# --- Timetable Building ---
+def get_config_digest(start_range, end_range, post_daily_range, slot_date):
+    """Anything that changes the shape of the day's timetable."""
+    config_string = f"{start_range}_{end_range}_{post_daily_range}_{slot_date}"
+    return hashlib.md5(config_string.encode()).hexdigest()
+
+def build_daily_slots(now, start_time, end_time, num_posts):
+    """
+    The day's posting times for range posts.
+    Slots are evenly spaced and centred in the window, so a single post lands
+    at the midpoint. If the timetable is built after the window opened (first
+    run of the day or a config change), only the remaining part is used.
+    """
+    if num_posts <= 0:
+        return []
+
+    start_datetime = now.replace(hour=start_time.hour, minute=start_time.minute, second=start_time.second, microsecond=0)
+    end_datetime = now.replace(hour=end_time.hour, minute=end_time.minute, second=end_time.second, microsecond=0)
+    if end_datetime <= start_datetime:
+        end_datetime += timedelta(days=1)
+
+    if now >= end_datetime:
+        return []
+    if now > start_datetime:
+        start_datetime = now
+
+    interval_seconds = max((end_datetime - start_datetime).total_seconds() / num_posts, 60)
+    slots = []
+    for i in range(num_posts):
+        slot = start_datetime + timedelta(seconds=interval_seconds * (i + 0.5))
+        if slot >= end_datetime:
+            break
+        slots.append(slot)
+    return slots
+
+# --- Scheduler Side ---
+def load_slots(cursor, platform, account_ids):
+    """Timetables of the given accounts, keyed by account id."""
+    states = {}
+    account_ids = list(account_ids)
+    for i in range(0, len(account_ids), SLOT_LOAD_CHUNK):
+        chunk = account_ids[i:i + SLOT_LOAD_CHUNK]
+        placeholders = ", ".join(["%s"] * len(chunk))
+        cursor.execute(f"""
+            SELECT account_id, slot_date, slots, slot_index, config_digest
+            FROM schedule_slots
+            WHERE platform = %s AND account_id IN ({placeholders})
+        """, (platform, *chunk))
+        for row in cursor.fetchall():
+            states[row['account_id']] = {
+                'slot_date': row['slot_date'],
+                'slots': row['slots'],
+                'slot_index': row['slot_index'],
+                'config_digest': row['config_digest'],
+                'dirty': False
+            }
+    return states
+
+def ensure_daily_slots(state, now, start_time, end_time, num_posts, config_digest):
+    """
+    Return the account's timetable, materializing it when the day or the
+    schedule config changed. Everything else reuses the stored list.
+    """
+    if state and state['slot_date'] == now.date() and state['config_digest'] == config_digest:
+        return state, False
+    slots = build_daily_slots(now, start_time, end_time, num_posts)
+    state = {
+        'slot_date': now.date(),
+        'slots': json.dumps([slot.strftime(SLOT_FORMAT) for slot in slots]),
+        'slot_index': 0,
+        'config_digest': config_digest,
+        'dirty': True
+    }
+    return state, True
+
+def next_slot(state, now):
+    """
+    The slot at slot_index, skipping slots missed by more than SLOT_GRACE_MINUTES.
+    Returns an aware datetime, or None when the day's timetable is used up.
+    """
+    slots = json.loads(state['slots'])
+    cutoff = now - timedelta(minutes=SLOT_GRACE_MINUTES)
+    while state['slot_index'] < len(slots):
+        slot = TIMEZONE.localize(datetime.strptime(slots[state['slot_index']], SLOT_FORMAT))
+        if slot >= cutoff:
+            return slot
+        state['slot_index'] += 1
+        state['dirty'] = True
+    return None
+
+def save_slots(cursor, platform, states):
+    """
+    Upsert every rebuilt or advanced timetable in one multi-row statement.
+    slot_index is assigned first, while the stored timetable is still in the
+    row: for the same timetable it only moves forward, so a pop_slot() a
+    worker made since load_slots() is kept; a rebuilt timetable starts over.
+    """
+    rows = [
+        (platform, account_id, state['slot_date'], state['slots'], state['slot_index'], state['config_digest'])
+        for account_id, state in states.items() if state['dirty']
+    ]
+    if not rows:
+        return 0
+    cursor.executemany("""
+        INSERT INTO schedule_slots (platform, account_id, slot_date, slots, slot_index, config_digest)
+        VALUES (%s, %s, %s, %s, %s, %s)
+        ON DUPLICATE KEY UPDATE
+            slot_index = IF(slot_date = VALUES(slot_date) AND slots = VALUES(slots)
+                                AND config_digest = VALUES(config_digest),
+                            GREATEST(slot_index, VALUES(slot_index)), VALUES(slot_index)),
+            slot_date = VALUES(slot_date),
+            slots = VALUES(slots),
+            config_digest = VALUES(config_digest)
+    """, rows)
+    return len(rows)
+
+# --- Worker Side ---
+def consumes_slot(item):
+    """
+    Whether posting this schedule item uses up today's current slot. Range
+    posts do, except retries of a failed post, which go out at their own
+    retry time rather than at a slot.
+    """
+    return item.get('schedule_type') == 'range' and not item.get('attempts')
+
+def pop_slot(cursor, platform, account_id):
+    """Consume today's current slot after a range post went out."""
+    try:
+        cursor.execute("""
+            UPDATE schedule_slots SET slot_index = slot_index + 1
+            WHERE platform = %s AND account_id = %s AND slot_date = %s
+        """, (platform, account_id, datetime.now(TIMEZONE).date()))
+    except mysql.connector.Error as e:
+        print(f"WARNING: Could not advance posting timetable for {platform} account {account_id}: {str(e)}")
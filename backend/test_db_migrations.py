@@ -0,0 +1,43 @@
+"""
+Hot-query EXPLAIN check from db_migrations.py, run under pytest.
+
+Seeds the hot tables in a scratch database (it drops them first), applies
+the migrations and fails if any hot query does a full table or full index
+scan. Skipped unless a MySQL server is configured through the usual DB_*
+variables and EXPLAIN_TEST_DATABASE names the scratch database.
+
+Usage:
+    EXPLAIN_TEST_DATABASE=socio_scratch python -m pytest test_db_migrations.py
+"""
+import os
+import pytest
+
+pytest.importorskip("mysql.connector")
+dotenv = pytest.importorskip("dotenv")
+
+# Load environment variables from .env file
+dotenv.load_dotenv()
+
+SCRATCH_DATABASE = os.getenv("EXPLAIN_TEST_DATABASE")
+SEED_ROWS = int(os.getenv("EXPLAIN_TEST_ROWS", "20000"))
+
+if not (SCRATCH_DATABASE and os.getenv("DB_HOST") and os.getenv("DB_PORT")):
+    pytest.skip("No scratch database configured (set DB_* and EXPLAIN_TEST_DATABASE)", allow_module_level=True)
+
+import db_migrations
+
+@pytest.fixture(scope="module")
+def scratch_config():
+    if SCRATCH_DATABASE == db_migrations.DB_CONFIG["database"]:
+        pytest.skip("EXPLAIN_TEST_DATABASE must not be the application database; seeding drops tables")
+    config = dict(db_migrations.DB_CONFIG, database=SCRATCH_DATABASE)
+    conn = db_migrations.get_db_connection(config)
+    if not conn:
+        pytest.skip(f"Cannot connect to scratch database {SCRATCH_DATABASE}")
+    conn.close()
+    db_migrations.seed_scratch_tables(config, SEED_ROWS)
+    db_migrations.migrate(config)
+    return config
+
+def test_hot_queries_use_an_index(scratch_config):
+    assert db_migrations.explain_hot_queries(scratch_config) == []
@@ -0,0 +1,146 @@
+"""
+Stage-level tracing for the posting pipeline.
+
+Each post is one trace and each pipeline stage inside it (login, download,
+upload, ...) is one span. Finished spans are appended as JSON lines to
+TRACE_FILE, so traces from every worker end up in one local file.
+
+    with tracing.trace('instagram_post', account_id=12):
+        with tracing.span('download'):
+            ...
+
+Back-off waits go through tracing.sleep(), which records them as 'sleep'
+spans, and workers end a post's trace before pausing between posts.
+
+Summary of the recorded stages:
+    python tracing.py [--file traces.jsonl] [--trace instagram_post]
+"""
+import os
+import json
+import time
+import math
+import uuid
+import argparse
+import threading
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dotenv import load_dotenv
+
+# Load environment variables from .env file
+load_dotenv()
+
+# --- Configuration ---
+TRACE_FILE = os.getenv("TRACE_FILE", "traces.jsonl")
+TRACING_ENABLED = os.getenv("TRACING_ENABLED", "1") != "0"
+
+# (trace_id, trace_name, span_id) of the innermost open span; contextvars keep asyncio tasks apart
+_current = ContextVar('tracing_current', default=None)
+_export_lock = threading.Lock()
+
+# --- Exporter ---
+def export(record):
+    line = json.dumps(record, default=str)
+    with _export_lock:
+        try:
+            with open(TRACE_FILE, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+        except OSError as e:
+            print(f"WARNING: Could not write trace span: {str(e)}")
+
+# --- Spans ---
+@contextmanager
+def _record(name, trace_id, trace_name, parent_id, attributes):
+    span_id = uuid.uuid4().hex[:16]
+    token = _current.set((trace_id, trace_name, span_id))
+    started_at = time.time()
+    started = time.perf_counter()
+    status = "ok"
+    try:
+        yield
+    except BaseException as e:
+        status = f"error: {type(e).__name__}"
+        raise
+    finally:
+        duration_ms = (time.perf_counter() - started) * 1000
+        _current.reset(token)
+        export({
+            "trace_id": trace_id,
+            "trace": trace_name,
+            "span_id": span_id,
+            "parent_id": parent_id,
+            "name": name,
+            "start": started_at,
+            "duration_ms": round(duration_ms, 3),
+            "status": status,
+            "attributes": attributes,
+        })
+
+@contextmanager
+def trace(name, **attributes):
+    """Start a new trace; its root span is named after the trace."""
+    if not TRACING_ENABLED:
+        yield
+        return
+    with _record(name, uuid.uuid4().hex, name, None, attributes):
+        yield
+
+@contextmanager
+def span(name, **attributes):
+    """A stage of the current trace. Outside a trace nothing is recorded."""
+    current = _current.get()
+    if not TRACING_ENABLED or current is None:
+        yield
+        return
+    trace_id, trace_name, parent_id = current
+    with _record(name, trace_id, trace_name, parent_id, attributes):
+        yield
+
+def sleep(seconds, name='sleep'):
+    """time.sleep() as its own span, so back-off waits show up apart from the work around them."""
+    with span(name, seconds=seconds):
+        time.sleep(seconds)
+
+# --- Summary ---
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list."""
+    rank = max(1, math.ceil(fraction * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+def summarize(path=TRACE_FILE, trace_name=None):
+    """Per (trace, stage) durations in milliseconds, from the JSON lines in path."""
+    durations = defaultdict(list)
+    errors = defaultdict(int)
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if trace_name and record.get("trace") != trace_name:
+                continue
+            # Records written without a trace or stage name are grouped under ""
+            key = (record.get("trace") or "", record.get("name") or "")
+            durations[key].append(record["duration_ms"])
+            if record.get("status") != "ok":
+                errors[key] += 1
+    return durations, errors
+
+def print_summary(path=TRACE_FILE, trace_name=None):
+    durations, errors = summarize(path, trace_name)
+    if not durations:
+        print(f"No spans found in {path}")
+        return
+    print(f"{'trace':<18} {'stage':<28} {'count':>6} {'errors':>6} {'p50 ms':>10} {'p95 ms':>10} {'max ms':>10} {'total s':>9}")
+    for (trace_key, stage), values in sorted(durations.items(), key=lambda item: (item[0][0], -sum(item[1]))):
+        values.sort()
+        print(f"{trace_key:<18} {stage:<28} {len(values):>6} {errors[(trace_key, stage)]:>6} "
+              f"{percentile(values, 0.5):>10.1f} {percentile(values, 0.95):>10.1f} {values[-1]:>10.1f} "
+              f"{sum(values) / 1000:>9.1f}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="p50/p95 per posting stage from recorded traces")
+    parser.add_argument("--file", default=TRACE_FILE, help="JSON lines trace file")
+    parser.add_argument("--trace", help="Only include traces with this name, e.g. instagram_post")
+    args = parser.parse_args()
+    print_summary(args.file, args.trace)
@@ -0,0 +1,120 @@
+import os
+import time
+import threading
+from datetime import datetime
+import pytz
+import mysql.connector
+import change_feed
+
+TIMEZONE = pytz.timezone('Asia/Kolkata')
+# Safety-net interval for re-reading the next_post_time the worker would claim (one indexed
+# query); schedule changes normally arrive through the change feed straight away
+WATCH_POLL_SECONDS = int(os.getenv("SCHEDULE_WATCH_POLL_SECONDS", "60"))
+
+_NOT_WAITING = object()
+
+def seconds_until(next_post_time):
+    """Seconds from now until a naive Asia/Kolkata next_post_time from the DB."""
+    if next_post_time.tzinfo is None:
+        next_post_time = TIMEZONE.localize(next_post_time)
+    return (next_post_time - datetime.now(TIMEZONE)).total_seconds()
+
+class ScheduleWatcher:
+    """
+    Cancellable timer for a posting worker.
+
+    wait_until() sleeps in a single Event.wait until the post is due. A
+    background thread re-reads the next_post_time of the row the worker would
+    claim next and re-arms the timer (wakes the sleeper early) as soon as it
+    differs from the time being waited on, so an edited or newly added
+    schedule is picked up without the worker polling every second.
+    Change-feed notifications for the platform re-arm it immediately.
+
+    next_post_time_sql must select that row the same way the worker's claim
+    query does (same joins and filters), returning only next_post_time; a
+    looser query would see rows the worker never claims and re-arm on every
+    poll. The default matches a claim query on the table alone. subscriber
+    is the worker's change-feed name (default: the table).
+    """
+
+    def __init__(self, get_db_connection, table, next_post_time_sql=None, subscriber=None,
+                 poll_seconds=WATCH_POLL_SECONDS):
+        self._get_db_connection = get_db_connection
+        self._table = table
+        self._subscriber = subscriber or table
+        self._next_post_time_sql = next_post_time_sql or f"""
+            SELECT next_post_time FROM {table}
+            WHERE selected = 'Yes' AND done = 'No' AND posts_left > 0 AND next_post_time IS NOT NULL
+            ORDER BY next_post_time ASC
+            LIMIT 1
+        """
+        self._poll_seconds = poll_seconds
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+        self._expected = _NOT_WAITING
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._watch, name=f"{self._table}-schedule-watcher", daemon=True)
+            self._thread.start()
+            change_feed.ChangeSubscriber(self._subscriber, self._get_db_connection,
+                                         platforms=[self._table], on_change=lambda _: self.rearm()).start()
+        return self
+
+    def rearm(self):
+        """Wake the worker so it re-reads its next scheduled account."""
+        self._event.set()
+
+    def _next_post_time(self):
+        conn = self._get_db_connection()
+        if not conn:
+            return _NOT_WAITING
+        try:
+            cursor = conn.cursor()
+            cursor.execute(self._next_post_time_sql)
+            result = cursor.fetchone()
+            cursor.close()
+            return result[0] if result else None
+        except mysql.connector.Error:
+            return _NOT_WAITING
+        finally:
+            conn.close()
+
+    def _watch(self):
+        while True:
+            time.sleep(self._poll_seconds)
+            with self._lock:
+                expected = self._expected
+            if expected is _NOT_WAITING:
+                continue
+            next_post_time = self._next_post_time()
+            if next_post_time is not _NOT_WAITING and next_post_time != expected:
+                self.rearm()
+
+    def _wait(self, expected, timeout):
+        # A re-arm that arrived since the last wait is kept, so the caller re-fetches right away
+        with self._lock:
+            self._expected = expected
+        try:
+            return self._event.wait(timeout)
+        finally:
+            with self._lock:
+                self._expected = _NOT_WAITING
+                self._event.clear()
+
+    def wait_until(self, next_post_time):
+        """
+        Sleep until next_post_time. Returns True when the post is due, or False
+        if the schedule changed first and the caller should re-fetch.
+        """
+        while True:
+            remaining = seconds_until(next_post_time)
+            if remaining <= 0:
+                return True
+            if self._wait(next_post_time, remaining):
+                return False
+
+    def wait_for_change(self, timeout):
+        """Idle wait while nothing is scheduled; returns early once something is."""
+        return self._wait(None, timeout)